@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Pago, PagoInscripcion, Donacion
+from .models import Pago, PagoInscripcion, Donacion, DailySalesRollup, ExchangeRate, PaymentReference, PaymentTransition, ProcessedWebhookEvent, Reembolso
 
 # Configuración del administrador para el modelo Pago
 @admin.register(Pago)
@@ -24,3 +24,77 @@ class DonacionAdmin(admin.ModelAdmin):
     list_filter = ('estado', 'metodo_pago')
     search_fields = ('nombre_donante', 'email_donante', 'referencia_transaccion')
     ordering = ('-id',)
+
+# Configuración del administrador para el índice de referencias de pago
+@admin.register(PaymentReference)
+class PaymentReferenceAdmin(admin.ModelAdmin):
+    list_display = ('reference', 'provider', 'content_type', 'object_id', 'created_at')
+    list_filter = ('provider', 'content_type')
+    search_fields = ('=reference',)
+    ordering = ('-id',)
+
+# Configuración del administrador para los eventos de webhook
+@admin.register(ProcessedWebhookEvent)
+class ProcessedWebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'event_type', 'status', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('status', 'event_type', 'provider')
+    search_fields = ('=event_id',)
+    readonly_fields = ('event_id', 'provider', 'event_type', 'payload', 'attempts', 'error', 'received_at', 'processed_at')
+    ordering = ('-received_at',)
+
+# Configuración del administrador para el historial de tipos de cambio
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ('fetched_at', 'base', 'quote', 'rate', 'source')
+    list_filter = ('base', 'quote', 'source')
+    date_hierarchy = 'fetched_at'
+    ordering = ('-fetched_at',)
+
+# Configuración del administrador para los resúmenes diarios de ventas (solo lectura)
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'tipo', 'moneda', 'metodo_pago', 'estado', 'cantidad', 'total_crc', 'total_usd')
+    list_filter = ('tipo', 'estado', 'moneda', 'metodo_pago')
+    date_hierarchy = 'fecha'
+    ordering = ('-fecha',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+# Configuración del administrador para el historial de transiciones (solo lectura)
+@admin.register(PaymentTransition)
+class PaymentTransitionAdmin(admin.ModelAdmin):
+    list_display = ('content_type', 'object_id', 'from_estado', 'to_estado', 'source', 'created_at')
+    list_filter = ('to_estado', 'source', 'content_type')
+    search_fields = ('=object_id',)
+    ordering = ('-created_at',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+# Configuración del administrador para los reembolsos (se crean con ReembolsoService)
+@admin.register(Reembolso)
+class ReembolsoAdmin(admin.ModelAdmin):
+    list_display = ('id', 'content_type', 'object_id', 'monto', 'moneda', 'tipo', 'estado', 'proveedor', 'fecha_creacion')
+    list_filter = ('estado', 'tipo', 'proveedor', 'moneda')
+    search_fields = ('=object_id', 'referencia_externa', 'idempotency_key')
+    readonly_fields = (
+        'content_type', 'object_id', 'monto', 'moneda', 'tipo', 'estado', 'proveedor', 'idempotency_key',
+        'referencia_externa', 'error', 'fecha_creacion', 'fecha_actualizacion', 'fecha_completado',
+    )
+    ordering = ('-fecha_creacion',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,33 @@
+"""
+Excepciones del módulo de pagos
+"""
+
+
+class PaymentError(Exception):
+    """Error base de las operaciones de pagos"""
+
+
+class TransicionInvalidaError(PaymentError):
+    """El cambio de estado solicitado no está permitido para el pago
+
+    Attributes:
+        actual (str): Estado actual del pago
+        nuevo (str): Estado solicitado
+    """
+
+    def __init__(self, actual, nuevo):
+        self.actual = actual
+        self.nuevo = nuevo
+        super().__init__(f'Transición no permitida: {actual} -> {nuevo}')
+
+
+class ReembolsoError(PaymentError):
+    """El reembolso solicitado no se puede crear o procesar"""
+
+
+class ProveedorNoDisponibleError(PaymentError):
+    """El proveedor de pagos no respondió
+
+    Se desconoce si aplicó la operación; se reintenta con la misma llave de
+    idempotencia en lugar de darla por fallida.
+    """
@@ -0,0 +1,199 @@
+"""
+Carga masiva de pagos y donaciones
+
+``BulkIngestor`` inserta pagos (``Pago``) o donaciones (``Donacion``) por
+lotes con ``bulk_create``, p. ej. pagos en efectivo/SINPE registrados fuera
+del sistema o donaciones históricas. Por cada lote:
+
+- valida los campos de cada fila sin consultar la base de datos;
+- calcula ``monto_crc`` y ``monto_usd`` con un único tipo de cambio para
+  toda la carga (``CurrencyConverter.fill_amounts``);
+- verifica que ``referencia_transaccion`` no exista con una sola consulta
+  ``IN`` (y que no se repita dentro de la carga);
+- inserta las filas válidas y registra sus referencias en
+  ``PaymentReference`` en la misma transacción;
+- encola el recálculo de los resúmenes de ventas de los días cargados.
+
+``bulk_create`` no ejecuta ``save()`` ni las señales de los modelos, por lo
+que los comprobantes no se admiten en la carga. Las fechas (``fecha_pago``
+o ``fecha_creacion``) indicadas en las filas se conservan.
+
+``PagoInscripcion`` no se admite: ``bulk_create`` no funciona con modelos
+que heredan de otra tabla.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from decimal import Decimal
+from itertools import islice
+from typing import Iterable, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Donacion, Pago, PaymentReference
+from .reports import sale_date
+from .services import CurrencyConverter
+from .tasks import schedule_sales_rollup
+
+logger = logging.getLogger(__name__)
+
+# Campo de fecha de cada modelo admitido
+DATE_FIELDS = {
+    Pago: 'fecha_pago',
+    Donacion: 'fecha_creacion',
+}
+
+CONVERTED_FIELDS = ('monto_crc', 'monto_usd')
+
+
+def _format_errors(error):
+    return '; '.join(f'{name}: {" ".join(messages)}' for name, messages in error.message_dict.items())
+
+
+@dataclass
+class IngestionResult:
+    """Resultado de una carga masiva
+
+    Attributes:
+        created (int): Registros insertados
+        duplicates (list): Referencias que ya existían o se repetían en la carga
+        errors (list): Tuplas (número de fila, mensaje) de las filas rechazadas
+    """
+    created: int = 0
+    duplicates: List[str] = field(default_factory=list)
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+
+class BulkIngestor:
+    """Inserta pagos o donaciones por lotes
+
+    Args:
+        model: ``Pago`` o ``Donacion``
+        batch_size (int): Filas por lote (y por sentencia ``INSERT``)
+        rate (Decimal): Tipo de cambio para toda la carga; por defecto el actual
+
+    Ejemplo:
+    ```python
+    result = BulkIngestor(Pago).ingest(csv.DictReader(archivo))
+    ```
+    """
+
+    def __init__(self, model, batch_size=1000, rate: Optional[Decimal] = None):
+        if model not in DATE_FIELDS:
+            raise ValueError(f'Modelo no admitido para carga masiva: {model.__name__}')
+        self.model = model
+        self.batch_size = batch_size
+        self.rate = rate
+        self.date_field = DATE_FIELDS[model]
+        self.field_names = {
+            f.name for f in model._meta.concrete_fields
+            if not f.primary_key and f.name not in CONVERTED_FIELDS and f.name != 'comprobante'
+        }
+        self._converted_only = [f.name for f in model._meta.fields if f.name not in CONVERTED_FIELDS]
+        self._seen = set()
+
+    def ingest(self, rows: Iterable[dict]) -> IngestionResult:
+        """Valida e inserta las filas por lotes
+
+        Args:
+            rows: Diccionarios con los campos del modelo; se leen por lotes,
+                por lo que puede ser un generador (p. ej. ``csv.DictReader``)
+
+        Returns:
+            IngestionResult: Totales de la carga
+        """
+        result = IngestionResult()
+        rows = enumerate(rows, start=1)
+        while True:
+            chunk = list(islice(rows, self.batch_size))
+            if not chunk:
+                break
+            self._ingest_chunk(chunk, result)
+        logger.info(
+            'Carga de %s: %s insertados, %s duplicados, %s con errores',
+            self.model._meta.label_lower, result.created, len(result.duplicates), len(result.errors),
+        )
+        return result
+
+    def _build(self, number, row, result):
+        unknown = set(row) - self.field_names
+        if unknown:
+            result.errors.append((number, f'Campos desconocidos: {", ".join(sorted(unknown))}'))
+            return None
+        instance = self.model(**{name: value for name, value in row.items() if value not in ('', None)})
+        try:
+            instance.clean_fields(exclude=CONVERTED_FIELDS)
+        except ValidationError as e:
+            result.errors.append((number, _format_errors(e)))
+            return None
+        fecha = getattr(instance, self.date_field)
+        if fecha is not None and timezone.is_naive(fecha):
+            setattr(instance, self.date_field, timezone.make_aware(fecha))
+        return instance
+
+    def _ingest_chunk(self, chunk, result):
+        built = []
+        for number, row in chunk:
+            instance = self._build(number, row, result)
+            if instance is not None:
+                built.append((number, instance))
+        if not built:
+            return
+
+        if self.rate is None:
+            self.rate = CurrencyConverter.get_exchange_rate()
+        CurrencyConverter.fill_amounts([instance for _, instance in built], rate=self.rate)
+
+        references = [instance.referencia_transaccion for _, instance in built if instance.referencia_transaccion]
+        existing = set(
+            self.model.objects.filter(referencia_transaccion__in=references)
+            .order_by().values_list('referencia_transaccion', flat=True)
+        ) if references else set()
+
+        valid = []
+        for number, instance in built:
+            reference = instance.referencia_transaccion
+            if reference and (reference in existing or reference in self._seen):
+                result.duplicates.append(reference)
+                continue
+            try:
+                instance.clean_fields(exclude=self._converted_only)
+            except ValidationError as e:
+                result.errors.append((number, _format_errors(e)))
+                continue
+            if reference:
+                self._seen.add(reference)
+            valid.append(instance)
+        if not valid:
+            return
+
+        # bulk_create asigna la fecha actual a los campos auto_now_add
+        dates = [getattr(instance, self.date_field) for instance in valid]
+        with transaction.atomic():
+            self.model.objects.bulk_create(valid, batch_size=self.batch_size)
+            self._ensure_pks(valid)
+            restored = []
+            for instance, fecha in zip(valid, dates):
+                if fecha is not None and instance.pk is not None:
+                    setattr(instance, self.date_field, fecha)
+                    restored.append(instance)
+            if restored:
+                self.model.objects.bulk_update(restored, [self.date_field], batch_size=self.batch_size)
+            PaymentReference.register_many(valid, batch_size=self.batch_size)
+            schedule_sales_rollup(sale_date(instance) for instance in valid)
+        result.created += len(valid)
+
+    def _ensure_pks(self, instances):
+        """Obtiene los IDs si la base de datos no los devuelve al insertar."""
+        missing = [instance for instance in instances if instance.pk is None]
+        if not missing:
+            return
+        pks = dict(
+            self.model.objects.filter(
+                referencia_transaccion__in=[instance.referencia_transaccion for instance in missing]
+            ).values_list('referencia_transaccion', 'pk')
+        )
+        for instance in missing:
+            instance.pk = pks.get(instance.referencia_transaccion)
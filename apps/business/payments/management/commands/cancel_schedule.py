@@ -0,0 +1,53 @@
+"""
+Comando de gestión para cancelar un horario y reembolsar sus inscripciones
+
+Marca el horario como cancelado y reembolsa por completo todos los pagos
+de inscripción completados del horario, por lotes y con un número acotado
+de reembolsos simultáneos (ver ``ReembolsoService.reembolsar_pagos``). Las
+inscripciones reembolsadas quedan canceladas.
+
+Si el comando se interrumpe, ejecutarlo de nuevo con el mismo horario no
+duplica reembolsos: solo procesa los que quedaron pendientes.
+
+Uso:
+    python manage.py cancel_schedule 42
+    python manage.py cancel_schedule 42 --concurrency 8 --motivo "Mal tiempo"
+
+Opciones:
+    --motivo: Motivo de los reembolsos
+    --concurrency: Reembolsos simultáneos (por defecto REFUNDS['MAX_CONCURRENCY'])
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.business.education.models import Horario
+from apps.business.payments.models import PagoInscripcion
+from apps.business.payments.services import ReembolsoService
+
+
+class Command(BaseCommand):
+    help = 'Cancela un horario y reembolsa los pagos de sus inscripciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('horario_id', type=int, help='ID del horario')
+        parser.add_argument('--motivo', default='', help='Motivo de los reembolsos')
+        parser.add_argument('--concurrency', type=int, help='Reembolsos simultáneos')
+
+    def handle(self, *args, **options):
+        horario_id = options['horario_id']
+        if not Horario.objects.filter(pk=horario_id).update(estado='cancelado'):
+            raise CommandError(f'No existe el horario {horario_id}')
+
+        resultado = ReembolsoService().reembolsar_pagos(
+            PagoInscripcion.objects.filter(inscripcion__horario_id=horario_id),
+            motivo=options['motivo'] or f'Cancelación del horario {horario_id}',
+            operacion=f'horario:{horario_id}',
+            max_concurrency=options['concurrency'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Horario {horario_id} cancelado; reembolsos: {dict(resultado) or "ninguno"}'
+        ))
+        if resultado['fallido'] or resultado['error']:
+            self.stderr.write(
+                'Algunos reembolsos no se completaron; revisarlos en el admin o ejecutar reconcile_refunds'
+            )
@@ -0,0 +1,74 @@
+"""
+Comando de gestión para cargar pagos o donaciones desde un archivo CSV
+
+La primera fila del archivo debe tener los nombres de los campos del modelo
+(p. ej. ``monto,moneda,metodo_pago,referencia_transaccion,fecha_pago``).
+Las filas se insertan por lotes con ``ingestion.BulkIngestor``; las filas
+inválidas o con referencias repetidas se omiten y se informan al final.
+
+Uso:
+    python manage.py import_payments pagos.csv
+    python manage.py import_payments donaciones.csv --model donacion --rate 520.50
+
+Opciones:
+    --model: Modelo a cargar (pago o donacion)
+    --batch-size: Filas por lote
+    --rate: Tipo de cambio USD/CRC para toda la carga (por defecto el actual)
+"""
+
+import csv
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.business.payments.ingestion import BulkIngestor
+from apps.business.payments.models import Donacion, Pago
+
+MODELS = {
+    'pago': Pago,
+    'donacion': Donacion,
+}
+
+
+class Command(BaseCommand):
+    help = 'Carga pagos o donaciones desde un archivo CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archivo CSV a cargar')
+        parser.add_argument(
+            '--model',
+            choices=sorted(MODELS),
+            default='pago',
+            help='Modelo a cargar'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Filas por lote'
+        )
+        parser.add_argument(
+            '--rate',
+            help='Tipo de cambio USD/CRC para toda la carga'
+        )
+
+    def handle(self, *args, **options):
+        rate = None
+        if options['rate']:
+            try:
+                rate = Decimal(options['rate'])
+            except InvalidOperation:
+                raise CommandError(f'Tipo de cambio inválido: {options["rate"]}')
+
+        ingestor = BulkIngestor(MODELS[options['model']], batch_size=options['batch_size'], rate=rate)
+        with open(options['path'], newline='', encoding='utf-8-sig') as archivo:
+            result = ingestor.ingest(csv.DictReader(archivo))
+
+        for number, message in result.errors[:20]:
+            self.stderr.write(f'Fila {number}: {message}')
+        if len(result.errors) > 20:
+            self.stderr.write(f'... y {len(result.errors) - 20} filas más con errores')
+        self.stdout.write(self.style.SUCCESS(
+            f'Insertados: {result.created}, duplicados: {len(result.duplicates)}, '
+            f'con errores: {len(result.errors)}'
+        ))
@@ -0,0 +1,49 @@
+"""
+Comando de gestión para reintentar eventos de webhook pendientes
+
+Los eventos se procesan en segundo plano al recibirse. Este comando procesa
+los que quedaron recibidos o fallidos, y devuelve a fallidos los que
+quedaron en proceso por más de ``--stale-minutes`` (p. ej. tras un reinicio).
+
+Uso:
+    python manage.py process_webhook_events
+    python manage.py process_webhook_events --min-age 60 --stale-minutes 15
+
+Opciones:
+    --min-age: Segundos mínimos desde la recepción (evita competir con el procesador en línea)
+    --stale-minutes: Minutos tras los que un evento en proceso se considera interrumpido
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.business.payments.webhooks import pending_events, process_event, reset_stale
+
+
+class Command(BaseCommand):
+    help = 'Procesa los eventos de webhook recibidos o fallidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=30,
+            help='Segundos mínimos desde la recepción'
+        )
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=10,
+            help='Minutos tras los que un evento en proceso se considera interrumpido'
+        )
+
+    def handle(self, *args, **options):
+        reset = reset_stale(timedelta(minutes=options['stale_minutes']))
+        event_ids = list(
+            pending_events(timedelta(seconds=options['min_age'])).values_list('event_id', flat=True)
+        )
+        processed = sum(1 for event_id in event_ids if process_event(event_id))
+        self.stdout.write(self.style.SUCCESS(
+            f'Eventos reiniciados: {reset}, procesados: {processed} de {len(event_ids)}'
+        ))
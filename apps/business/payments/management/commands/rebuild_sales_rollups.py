@@ -0,0 +1,56 @@
+"""
+Comando de gestión para recalcular los resúmenes diarios de ventas
+
+Los resúmenes se recalculan solos cuando cambia un pago; este comando se
+programa cada noche (p. ej. con cron) para corregir cualquier día que no se
+haya recalculado, y sirve para llenar el historial completo tras instalar
+los resúmenes. Los rangos largos se recalculan por bloques de un mes.
+
+Uso:
+    python manage.py rebuild_sales_rollups
+    python manage.py rebuild_sales_rollups --days 7
+    python manage.py rebuild_sales_rollups --desde 2023-01-01 --hasta 2025-12-31
+
+Opciones:
+    --days: Días a recalcular hasta hoy (por defecto ayer y hoy)
+    --desde / --hasta: Rango explícito de fechas (AAAA-MM-DD)
+"""
+
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.business.payments.reports import SalesRollupBuilder
+
+BLOQUE_DIAS = 31
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los resúmenes diarios de ventas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=2,
+            help='Días a recalcular hasta hoy'
+        )
+        parser.add_argument('--desde', type=date.fromisoformat, help='Primer día (AAAA-MM-DD)')
+        parser.add_argument('--hasta', type=date.fromisoformat, help='Último día (AAAA-MM-DD)')
+
+    def handle(self, *args, **options):
+        hasta = options['hasta'] or timezone.localdate()
+        desde = options['desde'] or hasta - timedelta(days=options['days'] - 1)
+        if desde > hasta:
+            raise CommandError('La fecha inicial debe ser anterior a la final')
+
+        filas = 0
+        inicio = desde
+        while inicio <= hasta:
+            fin = min(inicio + timedelta(days=BLOQUE_DIAS - 1), hasta)
+            filas += SalesRollupBuilder.rebuild(inicio, fin)
+            inicio = fin + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(
+            f'Resúmenes recalculados del {desde} al {hasta}: {filas} filas'
+        ))
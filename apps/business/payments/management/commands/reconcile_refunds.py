@@ -0,0 +1,42 @@
+"""
+Comando de gestión para conciliar los reembolsos con sus proveedores
+
+Actualiza los reembolsos que quedaron en proceso con el estado informado
+por Stripe (consultado por páginas) o PayPal, y reintenta los que quedaron
+pendientes por un error de red o un proceso interrumpido. Programarlo
+(p. ej. con cron cada 15 minutos) completa los reembolsos asíncronos y
+marca los pagos reembolsados por completo.
+
+Uso:
+    python manage.py reconcile_refunds
+    python manage.py reconcile_refunds --sin-reintentos
+
+Opciones:
+    --sin-reintentos: Solo concilia; no reintenta los reembolsos pendientes
+    --concurrency: Reintentos simultáneos (por defecto REFUNDS['MAX_CONCURRENCY'])
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.business.payments.services import ReembolsoService
+
+
+class Command(BaseCommand):
+    help = 'Concilia los reembolsos en proceso y reintenta los pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sin-reintentos',
+            action='store_true',
+            help='No reintentar los reembolsos pendientes'
+        )
+        parser.add_argument('--concurrency', type=int, help='Reintentos simultáneos')
+
+    def handle(self, *args, **options):
+        service = ReembolsoService()
+        conciliados = service.conciliar_reembolsos()
+        self.stdout.write(f'Reembolsos conciliados: {dict(conciliados) or "ninguno"}')
+        if options['sin_reintentos']:
+            return
+        reintentados = service.procesar_pendientes(max_concurrency=options['concurrency'])
+        self.stdout.write(self.style.SUCCESS(f'Reembolsos reintentados: {dict(reintentados) or "ninguno"}'))
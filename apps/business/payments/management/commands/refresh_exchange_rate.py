@@ -0,0 +1,24 @@
+"""
+Comando de gestión para actualizar el tipo de cambio USD/CRC
+
+El tipo se actualiza solo en segundo plano al vencer; programar este
+comando (p. ej. con cron cada hora) mantiene el tipo vigente y el
+historial al día aunque no haya tráfico.
+
+Uso:
+    python manage.py refresh_exchange_rate
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.business.payments.services import ExchangeRateService
+
+
+class Command(BaseCommand):
+    help = 'Consulta el tipo de cambio USD/CRC y lo guarda en el historial'
+
+    def handle(self, *args, **options):
+        rate = ExchangeRateService.refresh()
+        if rate is None:
+            raise CommandError('No se pudo obtener el tipo de cambio')
+        self.stdout.write(self.style.SUCCESS(f'Tipo de cambio actualizado: 1 USD = {rate} CRC'))
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_references(apps, schema_editor):
+    """Registra las referencias de los pagos y donaciones existentes."""
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    PaymentReference = apps.get_model('payments', 'PaymentReference')
+    inscripciones = set(
+        apps.get_model('payments', 'PagoInscripcion').objects.values_list('pk', flat=True)
+    )
+    content_types = {
+        model: ContentType.objects.get_or_create(app_label='payments', model=model)[0]
+        for model in ('pago', 'pagoinscripcion', 'donacion')
+    }
+
+    def rows():
+        for pk, reference in apps.get_model('payments', 'Pago').objects.values_list('pk', 'referencia_transaccion').iterator():
+            model = 'pagoinscripcion' if pk in inscripciones else 'pago'
+            yield PaymentReference(reference=reference, content_type=content_types[model], object_id=pk)
+        donaciones = apps.get_model('payments', 'Donacion').objects.exclude(referencia_transaccion__isnull=True)
+        for pk, reference in donaciones.exclude(referencia_transaccion='').values_list('pk', 'referencia_transaccion').iterator():
+            yield PaymentReference(reference=reference, content_type=content_types['donacion'], object_id=pk)
+
+    batch = []
+    for row in rows():
+        batch.append(row)
+        if len(batch) >= 1000:
+            PaymentReference.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    PaymentReference.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('payments', '0002_alter_pago_comprobante'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessedWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True)),
+                ('provider', models.CharField(default='stripe', max_length=20)),
+                ('event_type', models.CharField(max_length=100)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('RECEIVED', 'Recibido'), ('PROCESSING', 'Procesando'), ('PROCESSED', 'Procesado'), ('FAILED', 'Fallido')], default='RECEIVED', max_length=12)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Evento de Webhook',
+                'verbose_name_plural': 'Eventos de Webhook',
+                'ordering': ['-received_at'],
+                'indexes': [models.Index(fields=['status', 'received_at'], name='webhook_event_status_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PaymentReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(default='stripe', max_length=20)),
+                ('reference', models.CharField(max_length=255)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'Referencia de Pago',
+                'verbose_name_plural': 'Referencias de Pago',
+                'indexes': [models.Index(fields=['content_type', 'object_id'], name='payment_reference_target_idx')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'reference'), name='payment_reference_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('payments', '0003_webhook_events_and_references'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('from_estado', models.CharField(choices=[('PENDING', 'Pendiente'), ('PROCESSING', 'Procesando'), ('SUCCESS', 'Completado'), ('FAILED', 'Fallido'), ('REFUNDED', 'Reembolsado')], max_length=20)),
+                ('to_estado', models.CharField(choices=[('PENDING', 'Pendiente'), ('PROCESSING', 'Procesando'), ('SUCCESS', 'Completado'), ('FAILED', 'Fallido'), ('REFUNDED', 'Reembolsado')], max_length=20)),
+                ('source', models.CharField(blank=True, max_length=50)),
+                ('detail', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'Transición de Pago',
+                'verbose_name_plural': 'Transiciones de Pago',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['content_type', 'object_id', 'created_at'], name='payment_transition_target_idx')],
+            },
+        ),
+    ]
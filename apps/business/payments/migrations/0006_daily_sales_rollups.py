@@ -0,0 +1,50 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_exchange_rates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('tipo', models.CharField(choices=[('pago', 'Pago general'), ('inscripcion', 'Inscripción'), ('donacion', 'Donación')], max_length=20)),
+                ('moneda', models.CharField(choices=[('CRC', 'Colones'), ('USD', 'Dólares')], max_length=3)),
+                ('metodo_pago', models.CharField(choices=[('CARD', 'Tarjeta de Crédito/Débito'), ('PAYPAL', 'PayPal'), ('CASH', 'Efectivo/SINPE'), ('TRANSFER', 'Transferencia Bancaria'), ('OTHER', 'Otro')], max_length=30)),
+                ('estado', models.CharField(choices=[('PENDING', 'Pendiente'), ('PROCESSING', 'Procesando'), ('SUCCESS', 'Completado'), ('FAILED', 'Fallido'), ('REFUNDED', 'Reembolsado')], max_length=20)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('total_crc', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('total_usd', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Ventas',
+                'verbose_name_plural': 'Resúmenes Diarios de Ventas',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='donacion',
+            index=models.Index(fields=['fecha_creacion'], name='donacion_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['fecha_pago'], name='pago_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailysalesrollup',
+            index=models.Index(fields=['estado', 'fecha'], name='daily_sales_estado_fecha_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalesrollup',
+            constraint=models.UniqueConstraint(fields=('fecha', 'tipo', 'moneda', 'metodo_pago', 'estado'), name='daily_sales_rollup_uniq'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.3 on 2026-10-17 00:07
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('payments', '0006_daily_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reembolso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(0)])),
+                ('moneda', models.CharField(choices=[('CRC', 'Colones'), ('USD', 'Dólares')], max_length=3)),
+                ('tipo', models.CharField(choices=[('total', 'Total'), ('parcial', 'Parcial')], max_length=10)),
+                ('motivo', models.CharField(blank=True, max_length=255)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('fallido', 'Fallido')], default='pendiente', max_length=20)),
+                ('proveedor', models.CharField(choices=[('stripe', 'Stripe'), ('paypal', 'PayPal'), ('manual', 'Manual')], max_length=20)),
+                ('idempotency_key', models.CharField(max_length=255, unique=True)),
+                ('referencia_externa', models.CharField(blank=True, max_length=255, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('fecha_completado', models.DateTimeField(blank=True, null=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'Reembolso',
+                'verbose_name_plural': 'Reembolsos',
+                'ordering': ['fecha_creacion', 'id'],
+                'indexes': [models.Index(fields=['content_type', 'object_id'], name='reembolso_target_idx'), models.Index(fields=['estado', 'proveedor', 'fecha_creacion'], name='reembolso_estado_idx')],
+            },
+        ),
+    ]
@@ -1,5 +1,8 @@
 # Importaciones de Django
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.utils import timezone
 from django.core.validators import MinValueValidator  # Para validar montos positivos
 from config.storage_backends import MediaStorage
 
@@ -23,10 +26,9 @@ class Pago(models.Model):
     )
     ```
     
-    Para actualizar el estado de un pago:
+    Para actualizar el estado de un pago (ver ``state.PaymentStateMachine``):
     ```python
-    pago.estado = 'SUCCESS'
-    pago.save()
+    PaymentStateMachine.transition(pago, 'SUCCESS', source='admin')
     ```
     
     Attributes:
@@ -111,25 +113,43 @@ class Pago(models.Model):
         verbose_name = 'Pago'
         verbose_name_plural = 'Pagos'
         ordering = ['-fecha_pago']
+        indexes = [
+            models.Index(fields=['fecha_pago'], name='pago_fecha_idx'),
+        ]
+
+    # Relaciones cargadas con select_related al procesar el pago
+    PAYMENT_RELATED = ()
 
     def __str__(self):
         return f'Pago {self.referencia_transaccion} - {self.get_estado_display()}'
+
+    def payment_description(self):
+        """Descripción de la intención de pago en Stripe"""
+        return f"Pago general - {self.referencia_transaccion}"
+
+    def notification_data(self):
+        """Datos del pago para las notificaciones del frontend"""
+        return {
+            'id': self.id,
+            'monto': str(self.monto),
+            'moneda': self.moneda,
+            'fecha_pago': self.fecha_pago
+        }
+
+    def sync_related_estado(self, estado):
+        """Propaga un cambio de estado a los registros relacionados"""
         
     def save(self, *args, **kwargs):
-        """Guarda el pago y actualiza los montos en ambas monedas
+        """Guarda el pago y completa los montos en ambas monedas
         
-        Antes de guardar, calcula y actualiza los montos en CRC y USD
-        utilizando el servicio de conversión de divisas.
+        En la creación calcula los montos en CRC y USD que no se hayan
+        indicado (ver ``CurrencyConverter.fill_amounts``). Para cargas
+        masivas con ``bulk_create`` se usa ``ingestion.BulkIngestor``.
         """
         from .services import CurrencyConverter
         
         if not self.pk:  # Solo en creación
-            monto_crc, monto_usd = CurrencyConverter.get_both_currencies(
-                self.monto,
-                self.moneda
-            )
-            self.monto_crc = monto_crc
-            self.monto_usd = monto_usd
+            CurrencyConverter.fill_amounts([self])
             
         super().save(*args, **kwargs)
 
@@ -169,6 +189,14 @@ class PagoInscripcion(Pago):
         related_name='pago'
     )
 
+    # Estado de pago de la inscripción según el estado del pago
+    ESTADO_PAGO_INSCRIPCION = {
+        'SUCCESS': 'pagado',
+        'FAILED': 'pendiente',
+        'REFUNDED': 'cancelado',
+    }
+    PAYMENT_RELATED = ('inscripcion__horario__programa',)
+
     class Meta:
         verbose_name = 'Pago de Inscripción'
         verbose_name_plural = 'Pagos de Inscripciones'
@@ -176,14 +204,22 @@ class PagoInscripcion(Pago):
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
         # Actualizar estado de pago en la inscripción
-        if self.estado == 'SUCCESS':
-            self.inscripcion.estado_pago = 'pagado'
-        elif self.estado == 'FAILED':
-            self.inscripcion.estado_pago = 'pendiente'
-        elif self.estado == 'REFUNDED':
-            self.inscripcion.estado_pago = 'cancelado'
+        if self.estado in self.ESTADO_PAGO_INSCRIPCION:
+            self.inscripcion.estado_pago = self.ESTADO_PAGO_INSCRIPCION[self.estado]
         self.inscripcion.save()
 
+    def payment_description(self):
+        """Descripción de la intención de pago en Stripe"""
+        return f"Pago de inscripción para {self.inscripcion.horario.programa.nombre}"
+
+    def sync_related_estado(self, estado):
+        """Actualiza el estado de pago de la inscripción con una sola consulta"""
+        estado_pago = self.ESTADO_PAGO_INSCRIPCION.get(estado)
+        if estado_pago is None:
+            return
+        type(self.inscripcion).objects.filter(pk=self.inscripcion_id).update(estado_pago=estado_pago)
+        self.inscripcion.estado_pago = estado_pago
+
 class Donacion(models.Model):
     """Modelo para gestionar donaciones al parque
     
@@ -278,24 +314,588 @@ class Donacion(models.Model):
         verbose_name = 'Donación'
         verbose_name_plural = 'Donaciones'
         ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['fecha_creacion'], name='donacion_fecha_idx'),
+        ]
+
+    PAYMENT_RELATED = ()
 
     def __str__(self):
         return f'Donación {self.monto} {self.moneda} - {self.get_estado_display()}'
+
+    def payment_description(self):
+        """Descripción de la intención de pago en Stripe"""
+        return f"Donación de {self.nombre_donante or 'Anónimo'}"
+
+    def notification_data(self):
+        """Datos de la donación para las notificaciones del frontend"""
+        return {
+            'id': self.id,
+            'monto': str(self.monto),
+            'moneda': self.moneda,
+            'fecha_pago': self.fecha_creacion
+        }
+
+    def sync_related_estado(self, estado):
+        """Propaga un cambio de estado a los registros relacionados"""
         
     def save(self, *args, **kwargs):
-        """Guarda la donación y actualiza los montos en ambas monedas
+        """Guarda la donación y completa los montos en ambas monedas
         
-        Antes de guardar, calcula y actualiza los montos en CRC y USD
-        utilizando el servicio de conversión de divisas.
+        En la creación calcula los montos en CRC y USD que no se hayan
+        indicado (ver ``CurrencyConverter.fill_amounts``). Para cargas
+        masivas con ``bulk_create`` se usa ``ingestion.BulkIngestor``.
         """
         from .services import CurrencyConverter
         
         if not self.pk:  # Solo en creación
-            monto_crc, monto_usd = CurrencyConverter.get_both_currencies(
-                self.monto,
-                self.moneda
-            )
-            self.monto_crc = monto_crc
-            self.monto_usd = monto_usd
+            CurrencyConverter.fill_amounts([self])
             
         super().save(*args, **kwargs)
+
+
+class PaymentReference(models.Model):
+    """Índice de referencias de proveedores de pago hacia el registro local
+
+    Relaciona una referencia externa (p. ej. el ID de una intención de pago
+    de Stripe) con el ``Pago``, ``PagoInscripcion`` o ``Donacion`` que la
+    usa, de modo que un webhook resuelve el registro con una sola búsqueda
+    indexada en lugar de consultar cada tabla de pagos.
+
+    Las referencias se registran automáticamente al guardar los modelos de
+    pago (ver ``signals``) con ``register``.
+
+    Attributes:
+        provider (CharField): Proveedor de pago (stripe, paypal, ...)
+        reference (CharField): Referencia del proveedor
+        content_type (ForeignKey): Tipo del registro de pago
+        object_id (PositiveBigIntegerField): ID del registro de pago
+        created_at (DateTimeField): Fecha de registro
+    """
+    provider = models.CharField(
+        max_length=20,
+        default='stripe'
+    )
+    reference = models.CharField(
+        max_length=255
+    )
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE
+    )
+    object_id = models.PositiveBigIntegerField()
+    target = GenericForeignKey('content_type', 'object_id')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Referencia de Pago'
+        verbose_name_plural = 'Referencias de Pago'
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'reference'], name='payment_reference_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['content_type', 'object_id'], name='payment_reference_target_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.provider}:{self.reference}'
+
+    @classmethod
+    def register(cls, instance, reference, provider='stripe'):
+        """Registra (o reasigna) una referencia hacia un registro de pago
+
+        Usa una sola sentencia ``INSERT ... ON CONFLICT DO UPDATE``.
+
+        Args:
+            instance: Pago, PagoInscripcion o Donacion ya guardado
+            reference (str): Referencia del proveedor
+            provider (str): Proveedor de pago
+        """
+        if not reference:
+            return
+        cls.objects.bulk_create(
+            [cls(
+                provider=provider,
+                reference=reference,
+                content_type=ContentType.objects.get_for_model(instance),
+                object_id=instance.pk,
+            )],
+            update_conflicts=True,
+            unique_fields=['provider', 'reference'],
+            update_fields=['content_type', 'object_id'],
+        )
+
+    @classmethod
+    def register_many(cls, instances, provider='stripe', batch_size=1000):
+        """Registra las referencias de varios registros de pago del mismo modelo
+
+        Equivale a ``register`` para cada registro, en sentencias por lotes.
+
+        Args:
+            instances: Pagos o donaciones ya guardados
+            provider (str): Proveedor de pago
+            batch_size (int): Filas por sentencia
+        """
+        instances = [instance for instance in instances if instance.referencia_transaccion]
+        if not instances:
+            return
+        content_type = ContentType.objects.get_for_model(instances[0])
+        cls.objects.bulk_create(
+            [cls(
+                provider=provider,
+                reference=instance.referencia_transaccion,
+                content_type=content_type,
+                object_id=instance.pk,
+            ) for instance in instances],
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['provider', 'reference'],
+            update_fields=['content_type', 'object_id'],
+        )
+
+    @classmethod
+    def resolve(cls, reference, provider='stripe'):
+        """Obtiene el registro de pago asociado a una referencia
+
+        Args:
+            reference (str): Referencia del proveedor
+            provider (str): Proveedor de pago
+
+        Returns:
+            Pago, PagoInscripcion, Donacion o None si no se encontró
+        """
+        entry = cls.objects.filter(provider=provider, reference=reference).first()
+        if entry is None:
+            return None
+        model = ContentType.objects.get_for_id(entry.content_type_id).model_class()
+        return model.objects.filter(pk=entry.object_id).first()
+
+
+class ProcessedWebhookEvent(models.Model):
+    """Registro de eventos de webhook recibidos, para procesarlos una sola vez
+
+    Cada evento se guarda al recibirse (clave única ``event_id``) y se
+    procesa en segundo plano. Los reintentos del proveedor con el mismo
+    ``event_id`` se reconocen sin volver a ejecutar el trabajo.
+
+    Attributes:
+        event_id (CharField): ID del evento en el proveedor
+        provider (CharField): Proveedor que envió el evento
+        event_type (CharField): Tipo de evento
+        payload (JSONField): Contenido del evento
+        status (CharField): Estado del procesamiento
+        attempts (PositiveSmallIntegerField): Intentos de procesamiento
+        error (TextField): Último error de procesamiento
+        received_at (DateTimeField): Fecha de recepción
+        processed_at (DateTimeField): Fecha de procesamiento exitoso
+    """
+    STATUS_RECEIVED = 'RECEIVED'
+    STATUS_PROCESSING = 'PROCESSING'
+    STATUS_PROCESSED = 'PROCESSED'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (STATUS_RECEIVED, 'Recibido'),
+        (STATUS_PROCESSING, 'Procesando'),
+        (STATUS_PROCESSED, 'Procesado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    event_id = models.CharField(
+        max_length=255,
+        unique=True
+    )
+    provider = models.CharField(
+        max_length=20,
+        default='stripe'
+    )
+    event_type = models.CharField(
+        max_length=100
+    )
+    payload = models.JSONField()
+    status = models.CharField(
+        max_length=12,
+        choices=STATUS_CHOICES,
+        default=STATUS_RECEIVED
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Evento de Webhook'
+        verbose_name_plural = 'Eventos de Webhook'
+        ordering = ['-received_at']
+        indexes = [
+            models.Index(fields=['status', 'received_at'], name='webhook_event_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.event_type} {self.event_id} ({self.get_status_display()})'
+
+
+class PaymentTransitionQuerySet(models.QuerySet):
+    """QuerySet de solo inserción: el historial no se modifica ni se borra"""
+
+    def update(self, **kwargs):
+        raise TypeError('El historial de transiciones de pago no se puede modificar')
+
+    def delete(self):
+        raise TypeError('El historial de transiciones de pago no se puede borrar')
+
+
+class PaymentTransition(models.Model):
+    """Historial de solo inserción de los cambios de estado de los pagos
+
+    Cada transición aplicada por ``PaymentStateMachine`` agrega una fila en
+    la misma transacción que el ``UPDATE`` del estado. Las filas no se
+    modifican ni se borran, y se conservan aunque el pago se elimine.
+
+    Attributes:
+        content_type (ForeignKey): Tipo del registro de pago
+        object_id (PositiveBigIntegerField): ID del registro de pago
+        from_estado (CharField): Estado anterior
+        to_estado (CharField): Estado nuevo
+        source (CharField): Origen del cambio (processor, webhook, admin, ...)
+        detail (JSONField): Datos adicionales del cambio
+        created_at (DateTimeField): Fecha del cambio
+    """
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.PROTECT
+    )
+    object_id = models.PositiveBigIntegerField()
+    target = GenericForeignKey('content_type', 'object_id')
+    from_estado = models.CharField(
+        max_length=20,
+        choices=Pago.ESTADO_CHOICES
+    )
+    to_estado = models.CharField(
+        max_length=20,
+        choices=Pago.ESTADO_CHOICES
+    )
+    source = models.CharField(
+        max_length=50,
+        blank=True
+    )
+    detail = models.JSONField(
+        default=dict,
+        blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = PaymentTransitionQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Transición de Pago'
+        verbose_name_plural = 'Transiciones de Pago'
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['content_type', 'object_id', 'created_at'], name='payment_transition_target_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.content_type_id}:{self.object_id} {self.from_estado} -> {self.to_estado}'
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise TypeError('El historial de transiciones de pago no se puede modificar')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise TypeError('El historial de transiciones de pago no se puede borrar')
+
+    @classmethod
+    def history(cls, instance):
+        """Transiciones de un registro de pago en orden cronológico
+
+        Args:
+            instance: Pago, PagoInscripcion o Donacion
+        """
+        return cls.objects.filter(
+            content_type=ContentType.objects.get_for_model(instance),
+            object_id=instance.pk,
+        )
+
+
+class ExchangeRate(models.Model):
+    """Historial de tipos de cambio obtenidos del proveedor
+
+    Cada actualización del tipo de cambio agrega una fila, de modo que los
+    reportes pueden convertir montos con el tipo vigente en una fecha
+    (``rate_at``) y el servicio arranca con el último tipo conocido sin
+    esperar al proveedor.
+
+    Attributes:
+        base (CharField): Moneda base (USD)
+        quote (CharField): Moneda cotizada (CRC)
+        rate (DecimalField): Tipo de cambio (1 base = X cotizada)
+        fetched_at (DateTimeField): Fecha en que se obtuvo
+        source (CharField): Proveedor del tipo de cambio
+    """
+    base = models.CharField(
+        max_length=3,
+        default='USD'
+    )
+    quote = models.CharField(
+        max_length=3,
+        default='CRC'
+    )
+    rate = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        validators=[MinValueValidator(0)]
+    )
+    fetched_at = models.DateTimeField(default=timezone.now)
+    source = models.CharField(
+        max_length=100,
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = 'Tipo de Cambio'
+        verbose_name_plural = 'Tipos de Cambio'
+        ordering = ['-fetched_at']
+        get_latest_by = 'fetched_at'
+        indexes = [
+            models.Index(fields=['base', 'quote', 'fetched_at'], name='exchange_rate_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f'1 {self.base} = {self.rate} {self.quote} ({self.fetched_at:%Y-%m-%d %H:%M})'
+
+    @classmethod
+    def rate_at(cls, when, base='USD', quote='CRC'):
+        """Tipo de cambio vigente en una fecha
+
+        Args:
+            when (datetime): Fecha de referencia
+            base (str): Moneda base
+            quote (str): Moneda cotizada
+
+        Returns:
+            Decimal o None si no hay tipos registrados hasta esa fecha
+        """
+        return cls.objects.filter(
+            base=base, quote=quote, fetched_at__lte=when
+        ).order_by('-fetched_at').values_list('rate', flat=True).first()
+
+
+class DailySalesRollup(models.Model):
+    """Totales diarios de pagos y donaciones para reportes
+
+    Cada fila resume un día por tipo de transacción, moneda, método de pago
+    y estado. Las filas de un día se recalculan con una agregación en la
+    base de datos cuando cambia alguno de sus pagos y en el recálculo
+    nocturno (ver ``reports.SalesRollupBuilder``), de modo que los reportes
+    no recorren los pagos individuales.
+
+    Attributes:
+        fecha (DateField): Día (zona horaria local)
+        tipo (CharField): Pago general, inscripción o donación
+        moneda (CharField): Moneda original
+        metodo_pago (CharField): Método de pago
+        estado (CharField): Estado de los pagos
+        cantidad (PositiveIntegerField): Número de transacciones
+        total (DecimalField): Suma en la moneda original
+        total_crc (DecimalField): Suma en Colones
+        total_usd (DecimalField): Suma en Dólares
+        updated_at (DateTimeField): Último recálculo
+    """
+    TIPO_PAGO = 'pago'
+    TIPO_INSCRIPCION = 'inscripcion'
+    TIPO_DONACION = 'donacion'
+    TIPO_CHOICES = [
+        (TIPO_PAGO, 'Pago general'),
+        (TIPO_INSCRIPCION, 'Inscripción'),
+        (TIPO_DONACION, 'Donación'),
+    ]
+
+    fecha = models.DateField()
+    tipo = models.CharField(
+        max_length=20,
+        choices=TIPO_CHOICES
+    )
+    moneda = models.CharField(
+        max_length=3,
+        choices=Pago.MONEDA_CHOICES
+    )
+    metodo_pago = models.CharField(
+        max_length=30,
+        choices=Pago.METODO_PAGO_CHOICES
+    )
+    estado = models.CharField(
+        max_length=20,
+        choices=Pago.ESTADO_CHOICES
+    )
+    cantidad = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=0
+    )
+    total_crc = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=0
+    )
+    total_usd = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=0
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Resumen Diario de Ventas'
+        verbose_name_plural = 'Resúmenes Diarios de Ventas'
+        ordering = ['-fecha']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'tipo', 'moneda', 'metodo_pago', 'estado'], name='daily_sales_rollup_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['estado', 'fecha'], name='daily_sales_estado_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.fecha} {self.tipo} {self.moneda} {self.metodo_pago} {self.estado}: {self.cantidad}'
+
+
+class Reembolso(models.Model):
+    """Reembolso total o parcial de un pago o donación
+
+    Cada solicitud de reembolso es una fila con su propio estado, de modo
+    que un pago puede tener varios reembolsos parciales; la suma de los
+    reembolsos no fallidos nunca supera el monto del pago. Cuando los
+    reembolsos completados cubren todo el monto, el pago pasa a
+    ``REFUNDED`` (ver ``services.ReembolsoService``).
+
+    La llave de idempotencia se envía al proveedor, por lo que reintentar un
+    reembolso (o repetir la solicitud con la misma llave) no reembolsa dos
+    veces.
+
+    Estados::
+
+        pendiente -> procesando -> completado
+                                -> fallido
+
+    Un reembolso queda en ``procesando`` mientras el proveedor lo confirma;
+    la conciliación (comando ``reconcile_refunds``) consulta su estado.
+
+    Attributes:
+        content_type (ForeignKey): Tipo del registro de pago
+        object_id (PositiveBigIntegerField): ID del registro de pago
+        monto (DecimalField): Monto reembolsado en la moneda del pago
+        moneda (CharField): Moneda del pago
+        tipo (CharField): Total o parcial
+        motivo (CharField): Motivo del reembolso
+        estado (CharField): Estado del reembolso
+        proveedor (CharField): Proveedor que ejecuta el reembolso
+        idempotency_key (CharField): Llave de idempotencia única
+        referencia_externa (CharField): ID del reembolso en el proveedor
+        error (TextField): Último error del proveedor
+        fecha_creacion (DateTimeField): Fecha de la solicitud
+        fecha_actualizacion (DateTimeField): Fecha del último cambio
+        fecha_completado (DateTimeField): Fecha de confirmación del proveedor
+    """
+    TIPO_CHOICES = [
+        ('total', 'Total'),
+        ('parcial', 'Parcial')
+    ]
+
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completado', 'Completado'),
+        ('fallido', 'Fallido')
+    ]
+
+    PROVEEDOR_CHOICES = [
+        ('stripe', 'Stripe'),
+        ('paypal', 'PayPal'),
+        ('manual', 'Manual')
+    ]
+
+    # Estados que cuentan contra el monto disponible para reembolsar
+    ESTADOS_ACTIVOS = ('pendiente', 'procesando', 'completado')
+
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.PROTECT
+    )
+    object_id = models.PositiveBigIntegerField()
+    target = GenericForeignKey('content_type', 'object_id')
+    monto = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        validators=[MinValueValidator(0)]
+    )
+    moneda = models.CharField(
+        max_length=3,
+        choices=Pago.MONEDA_CHOICES
+    )
+    tipo = models.CharField(
+        max_length=10,
+        choices=TIPO_CHOICES
+    )
+    motivo = models.CharField(
+        max_length=255,
+        blank=True
+    )
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADO_CHOICES,
+        default='pendiente'
+    )
+    proveedor = models.CharField(
+        max_length=20,
+        choices=PROVEEDOR_CHOICES
+    )
+    idempotency_key = models.CharField(
+        max_length=255,
+        unique=True
+    )
+    referencia_externa = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True
+    )
+    error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    fecha_completado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Reembolso'
+        verbose_name_plural = 'Reembolsos'
+        ordering = ['fecha_creacion', 'id']
+        indexes = [
+            models.Index(fields=['content_type', 'object_id'], name='reembolso_target_idx'),
+            models.Index(fields=['estado', 'proveedor', 'fecha_creacion'], name='reembolso_estado_idx'),
+        ]
+
+    def __str__(self):
+        return f'Reembolso {self.monto} {self.moneda} ({self.get_estado_display()})'
+
+    def notification_data(self):
+        """Datos del reembolso para las notificaciones del frontend"""
+        return {
+            'id': self.id,
+            'monto': str(self.monto),
+            'moneda': self.moneda,
+            'fecha_creacion': self.fecha_creacion
+        }
+
+    @classmethod
+    def history(cls, instance):
+        """Reembolsos de un registro de pago en orden cronológico
+
+        Args:
+            instance: Pago, PagoInscripcion o Donacion
+        """
+        return cls.objects.filter(
+            content_type=ContentType.objects.get_for_model(instance),
+            object_id=instance.pk,
+        )
@@ -0,0 +1,195 @@
+"""
+Procesamiento de pagos con Stripe
+
+``PaymentProcessor`` es el único camino para procesar con Stripe un pago
+general, un pago de inscripción o una donación: los tres modelos cumplen el
+protocolo ``Payable`` y el procesador no distingue entre ellos.
+
+Cada procesamiento carga el registro con sus relaciones en una sola
+consulta (``PAYMENT_RELATED``) y reclama el pago con la transición
+``PENDING -> PROCESSING`` de ``PaymentStateMachine`` antes de llamar a
+Stripe: si dos solicitudes procesan el mismo pago, solo una actualiza la
+fila y la otra termina sin crear otra intención de pago. La intención usa
+además una llave de idempotencia derivada del pago, por lo que un
+reintento del trabajo recibe la misma intención de Stripe. Si Stripe no
+responde (``StripeConnectionError``) el pago vuelve a ``PENDING`` y el error
+se propaga para que la cola reintente el trabajo; solo un rechazo de Stripe
+lo marca ``FAILED``.
+
+La duración de cada procesamiento se registra en el histograma
+``payments.process`` (ver ``stripe_client.get_latency_histograms``).
+"""
+
+import logging
+import time
+from decimal import Decimal
+from typing import Optional, Protocol, runtime_checkable
+
+from apps.integrations.payments.stripe_client import (
+    StripeConnectionError, StripeError, get_stripe_client, observe_latency,
+)
+from .models import Donacion, Pago, PagoInscripcion
+from .notifications import PaymentNotifier
+from .state import PaymentStateMachine
+
+logger = logging.getLogger(__name__)
+
+PAYABLE_MODELS = {model._meta.label_lower: model for model in (Pago, PagoInscripcion, Donacion)}
+
+
+@runtime_checkable
+class Payable(Protocol):
+    """Registro que puede procesarse con ``PaymentProcessor``.
+
+    Attributes:
+        PAYMENT_RELATED (tuple): Relaciones a cargar con ``select_related``.
+    """
+    PAYMENT_RELATED: tuple
+    pk: int
+    monto: Decimal
+    moneda: str
+    estado: str
+    referencia_transaccion: Optional[str]
+
+    def payment_description(self) -> str:
+        """Descripción de la intención de pago en Stripe."""
+
+    def notification_data(self) -> dict:
+        """Datos para las notificaciones del frontend."""
+
+    def sync_related_estado(self, estado: str) -> None:
+        """Propaga un cambio de estado a los registros relacionados."""
+
+
+def payable_label(payable):
+    """Etiqueta del modelo de un registro pagable (``app_label.modelo``)."""
+    return payable._meta.label_lower
+
+
+class PaymentProcessor:
+    """Procesa registros pagables con Stripe y genera sus notificaciones.
+
+    Args:
+        stripe_client (StripeClient): Cliente de Stripe; por defecto el del proceso.
+        notifier (PaymentNotifier): Generador de notificaciones.
+    """
+
+    def __init__(self, stripe_client=None, notifier=None):
+        self.stripe_client = stripe_client or get_stripe_client()
+        self.notifier = notifier or PaymentNotifier()
+
+    @staticmethod
+    def load(label, pk):
+        """Carga un registro pagable con sus relaciones en una sola consulta.
+
+        Args:
+            label (str): Modelo (``payments.pago``, ``payments.pagoinscripcion``
+                o ``payments.donacion``).
+            pk (int): ID del registro.
+
+        Raises:
+            LookupError: Si el modelo no es pagable.
+            ObjectDoesNotExist: Si el registro no existe.
+        """
+        try:
+            model = PAYABLE_MODELS[label]
+        except KeyError:
+            raise LookupError(f'Modelo no pagable: {label}')
+        return model.objects.select_related(*model.PAYMENT_RELATED).get(pk=pk)
+
+    @staticmethod
+    def idempotency_key(payable):
+        """Llave de idempotencia de la intención de pago de un registro."""
+        return f'{payable_label(payable)}:{payable.pk}:payment_intent'
+
+    @staticmethod
+    def transition(payable, estado, expected, **fields):
+        """Aplica una transición del procesador (ver ``PaymentStateMachine``)."""
+        return PaymentStateMachine.transition(
+            payable, estado, expected=expected, source='processor', **fields
+        )
+
+    def process(self, payable):
+        """Crea la intención de pago de un registro pendiente y actualiza su estado.
+
+        Args:
+            payable (Payable): Registro cargado con ``load``.
+
+        Returns:
+            dict: Estado final y, según el resultado, ``payment_intent_id``,
+            ``client_secret`` y la notificación, o el error y su notificación.
+            Con ``duplicate`` si otro proceso ya había procesado el registro.
+
+        Raises:
+            StripeConnectionError: Si Stripe no respondió; el registro vuelve
+                a ``PENDING`` para reintentarse.
+        """
+        if payable.estado != 'PENDING':
+            return {'estado': payable.estado, 'duplicate': True}
+
+        started = time.perf_counter()
+        if not self.transition(payable, 'PROCESSING', expected='PENDING'):
+            return self._duplicate(payable)
+
+        failed = True
+        try:
+            try:
+                payment_intent = self.stripe_client.create_payment_intent(
+                    amount=payable.monto,
+                    currency=payable.moneda.lower(),
+                    description=payable.payment_description(),
+                    idempotency_key=self.idempotency_key(payable),
+                )
+            except StripeConnectionError:
+                # Se desconoce si Stripe creó la intención: el reintento usa la misma llave
+                self.transition(payable, 'PENDING', expected='PROCESSING')
+                raise
+            except StripeError as e:
+                if not self.transition(payable, 'FAILED', expected='PROCESSING'):
+                    return self._duplicate(payable)
+                return {
+                    'estado': payable.estado,
+                    'error': str(e),
+                    'notification': self.notifier.send_payment_failed(payable.notification_data()),
+                }
+            except Exception:
+                # Devolver el pago a pendiente para que el reintento lo reclame
+                self.transition(payable, 'PENDING', expected='PROCESSING')
+                raise
+
+            if not self.transition(
+                payable, 'SUCCESS', expected='PROCESSING', referencia_transaccion=payment_intent['id']
+            ):
+                return self._duplicate(payable)
+            failed = False
+            return {
+                'estado': payable.estado,
+                'payment_intent_id': payment_intent['id'],
+                'client_secret': payment_intent['client_secret'],
+                'notification': self.notifier.send_payment_confirmation(payable.notification_data()),
+            }
+        finally:
+            elapsed = time.perf_counter() - started
+            observe_latency('payments.process', elapsed, error=failed)
+            logger.info(
+                'Procesamiento de %s:%s terminado en %.0f ms (%s)',
+                payable_label(payable), payable.pk, elapsed * 1000, payable.estado,
+            )
+
+    def _duplicate(self, payable):
+        payable.refresh_from_db(fields=['estado'])
+        logger.warning('%s:%s ya había sido procesado por otra solicitud', payable_label(payable), payable.pk)
+        return {'estado': payable.estado, 'duplicate': True}
+
+    def fail(self, payable):
+        """Marca como fallido un registro que no se pudo procesar.
+
+        Returns:
+            bool: True si el registro seguía pendiente o en proceso.
+        """
+        if payable.estado not in ('PENDING', 'PROCESSING'):
+            return False
+        if not self.transition(payable, 'FAILED', expected=payable.estado):
+            return False
+        self.notifier.send_payment_failed(payable.notification_data())
+        return True
@@ -0,0 +1,347 @@
+"""
+Reportes de ventas sobre resúmenes diarios
+
+Los reportes no recorren los pagos: leen ``DailySalesRollup``, que guarda
+por día los totales de pagos generales, pagos de inscripción y donaciones
+por moneda, método de pago y estado. ``SalesRollupBuilder`` recalcula los
+resúmenes con una agregación ``GROUP BY`` en la base de datos:
+
+- al guardar, borrar o cambiar de estado un pago se encola el recálculo de
+  su día (tarea ``payments.refresh_sales_rollup``, agrupada por día);
+- el comando ``rebuild_sales_rollups`` recalcula cada noche los últimos
+  días y sirve para llenar el historial completo.
+
+``VentasReporter`` consulta los resúmenes con agregaciones sobre unos pocos
+miles de filas, incluso para rangos de varios años.
+
+Configuración (``settings.SALES_REPORTS``):
+    ROLLUP_DELAY (int): Segundos de espera antes de recalcular un día, para
+        agrupar los cambios de ese día en un solo recálculo.
+"""
+
+import logging
+import statistics
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .models import DailySalesRollup, Donacion, Pago, PagoInscripcion
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SALES_REPORTS = {
+    'ROLLUP_DELAY': 60,
+}
+
+
+def get_config():
+    """Configuración de reportes combinada con los valores por defecto."""
+    return {**DEFAULT_SALES_REPORTS, **getattr(settings, 'SALES_REPORTS', {})}
+
+
+# Tipo de transacción, consulta base y campo de fecha de cada origen
+SOURCES = (
+    (DailySalesRollup.TIPO_PAGO, lambda: Pago.objects.filter(pagoinscripcion__isnull=True), 'fecha_pago'),
+    (DailySalesRollup.TIPO_INSCRIPCION, lambda: PagoInscripcion.objects.all(), 'fecha_pago'),
+    (DailySalesRollup.TIPO_DONACION, lambda: Donacion.objects.all(), 'fecha_creacion'),
+)
+
+# Clave de cada tipo en el desglose de los reportes
+DESGLOSE = {
+    DailySalesRollup.TIPO_PAGO: 'pagos',
+    DailySalesRollup.TIPO_INSCRIPCION: 'inscripciones',
+    DailySalesRollup.TIPO_DONACION: 'donaciones',
+}
+
+CENTS = Decimal('0.01')
+
+
+def _as_date(value):
+    """Convierte un datetime (en la zona local) o una fecha en fecha."""
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value
+
+
+def _day_bounds(inicio, fin):
+    start = timezone.make_aware(datetime.combine(inicio, time.min))
+    end = timezone.make_aware(datetime.combine(fin + timedelta(days=1), time.min))
+    return start, end
+
+
+def sale_date(instance):
+    """Día (zona local) al que pertenece un pago o una donación."""
+    value = instance.fecha_creacion if isinstance(instance, Donacion) else instance.fecha_pago
+    return _as_date(value) if value is not None else timezone.localdate()
+
+
+def _money(value):
+    return (value or Decimal('0')).quantize(CENTS)
+
+
+def _variacion(actual, anterior):
+    """Variación porcentual entre dos totales; None si el anterior es cero."""
+    if not anterior:
+        return None
+    return ((actual - anterior) * 100 / anterior).quantize(CENTS)
+
+
+class SalesRollupBuilder:
+    """Recalcula los resúmenes diarios de ventas con agregaciones en la base de datos"""
+
+    @staticmethod
+    def rebuild(fecha_inicio, fecha_fin):
+        """Recalcula los resúmenes de un rango de días (inclusive)
+
+        Usa una consulta agrupada por origen para todo el rango y reemplaza
+        las filas del rango en una sola transacción.
+
+        Args:
+            fecha_inicio (date): Primer día
+            fecha_fin (date): Último día
+
+        Returns:
+            int: Filas de resumen escritas
+        """
+        fecha_inicio, fecha_fin = _as_date(fecha_inicio), _as_date(fecha_fin)
+        start, end = _day_bounds(fecha_inicio, fecha_fin)
+        rows = []
+        for tipo, queryset, date_field in SOURCES:
+            grouped = queryset().filter(**{
+                f'{date_field}__gte': start, f'{date_field}__lt': end,
+            }).order_by().annotate(
+                dia=TruncDate(date_field),
+            ).values('dia', 'moneda', 'metodo_pago', 'estado').annotate(
+                cantidad=Count('pk'),
+                suma=Sum('monto'),
+                suma_crc=Sum('monto_crc'),
+                suma_usd=Sum('monto_usd'),
+            )
+            rows.extend(
+                DailySalesRollup(
+                    fecha=row['dia'],
+                    tipo=tipo,
+                    moneda=row['moneda'],
+                    metodo_pago=row['metodo_pago'],
+                    estado=row['estado'],
+                    cantidad=row['cantidad'],
+                    total=_money(row['suma']),
+                    total_crc=_money(row['suma_crc']),
+                    total_usd=_money(row['suma_usd']),
+                )
+                for row in grouped
+            )
+
+        with transaction.atomic():
+            DailySalesRollup.objects.filter(fecha__range=(fecha_inicio, fecha_fin)).delete()
+            DailySalesRollup.objects.bulk_create(rows, batch_size=1000)
+        logger.info('Resúmenes de ventas recalculados del %s al %s: %s filas', fecha_inicio, fecha_fin, len(rows))
+        return len(rows)
+
+    @classmethod
+    def refresh_day(cls, fecha):
+        """Recalcula los resúmenes de un día."""
+        return cls.rebuild(fecha, fecha)
+
+
+class VentasReporter:
+    """Reportes de ventas de pagos, inscripciones y donaciones
+
+    Los montos se expresan en ``moneda_base`` (USD o CRC) con la conversión
+    guardada en cada pago, y solo cuentan como ventas los pagos completados
+    (``SUCCESS``) salvo en los desgloses por estado.
+    """
+
+    ESTADO_VENTA = 'SUCCESS'
+
+    def _campo(self, moneda_base):
+        if moneda_base not in ('USD', 'CRC'):
+            raise ValueError('Moneda base debe ser CRC o USD')
+        return 'total_usd' if moneda_base == 'USD' else 'total_crc'
+
+    def _rollups(self, fecha_inicio, fecha_fin, metodo_pago=None, tipo_transaccion=None, estado=ESTADO_VENTA):
+        queryset = DailySalesRollup.objects.filter(
+            fecha__range=(_as_date(fecha_inicio), _as_date(fecha_fin))
+        ).order_by()
+        if estado is not None:
+            queryset = queryset.filter(estado=estado)
+        if metodo_pago:
+            queryset = queryset.filter(metodo_pago=metodo_pago)
+        if tipo_transaccion:
+            queryset = queryset.filter(tipo=tipo_transaccion)
+        return queryset
+
+    def _resumen(self, queryset, campo):
+        totals = queryset.aggregate(total=Sum(campo), cantidad=Sum('cantidad'))
+        total = _money(totals['total'])
+        cantidad = totals['cantidad'] or 0
+        return {
+            'total_ventas': total,
+            'total_transacciones': cantidad,
+            'promedio_venta': (total / cantidad).quantize(CENTS) if cantidad else Decimal('0.00'),
+        }
+
+    def _desglose(self, queryset, campo):
+        desglose = {clave: Decimal('0.00') for clave in DESGLOSE.values()}
+        for row in queryset.values('tipo').annotate(suma=Sum(campo)):
+            desglose[DESGLOSE[row['tipo']]] = _money(row['suma'])
+        return desglose
+
+    def _por(self, queryset, dimension, campo):
+        return {
+            row[dimension]: {'total': _money(row['suma']), 'cantidad': row['transacciones']}
+            for row in queryset.values(dimension).annotate(suma=Sum(campo), transacciones=Sum('cantidad'))
+        }
+
+    def generar_reporte_diario(self, fecha, moneda_base='USD', metodo_pago=None, tipo_transaccion=None):
+        """Resumen de ventas de un día
+
+        Args:
+            fecha (date): Día del reporte
+            moneda_base (str): Moneda de los totales (USD o CRC)
+            metodo_pago (str): Filtrar por método de pago
+            tipo_transaccion (str): Filtrar por tipo (pago, inscripcion o donacion)
+
+        Returns:
+            dict: Totales, promedio y desgloses por tipo, moneda original,
+            método de pago y estado
+        """
+        campo = self._campo(moneda_base)
+        ventas = self._rollups(fecha, fecha, metodo_pago, tipo_transaccion)
+        todos = self._rollups(fecha, fecha, metodo_pago, tipo_transaccion, estado=None)
+        return {
+            'fecha': _as_date(fecha),
+            'moneda_base': moneda_base,
+            **self._resumen(ventas, campo),
+            'desglose': self._desglose(ventas, campo),
+            'por_moneda': self._por(ventas, 'moneda', 'total'),
+            'por_metodo': self._por(ventas, 'metodo_pago', campo),
+            'por_estado': self._por(todos, 'estado', campo),
+        }
+
+    def generar_reporte_mensual(self, year, month, moneda_base='USD'):
+        """Resumen de ventas de un mes con su tendencia diaria
+
+        Returns:
+            dict: Totales, desglose por tipo y ``tendencia_diaria`` con el
+            total de cada día con ventas
+        """
+        campo = self._campo(moneda_base)
+        inicio = date(year, month, 1)
+        fin = (inicio + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        ventas = self._rollups(inicio, fin)
+        return {
+            'year': year,
+            'month': month,
+            'moneda_base': moneda_base,
+            **self._resumen(ventas, campo),
+            'desglose': self._desglose(ventas, campo),
+            'tendencia_diaria': [
+                {'fecha': row['fecha'], 'total': _money(row['suma']), 'cantidad': row['transacciones']}
+                for row in ventas.values('fecha').annotate(
+                    suma=Sum(campo), transacciones=Sum('cantidad')
+                ).order_by('fecha')
+            ],
+        }
+
+    def analizar_metodos_pago(self, fecha_inicio, fecha_fin, moneda_base='USD'):
+        """Ventas por método de pago en un rango de fechas
+
+        Returns:
+            dict: Por método, ``total``, ``cantidad`` y ``porcentaje`` del total
+        """
+        campo = self._campo(moneda_base)
+        metodos = self._por(self._rollups(fecha_inicio, fecha_fin), 'metodo_pago', campo)
+        total = sum((metodo['total'] for metodo in metodos.values()), Decimal('0'))
+        for metodo in metodos.values():
+            metodo['porcentaje'] = (metodo['total'] * 100 / total).quantize(CENTS) if total else Decimal('0.00')
+        return metodos
+
+    def analizar_tendencias(self, fecha_inicio, fecha_fin, moneda_base='USD'):
+        """Tendencia mensual de ventas en un rango de fechas
+
+        Returns:
+            dict: ``ventas_mensuales``, ``crecimiento_mensual`` (variación de
+            cada mes respecto al anterior), ``dia_mas_ventas`` y
+            ``metodo_pago_preferido`` (por número de transacciones)
+        """
+        campo = self._campo(moneda_base)
+        ventas = self._rollups(fecha_inicio, fecha_fin)
+        mensuales = [
+            {'mes': row['mes'].strftime('%Y-%m'), 'total': _money(row['suma']), 'cantidad': row['transacciones']}
+            for row in ventas.annotate(mes=TruncMonth('fecha')).values('mes').annotate(
+                suma=Sum(campo), transacciones=Sum('cantidad')
+            ).order_by('mes')
+        ]
+        crecimiento = [
+            {'mes': actual['mes'], 'variacion_porcentual': _variacion(actual['total'], anterior['total'])}
+            for anterior, actual in zip(mensuales, mensuales[1:])
+        ]
+        mejor_dia = ventas.values('fecha').annotate(suma=Sum(campo)).order_by('-suma', 'fecha').first()
+        metodo = ventas.values('metodo_pago').annotate(
+            transacciones=Sum('cantidad')
+        ).order_by('-transacciones', 'metodo_pago').first()
+        return {
+            'ventas_mensuales': mensuales,
+            'crecimiento_mensual': crecimiento,
+            'dia_mas_ventas': {'fecha': mejor_dia['fecha'], 'total': _money(mejor_dia['suma'])} if mejor_dia else None,
+            'metodo_pago_preferido': metodo['metodo_pago'] if metodo else None,
+        }
+
+    def calcular_estadisticas(self, fecha_inicio, fecha_fin, moneda_base='USD'):
+        """Estadísticas de las ventas diarias de un rango (los días sin ventas cuentan como cero)
+
+        Returns:
+            dict: ``promedio_diario``, ``desviacion_estandar``, ``mediana``,
+            ``maximo`` y ``minimo`` de los totales diarios
+        """
+        campo = self._campo(moneda_base)
+        inicio, fin = _as_date(fecha_inicio), _as_date(fecha_fin)
+        por_dia = dict(
+            self._rollups(inicio, fin).values('fecha').annotate(suma=Sum(campo)).values_list('fecha', 'suma')
+        )
+        serie = [_money(por_dia.get(inicio + timedelta(days=i))) for i in range((fin - inicio).days + 1)]
+        if not serie:
+            serie = [Decimal('0.00')]
+        return {
+            'dias': len(serie),
+            'promedio_diario': _money(statistics.mean(serie)),
+            'desviacion_estandar': _money(statistics.pstdev(serie)),
+            'mediana': _money(statistics.median(serie)),
+            'maximo': max(serie),
+            'minimo': min(serie),
+        }
+
+    def generar_comparativo(self, fecha_inicio, fecha_fin, periodo_anterior=None, moneda_base='USD'):
+        """Compara las ventas de un rango con las del periodo anterior
+
+        Args:
+            fecha_inicio (date): Inicio del periodo actual
+            fecha_fin (date): Fin del periodo actual
+            periodo_anterior (int): Días del periodo anterior, que termina el
+                día antes de ``fecha_inicio``; por defecto la misma duración
+
+        Returns:
+            dict: Resúmenes ``actual`` y ``anterior``, ``variacion_porcentual``
+            y ``tendencia`` (creciente, decreciente o estable)
+        """
+        campo = self._campo(moneda_base)
+        inicio, fin = _as_date(fecha_inicio), _as_date(fecha_fin)
+        dias = periodo_anterior or (fin - inicio).days + 1
+        anterior_fin = inicio - timedelta(days=1)
+        anterior_inicio = anterior_fin - timedelta(days=dias - 1)
+
+        actual = self._resumen(self._rollups(inicio, fin), campo)
+        anterior = self._resumen(self._rollups(anterior_inicio, anterior_fin), campo)
+        diferencia = actual['total_ventas'] - anterior['total_ventas']
+        return {
+            'actual': {'fecha_inicio': inicio, 'fecha_fin': fin, **actual},
+            'anterior': {'fecha_inicio': anterior_inicio, 'fecha_fin': anterior_fin, **anterior},
+            'variacion_porcentual': _variacion(actual['total_ventas'], anterior['total_ventas']),
+            'tendencia': 'creciente' if diferencia > 0 else 'decreciente' if diferencia < 0 else 'estable',
+        }
@@ -1,57 +1,291 @@
-"""Servicios para la gestión de pagos y conversión de divisas"""
+"""Servicios para la gestión de pagos y conversión de divisas
 
+El tipo de cambio USD/CRC lo mantiene ``ExchangeRateService`` con
+semántica *stale-while-revalidate*: mientras el tipo en caché sea reciente
+(``FRESH_FOR``) se devuelve sin más; al vencer se sigue devolviendo y una
+sola actualización se lanza en segundo plano. Un candado en la caché
+(``cache.add``) garantiza que solo un proceso consulte al proveedor a la
+vez, y cada tipo obtenido se guarda en ``ExchangeRate`` para reportes
+históricos y para arrancar sin esperar al proveedor.
+
+Configuración (``settings.EXCHANGE_RATES``):
+    URL (str): Endpoint del proveedor de tipos de cambio.
+    TIMEOUT (float): Tiempo máximo de la consulta al proveedor.
+    FRESH_FOR (int): Segundos durante los que el tipo se considera vigente.
+    STALE_FOR (int): Segundos durante los que un tipo vencido puede servirse
+        mientras se actualiza; pasado ese plazo se actualiza antes de responder.
+    LOCK_TIMEOUT (int): Segundos del candado de actualización; tras un error
+        también es la espera antes del siguiente intento.
+    DEFAULT_RATE (str): Tipo usado si nunca se ha obtenido uno.
+    ASYNC (bool): Si es False la actualización se hace antes de responder.
+
+Los reembolsos (``Reembolso``) los crea, procesa y concilia
+``ReembolsoService``. Cada reembolso se reclama con un ``UPDATE``
+condicional antes de llamar al proveedor y lleva una llave de idempotencia,
+por lo que reintentarlo no reembolsa dos veces. La conciliación consulta a
+Stripe los reembolsos por páginas en lugar de uno por uno, y los
+reembolsos masivos (p. ej. al cancelar un horario) se procesan por lotes
+con un número acotado de llamadas simultáneas al proveedor.
+
+Configuración (``settings.REFUNDS``):
+    MAX_CONCURRENCY (int): Reembolsos simultáneos en un reembolso masivo.
+    BATCH_SIZE (int): Pagos leídos y reembolsos creados por lote.
+    PAGE_SIZE (int): Reembolsos por página al conciliar con Stripe (máximo 100).
+    RETRY_AFTER (int): Segundos tras los que un reembolso que el proveedor
+        no registró vuelve a ``pendiente`` para reintentarse.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from decimal import Decimal
-from typing import Union, Tuple
-from datetime import datetime
+from typing import Iterable, List, Optional, Union, Tuple
+from urllib.parse import urlparse
+
 import requests
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
 from django.core.cache import cache
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+
+from apps.integrations.payments.stripe_client import StripeConnectionError, get_stripe_client
+from .exceptions import ProveedorNoDisponibleError, ReembolsoError
+from .notifications import PaymentNotifier
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXCHANGE_RATES = {
+    'URL': 'https://api.exchangerate-api.com/v4/latest/USD',
+    'TIMEOUT': 5.0,
+    'FRESH_FOR': 14400,
+    'STALE_FOR': 7 * 24 * 3600,
+    'LOCK_TIMEOUT': 60,
+    'DEFAULT_RATE': '540.00',
+    'ASYNC': True,
+}
+
+
+def get_config():
+    """Configuración del tipo de cambio combinada con los valores por defecto."""
+    return {**DEFAULT_EXCHANGE_RATES, **getattr(settings, 'EXCHANGE_RATES', {})}
+
+
+DEFAULT_REFUNDS = {
+    'MAX_CONCURRENCY': 4,
+    'BATCH_SIZE': 500,
+    'PAGE_SIZE': 100,
+    'RETRY_AFTER': 900,
+}
+
+
+def get_refunds_config():
+    """Configuración de los reembolsos combinada con los valores por defecto."""
+    return {**DEFAULT_REFUNDS, **getattr(settings, 'REFUNDS', {})}
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='exchange-rates')
+        return _executor
+
+
+class ExchangeRateService:
+    """Tipo de cambio USD/CRC en caché con actualización en segundo plano
+
+    La entrada en caché (``CACHE_KEY``) guarda el tipo y la hora en que se
+    obtuvo; se conserva durante ``STALE_FOR`` para poder servirla vencida.
+
+    Attributes:
+        CACHE_KEY (str): Clave del tipo de cambio en caché
+        LOCK_KEY (str): Clave del candado de actualización
+    """
+
+    CACHE_KEY = 'exchange_rate_usd_crc'
+    LOCK_KEY = 'exchange_rate_usd_crc:refresh'
+
+    @classmethod
+    def get_rate(cls) -> Decimal:
+        """Obtiene el tipo de cambio actual (1 USD = X CRC)
+
+        Returns:
+            Decimal: Tipo vigente, un tipo vencido mientras se actualiza o,
+            si nunca se obtuvo uno, ``DEFAULT_RATE``.
+        """
+        config = get_config()
+        entry = cls._cached_entry()
+        if entry is None:
+            entry = cls._latest_entry()
+        if entry is None:
+            # Arranque sin historial: una sola consulta y el resto la espera
+            return cls._refresh_and_wait(config)
+
+        age = time.time() - entry['fetched_at']
+        if age > config['STALE_FOR']:
+            rate = cls._refresh_single_flight()
+            return rate if rate is not None else Decimal(entry['rate'])
+        if age > config['FRESH_FOR']:
+            cls.schedule_refresh()
+        return Decimal(entry['rate'])
+
+    @classmethod
+    def refresh(cls) -> Optional[Decimal]:
+        """Consulta el tipo de cambio al proveedor, lo guarda y lo deja en caché
+
+        Returns:
+            Decimal o None si la consulta falló.
+        """
+        from .models import ExchangeRate
+
+        config = get_config()
+        try:
+            response = requests.get(config['URL'], timeout=config['TIMEOUT'])
+            response.raise_for_status()
+            rate = Decimal(str(response.json()['rates']['CRC']))
+        except Exception:
+            logger.warning('No se pudo obtener el tipo de cambio', exc_info=True)
+            return None
+
+        record = ExchangeRate.objects.create(rate=rate, source=urlparse(config['URL']).netloc)
+        cls._store(rate, record.fetched_at.timestamp())
+        return rate
+
+    @classmethod
+    def schedule_refresh(cls):
+        """Actualiza el tipo en segundo plano si nadie más lo está haciendo."""
+        if not cache.add(cls.LOCK_KEY, 1, get_config()['LOCK_TIMEOUT']):
+            return
+        if get_config()['ASYNC']:
+            _get_executor().submit(cls._refresh_in_background)
+        else:
+            cls._refresh_locked()
+
+    @classmethod
+    def rate_at(cls, when) -> Decimal:
+        """Tipo de cambio vigente en una fecha, según el historial
+
+        Si no hay historial hasta esa fecha se usa el tipo actual.
+        """
+        from .models import ExchangeRate
+
+        rate = ExchangeRate.rate_at(when)
+        return rate if rate is not None else cls.get_rate()
+
+    @classmethod
+    def _cached_entry(cls):
+        entry = cache.get(cls.CACHE_KEY)
+        if isinstance(entry, dict):
+            return entry
+        if entry is not None:
+            # Formato anterior (solo el tipo): se sirve como vencido
+            return {'rate': str(entry), 'fetched_at': 0}
+        return None
+
+    @classmethod
+    def _latest_entry(cls):
+        from .models import ExchangeRate
+
+        record = ExchangeRate.objects.filter(base='USD', quote='CRC').only('rate', 'fetched_at').first()
+        if record is None:
+            return None
+        return cls._store(record.rate, record.fetched_at.timestamp())
+
+    @classmethod
+    def _store(cls, rate, fetched_at):
+        entry = {'rate': str(rate), 'fetched_at': fetched_at}
+        cache.set(cls.CACHE_KEY, entry, get_config()['STALE_FOR'])
+        return entry
+
+    @classmethod
+    def _refresh_locked(cls):
+        """Actualiza con el candado ya tomado; tras un error el candado vence solo."""
+        rate = cls.refresh()
+        if rate is not None:
+            cache.delete(cls.LOCK_KEY)
+        return rate
+
+    @classmethod
+    def _refresh_in_background(cls):
+        try:
+            cls._refresh_locked()
+        finally:
+            close_old_connections()
+
+    @classmethod
+    def _refresh_single_flight(cls):
+        if not cache.add(cls.LOCK_KEY, 1, get_config()['LOCK_TIMEOUT']):
+            return None
+        return cls._refresh_locked()
+
+    @classmethod
+    def _refresh_and_wait(cls, config):
+        default = Decimal(str(config['DEFAULT_RATE']))
+        if cache.add(cls.LOCK_KEY, 1, config['LOCK_TIMEOUT']):
+            rate = cls._refresh_locked()
+            if rate is None:
+                # Servir el tipo por defecto como vencido hasta el siguiente intento
+                cls._store(default, 0)
+                return default
+            return rate
+
+        deadline = time.monotonic() + config['TIMEOUT']
+        while time.monotonic() < deadline:
+            entry = cls._cached_entry()
+            if entry is not None:
+                return Decimal(entry['rate'])
+            time.sleep(0.05)
+        return default
+
 
 class CurrencyConverter:
     """Servicio para la conversión de divisas
     
-    Este servicio maneja la conversión entre CRC y USD utilizando tasas de cambio
-    actualizadas. Implementa un sistema de caché para evitar llamadas excesivas
-    al servicio de tasas de cambio.
+    Este servicio maneja la conversión entre CRC y USD utilizando el tipo de
+    cambio de ``ExchangeRateService``.
     
     Attributes:
-        CACHE_KEY (str): Clave para almacenar la tasa en caché
-        CACHE_TIMEOUT (int): Tiempo de expiración del caché en segundos (4 horas)
+        CACHE_KEY (str): Clave del tipo de cambio en caché
+        DEFAULT_RATE (Decimal): Tipo usado si nunca se ha obtenido uno
     """
     
-    CACHE_KEY = 'exchange_rate_usd_crc'
-    CACHE_TIMEOUT = 14400  # 4 horas en segundos
+    CACHE_KEY = ExchangeRateService.CACHE_KEY
+    DEFAULT_RATE = Decimal(DEFAULT_EXCHANGE_RATES['DEFAULT_RATE'])
     
     @classmethod
     def get_exchange_rate(cls) -> Decimal:
         """Obtiene la tasa de cambio actual USD a CRC
         
-        Primero intenta obtener la tasa del caché. Si no está disponible o expiró,
-        realiza una llamada al servicio de tasas de cambio y actualiza el caché.
-        
         Returns:
             Decimal: Tasa de cambio actual (1 USD = X CRC)
         """
-        rate = cache.get(cls.CACHE_KEY)
-        if rate is not None:
-            return Decimal(str(rate))
-        
-        # Si no hay tasa en caché, obtener de la API
-        try:
-            response = requests.get(
-                'https://api.exchangerate-api.com/v4/latest/USD',
-                timeout=5
-            )
-            response.raise_for_status()
-            data = response.json()
-            rate = Decimal(str(data['rates']['CRC']))
-            
-            # Guardar en caché
-            cache.set(cls.CACHE_KEY, str(rate), cls.CACHE_TIMEOUT)
-            return rate
-        except Exception:
-            # En caso de error, usar una tasa por defecto
-            return Decimal('540.00')
+        return ExchangeRateService.get_rate()
+
+    @staticmethod
+    def _validate(from_currency: str, to_currency: str):
+        if from_currency not in ['CRC', 'USD'] or to_currency not in ['CRC', 'USD']:
+            raise ValueError('Monedas deben ser CRC o USD')
+
+    @staticmethod
+    def _convert(amount: Decimal, from_currency: str, to_currency: str, rate: Decimal) -> Decimal:
+        if amount < 0:
+            raise ValueError('El monto no puede ser negativo')
+        if from_currency == to_currency:
+            return amount
+        if from_currency == 'USD':
+            return (amount * rate).quantize(Decimal('0.01'))
+        return (amount / rate).quantize(Decimal('0.01'))
     
     @classmethod
     def convert_currency(
@@ -71,21 +305,86 @@ class CurrencyConverter:
             Decimal: Monto convertido
             
         Raises:
-            ValueError: Si las monedas no son válidas
+            ValueError: Si las monedas no son válidas o el monto es negativo
         """
-        if from_currency not in ['CRC', 'USD'] or to_currency not in ['CRC', 'USD']:
-            raise ValueError('Monedas deben ser CRC o USD')
-            
+        cls._validate(from_currency, to_currency)
+        amount = Decimal(str(amount))
         if from_currency == to_currency:
-            return Decimal(str(amount))
+            return cls._convert(amount, from_currency, to_currency, None)
+        rate = Decimal(str(cls.get_exchange_rate()))
+        return cls._convert(amount, from_currency, to_currency, rate)
+
+    @classmethod
+    def convert_many(
+        cls,
+        amounts: Iterable[Union[Decimal, float]],
+        from_currency: str,
+        to_currency: str,
+        rate: Optional[Decimal] = None
+    ) -> List[Decimal]:
+        """Convierte varios montos con una sola consulta del tipo de cambio
+        
+        Args:
+            amounts: Montos a convertir
+            from_currency: Moneda origen ('CRC' o 'USD')
+            to_currency: Moneda destino ('CRC' o 'USD')
+            rate: Tipo a usar (p. ej. ``ExchangeRateService.rate_at``); por
+                defecto el actual
             
-        rate = cls.get_exchange_rate()
-        amount = Decimal(str(amount))
+        Returns:
+            List[Decimal]: Montos convertidos, en el mismo orden
+        """
+        cls._validate(from_currency, to_currency)
+        amounts = [Decimal(str(amount)) for amount in amounts]
+        if from_currency != to_currency and amounts:
+            rate = Decimal(str(rate if rate is not None else cls.get_exchange_rate()))
+        return [cls._convert(amount, from_currency, to_currency, rate) for amount in amounts]
+
+    @classmethod
+    def fill_amounts(cls, instances, rate: Optional[Decimal] = None):
+        """Calcula ``monto_crc`` y ``monto_usd`` de varios pagos o donaciones
         
-        if from_currency == 'USD' and to_currency == 'CRC':
-            return (amount * rate).quantize(Decimal('0.01'))
-        else:  # CRC a USD
-            return (amount / rate).quantize(Decimal('0.01'))
+        Usa una sola consulta del tipo de cambio para todo el lote y solo
+        completa los registros que aún no tienen ambos montos, por lo que
+        sirve para ``bulk_create`` y para ``save()`` de un solo registro.
+        
+        Args:
+            instances: Pagos o donaciones con ``monto`` y ``moneda``
+            rate: Tipo a usar; por defecto el actual
+            
+        Returns:
+            Los mismos registros
+            
+        Raises:
+            ValueError: Si alguna moneda no es válida o algún monto es negativo
+        """
+        pending = [
+            instance for instance in instances
+            if instance.monto_crc is None or instance.monto_usd is None
+        ]
+        if not pending:
+            return instances
+        rate = Decimal(str(rate if rate is not None else cls.get_exchange_rate()))
+        for instance in pending:
+            amount = Decimal(str(instance.monto))
+            other = 'USD' if instance.moneda == 'CRC' else 'CRC'
+            cls._validate(instance.moneda, other)
+            converted = cls._convert(amount, instance.moneda, other, rate)
+            if instance.moneda == 'CRC':
+                instance.monto_crc, instance.monto_usd = amount, converted
+            else:
+                instance.monto_crc, instance.monto_usd = converted, amount
+        return instances
+
+    @classmethod
+    def usd_to_crc(cls, amount: Union[Decimal, float]) -> Decimal:
+        """Convierte un monto de USD a CRC"""
+        return cls.convert_currency(amount, 'USD', 'CRC')
+
+    @classmethod
+    def crc_to_usd(cls, amount: Union[Decimal, float]) -> Decimal:
+        """Convierte un monto de CRC a USD"""
+        return cls.convert_currency(amount, 'CRC', 'USD')
     
     @classmethod
     def get_both_currencies(cls, amount: Union[Decimal, float], currency: str) -> Tuple[Decimal, Decimal]:
@@ -106,4 +405,544 @@ class CurrencyConverter:
             monto_usd = amount
             monto_crc = cls.convert_currency(amount, 'USD', 'CRC')
             
-        return monto_crc, monto_usd
\ No newline at end of file
+        return monto_crc, monto_usd
+
+
+# Proveedor que ejecuta el reembolso según el método de pago; los demás
+# (efectivo, SINPE, transferencia) los entrega el personal del parque
+PROVEEDORES_REEMBOLSO = {
+    'CARD': 'stripe',
+    'PAYPAL': 'paypal',
+}
+
+# Estado del reembolso según el estado informado por cada proveedor
+ESTADOS_PROVEEDOR = {
+    'stripe': {
+        'succeeded': 'completado',
+        'pending': 'procesando',
+        'requires_action': 'procesando',
+        'failed': 'fallido',
+        'canceled': 'fallido',
+    },
+    'paypal': {
+        'completed': 'completado',
+        'pending': 'procesando',
+        'failed': 'fallido',
+        'cancelled': 'fallido',
+    },
+}
+
+
+class ReembolsoService:
+    """Servicio para crear, procesar y conciliar reembolsos
+
+    Un pago puede tener varios reembolsos parciales mientras la suma de los
+    no fallidos no supere su monto. Cuando los reembolsos completados cubren
+    todo el monto, el pago pasa a ``REFUNDED`` con ``PaymentStateMachine``.
+
+    Args:
+        stripe_client (StripeClient): Cliente de Stripe; por defecto el del proceso.
+        paypal_client (PayPalClient): Cliente de PayPal; por defecto uno nuevo
+            creado en el primer reembolso de PayPal.
+        notifier (PaymentNotifier): Generador de notificaciones.
+
+    Ejemplo:
+    ```python
+    service = ReembolsoService()
+    reembolso = service.crear_reembolso(pago, motivo='Solicitud del cliente', monto=Decimal('50.00'))
+    resultado = service.procesar_reembolso(reembolso)
+    ```
+    """
+
+    def __init__(self, stripe_client=None, paypal_client=None, notifier=None):
+        self.stripe_client = stripe_client or get_stripe_client()
+        self._paypal_client = paypal_client
+        self.notifier = notifier or PaymentNotifier()
+
+    @property
+    def paypal_client(self):
+        """Cliente de PayPal; el SDK solo se carga si hay reembolsos de PayPal."""
+        if self._paypal_client is None:
+            from apps.integrations.payments.paypal import PayPalClient
+            self._paypal_client = PayPalClient()
+        return self._paypal_client
+
+    @staticmethod
+    def proveedor(pago):
+        """Proveedor que ejecuta los reembolsos de un pago."""
+        return PROVEEDORES_REEMBOLSO.get(pago.metodo_pago, 'manual')
+
+    @staticmethod
+    def idempotency_key(pago, operacion=None):
+        """Llave de idempotencia de un reembolso de un pago.
+
+        Args:
+            pago: Pago, PagoInscripcion o Donacion
+            operacion (str): Identificador de la operación; sin él la llave es única
+        """
+        return f'{pago._meta.label_lower}:{pago.pk}:refund:{operacion or uuid.uuid4().hex}'
+
+    @staticmethod
+    def estado_proveedor(proveedor, status):
+        """Estado del reembolso para un estado del proveedor; los desconocidos quedan en proceso."""
+        return ESTADOS_PROVEEDOR[proveedor].get(status, 'procesando')
+
+    def calcular_monto_disponible(self, pago) -> Decimal:
+        """Monto del pago que aún se puede reembolsar
+
+        Los reembolsos pendientes y en proceso cuentan como reembolsados.
+        """
+        from .models import Reembolso
+
+        comprometido = Reembolso.history(pago).filter(
+            estado__in=Reembolso.ESTADOS_ACTIVOS
+        ).aggregate(total=Sum('monto'))['total']
+        return pago.monto - (comprometido or Decimal('0'))
+
+    def obtener_historial_reembolsos(self, pago):
+        """Reembolsos de un pago en orden cronológico"""
+        from .models import Reembolso
+
+        return Reembolso.history(pago)
+
+    def crear_reembolso(self, pago, motivo='', monto=None, idempotency_key=None):
+        """Registra un reembolso pendiente de un pago completado
+
+        Args:
+            pago: Pago, PagoInscripcion o Donacion en estado ``SUCCESS``
+            motivo (str): Motivo del reembolso
+            monto (Decimal): Monto a reembolsar; None reembolsa todo el disponible
+            idempotency_key (str): Llave de la solicitud; si ya hay un
+                reembolso con ella se devuelve ese en lugar de crear otro
+
+        Returns:
+            Reembolso: Reembolso en estado ``pendiente``
+
+        Raises:
+            ReembolsoError: Si el pago no está completado o el monto no es válido
+        """
+        from .models import Reembolso
+
+        if idempotency_key:
+            existing = self._por_llave(pago, idempotency_key)
+            if existing is not None:
+                return existing
+        if monto is not None:
+            monto = Decimal(str(monto))
+            if monto <= 0:
+                raise ReembolsoError('El monto del reembolso debe ser mayor que cero')
+
+        # El estado de PagoInscripcion vive en la tabla de Pago
+        model = pago._meta.get_field('estado').model
+        try:
+            with transaction.atomic():
+                # Bloquear el pago para que dos solicitudes no reembolsen el mismo saldo
+                estado = model.objects.select_for_update().filter(
+                    pk=pago.pk
+                ).values_list('estado', flat=True).first()
+                if estado != 'SUCCESS':
+                    raise ReembolsoError(f'Solo se pueden reembolsar pagos completados (estado: {estado})')
+                disponible = self.calcular_monto_disponible(pago)
+                if disponible <= 0:
+                    raise ReembolsoError('El pago ya fue reembolsado por completo')
+                if monto is None:
+                    monto = disponible
+                elif monto > disponible:
+                    raise ReembolsoError(
+                        f'El monto a reembolsar ({monto}) supera el disponible para reembolso ({disponible})'
+                    )
+                reembolso = Reembolso.objects.create(
+                    target=pago,
+                    monto=monto,
+                    moneda=pago.moneda,
+                    tipo='total' if monto == pago.monto else 'parcial',
+                    motivo=motivo,
+                    proveedor=self.proveedor(pago),
+                    idempotency_key=idempotency_key or self.idempotency_key(pago),
+                )
+        except IntegrityError:
+            # Otra solicitud con la misma llave ganó la inserción
+            existing = self._por_llave(pago, idempotency_key) if idempotency_key else None
+            if existing is None:
+                raise
+            return existing
+
+        logger.info(
+            'Reembolso %s creado para %s:%s por %s %s',
+            reembolso.pk, pago._meta.label_lower, pago.pk, reembolso.monto, reembolso.moneda,
+        )
+        return reembolso
+
+    @staticmethod
+    def _por_llave(pago, idempotency_key):
+        from .models import Reembolso
+
+        existing = Reembolso.objects.filter(idempotency_key=idempotency_key).first()
+        if existing is None:
+            return None
+        if (existing.content_type_id, existing.object_id) != (ContentType.objects.get_for_model(pago).pk, pago.pk):
+            raise ReembolsoError('La llave de idempotencia pertenece al reembolso de otro pago')
+        return existing
+
+    @staticmethod
+    def _transition(reembolso, estado, expected, **fields):
+        """Cambia el estado de un reembolso si sigue en el estado esperado."""
+        from .models import Reembolso
+
+        updated = Reembolso.objects.filter(pk=reembolso.pk, estado=expected).update(
+            estado=estado, fecha_actualizacion=timezone.now(), **fields
+        )
+        if not updated:
+            return False
+        reembolso.estado = estado
+        for name, value in fields.items():
+            setattr(reembolso, name, value)
+        return True
+
+    def procesar_reembolso(self, reembolso) -> dict:
+        """Ejecuta un reembolso pendiente con su proveedor
+
+        El reembolso se reclama con la transición ``pendiente -> procesando``
+        antes de llamar al proveedor: si dos procesos lo procesan a la vez,
+        solo uno llama al proveedor. Si el proveedor no responde
+        (``ProveedorNoDisponibleError``) o falla algo inesperado, vuelve a
+        ``pendiente`` para reintentarlo con la misma llave de idempotencia;
+        solo un rechazo del proveedor lo marca ``fallido``.
+
+        Args:
+            reembolso (Reembolso): Reembolso creado con ``crear_reembolso``
+
+        Returns:
+            dict: ``success``, estado final y, según el resultado, la
+            referencia del proveedor y la notificación o el error. Con
+            ``duplicate`` si el reembolso ya no estaba pendiente.
+
+        Raises:
+            ProveedorNoDisponibleError: Si el proveedor no respondió
+        """
+        if reembolso.estado != 'pendiente' or not self._transition(reembolso, 'procesando', expected='pendiente'):
+            reembolso.refresh_from_db(fields=['estado', 'referencia_externa'])
+            return {'success': reembolso.estado != 'fallido', 'estado': reembolso.estado, 'duplicate': True}
+
+        try:
+            estado, referencia = self._reembolsar_con_proveedor(reembolso)
+        except ProveedorNoDisponibleError:
+            self._transition(reembolso, 'pendiente', expected='procesando')
+            raise
+        except (APIException, ReembolsoError) as e:
+            # Rechazo del proveedor (StripeError, PayPalError)
+            self._aplicar_resultado(reembolso, 'fallido', error=str(e))
+            return {'success': False, 'estado': reembolso.estado, 'error': str(e)}
+        except Exception:
+            self._transition(reembolso, 'pendiente', expected='procesando')
+            raise
+
+        notification = self._aplicar_resultado(reembolso, estado, referencia)
+        result = {
+            'success': reembolso.estado != 'fallido',
+            'estado': reembolso.estado,
+            'referencia_externa': reembolso.referencia_externa,
+        }
+        if notification is not None:
+            result['notification'] = notification
+        return result
+
+    def _reembolsar_con_proveedor(self, reembolso):
+        """Solicita el reembolso al proveedor.
+
+        Returns:
+            tuple: Estado del reembolso y referencia del proveedor
+
+        Raises:
+            ProveedorNoDisponibleError: Si el proveedor no respondió
+        """
+        pago = reembolso.target
+        if pago is None:
+            raise ReembolsoError('El pago del reembolso ya no existe')
+
+        if reembolso.proveedor == 'stripe':
+            try:
+                refund = self.stripe_client.refund_payment(
+                    pago.referencia_transaccion,
+                    amount=reembolso.monto,
+                    idempotency_key=reembolso.idempotency_key,
+                    metadata={'reembolso': str(reembolso.pk)},
+                )
+            except StripeConnectionError as e:
+                raise ProveedorNoDisponibleError(str(e)) from e
+            return self.estado_proveedor('stripe', refund['status']), refund['id']
+        if reembolso.proveedor == 'paypal':
+            refund = self.paypal_client.refund_payment(
+                pago.referencia_transaccion,
+                amount=reembolso.monto,
+                idempotency_key=reembolso.idempotency_key,
+            )
+            return self.estado_proveedor('paypal', refund['state']), refund['id']
+        # Reembolso manual: el dinero lo entrega el personal del parque
+        return 'completado', None
+
+    def _aplicar_resultado(self, reembolso, estado, referencia=None, error=''):
+        """Guarda la respuesta del proveedor de un reembolso en proceso.
+
+        Returns:
+            dict: Notificación si el reembolso se completó, o None.
+        """
+        fields = {'error': error}
+        if referencia:
+            fields['referencia_externa'] = referencia
+        if estado == 'completado':
+            fields['fecha_completado'] = timezone.now()
+
+        with transaction.atomic():
+            if not self._transition(reembolso, estado, expected='procesando', **fields):
+                logger.info('El reembolso %s ya no está en proceso; se omite el cambio a %s', reembolso.pk, estado)
+                return None
+            if estado == 'completado':
+                self._cerrar_pago(reembolso)
+
+        if estado == 'fallido':
+            logger.warning('Reembolso %s rechazado: %s', reembolso.pk, error)
+        if estado != 'completado':
+            return None
+        return self.notifier.send_refund_confirmation(reembolso.notification_data())
+
+    def _cerrar_pago(self, reembolso):
+        """Marca el pago como reembolsado si los reembolsos completados cubren su monto."""
+        from .models import Reembolso
+        from .state import PaymentStateMachine
+
+        pago = reembolso.target
+        reembolsado = Reembolso.history(pago).filter(estado='completado').aggregate(total=Sum('monto'))['total']
+        if reembolsado is None or reembolsado < pago.monto:
+            return
+        if not PaymentStateMachine.transition(
+            pago, 'REFUNDED', expected='SUCCESS', source='refund', detail={'reembolso': reembolso.pk}
+        ):
+            logger.warning(
+                '%s:%s no estaba completado al terminar su reembolso %s',
+                pago._meta.label_lower, pago.pk, reembolso.pk,
+            )
+
+    def reembolsar_pagos(self, pagos, motivo, operacion, max_concurrency=None) -> Counter:
+        """Reembolsa por completo varios pagos, p. ej. al cancelar un horario
+
+        Los pagos se leen por lotes de ``BATCH_SIZE`` y sus reembolsos se
+        crean con una sola inserción por lote, con llaves derivadas de
+        ``operacion``: repetir la operación no crea reembolsos nuevos y solo
+        procesa los que quedaron pendientes. Cada lote se procesa con a lo
+        sumo ``max_concurrency`` llamadas simultáneas al proveedor.
+
+        Args:
+            pagos: QuerySet de un modelo de pago; se omiten los no completados
+            motivo (str): Motivo de los reembolsos
+            operacion (str): Identificador de la operación, p. ej. ``horario:12``
+            max_concurrency (int): Reembolsos simultáneos; por defecto ``MAX_CONCURRENCY``
+
+        Returns:
+            Counter: Reembolsos por estado final (``error`` si no se pudo
+            contactar al proveedor; quedan pendientes)
+        """
+        config = get_refunds_config()
+        workers = max_concurrency or config['MAX_CONCURRENCY']
+        pagos = pagos.filter(estado='SUCCESS').order_by('pk')
+        resultado = Counter()
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='refunds') if workers > 1 else None
+        try:
+            last_pk = 0
+            while True:
+                chunk = list(pagos.filter(pk__gt=last_pk)[:config['BATCH_SIZE']])
+                if not chunk:
+                    break
+                last_pk = chunk[-1].pk
+                ids = self._crear_lote(chunk, motivo, operacion)
+                resultado.update(self._procesar_ids(ids, executor))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        logger.info('Reembolso masivo %s: %s', operacion, dict(resultado))
+        return resultado
+
+    def _crear_lote(self, pagos, motivo, operacion):
+        """Crea los reembolsos totales de un lote de pagos.
+
+        Returns:
+            list: IDs de los reembolsos pendientes de la operación en el lote
+        """
+        from .models import Reembolso
+
+        content_type = ContentType.objects.get_for_model(pagos[0])
+        comprometido = dict(
+            Reembolso.objects.filter(
+                content_type=content_type,
+                object_id__in=[pago.pk for pago in pagos],
+                estado__in=Reembolso.ESTADOS_ACTIVOS,
+            ).order_by().values('object_id').annotate(total=Sum('monto')).values_list('object_id', 'total')
+        )
+        keys = []
+        nuevos = []
+        for pago in pagos:
+            key = self.idempotency_key(pago, operacion)
+            keys.append(key)
+            disponible = pago.monto - comprometido.get(pago.pk, Decimal('0'))
+            if disponible <= 0:
+                continue
+            nuevos.append(Reembolso(
+                content_type=content_type,
+                object_id=pago.pk,
+                monto=disponible,
+                moneda=pago.moneda,
+                tipo='total' if disponible == pago.monto else 'parcial',
+                motivo=motivo,
+                proveedor=self.proveedor(pago),
+                idempotency_key=key,
+            ))
+        Reembolso.objects.bulk_create(nuevos, ignore_conflicts=True)
+        return list(
+            Reembolso.objects.filter(idempotency_key__in=keys, estado='pendiente').values_list('pk', flat=True)
+        )
+
+    def _procesar_ids(self, ids, executor=None):
+        """Procesa reembolsos pendientes; con ``executor``, en sus hilos.
+
+        Returns:
+            list: Estado final de cada reembolso
+        """
+        if executor is None:
+            return [self._procesar_id(pk) for pk in ids]
+        return list(executor.map(self._procesar_id_en_hilo, ids))
+
+    def _procesar_id(self, pk):
+        from .models import Reembolso
+
+        try:
+            return self.procesar_reembolso(Reembolso.objects.get(pk=pk))['estado']
+        except Exception:
+            logger.exception('Error al procesar el reembolso %s', pk)
+            return 'error'
+
+    def _procesar_id_en_hilo(self, pk):
+        try:
+            return self._procesar_id(pk)
+        finally:
+            close_old_connections()
+
+    def procesar_pendientes(self, max_concurrency=None) -> Counter:
+        """Procesa los reembolsos pendientes desde hace más de ``RETRY_AFTER``
+
+        Recupera los reembolsos que un proceso interrumpido o un error de red
+        dejaron pendientes; se reintentan con su misma llave de idempotencia.
+
+        Returns:
+            Counter: Reembolsos por estado final
+        """
+        from .models import Reembolso
+
+        config = get_refunds_config()
+        workers = max_concurrency or config['MAX_CONCURRENCY']
+        limite = timezone.now() - timedelta(seconds=config['RETRY_AFTER'])
+        pendientes = Reembolso.objects.filter(estado='pendiente', fecha_actualizacion__lte=limite).order_by('pk')
+        resultado = Counter()
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='refunds') if workers > 1 else None
+        try:
+            last_pk = 0
+            while True:
+                ids = list(pendientes.filter(pk__gt=last_pk).values_list('pk', flat=True)[:config['BATCH_SIZE']])
+                if not ids:
+                    break
+                last_pk = ids[-1]
+                resultado.update(self._procesar_ids(ids, executor))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return resultado
+
+    def conciliar_reembolsos(self) -> Counter:
+        """Actualiza los reembolsos en proceso con el estado de su proveedor
+
+        Los reembolsos de Stripe se consultan por páginas de ``PAGE_SIZE``
+        (``StripeClient.list_refunds``) desde la creación del más antiguo en
+        proceso, en lugar de una llamada por reembolso; se identifican por
+        su ID o por ``metadata['reembolso']`` si la respuesta original se
+        perdió. Los que Stripe no registró vuelven a ``pendiente`` pasados
+        ``RETRY_AFTER`` segundos para reintentarse con la misma llave.
+
+        La API de PayPal no ofrece un listado de reembolsos, por lo que los
+        de PayPal (que casi siempre se completan al solicitarlos) se
+        consultan uno por uno.
+
+        Returns:
+            Counter: Reembolsos actualizados por estado
+        """
+        resultado = Counter()
+        self._conciliar_stripe(resultado)
+        self._conciliar_paypal(resultado)
+        logger.info('Conciliación de reembolsos: %s', dict(resultado))
+        return resultado
+
+    def _conciliar_stripe(self, resultado):
+        from .models import Reembolso
+
+        config = get_refunds_config()
+        en_proceso = list(
+            Reembolso.objects.filter(estado='procesando', proveedor='stripe').values_list(
+                'pk', 'referencia_externa', 'fecha_creacion', 'fecha_actualizacion'
+            )
+        )
+        if not en_proceso:
+            return
+        por_referencia = {referencia: pk for pk, referencia, _, _ in en_proceso if referencia}
+        sin_confirmar = {pk: actualizado for pk, _, _, actualizado in en_proceso}
+        # Margen para diferencias de reloj con Stripe
+        desde = int(min(creado for _, _, creado, _ in en_proceso).timestamp()) - 300
+
+        starting_after = None
+        while sin_confirmar:
+            page = self.stripe_client.list_refunds(
+                created_gte=desde, limit=config['PAGE_SIZE'], starting_after=starting_after
+            )
+            encontrados = {}
+            for refund in page['data']:
+                pk = por_referencia.get(refund['id'])
+                if pk is None:
+                    try:
+                        pk = int(refund['metadata'].get('reembolso'))
+                    except (TypeError, ValueError):
+                        continue
+                if sin_confirmar.pop(pk, None) is not None:
+                    encontrados[pk] = refund
+            for reembolso in Reembolso.objects.filter(pk__in=encontrados):
+                refund = encontrados[reembolso.pk]
+                estado = self.estado_proveedor('stripe', refund['status'])
+                if estado == 'procesando' and reembolso.referencia_externa:
+                    continue
+                self._aplicar_resultado(reembolso, estado, refund['id'])
+                resultado[estado] += 1
+            if not page['has_more'] or not page['data']:
+                break
+            starting_after = page['data'][-1]['id']
+
+        # Stripe no registró la solicitud: se reintenta con la misma llave
+        limite = timezone.now() - timedelta(seconds=config['RETRY_AFTER'])
+        perdidos = [pk for pk, actualizado in sin_confirmar.items() if actualizado <= limite]
+        if perdidos:
+            resultado['pendiente'] += Reembolso.objects.filter(
+                pk__in=perdidos, estado='procesando', referencia_externa__isnull=True
+            ).update(estado='pendiente', fecha_actualizacion=timezone.now())
+
+    def _conciliar_paypal(self, resultado):
+        from .models import Reembolso
+
+        en_proceso = Reembolso.objects.filter(
+            estado='procesando', proveedor='paypal', referencia_externa__isnull=False
+        ).order_by('pk')
+        for reembolso in en_proceso.iterator():
+            try:
+                refund = self.paypal_client.get_refund(reembolso.referencia_externa)
+            except APIException:
+                logger.warning('No se pudo consultar el reembolso PayPal %s', reembolso.referencia_externa)
+                continue
+            estado = self.estado_proveedor('paypal', refund['state'])
+            if estado == 'procesando':
+                continue
+            self._aplicar_resultado(reembolso, estado, refund['id'])
+            resultado[estado] += 1
@@ -6,48 +6,91 @@ ocurren eventos en los modelos del módulo payments, específicamente
 para gestionar la eliminación de archivos en S3.
 
 Señales implementadas:
-- post_delete: Elimina archivos de S3 cuando se elimina una instancia
-- pre_save: Elimina archivos anteriores de S3 cuando se actualiza un campo de archivo
+- post_delete: Encola la eliminación de archivos de S3 cuando se elimina una instancia
+- pre_save: Encola la eliminación del archivo anterior de S3 cuando se actualiza un campo de archivo
+- post_save: Registra la referencia de transacción en PaymentReference
+- post_save, post_delete y payment_state_changed: Encolan el recálculo de
+  los resúmenes de ventas del día del pago
 """
 
 import logging
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from .models import Pago
-from core.utils.storage.s3_utils import delete_s3_files_from_instance, delete_old_s3_file
+from .models import Donacion, Pago, PagoInscripcion, PaymentReference
+from apps.support.jobs.queue import enqueue
+from core.utils.storage.s3_utils import get_file_fields_from_instance
+from .reports import sale_date
+from .state import payment_state_changed
+from .tasks import DELETE_FILES, schedule_sales_rollup
 
 logger = logging.getLogger(__name__)
 
 @receiver(post_delete, sender=Pago)
 def delete_payment_s3_files_on_delete(sender, instance, **kwargs):
     """
-    Elimina todos los archivos S3 asociados cuando se elimina un pago
-    
+    Encola la eliminación de los archivos S3 asociados cuando se elimina un pago
+
+    La eliminación ocurre en los trabajadores de la cola y se reintenta si
+    S3 no responde; si el borrado del pago se revierte, el trabajo también.
+
     Args:
         sender: Modelo que envía la señal (Pago)
         instance: Instancia que se está eliminando
         **kwargs: Argumentos adicionales de la señal
     """
-    try:
-        results = delete_s3_files_from_instance(instance)
-        logger.info(f"Eliminación S3 completada para pago ID {instance.pk}: {results}")
-    except Exception as e:
-        logger.error(f"Error al eliminar archivos S3 para pago ID {instance.pk}: {e}")
+    paths = [file_field.name for _, file_field in get_file_fields_from_instance(instance)]
+    if paths:
+        enqueue(DELETE_FILES, kwargs={'paths': paths}, reference=f'payments.pago:{instance.pk}')
 
 @receiver(pre_save, sender=Pago)
 def delete_old_payment_receipt_on_update(sender, instance, **kwargs):
     """
-    Elimina el comprobante anterior de S3 cuando se actualiza un pago
-    
+    Encola la eliminación del comprobante anterior de S3 cuando se actualiza un pago
+
     Args:
         sender: Modelo que envía la señal (Pago)
         instance: Instancia que se está guardando (con cambios)
         **kwargs: Argumentos adicionales de la señal
     """
-    try:
-        if instance.pk:  # Solo para actualizaciones, no para creaciones
-            success = delete_old_s3_file(sender, instance, 'comprobante')
-            if not success:
-                logger.warning(f"No se pudo eliminar el comprobante anterior del pago ID {instance.pk}")
-    except Exception as e:
-        logger.error(f"Error al verificar comprobante anterior para pago ID {instance.pk}: {e}")
\ No newline at end of file
+    if not instance.pk:  # Solo para actualizaciones, no para creaciones
+        return
+    old_name = Pago.objects.filter(pk=instance.pk).values_list('comprobante', flat=True).first()
+    if old_name and old_name != instance.comprobante.name:
+        enqueue(DELETE_FILES, kwargs={'paths': [old_name]}, reference=f'payments.pago:{instance.pk}')
+
+
+@receiver(post_save, sender=Pago)
+@receiver(post_save, sender=PagoInscripcion)
+@receiver(post_save, sender=Donacion)
+def register_payment_reference(sender, instance, update_fields=None, **kwargs):
+    """
+    Registra la referencia de transacción del pago para resolver webhooks
+
+    Args:
+        sender: Modelo que envía la señal (Pago, PagoInscripcion o Donacion)
+        instance: Instancia guardada
+        update_fields: Campos actualizados; se omite si no incluye la referencia
+        **kwargs: Argumentos adicionales de la señal
+    """
+    if update_fields is not None and 'referencia_transaccion' not in update_fields:
+        return
+    PaymentReference.register(instance, instance.referencia_transaccion)
+
+
+@receiver(post_save, sender=Pago)
+@receiver(post_save, sender=PagoInscripcion)
+@receiver(post_save, sender=Donacion)
+@receiver(post_delete, sender=Pago)
+@receiver(post_delete, sender=PagoInscripcion)
+@receiver(post_delete, sender=Donacion)
+@receiver(payment_state_changed)
+def schedule_sales_rollup_refresh(sender, instance, **kwargs):
+    """
+    Encola el recálculo de los resúmenes de ventas del día de un pago
+
+    Args:
+        sender: Modelo que envía la señal (Pago, PagoInscripcion o Donacion)
+        instance: Pago o donación creado, modificado, borrado o con nuevo estado
+        **kwargs: Argumentos adicionales de la señal
+    """
+    schedule_sales_rollup([sale_date(instance)])
@@ -0,0 +1,107 @@
+"""
+Máquina de estados de los pagos
+
+Define los cambios de estado permitidos para ``Pago``, ``PagoInscripcion``
+y ``Donacion`` y los aplica sin bloquear filas: cada transición es un
+``UPDATE`` condicionado al estado que se leyó (``estado=expected``), y solo
+la solicitud que actualiza la fila gana. Las demás reciben ``False`` y
+deben volver a leer el registro.
+
+Flujo normal::
+
+    PENDING -> PROCESSING -> SUCCESS -> REFUNDED
+                          -> FAILED
+
+Cada transición aplicada se guarda en ``PaymentTransition`` en la misma
+transacción que el cambio de estado y se anuncia con la señal
+``payment_state_changed``.
+"""
+
+import logging
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.dispatch import Signal
+
+from .exceptions import TransicionInvalidaError
+from .models import PaymentReference, PaymentTransition
+
+logger = logging.getLogger(__name__)
+
+# Enviada tras aplicar una transición, con ``instance``, ``from_estado`` y ``to_estado``
+payment_state_changed = Signal()
+
+TRANSITIONS = {
+    # Los pagos en efectivo o confirmados por Stripe pasan directo a un resultado
+    'PENDING': {'PROCESSING', 'SUCCESS', 'FAILED'},
+    # PENDING libera un procesamiento interrumpido para reintentarlo
+    'PROCESSING': {'PENDING', 'SUCCESS', 'FAILED'},
+    # Stripe puede rechazar después una intención ya creada
+    'SUCCESS': {'FAILED', 'REFUNDED'},
+    # Un nuevo intento o una confirmación tardía de Stripe
+    'FAILED': {'PENDING', 'SUCCESS'},
+    'REFUNDED': set(),
+}
+
+
+class PaymentStateMachine:
+    """Aplica transiciones de estado atómicas a los registros de pago"""
+
+    @staticmethod
+    def can_transition(actual, nuevo):
+        """Indica si se permite pasar de ``actual`` a ``nuevo``."""
+        return nuevo in TRANSITIONS.get(actual, ())
+
+    @classmethod
+    def transition(cls, payable, estado, expected=None, source='', detail=None, **fields):
+        """Cambia el estado de un registro si sigue en el estado esperado.
+
+        Args:
+            payable: Pago, PagoInscripcion o Donacion.
+            estado (str): Nuevo estado.
+            expected (str): Estado que debe tener en la base de datos; por
+                defecto el estado leído en ``payable``.
+            source (str): Origen del cambio, para el historial.
+            detail (dict): Datos adicionales para el historial.
+            **fields: Otros campos a actualizar en la misma sentencia.
+
+        Returns:
+            bool: True si esta llamada hizo el cambio; False si otro proceso
+            cambió el estado antes.
+
+        Raises:
+            TransicionInvalidaError: Si la transición no está permitida.
+        """
+        if expected is None:
+            expected = payable.estado
+        if not cls.can_transition(expected, estado):
+            raise TransicionInvalidaError(expected, estado)
+
+        # El estado de PagoInscripcion vive en la tabla de Pago
+        model = payable._meta.get_field('estado').model
+        with transaction.atomic(savepoint=False):
+            updated = model.objects.filter(pk=payable.pk, estado=expected).update(estado=estado, **fields)
+            if not updated:
+                logger.info(
+                    '%s:%s ya no está en %s; se omite el cambio a %s',
+                    payable._meta.label_lower, payable.pk, expected, estado,
+                )
+                return False
+            PaymentTransition.objects.create(
+                content_type=ContentType.objects.get_for_model(payable),
+                object_id=payable.pk,
+                from_estado=expected,
+                to_estado=estado,
+                source=source,
+                detail=detail or {},
+            )
+            payable.estado = estado
+            for name, value in fields.items():
+                setattr(payable, name, value)
+            payable.sync_related_estado(estado)
+            if 'referencia_transaccion' in fields:
+                PaymentReference.register(payable, fields['referencia_transaccion'])
+            payment_state_changed.send(
+                sender=type(payable), instance=payable, from_estado=expected, to_estado=estado
+            )
+        return True
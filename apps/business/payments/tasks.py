@@ -0,0 +1,150 @@
+"""
+Tareas en segundo plano del módulo payments
+
+El procesamiento con Stripe de pagos, pagos de inscripción y donaciones se
+ejecuta en los trabajadores de la cola (``apps.support.jobs``) en lugar de
+en la solicitud HTTP. El endpoint ``procesar_pago`` encola el trabajo y
+responde 202; el resultado (intención de pago y notificación) queda en el
+trabajo y se consulta con GET sobre el mismo endpoint.
+
+Tareas registradas:
+- payments.process_payment: Crea la intención de pago y actualiza el estado
+- payments.delete_files: Elimina archivos de S3 de registros borrados o reemplazados
+- payments.refresh_sales_rollup: Recalcula los resúmenes de ventas de un día
+"""
+
+import logging
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+
+from apps.support.jobs.models import Job
+from apps.support.jobs.queue import PermanentError, enqueue, task
+from core.utils.storage.s3_utils import delete_s3_file
+from .processing import PaymentProcessor, payable_label
+from .reports import SalesRollupBuilder, get_config as get_reports_config
+
+logger = logging.getLogger(__name__)
+
+PROCESS_PAYMENT = 'payments.process_payment'
+DELETE_FILES = 'payments.delete_files'
+REFRESH_SALES_ROLLUP = 'payments.refresh_sales_rollup'
+
+
+def payment_reference(instance):
+    """Referencia del trabajo de un pago (``app_label.modelo:pk``)."""
+    return f'{payable_label(instance)}:{instance.pk}'
+
+
+def _load(model, pk):
+    try:
+        return PaymentProcessor.load(model, pk)
+    except (LookupError, ObjectDoesNotExist):
+        raise PermanentError(f'Pago no encontrado: {model}:{pk}')
+
+
+def _mark_failed(job, error):
+    """Deja como fallido el pago de un trabajo descartado."""
+    try:
+        payable = _load(**job.kwargs)
+    except PermanentError:
+        return
+    PaymentProcessor().fail(payable)
+
+
+@task(PROCESS_PAYMENT, queue='payments', on_dead=_mark_failed)
+def process_payment(model, pk):
+    """Procesa un pago pendiente con Stripe y genera su notificación.
+
+    Args:
+        model (str): Modelo del pago (``payments.pago``, ``payments.pagoinscripcion``
+            o ``payments.donacion``).
+        pk (int): ID del pago.
+
+    Returns:
+        dict: Resultado de ``PaymentProcessor.process``.
+    """
+    return PaymentProcessor().process(_load(model, pk))
+
+
+def schedule_payment(instance):
+    """Encola el procesamiento de un pago; si ya hay uno en curso lo devuelve.
+
+    Returns:
+        Job: Trabajo de procesamiento del pago.
+    """
+    return enqueue(
+        PROCESS_PAYMENT,
+        kwargs={'model': payable_label(instance), 'pk': instance.pk},
+        reference=payment_reference(instance),
+        unique=True,
+    )
+
+
+def latest_payment_job(instance):
+    """Último trabajo de procesamiento de un pago o None."""
+    return Job.objects.filter(
+        task=PROCESS_PAYMENT, reference=payment_reference(instance)
+    ).order_by('-created_at', '-pk').first()
+
+
+@task(DELETE_FILES)
+def delete_files(paths):
+    """Elimina archivos de S3; reintenta si alguno no se pudo eliminar.
+
+    Args:
+        paths (list): Rutas de los archivos en el almacenamiento.
+
+    Returns:
+        int: Cantidad de archivos eliminados.
+    """
+    if not getattr(settings, 'USE_S3', False):
+        return 0
+    failed = [path for path in paths if not delete_s3_file(path)]
+    if failed:
+        raise RuntimeError(f'No se pudieron eliminar: {", ".join(failed)}')
+    return len(paths)
+
+
+@task(REFRESH_SALES_ROLLUP)
+def refresh_sales_rollup(fecha):
+    """Recalcula los resúmenes de ventas de un día.
+
+    Args:
+        fecha (str): Día en formato ISO (``AAAA-MM-DD``).
+
+    Returns:
+        int: Filas de resumen escritas.
+    """
+    return SalesRollupBuilder.refresh_day(date.fromisoformat(fecha))
+
+
+def schedule_sales_rollup(fechas):
+    """Encola, al confirmar la transacción, el recálculo de los resúmenes de varios días.
+
+    Los cambios de un mismo día se agrupan: si ya hay un recálculo pendiente
+    de ese día no se encola otro.
+
+    Args:
+        fechas: Días (``date``) con pagos creados, modificados o borrados.
+    """
+    fechas = sorted(set(fechas))
+    if not fechas:
+        return
+
+    def _enqueue():
+        delay = get_reports_config()['ROLLUP_DELAY']
+        for fecha in fechas:
+            reference = f'sales-rollup:{fecha.isoformat()}'
+            if Job.objects.filter(task=REFRESH_SALES_ROLLUP, reference=reference, status=Job.STATUS_PENDING).exists():
+                continue
+            enqueue(
+                REFRESH_SALES_ROLLUP,
+                kwargs={'fecha': fecha.isoformat()},
+                reference=reference,
+                delay=timedelta(seconds=delay) if delay else None,
+            )
+
+    transaction.on_commit(_enqueue)
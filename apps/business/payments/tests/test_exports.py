@@ -0,0 +1,92 @@
+# tests/test_exports.py
+
+import csv
+import io
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from openpyxl import load_workbook
+from rest_framework.test import APIClient
+
+from apps.business.payments.models import Donacion, Pago
+
+
+@patch('apps.business.payments.services.CurrencyConverter.get_exchange_rate', return_value=Decimal('500'))
+class TestExportaciones(TestCase):
+    """Pruebas de la exportación de listados administrativos
+
+    Verifica que la exportación respeta filtros, búsqueda y orden del
+    listado, que no pagina y que el número de consultas no depende de la
+    cantidad de filas.
+    """
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(username='admin', password='x'))
+
+    def _pagos(self, cantidad, estado='SUCCESS', prefijo='REF'):
+        for i in range(cantidad):
+            Pago.objects.create(
+                monto=Decimal('10') + i, moneda='USD', metodo_pago='CARD',
+                referencia_transaccion=f'{prefijo}-{i:03d}', estado=estado
+            )
+
+    def _csv(self, response):
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(io.StringIO(content)))
+
+    def test_csv_con_filtros_busqueda_y_orden(self, _rate):
+        """Prueba que el CSV aplica los filtros del listado y no pagina"""
+        self._pagos(15)
+        self._pagos(3, estado='FAILED', prefijo='FAIL')
+
+        response = self.client.get(
+            '/api/v1/payments/admin/pagos/exportar/',
+            {'estado': 'SUCCESS', 'search': 'REF-00', 'ordering': 'monto'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('pagos-', response['Content-Disposition'])
+        rows = self._csv(response)
+        self.assertEqual(rows[0][:3], ['ID', 'Fecha', 'Referencia'])
+        self.assertEqual([row[2] for row in rows[1:]], [f'REF-00{i}' for i in range(10)])
+        self.assertEqual(rows[1][8], '10.00')
+
+    def test_consultas_constantes(self, _rate):
+        """Prueba que la exportación usa las mismas consultas con más filas"""
+        self._pagos(5)
+        # Registro de auditoría de la solicitud y la consulta de las filas
+        with self.assertNumQueries(2):
+            self._csv(self.client.get('/api/v1/payments/admin/pagos/exportar/'))
+
+        self._pagos(30, prefijo='MAS')
+        with self.assertNumQueries(2):
+            rows = self._csv(self.client.get('/api/v1/payments/admin/pagos/exportar/'))
+        self.assertEqual(len(rows), 36)
+
+    def test_xlsx_de_donaciones(self, _rate):
+        """Prueba la exportación de donaciones en XLSX"""
+        Donacion.objects.create(monto=50, moneda='USD', metodo_pago='CARD', nombre_donante='Ana')
+        Donacion.objects.create(monto=20000, moneda='CRC', metodo_pago='CASH', nombre_donante='Luis')
+
+        response = self.client.get('/api/v1/payments/admin/donaciones/exportar/', {'formato': 'xlsx', 'moneda': 'CRC'})
+
+        self.assertEqual(response.status_code, 200)
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        rows = list(sheet.values)
+        self.assertEqual(rows[0][-2:], ('Donante', 'Email'))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][9], 'Luis')
+        self.assertEqual(rows[1][8], 40)
+
+    def test_formato_invalido_y_permisos(self, _rate):
+        """Prueba el formato no soportado y que solo exportan administradores"""
+        url = '/api/v1/payments/admin/pagos-inscripcion/exportar/'
+        self.assertEqual(self.client.get(url, {'formato': 'pdf'}).status_code, 400)
+
+        self.client.force_authenticate(User.objects.create_user(username='usuario'))
+        self.assertEqual(self.client.get(url).status_code, 403)
@@ -0,0 +1,88 @@
+# tests/test_ingestion.py
+
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.business.payments.ingestion import BulkIngestor
+from apps.business.payments.models import Donacion, Pago, PagoInscripcion, PaymentReference
+
+
+@patch('apps.business.payments.services.CurrencyConverter.get_exchange_rate', return_value=Decimal('500'))
+class TestBulkIngestor(TestCase):
+    """Pruebas de la carga masiva de pagos y donaciones
+
+    Verifica que la conversión usa un solo tipo de cambio por carga, que las
+    referencias se validan por lote y que las fechas indicadas se conservan.
+    """
+
+    def _filas(self, cantidad, prefijo='CASH'):
+        return [
+            {'monto': '1000', 'moneda': 'CRC', 'metodo_pago': 'CASH', 'referencia_transaccion': f'{prefijo}-{i}'}
+            for i in range(cantidad)
+        ]
+
+    def test_carga_por_lotes_con_un_tipo_de_cambio(self, rate):
+        """Prueba que toda la carga se convierte con una sola consulta del tipo"""
+        filas = self._filas(5) + [
+            {'monto': '20', 'moneda': 'USD', 'metodo_pago': 'TRANSFER', 'referencia_transaccion': 'USD-1'}
+        ]
+
+        ContentType.objects.get_for_model(Pago)
+        # Por lote: referencias existentes, INSERT y referencias de pago (más el savepoint)
+        with self.assertNumQueries(3 * 3 + 2 * 3):
+            result = BulkIngestor(Pago, batch_size=2).ingest(iter(filas))
+
+        self.assertEqual(result.created, 6)
+        rate.assert_called_once()
+        pago = Pago.objects.get(referencia_transaccion='USD-1')
+        self.assertEqual((pago.monto_crc, pago.monto_usd), (Decimal('10000.00'), Decimal('20.00')))
+        self.assertEqual(Pago.objects.get(referencia_transaccion='CASH-0').monto_usd, Decimal('2.00'))
+        self.assertEqual(PaymentReference.resolve('CASH-4'), Pago.objects.get(referencia_transaccion='CASH-4'))
+
+    def test_referencias_repetidas_y_filas_invalidas(self, rate):
+        """Prueba que se omiten referencias existentes, repetidas y filas inválidas"""
+        Pago.objects.create(monto=100, moneda='CRC', metodo_pago='CASH', referencia_transaccion='CASH-0')
+        filas = self._filas(3) + [
+            {'monto': '5', 'moneda': 'CRC', 'metodo_pago': 'CASH', 'referencia_transaccion': 'CASH-1'},
+            {'monto': '-5', 'moneda': 'CRC', 'metodo_pago': 'CASH', 'referencia_transaccion': 'NEG'},
+            {'monto': '5', 'moneda': 'EUR', 'metodo_pago': 'CASH', 'referencia_transaccion': 'EUR'},
+            {'monto': '5', 'moneda': 'CRC', 'metodo_pago': 'CASH', 'referencia': 'X'},
+            {'monto': '99999999', 'moneda': 'USD', 'metodo_pago': 'CASH', 'referencia_transaccion': 'BIG'},
+        ]
+
+        result = BulkIngestor(Pago, batch_size=3).ingest(filas)
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual(result.duplicates, ['CASH-0', 'CASH-1'])
+        self.assertEqual([number for number, _ in result.errors], [5, 6, 7, 8])
+        self.assertIn('monto_crc', result.errors[-1][1])
+        self.assertEqual(Pago.objects.get(referencia_transaccion='CASH-1').monto, Decimal('1000'))
+
+    def test_donaciones_historicas_conservan_la_fecha(self, rate):
+        """Prueba la carga de donaciones con fecha y sin referencia"""
+        fecha = timezone.make_aware(datetime(2023, 5, 1, 10, 30))
+        result = BulkIngestor(Donacion).ingest([
+            {'monto': Decimal('50'), 'moneda': 'USD', 'metodo_pago': 'CASH', 'fecha_creacion': fecha},
+            {'monto': Decimal('25000'), 'moneda': 'CRC', 'metodo_pago': 'CASH', 'nombre_donante': 'Ana'},
+        ])
+
+        self.assertEqual(result.created, 2)
+        historica = Donacion.objects.get(moneda='USD')
+        self.assertEqual(historica.fecha_creacion, fecha)
+        self.assertEqual(historica.monto_crc, Decimal('25000.00'))
+        self.assertEqual(Donacion.objects.get(nombre_donante='Ana').fecha_creacion.date(), timezone.now().date())
+
+    def test_save_no_consulta_el_tipo_con_montos_calculados(self, rate):
+        """Prueba que save() solo convierte los montos que faltan"""
+        Pago.objects.create(
+            monto=10, monto_crc=5000, monto_usd=10, moneda='USD', metodo_pago='CASH', referencia_transaccion='R1'
+        )
+
+        rate.assert_not_called()
+        with self.assertRaises(ValueError):
+            BulkIngestor(PagoInscripcion)
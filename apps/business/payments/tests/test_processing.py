@@ -0,0 +1,151 @@
+# tests/test_processing.py
+
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import stripe
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.business.education.models import Horario, Inscripcion, Instructor, Programa
+from apps.business.payments.models import Donacion, Pago, PagoInscripcion, PaymentReference, PaymentTransition
+from apps.business.payments.processing import Payable, PaymentProcessor
+from apps.integrations.payments.stripe_client import StripeClient, StripeConnectionError, StripeError
+
+
+@patch('apps.business.payments.services.CurrencyConverter.get_exchange_rate', return_value=Decimal('500'))
+class TestPaymentProcessor(TestCase):
+    """Pruebas del procesador único de pagos
+
+    Verifica que los tres tipos de pago comparten el mismo flujo, que el
+    pago se reclama con un UPDATE condicional antes de llamar a Stripe y
+    que un segundo procesamiento del mismo pago no crea otra intención.
+    """
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.stripe = MagicMock()
+        self.stripe.create_payment_intent.return_value = {'id': 'pi_proc', 'client_secret': 'secret'}
+        self.processor = PaymentProcessor(stripe_client=self.stripe)
+
+    def _pago_inscripcion(self):
+        instructor = Instructor.objects.create(
+            user=User.objects.create_user(username='instructor'),
+            especialidad='Biología Marina',
+            experiencia_years=5,
+            bio='Instructor'
+        )
+        programa = Programa.objects.create(
+            nombre='Tortugas', descripcion='Programa', duracion_horas=2, capacidad_min=1,
+            capacidad_max=10, edad_minima=8, edad_maxima=14, requisitos='Ninguno', precio=Decimal('25000')
+        )
+        horario = Horario.objects.create(
+            programa=programa, instructor=instructor, cupos_disponibles=10,
+            fecha_inicio=timezone.now() + timedelta(days=5),
+            fecha_fin=timezone.now() + timedelta(days=5, hours=2),
+        )
+        inscripcion = Inscripcion.objects.create(
+            usuario=User.objects.create_user(username='participante'), horario=horario,
+            nombre_participante='Ana', edad_participante=10
+        )
+        return PagoInscripcion.objects.create(
+            inscripcion=inscripcion, monto=Decimal('25000'), moneda='CRC',
+            metodo_pago='CARD', referencia_transaccion='INS1'
+        )
+
+    def test_modelos_cumplen_el_protocolo(self, _rate):
+        """Prueba que pagos, pagos de inscripción y donaciones son pagables"""
+        for model in (Pago, PagoInscripcion, Donacion):
+            self.assertIsInstance(model(), Payable)
+
+    def test_pago_de_inscripcion_con_consultas_acotadas(self, _rate):
+        """Prueba el procesamiento de una inscripción sin cargas perezosas"""
+        pago = self._pago_inscripcion()
+
+        with self.assertNumQueries(1):
+            payable = PaymentProcessor.load('payments.pagoinscripcion', pago.pk)
+            description = payable.payment_description()
+        # Dos transiciones con su historial, estado de la inscripción y referencia de Stripe
+        with self.assertNumQueries(6):
+            result = self.processor.process(payable)
+
+        self.assertEqual(description, 'Pago de inscripción para Tortugas')
+        self.assertEqual(result['estado'], 'SUCCESS')
+        self.assertEqual(result['notification']['type'], 'success')
+        pago.refresh_from_db()
+        self.assertEqual(pago.estado, 'SUCCESS')
+        self.assertEqual(pago.referencia_transaccion, 'pi_proc')
+        self.assertEqual(pago.inscripcion.estado_pago, 'pagado')
+        self.assertEqual(PaymentReference.resolve('pi_proc'), pago)
+
+    def test_procesamiento_duplicado_no_cambia_el_estado_dos_veces(self, _rate):
+        """Prueba que dos procesamientos concurrentes solo aplican un resultado"""
+        donacion = Donacion.objects.create(monto=50, moneda='USD', metodo_pago='CARD', referencia_transaccion='DON1')
+        first = PaymentProcessor.load('payments.donacion', donacion.pk)
+        second = PaymentProcessor.load('payments.donacion', donacion.pk)
+
+        self.assertEqual(self.processor.process(first)['estado'], 'SUCCESS')
+        result = self.processor.process(second)
+
+        self.assertTrue(result['duplicate'])
+        self.assertEqual(result['estado'], 'SUCCESS')
+        donacion.refresh_from_db()
+        self.assertEqual(donacion.estado, 'SUCCESS')
+        self.stripe.create_payment_intent.assert_called_once()
+        self.assertEqual(
+            self.stripe.create_payment_intent.call_args.kwargs['idempotency_key'],
+            f'payments.donacion:{donacion.pk}:payment_intent'
+        )
+        self.assertEqual(
+            [(t.from_estado, t.to_estado) for t in PaymentTransition.history(donacion)],
+            [('PENDING', 'PROCESSING'), ('PROCESSING', 'SUCCESS')]
+        )
+
+    def test_error_de_stripe_marca_el_pago_fallido(self, _rate):
+        """Prueba que un rechazo de Stripe deja el pago como fallido"""
+        self.stripe.create_payment_intent.side_effect = StripeError('Tarjeta rechazada')
+        pago = Pago.objects.create(monto=100, moneda='USD', metodo_pago='CARD', referencia_transaccion='REF1')
+
+        result = self.processor.process(PaymentProcessor.load('payments.pago', pago.pk))
+
+        self.assertEqual(result['estado'], 'FAILED')
+        self.assertEqual(result['notification']['type'], 'error')
+        pago.refresh_from_db()
+        self.assertEqual(pago.estado, 'FAILED')
+        self.assertEqual(pago.referencia_transaccion, 'REF1')
+
+    def test_error_inesperado_devuelve_el_pago_a_pendiente(self, _rate):
+        """Prueba que un error de red libera el pago para el reintento del trabajo"""
+        self.stripe.create_payment_intent.side_effect = RuntimeError('timeout')
+        pago = Pago.objects.create(monto=100, moneda='USD', metodo_pago='CARD', referencia_transaccion='REF2')
+
+        with self.assertRaises(RuntimeError):
+            self.processor.process(PaymentProcessor.load('payments.pago', pago.pk))
+
+        pago.refresh_from_db()
+        self.assertEqual(pago.estado, 'PENDING')
+
+    @override_settings(STRIPE_SECRET_KEY='sk_test_proc', STRIPE_PUBLIC_KEY='pk_test_proc')
+    def test_stripe_sin_respuesta_no_marca_fallido(self, _rate):
+        """Prueba que un error de conexión del cliente real deja el pago para el reintento"""
+        client = StripeClient(config={'MAX_RETRIES': 0})
+        client._client = MagicMock()
+        client._client.payment_intents.create.side_effect = stripe.error.APIConnectionError('timeout')
+        notifier = MagicMock()
+        processor = PaymentProcessor(stripe_client=client, notifier=notifier)
+        pago = Pago.objects.create(monto=100, moneda='USD', metodo_pago='CARD', referencia_transaccion='REF3')
+
+        with self.assertRaises(StripeConnectionError):
+            processor.process(PaymentProcessor.load('payments.pago', pago.pk))
+
+        pago.refresh_from_db()
+        self.assertEqual(pago.estado, 'PENDING')
+        notifier.send_payment_failed.assert_not_called()
+        self.assertFalse(PaymentTransition.objects.filter(to_estado='FAILED').exists())
+
+    def test_modelo_no_pagable(self, _rate):
+        """Prueba que solo se cargan modelos pagables"""
+        with self.assertRaises(LookupError):
+            PaymentProcessor.load('auth.user', 1)
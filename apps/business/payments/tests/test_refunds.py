@@ -1,60 +1,74 @@
 # tests/test_refunds.py
 
-from unittest.mock import patch, MagicMock
-from django.test import TestCase
-from django.utils import timezone
+from datetime import timedelta
 from decimal import Decimal
-from apps.business.payments.models import Pago, Reembolso
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+import stripe
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.business.education.models import Horario, Inscripcion, Instructor, Programa
+from apps.business.payments.exceptions import ProveedorNoDisponibleError, ReembolsoError
+from apps.business.payments.models import Pago, PagoInscripcion, PaymentTransition, Reembolso
 from apps.business.payments.services import ReembolsoService
-from apps.business.payments.exceptions import ReembolsoError
+from apps.integrations.payments.stripe_client import StripeClient, StripeConnectionError, StripeError
+
 
+@patch('apps.business.payments.services.CurrencyConverter.get_exchange_rate', return_value=Decimal('500'))
 class TestReembolsoService(TestCase):
     """Pruebas para el servicio de reembolsos
-    
+
     Verifica la creación, procesamiento y seguimiento de reembolsos
     para diferentes tipos de pagos y métodos de pago.
     """
 
     def setUp(self):
         """Configuración inicial para las pruebas"""
-        self.service = ReembolsoService()
-        
+        self.stripe = MagicMock()
+        self.stripe.refund_payment.return_value = {'id': 're_test123', 'status': 'succeeded'}
+        self.paypal = MagicMock()
+        self.service = ReembolsoService(stripe_client=self.stripe, paypal_client=self.paypal)
+
         # Crear pago de prueba
         self.pago = Pago.objects.create(
             monto=Decimal('100.00'),
             moneda='USD',
-            estado='completado',
-            metodo_pago='tarjeta',
-            fecha_creacion=timezone.now(),
-            referencia='PAY001'
+            estado='SUCCESS',
+            metodo_pago='CARD',
+            referencia_transaccion='PAY001'
         )
 
-    def test_crear_reembolso_total(self):
+    def test_crear_reembolso_total(self, _rate):
         """Prueba la creación de un reembolso total"""
         reembolso = self.service.crear_reembolso(
             pago=self.pago,
             motivo='Solicitud del cliente',
             monto=None  # Monto None indica reembolso total
         )
-        
+
         self.assertEqual(reembolso.monto, self.pago.monto)
         self.assertEqual(reembolso.estado, 'pendiente')
         self.assertEqual(reembolso.tipo, 'total')
+        self.assertEqual(reembolso.proveedor, 'stripe')
 
-    def test_crear_reembolso_parcial(self):
+    def test_crear_reembolso_parcial(self, _rate):
         """Prueba la creación de un reembolso parcial"""
         monto_parcial = Decimal('50.00')
-        
+
         reembolso = self.service.crear_reembolso(
             pago=self.pago,
             motivo='Compensación parcial',
             monto=monto_parcial
         )
-        
+
         self.assertEqual(reembolso.monto, monto_parcial)
         self.assertEqual(reembolso.tipo, 'parcial')
 
-    def test_validar_monto_reembolso(self):
+    def test_validar_monto_reembolso(self, _rate):
         """Prueba la validación de montos de reembolso"""
         # Intentar reembolsar más que el monto original
         with self.assertRaises(ReembolsoError):
@@ -64,88 +78,86 @@ class TestReembolsoService(TestCase):
                 monto=Decimal('150.00')
             )
 
-    def test_multiple_reembolsos_parciales(self):
+    def test_multiple_reembolsos_parciales(self, _rate):
         """Prueba múltiples reembolsos parciales para un pago"""
         # Primer reembolso parcial
-        reembolso1 = self.service.crear_reembolso(
+        self.service.crear_reembolso(
             pago=self.pago,
             motivo='Primera parte',
             monto=Decimal('30.00')
         )
-        
+
         # Segundo reembolso parcial
-        reembolso2 = self.service.crear_reembolso(
+        self.service.crear_reembolso(
             pago=self.pago,
             motivo='Segunda parte',
             monto=Decimal('40.00')
         )
-        
+
         # Verificar monto disponible para reembolso
         monto_disponible = self.service.calcular_monto_disponible(self.pago)
         self.assertEqual(monto_disponible, Decimal('30.00'))
 
-    @patch('payments.integrations.stripe_client.StripeClient.create_refund')
-    def test_procesar_reembolso_tarjeta(self, mock_stripe_refund):
+    def test_procesar_reembolso_tarjeta(self, _rate):
         """Prueba el procesamiento de reembolso para pago con tarjeta"""
-        # Simular respuesta exitosa de Stripe
-        mock_stripe_refund.return_value = {
-            'success': True,
-            'refund_id': 're_test123'
-        }
-        
         reembolso = self.service.crear_reembolso(
             pago=self.pago,
             motivo='Reembolso a tarjeta'
         )
-        
+
         resultado = self.service.procesar_reembolso(reembolso)
-        
+
         self.assertTrue(resultado['success'])
         self.assertEqual(reembolso.estado, 'completado')
         self.assertEqual(reembolso.referencia_externa, 're_test123')
+        kwargs = self.stripe.refund_payment.call_args.kwargs
+        self.assertEqual(kwargs['idempotency_key'], reembolso.idempotency_key)
+        self.assertEqual(kwargs['metadata'], {'reembolso': str(reembolso.pk)})
+        self.pago.refresh_from_db()
+        self.assertEqual(self.pago.estado, 'REFUNDED')
 
-    @patch('payments.integrations.paypal.PayPalClient.refund_payment')
-    def test_procesar_reembolso_paypal(self, mock_paypal_refund):
+    def test_procesar_reembolso_paypal(self, _rate):
         """Prueba el procesamiento de reembolso para pago con PayPal"""
         # Cambiar método de pago a PayPal
-        self.pago.metodo_pago = 'paypal'
+        self.pago.metodo_pago = 'PAYPAL'
         self.pago.save()
-        
+
         # Simular respuesta exitosa de PayPal
-        mock_paypal_refund.return_value = {
-            'success': True,
-            'refund_id': 'REF123'
+        self.paypal.refund_payment.return_value = {
+            'id': 'REF123',
+            'state': 'completed'
         }
-        
+
         reembolso = self.service.crear_reembolso(
             pago=self.pago,
             motivo='Reembolso a PayPal'
         )
-        
+
         resultado = self.service.procesar_reembolso(reembolso)
-        
+
         self.assertTrue(resultado['success'])
         self.assertEqual(reembolso.estado, 'completado')
+        self.stripe.refund_payment.assert_not_called()
 
-    def test_reembolso_pago_no_completado(self):
+    def test_reembolso_pago_no_completado(self, _rate):
         """Prueba intentar reembolsar un pago no completado"""
-        self.pago.estado = 'pendiente'
+        self.pago.estado = 'PENDING'
         self.pago.save()
-        
+
         with self.assertRaises(ReembolsoError):
             self.service.crear_reembolso(
                 pago=self.pago,
                 motivo='Intento inválido'
             )
 
-    def test_reembolso_ya_reembolsado(self):
+    def test_reembolso_ya_reembolsado(self, _rate):
         """Prueba intentar reembolsar un pago ya reembolsado"""
         # Crear reembolso total
         self.service.crear_reembolso(
             pago=self.pago,
             motivo='Primer reembolso'
         )
-        
+
         # Intentar otro reembolso
         with self.assertRaises(ReembolsoError):
             self.service.crear_reembolso(
@@ -153,47 +165,275 @@ class TestReembolsoService(TestCase):
                 motivo='Segundo intento'
             )
 
-    def test_historial_reembolsos(self):
+    def test_historial_reembolsos(self, _rate):
         """Prueba la obtención del historial de reembolsos"""
         # Crear varios reembolsos
-        reembolso1 = self.service.crear_reembolso(
+        self.service.crear_reembolso(
             pago=self.pago,
             motivo='Primer reembolso parcial',
             monto=Decimal('30.00')
         )
-        
-        reembolso2 = self.service.crear_reembolso(
+
+        self.service.crear_reembolso(
             pago=self.pago,
             motivo='Segundo reembolso parcial',
             monto=Decimal('20.00')
         )
-        
+
         historial = self.service.obtener_historial_reembolsos(self.pago)
-        
+
         self.assertEqual(len(historial), 2)
         self.assertEqual(
             sum(r.monto for r in historial),
             Decimal('50.00')
         )
 
-    def test_notificacion_reembolso(self):
+    def test_notificacion_reembolso(self, _rate):
         """Prueba la generación de notificaciones de reembolso"""
         reembolso = self.service.crear_reembolso(
             pago=self.pago,
             motivo='Reembolso con notificación'
         )
-        
-        with patch('payments.notifications.PaymentNotifier.send_refund_confirmation') as mock_notify:
+
+        with patch('apps.business.payments.notifications.PaymentNotifier.send_refund_confirmation') as mock_notify:
             self.service.procesar_reembolso(reembolso)
             mock_notify.assert_called_once()
 
-    def test_reembolso_diferentes_monedas(self):
+    def test_reembolso_diferentes_monedas(self, _rate):
         """Prueba reembolsos con diferentes monedas"""
         # Cambiar moneda del pago
-        self.pago.moneda = 'EUR'
+        self.pago.moneda = 'CRC'
         self.pago.save()
-        
+
         reembolso = self.service.crear_reembolso(
             pago=self.pago,
-            motivo='Reembolso en EUR'
-        )
\ No newline at end of file
+            motivo='Reembolso en CRC'
+        )
+
+        self.assertEqual(reembolso.moneda, 'CRC')
+
+    def test_reembolsos_parciales_completan_el_pago(self, _rate):
+        """Prueba que el pago queda reembolsado al completar todo su monto"""
+        primero = self.service.crear_reembolso(pago=self.pago, motivo='Parte 1', monto=Decimal('60.00'))
+        self.service.procesar_reembolso(primero)
+        self.pago.refresh_from_db()
+        self.assertEqual(self.pago.estado, 'SUCCESS')
+
+        segundo = self.service.crear_reembolso(pago=self.pago, motivo='Parte 2')
+        self.assertEqual(segundo.monto, Decimal('40.00'))
+        self.service.procesar_reembolso(segundo)
+
+        self.pago.refresh_from_db()
+        self.assertEqual(self.pago.estado, 'REFUNDED')
+        self.assertEqual(
+            [(t.from_estado, t.to_estado, t.source) for t in PaymentTransition.history(self.pago)],
+            [('SUCCESS', 'REFUNDED', 'refund')]
+        )
+
+    def test_llave_de_idempotencia(self, _rate):
+        """Prueba que repetir la solicitud con la misma llave no crea otro reembolso"""
+        primero = self.service.crear_reembolso(pago=self.pago, monto=Decimal('10.00'), idempotency_key='solicitud-1')
+        segundo = self.service.crear_reembolso(pago=self.pago, monto=Decimal('10.00'), idempotency_key='solicitud-1')
+
+        self.assertEqual(primero.pk, segundo.pk)
+        self.assertEqual(self.service.calcular_monto_disponible(self.pago), Decimal('90.00'))
+
+        self.service.procesar_reembolso(primero)
+        resultado = self.service.procesar_reembolso(segundo)
+        self.assertTrue(resultado['duplicate'])
+        self.stripe.refund_payment.assert_called_once()
+
+    def test_rechazo_del_proveedor_libera_el_monto(self, _rate):
+        """Prueba que un reembolso rechazado no cuenta contra el disponible"""
+        self.stripe.refund_payment.side_effect = StripeError('Saldo insuficiente')
+        reembolso = self.service.crear_reembolso(pago=self.pago)
+
+        resultado = self.service.procesar_reembolso(reembolso)
+
+        self.assertFalse(resultado['success'])
+        self.assertEqual(reembolso.estado, 'fallido')
+        self.assertEqual(self.service.calcular_monto_disponible(self.pago), Decimal('100.00'))
+
+    def test_error_de_red_devuelve_a_pendiente(self, _rate):
+        """Prueba que un error inesperado deja el reembolso listo para reintentarse"""
+        self.stripe.refund_payment.side_effect = RuntimeError('timeout')
+        reembolso = self.service.crear_reembolso(pago=self.pago)
+
+        with self.assertRaises(RuntimeError):
+            self.service.procesar_reembolso(reembolso)
+
+        reembolso.refresh_from_db()
+        self.assertEqual(reembolso.estado, 'pendiente')
+
+    @override_settings(STRIPE_SECRET_KEY='sk_test_refunds', STRIPE_PUBLIC_KEY='pk_test_refunds')
+    def test_stripe_sin_respuesta_no_marca_fallido(self, _rate):
+        """Prueba que un error de conexión del cliente real no da el reembolso por fallido"""
+        client = StripeClient(config={'MAX_RETRIES': 0})
+        client._client = MagicMock()
+        client._client.refunds.create.side_effect = stripe.error.APIConnectionError('timeout')
+        service = ReembolsoService(stripe_client=client, paypal_client=MagicMock())
+        reembolso = service.crear_reembolso(pago=self.pago)
+
+        with self.assertRaises(ProveedorNoDisponibleError) as error:
+            service.procesar_reembolso(reembolso)
+        self.assertIsInstance(error.exception.__cause__, StripeConnectionError)
+
+        reembolso.refresh_from_db()
+        self.assertEqual(reembolso.estado, 'pendiente')
+        self.assertEqual(reembolso.error, '')
+        self.assertEqual(service.calcular_monto_disponible(self.pago), Decimal('0'))
+        # El reintento usa la misma llave de idempotencia
+        client._client.refunds.create.side_effect = None
+        client._client.refunds.create.return_value = MagicMock(
+            id='re_retry', status='succeeded', amount=10000, currency='usd', metadata={}
+        )
+        self.assertEqual(service.procesar_reembolso(reembolso)['estado'], 'completado')
+        keys = {call.kwargs['options']['idempotency_key'] for call in client._client.refunds.create.call_args_list}
+        self.assertEqual(keys, {reembolso.idempotency_key})
+
+
+@patch('apps.business.payments.services.CurrencyConverter.get_exchange_rate', return_value=Decimal('500'))
+class TestConciliacionReembolsos(TestCase):
+    """Pruebas de la conciliación de reembolsos con Stripe
+
+    Verifica que los reembolsos en proceso se actualizan con pocas
+    consultas paginadas a Stripe en lugar de una por reembolso.
+    """
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.stripe = MagicMock()
+        self.service = ReembolsoService(stripe_client=self.stripe, paypal_client=MagicMock())
+
+    def _en_proceso(self, numero):
+        pago = Pago.objects.create(
+            monto=Decimal('20.00'), moneda='USD', estado='SUCCESS', metodo_pago='CARD',
+            referencia_transaccion=f'pi_{numero}'
+        )
+        self.stripe.refund_payment.return_value = {'id': f're_{numero}', 'status': 'pending'}
+        reembolso = self.service.crear_reembolso(pago=pago)
+        self.service.procesar_reembolso(reembolso)
+        return reembolso
+
+    def test_concilia_por_paginas(self, _rate):
+        """Prueba que los reembolsos se actualizan recorriendo las páginas de Stripe"""
+        reembolsos = [self._en_proceso(numero) for numero in range(3)]
+        self.assertEqual({r.estado for r in reembolsos}, {'procesando'})
+        self.stripe.list_refunds.side_effect = [
+            {'data': [
+                {'id': 're_otro', 'status': 'succeeded', 'metadata': {}},
+                {'id': 're_2', 'status': 'succeeded', 'metadata': {}},
+            ], 'has_more': True},
+            {'data': [
+                {'id': 're_1', 'status': 'failed', 'metadata': {}},
+                {'id': 're_0', 'status': 'succeeded', 'metadata': {}},
+            ], 'has_more': True},
+        ]
+
+        resultado = self.service.conciliar_reembolsos()
+
+        self.assertEqual(resultado, {'completado': 2, 'fallido': 1})
+        # Se detiene al encontrar todos los reembolsos en proceso
+        self.assertEqual(self.stripe.list_refunds.call_count, 2)
+        self.assertEqual(self.stripe.list_refunds.call_args.kwargs['starting_after'], 're_2')
+        estados = dict(Reembolso.objects.values_list('referencia_externa', 'estado'))
+        self.assertEqual(estados, {'re_0': 'completado', 're_1': 'fallido', 're_2': 'completado'})
+        self.assertEqual(
+            sorted(Pago.objects.values_list('estado', flat=True)), ['REFUNDED', 'REFUNDED', 'SUCCESS']
+        )
+
+    def test_respuesta_perdida_se_identifica_por_metadata(self, _rate):
+        """Prueba que un reembolso sin referencia se identifica por su metadata o se reintenta"""
+        encontrado = self._en_proceso(1)
+        perdido = self._en_proceso(2)
+        Reembolso.objects.filter(pk__in=[encontrado.pk, perdido.pk]).update(
+            referencia_externa=None, fecha_actualizacion=timezone.now() - timedelta(hours=1)
+        )
+        self.stripe.list_refunds.side_effect = [{'data': [
+            {'id': 're_1', 'status': 'succeeded', 'metadata': {'reembolso': str(encontrado.pk)}},
+        ], 'has_more': False}]
+
+        resultado = self.service.conciliar_reembolsos()
+
+        self.assertEqual(resultado, {'completado': 1, 'pendiente': 1})
+        encontrado.refresh_from_db()
+        perdido.refresh_from_db()
+        self.assertEqual((encontrado.estado, encontrado.referencia_externa), ('completado', 're_1'))
+        self.assertEqual(perdido.estado, 'pendiente')
+
+    def test_sin_reembolsos_en_proceso_no_consulta_stripe(self, _rate):
+        """Prueba que la conciliación no llama a Stripe si no hay nada pendiente"""
+        self.assertEqual(self.service.conciliar_reembolsos(), {})
+        self.stripe.list_refunds.assert_not_called()
+
+
+@patch('apps.business.payments.services.CurrencyConverter.get_exchange_rate', return_value=Decimal('500'))
+class TestReembolsoMasivo(TestCase):
+    """Pruebas del reembolso masivo al cancelar un horario"""
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        instructor = Instructor.objects.create(
+            user=User.objects.create_user(username='instructor'),
+            especialidad='Biología Marina',
+            experiencia_years=5,
+            bio='Instructor'
+        )
+        programa = Programa.objects.create(
+            nombre='Tortugas', descripcion='Programa', duracion_horas=2, capacidad_min=1,
+            capacidad_max=10, edad_minima=8, edad_maxima=14, requisitos='Ninguno', precio=Decimal('25000')
+        )
+        self.horario = Horario.objects.create(
+            programa=programa, instructor=instructor, cupos_disponibles=10,
+            fecha_inicio=timezone.now() + timedelta(days=5),
+            fecha_fin=timezone.now() + timedelta(days=5, hours=2),
+        )
+        self.pagos = []
+        for numero, estado in enumerate(['SUCCESS', 'SUCCESS', 'SUCCESS', 'PENDING']):
+            inscripcion = Inscripcion.objects.create(
+                usuario=User.objects.create_user(username=f'participante{numero}'), horario=self.horario,
+                nombre_participante=f'Participante {numero}', edad_participante=10
+            )
+            self.pagos.append(PagoInscripcion.objects.create(
+                inscripcion=inscripcion, monto=Decimal('25000'), moneda='CRC', estado=estado,
+                metodo_pago='CASH' if numero == 2 else 'CARD', referencia_transaccion=f'pi_ins{numero}'
+            ))
+
+    @patch('apps.business.payments.services.get_stripe_client')
+    def test_cancelar_horario_reembolsa_las_inscripciones(self, get_client, _rate):
+        """Prueba que cancelar un horario reembolsa sus pagos una sola vez"""
+        stripe = get_client.return_value
+        stripe.refund_payment.side_effect = [
+            {'id': 're_ins0', 'status': 'succeeded'},
+            RuntimeError('timeout'),
+            {'id': 're_ins1', 'status': 'succeeded'},
+        ]
+
+        call_command('cancel_schedule', self.horario.pk, '--concurrency', '1', stdout=StringIO(), stderr=StringIO())
+
+        self.horario.refresh_from_db()
+        self.assertEqual(self.horario.estado, 'cancelado')
+        self.assertEqual(
+            list(Reembolso.objects.order_by('object_id').values_list('object_id', 'estado', 'proveedor')),
+            [
+                (self.pagos[0].pk, 'completado', 'stripe'),
+                (self.pagos[1].pk, 'pendiente', 'stripe'),
+                (self.pagos[2].pk, 'completado', 'manual'),
+            ]
+        )
+
+        # Repetir la cancelación solo procesa el reembolso que quedó pendiente
+        call_command('cancel_schedule', self.horario.pk, '--concurrency', '1', stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(Reembolso.objects.count(), 3)
+        self.assertEqual(stripe.refund_payment.call_count, 3)
+        self.assertEqual(
+            [call.kwargs['idempotency_key'] for call in stripe.refund_payment.call_args_list[1:]],
+            [f'payments.pagoinscripcion:{self.pagos[1].pk}:refund:horario:{self.horario.pk}'] * 2
+        )
+        estados = dict(PagoInscripcion.objects.values_list('pk', 'estado'))
+        self.assertEqual([estados[pago.pk] for pago in self.pagos], ['REFUNDED', 'REFUNDED', 'REFUNDED', 'PENDING'])
+        self.assertEqual(
+            sorted(Inscripcion.objects.values_list('estado_pago', flat=True)),
+            ['cancelado', 'cancelado', 'cancelado', 'pendiente']
+        )
@@ -1,15 +1,23 @@
 # tests/test_reports.py
 
-from datetime import datetime, timedelta
+import statistics
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
 from django.test import TestCase
 from django.utils import timezone
-from apps.business.payments.models import Pago, PagoInscripcion, Donacion
-from apps.business.payments.reports import VentasReporter
 
+from apps.business.education.models import Horario, Inscripcion, Instructor, Programa
+from apps.business.payments.models import Donacion, Pago, PagoInscripcion
+from apps.business.payments.reports import SalesRollupBuilder, VentasReporter
+
+
+@patch('apps.business.payments.services.CurrencyConverter.get_exchange_rate', return_value=Decimal('500'))
 class TestVentasReporter(TestCase):
     """Pruebas para el generador de reportes de ventas
-    
+
     Verifica la generación de reportes de ventas, incluyendo
     resúmenes diarios, mensuales y análisis de tendencias.
     """
@@ -17,157 +25,204 @@ class TestVentasReporter(TestCase):
     def setUp(self):
         """Configuración inicial para las pruebas"""
         self.reporter = VentasReporter()
-        
-        # Crear pagos de prueba
-        self.fecha_base = timezone.now()
-        
-        # Pagos generales
-        Pago.objects.create(
-            monto=Decimal('100.00'),
-            moneda='USD',
-            estado='completado',
-            metodo_pago='tarjeta',
-            fecha_creacion=self.fecha_base,
-            referencia='PAY001'
+        self.fecha_base = date(2025, 3, 15)
+
+        with patch('apps.business.payments.services.CurrencyConverter.get_exchange_rate', return_value=Decimal('500')):
+            # Pagos generales
+            self._pago('PAY001', Decimal('100.00'), 'CARD', self.fecha_base)
+            self._pago('PAY002', Decimal('150.00'), 'PAYPAL', self.fecha_base - timedelta(days=1))
+
+            # Pago de inscripción
+            self._fechar(PagoInscripcion.objects.create(
+                inscripcion=self._inscripcion(),
+                monto=Decimal('200.00'),
+                moneda='USD',
+                estado='SUCCESS',
+                metodo_pago='CARD',
+                referencia_transaccion='INS001'
+            ), self.fecha_base)
+
+            # Donaciones
+            self._fechar(Donacion.objects.create(
+                monto=Decimal('50.00'),
+                moneda='USD',
+                estado='SUCCESS',
+                metodo_pago='TRANSFER'
+            ), self.fecha_base)
+
+        self._rebuild()
+
+    def _fechar(self, pago, dia):
+        """Mueve un pago o donación al mediodía (hora local) de ``dia``"""
+        momento = timezone.make_aware(datetime.combine(dia, time(12)))
+        if isinstance(pago, Donacion):
+            Donacion.objects.filter(pk=pago.pk).update(fecha_creacion=momento)
+        else:
+            Pago.objects.filter(pk=pago.pk).update(fecha_pago=momento)
+        return pago
+
+    def _pago(self, referencia, monto, metodo, dia, moneda='USD'):
+        return self._fechar(Pago.objects.create(
+            monto=monto,
+            moneda=moneda,
+            estado='SUCCESS',
+            metodo_pago=metodo,
+            referencia_transaccion=referencia
+        ), dia)
+
+    def _inscripcion(self):
+        instructor = Instructor.objects.create(
+            user=User.objects.create_user(username='instructor'),
+            especialidad='Biología Marina',
+            experiencia_years=5,
+            bio='Instructor'
         )
-        
-        Pago.objects.create(
-            monto=Decimal('150.00'),
-            moneda='USD',
-            estado='completado',
-            metodo_pago='paypal',
-            fecha_creacion=self.fecha_base - timedelta(days=1),
-            referencia='PAY002'
+        programa = Programa.objects.create(
+            nombre='Tortugas', descripcion='Programa', duracion_horas=2, capacidad_min=1,
+            capacidad_max=10, edad_minima=8, edad_maxima=14, requisitos='Ninguno', precio=Decimal('200')
         )
-        
-        # Pagos de inscripción
-        PagoInscripcion.objects.create(
-            monto=Decimal('200.00'),
-            moneda='USD',
-            estado='completado',
-            metodo_pago='tarjeta',
-            fecha_creacion=self.fecha_base,
-            referencia='INS001',
-            estudiante_id=1
+        horario = Horario.objects.create(
+            programa=programa, instructor=instructor, cupos_disponibles=10,
+            fecha_inicio=timezone.now() + timedelta(days=5),
+            fecha_fin=timezone.now() + timedelta(days=5, hours=2),
         )
-        
-        # Donaciones
-        Donacion.objects.create(
-            monto=Decimal('50.00'),
-            moneda='USD',
-            estado='completado',
-            metodo_pago='transferencia',
-            fecha_creacion=self.fecha_base,
-            referencia='DON001',
-            donante_email='donante@test.com'
+        return Inscripcion.objects.create(
+            usuario=User.objects.create_user(username='participante'), horario=horario,
+            nombre_participante='Ana', edad_participante=10
         )
 
-    def test_reporte_diario(self):
+    def _rebuild(self):
+        SalesRollupBuilder.rebuild(self.fecha_base - timedelta(days=60), self.fecha_base)
+
+    def test_reporte_diario(self, _rate):
         """Prueba la generación del reporte diario de ventas"""
-        reporte = self.reporter.generar_reporte_diario(self.fecha_base.date())
-        
+        reporte = self.reporter.generar_reporte_diario(self.fecha_base)
+
         self.assertEqual(reporte['total_ventas'], Decimal('350.00'))
         self.assertEqual(reporte['total_transacciones'], 3)
         self.assertEqual(reporte['promedio_venta'], Decimal('116.67'))
-        
+
         # Verificar desglose por tipo
         self.assertEqual(reporte['desglose']['pagos'], Decimal('100.00'))
         self.assertEqual(reporte['desglose']['inscripciones'], Decimal('200.00'))
         self.assertEqual(reporte['desglose']['donaciones'], Decimal('50.00'))
 
-    def test_reporte_mensual(self):
+    def test_reporte_mensual(self, _rate):
         """Prueba la generación del reporte mensual"""
         reporte = self.reporter.generar_reporte_mensual(
             self.fecha_base.year,
             self.fecha_base.month
         )
-        
+
         self.assertEqual(reporte['total_ventas'], Decimal('500.00'))
         self.assertEqual(reporte['total_transacciones'], 4)
-        
+
         # Verificar tendencias diarias
         self.assertIn('tendencia_diaria', reporte)
         self.assertEqual(len(reporte['tendencia_diaria']), 2)
+        self.assertEqual(reporte['tendencia_diaria'][1]['total'], Decimal('350.00'))
 
-    def test_reporte_por_metodo_pago(self):
+    def test_reporte_por_metodo_pago(self, _rate):
         """Prueba el análisis por método de pago"""
         reporte = self.reporter.analizar_metodos_pago(
-            self.fecha_base.date(),
-            self.fecha_base.date()
+            self.fecha_base - timedelta(days=1),
+            self.fecha_base
         )
-        
-        self.assertEqual(reporte['tarjeta']['total'], Decimal('300.00'))
-        self.assertEqual(reporte['paypal']['total'], Decimal('150.00'))
-        self.assertEqual(reporte['transferencia']['total'], Decimal('50.00'))
 
-    def test_reporte_conversion_moneda(self):
+        self.assertEqual(reporte['CARD']['total'], Decimal('300.00'))
+        self.assertEqual(reporte['CARD']['cantidad'], 2)
+        self.assertEqual(reporte['CARD']['porcentaje'], Decimal('60.00'))
+        self.assertEqual(reporte['PAYPAL']['total'], Decimal('150.00'))
+        self.assertEqual(reporte['TRANSFER']['total'], Decimal('50.00'))
+
+    def test_reporte_conversion_moneda(self, _rate):
         """Prueba la conversión de monedas en reportes"""
         # Crear pago en otra moneda
-        Pago.objects.create(
-            monto=Decimal('50000.00'),
-            moneda='CRC',
-            estado='completado',
-            metodo_pago='tarjeta',
-            fecha_creacion=self.fecha_base,
-            referencia='PAY003'
-        )
-        
+        self._pago('PAY003', Decimal('50000.00'), 'CARD', self.fecha_base, moneda='CRC')
+        SalesRollupBuilder.refresh_day(self.fecha_base)
+
         reporte = self.reporter.generar_reporte_diario(
-            self.fecha_base.date(),
+            self.fecha_base,
             moneda_base='USD'
         )
-        
-        # Asumiendo tasa de conversión aproximada
-        self.assertGreater(reporte['total_ventas'], Decimal('350.00'))
 
-    def test_reporte_tendencias(self):
+        # Tasa de conversión de 500 colones por dólar
+        self.assertEqual(reporte['total_ventas'], Decimal('450.00'))
+        self.assertEqual(reporte['por_moneda']['CRC']['total'], Decimal('50000.00'))
+
+        reporte_crc = self.reporter.generar_reporte_diario(self.fecha_base, moneda_base='CRC')
+        self.assertEqual(reporte_crc['total_ventas'], Decimal('225000.00'))
+
+        with self.assertRaises(ValueError):
+            self.reporter.generar_reporte_diario(self.fecha_base, moneda_base='EUR')
+
+    def test_reporte_tendencias(self, _rate):
         """Prueba el análisis de tendencias"""
+        self._pago('PAY004', Decimal('250.00'), 'PAYPAL', date(2025, 2, 20))
+        self._rebuild()
+
         tendencias = self.reporter.analizar_tendencias(
             fecha_inicio=self.fecha_base - timedelta(days=30),
             fecha_fin=self.fecha_base
         )
-        
-        self.assertIn('crecimiento_mensual', tendencias)
-        self.assertIn('dia_mas_ventas', tendencias)
-        self.assertIn('metodo_pago_preferido', tendencias)
 
-    def test_reporte_estadisticas(self):
+        self.assertEqual(
+            [(mes['mes'], mes['total']) for mes in tendencias['ventas_mensuales']],
+            [('2025-02', Decimal('250.00')), ('2025-03', Decimal('500.00'))]
+        )
+        self.assertEqual(tendencias['crecimiento_mensual'], [
+            {'mes': '2025-03', 'variacion_porcentual': Decimal('100.00')}
+        ])
+        self.assertEqual(tendencias['dia_mas_ventas'], {'fecha': self.fecha_base, 'total': Decimal('350.00')})
+        self.assertEqual(tendencias['metodo_pago_preferido'], 'CARD')
+
+    def test_reporte_estadisticas(self, _rate):
         """Prueba el cálculo de estadísticas avanzadas"""
         stats = self.reporter.calcular_estadisticas(
-            fecha_inicio=self.fecha_base - timedelta(days=7),
+            fecha_inicio=self.fecha_base - timedelta(days=6),
             fecha_fin=self.fecha_base
         )
-        
-        self.assertIn('promedio_diario', stats)
-        self.assertIn('desviacion_estandar', stats)
-        self.assertIn('mediana', stats)
 
-    def test_reporte_vacio(self):
+        # Los días sin ventas cuentan como cero
+        serie = [Decimal('0')] * 5 + [Decimal('150'), Decimal('350')]
+        self.assertEqual(stats['dias'], 7)
+        self.assertEqual(stats['promedio_diario'], Decimal('71.43'))
+        self.assertEqual(stats['desviacion_estandar'], statistics.pstdev(serie).quantize(Decimal('0.01')))
+        self.assertEqual(stats['mediana'], Decimal('0.00'))
+        self.assertEqual((stats['maximo'], stats['minimo']), (Decimal('350.00'), Decimal('0.00')))
+
+    def test_reporte_vacio(self, _rate):
         """Prueba la generación de reportes sin datos"""
         fecha_futura = self.fecha_base + timedelta(days=30)
-        reporte = self.reporter.generar_reporte_diario(fecha_futura.date())
-        
+        reporte = self.reporter.generar_reporte_diario(fecha_futura)
+
         self.assertEqual(reporte['total_ventas'], Decimal('0'))
         self.assertEqual(reporte['total_transacciones'], 0)
+        self.assertEqual(reporte['promedio_venta'], Decimal('0'))
 
-    def test_reporte_comparativo(self):
+    def test_reporte_comparativo(self, _rate):
         """Prueba la generación de reportes comparativos"""
+        self._pago('PAY005', Decimal('250.00'), 'CARD', self.fecha_base - timedelta(days=40))
+        self._rebuild()
+
         comparacion = self.reporter.generar_comparativo(
-            fecha_inicio=self.fecha_base - timedelta(days=30),
+            fecha_inicio=self.fecha_base - timedelta(days=29),
             fecha_fin=self.fecha_base,
             periodo_anterior=30
         )
-        
-        self.assertIn('variacion_porcentual', comparacion)
-        self.assertIn('tendencia', comparacion)
 
-    def test_filtros_reporte(self):
+        self.assertEqual(comparacion['actual']['total_ventas'], Decimal('500.00'))
+        self.assertEqual(comparacion['anterior']['total_ventas'], Decimal('250.00'))
+        self.assertEqual(comparacion['variacion_porcentual'], Decimal('100.00'))
+        self.assertEqual(comparacion['tendencia'], 'creciente')
+
+    def test_filtros_reporte(self, _rate):
         """Prueba los filtros en la generación de reportes"""
         reporte = self.reporter.generar_reporte_diario(
-            self.fecha_base.date(),
-            metodo_pago='tarjeta',
+            self.fecha_base,
+            metodo_pago='CARD',
             tipo_transaccion='inscripcion'
         )
-        
+
         self.assertEqual(reporte['total_ventas'], Decimal('200.00'))
-        self.assertEqual(reporte['total_transacciones'], 1)
\ No newline at end of file
+        self.assertEqual(reporte['total_transacciones'], 1)
@@ -0,0 +1,135 @@
+# tests/test_sales_rollups.py
+
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.business.payments.models import DailySalesRollup, Donacion, Pago
+from apps.business.payments.reports import SalesRollupBuilder, VentasReporter
+from apps.business.payments.state import PaymentStateMachine
+from apps.business.payments.tasks import REFRESH_SALES_ROLLUP
+from apps.support.jobs.models import Job
+
+
+@patch('apps.business.payments.services.CurrencyConverter.get_exchange_rate', return_value=Decimal('500'))
+class TestVentasReporter(TestCase):
+    """Pruebas de los reportes de ventas sobre resúmenes diarios
+
+    Verifica que los resúmenes se calculan con agregaciones en la base de
+    datos, que los reportes solo leen los resúmenes y que los cambios de
+    estado encolan el recálculo del día.
+    """
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.hoy = timezone.localdate()
+        self.ayer = self.hoy - timedelta(days=1)
+        self.reporter = VentasReporter()
+
+    def _pago(self, referencia, monto, moneda='USD', metodo='CARD', estado='SUCCESS', dias=0):
+        pago = Pago.objects.create(
+            monto=monto, moneda=moneda, metodo_pago=metodo, referencia_transaccion=referencia, estado=estado
+        )
+        if dias:
+            Pago.objects.filter(pk=pago.pk).update(fecha_pago=pago.fecha_pago - timedelta(days=dias))
+        return pago
+
+    def _datos(self):
+        self._pago('P1', 100)
+        self._pago('P2', 150, metodo='PAYPAL', dias=1)
+        self._pago('P3', 25000, moneda='CRC', metodo='CASH')
+        self._pago('P4', 80, estado='FAILED')
+        Donacion.objects.create(monto=50, moneda='USD', metodo_pago='TRANSFER', estado='SUCCESS')
+        SalesRollupBuilder.rebuild(self.ayer, self.hoy)
+
+    def test_resumenes_agregados_por_dimension(self, _rate):
+        """Prueba que cada día se resume por tipo, moneda, método y estado"""
+        self._datos()
+
+        self.assertEqual(DailySalesRollup.objects.count(), 5)
+        tarjeta = DailySalesRollup.objects.get(fecha=self.hoy, metodo_pago='CARD', estado='SUCCESS')
+        self.assertEqual((tarjeta.tipo, tarjeta.cantidad, tarjeta.total_crc), ('pago', 1, Decimal('50000.00')))
+
+    def test_reporte_diario_desde_resumenes(self, _rate):
+        """Prueba el reporte diario con desglose y sin leer los pagos"""
+        self._datos()
+
+        # Totales y un desglose por tipo, moneda, método y estado, todo sobre los resúmenes
+        with self.assertNumQueries(5):
+            reporte = self.reporter.generar_reporte_diario(self.hoy)
+
+        self.assertEqual(reporte['total_ventas'], Decimal('200.00'))
+        self.assertEqual(reporte['total_transacciones'], 3)
+        self.assertEqual(reporte['promedio_venta'], Decimal('66.67'))
+        self.assertEqual(reporte['desglose'], {
+            'pagos': Decimal('150.00'), 'inscripciones': Decimal('0.00'), 'donaciones': Decimal('50.00')
+        })
+        self.assertEqual(reporte['por_moneda']['CRC'], {'total': Decimal('25000.00'), 'cantidad': 1})
+        self.assertEqual(reporte['por_estado']['FAILED']['cantidad'], 1)
+
+        filtrado = self.reporter.generar_reporte_diario(self.hoy, moneda_base='CRC', tipo_transaccion='donacion')
+        self.assertEqual(filtrado['total_ventas'], Decimal('25000.00'))
+
+    def test_tendencias_y_comparativo(self, _rate):
+        """Prueba las tendencias, estadísticas y el comparativo entre periodos"""
+        self._datos()
+
+        metodos = self.reporter.analizar_metodos_pago(self.ayer, self.hoy)
+        self.assertEqual(metodos['PAYPAL']['total'], Decimal('150.00'))
+        self.assertEqual(metodos['PAYPAL']['porcentaje'], Decimal('42.86'))
+
+        tendencias = self.reporter.analizar_tendencias(self.ayer, self.hoy)
+        self.assertEqual(tendencias['dia_mas_ventas'], {'fecha': self.hoy, 'total': Decimal('200.00')})
+        self.assertEqual(tendencias['metodo_pago_preferido'], 'CARD')
+
+        stats = self.reporter.calcular_estadisticas(self.ayer, self.hoy)
+        self.assertEqual(stats['promedio_diario'], Decimal('175.00'))
+        self.assertEqual(stats['mediana'], Decimal('175.00'))
+        self.assertEqual(stats['desviacion_estandar'], Decimal('25.00'))
+
+        comparativo = self.reporter.generar_comparativo(self.hoy, self.hoy)
+        self.assertEqual(comparativo['variacion_porcentual'], Decimal('33.33'))
+        self.assertEqual(comparativo['tendencia'], 'creciente')
+
+    def test_reporte_vacio(self, _rate):
+        """Prueba los reportes sin ventas"""
+        reporte = self.reporter.generar_reporte_diario(self.hoy)
+
+        self.assertEqual(reporte['total_ventas'], Decimal('0.00'))
+        self.assertEqual(reporte['total_transacciones'], 0)
+        self.assertIsNone(self.reporter.analizar_tendencias(self.hoy, self.hoy)['dia_mas_ventas'])
+        self.assertIsNone(self.reporter.generar_comparativo(self.hoy, self.hoy)['variacion_porcentual'])
+
+    @override_settings(JOB_QUEUE={'ASYNC': False}, SALES_REPORTS={'ROLLUP_DELAY': 0})
+    def test_cambio_de_estado_recalcula_el_dia(self, _rate):
+        """Prueba que un cambio de estado actualiza el resumen de su día"""
+        with self.captureOnCommitCallbacks(execute=True):
+            pago = self._pago('P1', 100, estado='PENDING')
+        with self.captureOnCommitCallbacks(execute=True):
+            PaymentStateMachine.transition(pago, 'SUCCESS', source='prueba')
+
+        self.assertEqual(self.reporter.generar_reporte_diario(self.hoy)['total_ventas'], Decimal('100.00'))
+        self.assertFalse(DailySalesRollup.objects.filter(estado='PENDING').exists())
+
+    def test_recalculos_del_mismo_dia_se_agrupan(self, _rate):
+        """Prueba que varios cambios de un día encolan un solo recálculo"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._pago('P1', 100)
+            self._pago('P2', 200)
+
+        job = Job.objects.get(task=REFRESH_SALES_ROLLUP)
+        self.assertEqual(job.reference, f'sales-rollup:{self.hoy.isoformat()}')
+        self.assertGreater(job.run_at, timezone.now())
+
+    def test_comando_de_recalculo(self, _rate):
+        """Prueba el recálculo nocturno por rango de fechas"""
+        self._pago('P1', 100, dias=40)
+
+        call_command('rebuild_sales_rollups', '--days', '45', stdout=StringIO())
+
+        self.assertEqual(DailySalesRollup.objects.get().fecha, self.hoy - timedelta(days=40))
@@ -1,9 +1,14 @@
 # tests/test_services.py
 
+import time
+from datetime import timedelta
 from unittest.mock import patch, MagicMock
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from decimal import Decimal
-from apps.business.payments.services import CurrencyConverter
+from apps.business.payments.models import ExchangeRate
+from apps.business.payments.services import CurrencyConverter, ExchangeRateService
 
 class TestCurrencyConverter(TestCase):
     """Pruebas para el servicio de conversión de monedas
@@ -14,6 +19,7 @@ class TestCurrencyConverter(TestCase):
     
     def setUp(self):
         """Configuración inicial para las pruebas"""
+        cache.clear()
         self.converter = CurrencyConverter()
         self.mock_exchange_rate = 550.0  # Tipo de cambio de prueba
 
@@ -116,4 +122,75 @@ class TestCurrencyConverter(TestCase):
                 self.converter.usd_to_crc(Decimal('-100.00'))
             
             with self.assertRaises(ValueError):
-                self.converter.crc_to_usd(Decimal('-55000.00'))
\ No newline at end of file
+                self.converter.crc_to_usd(Decimal('-55000.00'))
+
+
+@override_settings(EXCHANGE_RATES={'ASYNC': False, 'FRESH_FOR': 60, 'STALE_FOR': 3600})
+@patch('apps.business.payments.services.requests.get')
+class TestExchangeRateService(TestCase):
+    """Pruebas del tipo de cambio con actualización en segundo plano
+
+    Verifica que un tipo vencido se sigue sirviendo mientras se actualiza,
+    que solo un proceso consulta al proveedor y que el historial permite
+    convertir con el tipo de una fecha.
+    """
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        cache.clear()
+
+    def _respuesta(self, mock_get, rate):
+        mock_get.return_value = MagicMock(**{'json.return_value': {'rates': {'CRC': rate}}})
+
+    def test_tipo_vencido_se_sirve_y_se_actualiza(self, mock_get):
+        """Prueba que un tipo vencido se devuelve y dispara una sola actualización"""
+        self._respuesta(mock_get, 510)
+        cache.set(ExchangeRateService.CACHE_KEY, {'rate': '500', 'fetched_at': time.time() - 120}, 3600)
+
+        self.assertEqual(ExchangeRateService.get_rate(), Decimal('500'))
+
+        mock_get.assert_called_once()
+        self.assertEqual(ExchangeRateService.get_rate(), Decimal('510'))
+        self.assertEqual(ExchangeRate.objects.get().rate, Decimal('510'))
+
+    def test_una_sola_actualizacion_a_la_vez(self, mock_get):
+        """Prueba que con el candado tomado no se consulta al proveedor"""
+        cache.set(ExchangeRateService.CACHE_KEY, {'rate': '500', 'fetched_at': time.time() - 120}, 3600)
+        cache.add(ExchangeRateService.LOCK_KEY, 1, 60)
+
+        self.assertEqual(ExchangeRateService.get_rate(), Decimal('500'))
+
+        mock_get.assert_not_called()
+
+    def test_arranque_desde_el_historial(self, mock_get):
+        """Prueba que sin caché se usa el último tipo guardado sin consultar al proveedor"""
+        ExchangeRate.objects.create(rate=Decimal('505.5'))
+
+        self.assertEqual(ExchangeRateService.get_rate(), Decimal('505.5'))
+
+        mock_get.assert_not_called()
+
+    def test_error_sin_historial_no_repite_la_consulta(self, mock_get):
+        """Prueba que tras un error se usa el tipo por defecto hasta el siguiente intento"""
+        mock_get.side_effect = Exception('API Error')
+
+        self.assertEqual(ExchangeRateService.get_rate(), CurrencyConverter.DEFAULT_RATE)
+        self.assertEqual(ExchangeRateService.get_rate(), CurrencyConverter.DEFAULT_RATE)
+
+        mock_get.assert_called_once()
+
+    def test_tipo_historico_y_conversion_en_lote(self, mock_get):
+        """Prueba la conversión de varios montos con el tipo de una fecha"""
+        ExchangeRate.objects.create(rate=Decimal('500'), fetched_at=timezone.now() - timedelta(days=10))
+        ExchangeRate.objects.create(rate=Decimal('520'), fetched_at=timezone.now() - timedelta(days=1))
+
+        rate = ExchangeRateService.rate_at(timezone.now() - timedelta(days=5))
+        with patch.object(CurrencyConverter, 'get_exchange_rate', return_value=Decimal('520')) as mock_rate:
+            historico = CurrencyConverter.convert_many(['10', '2.5', 0], 'USD', 'CRC', rate=rate)
+            mock_rate.assert_not_called()
+            actual = CurrencyConverter.convert_many(['1040', '260'], 'CRC', 'USD')
+            mock_rate.assert_called_once()
+
+        self.assertEqual(rate, Decimal('500'))
+        self.assertEqual(historico, [Decimal('5000.00'), Decimal('1250.00'), Decimal('0.00')])
+        self.assertEqual(actual, [Decimal('2.00'), Decimal('0.50')])
@@ -0,0 +1,70 @@
+# tests/test_state.py
+
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from apps.business.payments.exceptions import TransicionInvalidaError
+from apps.business.payments.models import Pago, PaymentTransition
+from apps.business.payments.state import PaymentStateMachine
+
+
+@patch('apps.business.payments.services.CurrencyConverter.get_exchange_rate', return_value=Decimal('500'))
+class TestPaymentStateMachine(TestCase):
+    """Pruebas de la máquina de estados de los pagos
+
+    Verifica las transiciones permitidas, el UPDATE condicional sobre el
+    estado leído y el historial de solo inserción.
+    """
+
+    def _pago(self, estado='PENDING'):
+        return Pago.objects.create(
+            monto=100, moneda='USD', metodo_pago='CARD', referencia_transaccion='REF1', estado=estado
+        )
+
+    def test_transicion_registra_el_historial(self, _rate):
+        """Prueba que una transición cambia el estado y agrega una fila al historial"""
+        pago = self._pago()
+
+        self.assertTrue(PaymentStateMachine.transition(pago, 'PROCESSING', source='prueba', detail={'a': 1}))
+
+        pago.refresh_from_db()
+        self.assertEqual(pago.estado, 'PROCESSING')
+        transition = PaymentTransition.history(pago).get()
+        self.assertEqual((transition.from_estado, transition.to_estado), ('PENDING', 'PROCESSING'))
+        self.assertEqual(transition.source, 'prueba')
+        self.assertEqual(transition.detail, {'a': 1})
+
+    def test_lectura_desactualizada_no_aplica_el_cambio(self, _rate):
+        """Prueba que si otro proceso cambió el estado la transición no se aplica"""
+        pago = self._pago()
+        stale = Pago.objects.get(pk=pago.pk)
+        PaymentStateMachine.transition(pago, 'PROCESSING')
+
+        self.assertFalse(PaymentStateMachine.transition(stale, 'PROCESSING'))
+
+        self.assertEqual(PaymentTransition.history(pago).count(), 1)
+
+    def test_transiciones_no_permitidas(self, _rate):
+        """Prueba que un pago reembolsado o pendiente no se reembolsa"""
+        for estado in ('REFUNDED', 'PENDING'):
+            with self.assertRaises(TransicionInvalidaError):
+                PaymentStateMachine.transition(self._pago(estado), 'REFUNDED')
+            Pago.objects.all().delete()
+        self.assertFalse(PaymentTransition.objects.exists())
+
+    def test_historial_de_solo_insercion(self, _rate):
+        """Prueba que el historial no se puede modificar ni borrar"""
+        pago = self._pago()
+        PaymentStateMachine.transition(pago, 'SUCCESS')
+        transition = PaymentTransition.history(pago).get()
+
+        with self.assertRaises(TypeError):
+            transition.save()
+        with self.assertRaises(TypeError):
+            transition.delete()
+        with self.assertRaises(TypeError):
+            PaymentTransition.objects.update(source='x')
+        with self.assertRaises(TypeError):
+            PaymentTransition.objects.all().delete()
@@ -0,0 +1,128 @@
+# tests/test_stripe_pool.py
+
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import requests
+import stripe
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.integrations.payments.stripe_client import (
+    LatencyHistogram, StripeClient, StripeConnectionError, StripeError, get_latency_histograms,
+    get_stripe_client, reset_latency_histograms,
+)
+
+
+@override_settings(STRIPE_SECRET_KEY='sk_test_pool', STRIPE_PUBLIC_KEY='pk_test_pool')
+@patch('apps.integrations.payments.stripe_client.time.sleep')
+class TestStripeClientPool(TestCase):
+    """Pruebas del cliente de Stripe compartido
+
+    Verifica los reintentos ante errores de red, las llaves de idempotencia
+    y el registro de latencias por operación.
+    """
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        reset_latency_histograms()
+        self.client = StripeClient(config={
+            'MAX_RETRIES': 2, 'BACKOFF_BASE': 0.1, 'BACKOFF_MAX': 1.0,
+            'CONNECT_TIMEOUT': 1.0, 'READ_TIMEOUT': 1.0, 'POOL_SIZE': 2,
+        })
+        self.sdk = MagicMock()
+        self.client._client = self.sdk
+
+    def test_reintenta_errores_de_red_con_la_misma_llave(self, sleep):
+        """Prueba que un error de red se reintenta sin crear otra intención"""
+        intent = MagicMock(id='pi_1', client_secret='secret', status='requires_payment_method')
+        self.sdk.payment_intents.create.side_effect = [stripe.error.APIConnectionError('reset'), intent]
+
+        result = self.client.create_payment_intent(
+            Decimal('10.00'), 'USD', 'Prueba', idempotency_key='pago:1'
+        )
+
+        self.assertEqual(result['id'], 'pi_1')
+        calls = self.sdk.payment_intents.create.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertEqual({call.kwargs['options']['idempotency_key'] for call in calls}, {'pago:1'})
+        self.assertEqual(calls[0].kwargs['params']['amount'], 1000)
+        sleep.assert_called_once()
+        self.assertLessEqual(sleep.call_args.args[0], 0.1)
+
+        stats = get_latency_histograms()['payment_intents.create']
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual(stats['errors'], 1)
+
+    def test_reintentos_acotados(self, sleep):
+        """Prueba que tras agotar los reintentos se lanza StripeError"""
+        self.sdk.refunds.create.side_effect = stripe.error.APIConnectionError('timeout')
+
+        with self.assertRaises(StripeError):
+            self.client.refund_payment('pi_1', idempotency_key='reembolso:1')
+
+        self.assertEqual(self.sdk.refunds.create.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_errores_de_stripe_no_se_reintentan(self, sleep):
+        """Prueba que un rechazo de tarjeta no se reintenta"""
+        self.sdk.payment_intents.create.side_effect = stripe.error.CardError('rechazada', None, 'card_declined')
+
+        with self.assertRaises(StripeError):
+            self.client.create_payment_intent(Decimal('10.00'), 'USD', 'Prueba')
+
+        self.assertEqual(self.sdk.payment_intents.create.call_count, 1)
+        sleep.assert_not_called()
+        key = self.sdk.payment_intents.create.call_args.kwargs['options']['idempotency_key']
+        self.assertTrue(key)
+
+    def test_solo_errores_de_transporte_son_reintentables(self, sleep):
+        """Prueba que un error de programación no se confunde con Stripe sin respuesta"""
+        self.sdk.refunds.create.side_effect = requests.Timeout('read timeout')
+        with self.assertRaises(StripeConnectionError):
+            self.client.refund_payment('pi_1', idempotency_key='reembolso:1')
+        self.assertEqual(self.sdk.refunds.create.call_count, 3)
+
+        with self.assertRaises(StripeError) as error:
+            self.client.create_payment_intent(None, 'USD', 'Prueba')
+        self.assertNotIsInstance(error.exception, StripeConnectionError)
+        self.sdk.payment_intents.create.assert_not_called()
+
+    def test_cliente_compartido_sin_estado_global(self, sleep):
+        """Prueba que el cliente del proceso se reutiliza y no modifica stripe.api_key"""
+        stripe.api_key = None
+        first = get_stripe_client()
+
+        self.assertIs(first, get_stripe_client())
+        self.assertIs(first.client, first.client)
+        self.assertIsNone(stripe.api_key)
+        self.assertEqual(first.api_key, 'sk_test_pool')
+
+    def test_histograma_estima_percentiles(self, sleep):
+        """Prueba los percentiles por intervalo del histograma"""
+        histogram = LatencyHistogram(buckets=(10, 100, 1000))
+        for _ in range(90):
+            histogram.observe(0.005)
+        for _ in range(9):
+            histogram.observe(0.05)
+        histogram.observe(2.0)
+
+        stats = histogram.snapshot()
+        self.assertEqual(stats['p50_ms'], 10)
+        self.assertEqual(stats['p95_ms'], 100)
+        self.assertEqual(stats['p99_ms'], 100)
+        self.assertEqual(stats['max_ms'], 2000.0)
+        self.assertEqual(stats['buckets'], {'le_10': 90, 'le_100': 9, 'le_1000': 0, 'inf': 1})
+
+    def test_endpoint_de_latencias_solo_admin(self, sleep):
+        """Prueba que el endpoint de latencias requiere administrador"""
+        api = APIClient()
+        url = '/api/v1/payments/stripe/latency/'
+        api.force_authenticate(User.objects.create_user(username='usuario'))
+        self.assertEqual(api.get(url).status_code, 403)
+
+        api.force_authenticate(User.objects.create_superuser(username='admin', password='x'))
+        response = api.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {})
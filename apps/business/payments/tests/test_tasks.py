@@ -0,0 +1,97 @@
+# tests/test_tasks.py
+
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.business.payments.models import Donacion, Pago
+from apps.integrations.payments.stripe_client import StripeError
+from apps.support.jobs.models import Job
+
+
+@override_settings(JOB_QUEUE={'ASYNC': False})
+@patch('apps.business.payments.services.CurrencyConverter.get_exchange_rate', return_value=Decimal('500'))
+class TestProcesarPagoEnSegundoPlano(TestCase):
+    """Pruebas del procesamiento de pagos en la cola de trabajos
+
+    Verifica que el endpoint solo encola el trabajo y que el resultado de
+    Stripe se consulta después sobre el mismo endpoint.
+    """
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='pagador', password='pass123')
+        self.client.force_authenticate(user=self.user)
+
+    def _procesar(self, url):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(url)
+
+    @patch('apps.business.payments.processing.get_stripe_client')
+    def test_pago_se_procesa_en_la_cola(self, stripe_client, _rate):
+        """Prueba que el endpoint responde 202 y el trabajo actualiza el pago"""
+        stripe_client.return_value.create_payment_intent.return_value = {
+            'id': 'pi_123', 'client_secret': 'pi_123_secret'
+        }
+        pago = Pago.objects.create(monto=100, moneda='USD', metodo_pago='CARD', referencia_transaccion='REF1')
+        url = f'/api/v1/payments/pagos/{pago.id}/procesar_pago/'
+
+        response = self._procesar(url)
+
+        self.assertEqual(response.status_code, 202)
+        pago.refresh_from_db()
+        self.assertEqual(pago.estado, 'SUCCESS')
+        self.assertEqual(pago.referencia_transaccion, 'pi_123')
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], Job.STATUS_SUCCEEDED)
+        self.assertEqual(response.data['result']['client_secret'], 'pi_123_secret')
+        self.assertEqual(response.data['result']['notification']['type'], 'success')
+
+    @patch('apps.business.payments.processing.get_stripe_client')
+    def test_error_de_stripe_marca_la_donacion_fallida(self, stripe_client, _rate):
+        """Prueba que un rechazo de Stripe deja la donación como fallida sin reintentos"""
+        stripe_client.return_value.create_payment_intent.side_effect = StripeError('Tarjeta rechazada')
+        donacion = Donacion.objects.create(monto=50, moneda='CRC', metodo_pago='CARD', referencia_transaccion='DON1')
+
+        self._procesar(f'/api/v1/payments/donaciones/{donacion.id}/procesar_pago/')
+
+        donacion.refresh_from_db()
+        self.assertEqual(donacion.estado, 'FAILED')
+        job = Job.objects.get(reference=f'payments.donacion:{donacion.id}')
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(job.result['notification']['type'], 'error')
+
+    @patch('apps.business.payments.processing.get_stripe_client')
+    def test_pago_no_pendiente_no_se_encola(self, stripe_client, _rate):
+        """Prueba que un pago ya procesado no genera trabajos"""
+        pago = Pago.objects.create(
+            monto=100, moneda='USD', metodo_pago='CARD', referencia_transaccion='REF2', estado='SUCCESS'
+        )
+
+        response = self._procesar(f'/api/v1/payments/pagos/{pago.id}/procesar_pago/')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Job.objects.exists())
+        stripe_client.assert_not_called()
+
+    @override_settings(JOB_QUEUE={'ASYNC': True, 'MAX_ATTEMPTS': 1})
+    @patch('apps.business.payments.processing.get_stripe_client')
+    def test_trabajo_descartado_marca_el_pago_fallido(self, stripe_client, _rate):
+        """Prueba que al agotar los intentos el pago queda como fallido"""
+        from apps.support.jobs.queue import Worker
+
+        stripe_client.return_value.create_payment_intent.side_effect = RuntimeError('timeout')
+        pago = Pago.objects.create(monto=100, moneda='USD', metodo_pago='CARD', referencia_transaccion='REF3')
+        self._procesar(f'/api/v1/payments/pagos/{pago.id}/procesar_pago/')
+
+        Worker(queues=['payments'], worker_id='w1').run_pending()
+
+        pago.refresh_from_db()
+        self.assertEqual(pago.estado, 'FAILED')
+        self.assertEqual(Job.objects.get().status, Job.STATUS_DEAD)
@@ -0,0 +1,109 @@
+# tests/test_webhooks.py
+
+import json
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from apps.business.payments import webhooks
+from apps.business.payments.models import Donacion, Pago, PaymentReference, ProcessedWebhookEvent
+
+
+def _event(event_id, payment_intent_id, event_type='payment_intent.succeeded'):
+    return {
+        'id': event_id,
+        'type': event_type,
+        'data': {'object': {'id': payment_intent_id}},
+    }
+
+
+@override_settings(PAYMENT_WEBHOOKS={'ASYNC': False}, STRIPE_WEBHOOK_SECRET='whsec_test')
+@patch('apps.business.payments.services.CurrencyConverter.get_exchange_rate', return_value=Decimal('500'))
+class TestStripeWebhook(TestCase):
+    """Pruebas del procesamiento idempotente de webhooks de Stripe
+
+    Verifica la resolución de pagos por referencia, la deduplicación de
+    eventos y el reintento de eventos fallidos.
+    """
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.url = '/api/v1/payments/stripe/webhook/'
+
+    def _post(self, event):
+        with patch('stripe.Webhook.construct_event'):
+            with self.captureOnCommitCallbacks(execute=True):
+                return self.client.post(
+                    self.url,
+                    data=json.dumps(event),
+                    content_type='application/json',
+                    HTTP_STRIPE_SIGNATURE='t=1,v1=firma'
+                )
+
+    def test_referencias_resuelven_con_una_consulta(self, _rate):
+        """Prueba que pagos y donaciones se resuelven por su referencia"""
+        pago = Pago.objects.create(monto=100, moneda='USD', metodo_pago='CARD', referencia_transaccion='pi_pago')
+        donacion = Donacion.objects.create(monto=50, moneda='CRC', metodo_pago='CARD', referencia_transaccion='pi_don')
+
+        self.assertEqual(PaymentReference.resolve('pi_pago'), pago)
+        self.assertEqual(PaymentReference.resolve('pi_don'), donacion)
+        self.assertIsNone(PaymentReference.resolve('pi_inexistente'))
+        with self.assertNumQueries(2):
+            PaymentReference.resolve('pi_pago')
+
+    def test_evento_se_procesa_una_sola_vez(self, _rate):
+        """Prueba que los reintentos de Stripe no repiten el trabajo"""
+        pago = Pago.objects.create(monto=100, moneda='USD', metodo_pago='CARD', referencia_transaccion='pi_1')
+
+        first = self._post(_event('evt_1', 'pi_1'))
+        handler = MagicMock()
+        with patch.dict(webhooks.HANDLERS, {'payment_intent.succeeded': handler}):
+            second = self._post(_event('evt_1', 'pi_1'))
+
+        self.assertEqual((first.status_code, second.status_code), (200, 200))
+        handler.assert_not_called()
+        pago.refresh_from_db()
+        self.assertEqual(pago.estado, 'SUCCESS')
+        event = ProcessedWebhookEvent.objects.get(event_id='evt_1')
+        self.assertEqual((event.status, event.attempts), (ProcessedWebhookEvent.STATUS_PROCESSED, 1))
+
+    def test_pago_fallido(self, _rate):
+        """Prueba que un pago fallido actualiza el estado"""
+        pago = Pago.objects.create(monto=100, moneda='USD', metodo_pago='CARD', referencia_transaccion='pi_2')
+
+        self._post(_event('evt_2', 'pi_2', 'payment_intent.payment_failed'))
+
+        pago.refresh_from_db()
+        self.assertEqual(pago.estado, 'FAILED')
+
+    def test_evento_fallido_se_reintenta(self, _rate):
+        """Prueba que los eventos fallidos se reintentan con el comando"""
+        pago = Pago.objects.create(monto=100, moneda='USD', metodo_pago='CARD', referencia_transaccion='pi_3')
+
+        with patch.dict(webhooks.HANDLERS, {'payment_intent.succeeded': self._fail}):
+            response = self._post(_event('evt_3', 'pi_3'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ProcessedWebhookEvent.objects.get(event_id='evt_3').status, ProcessedWebhookEvent.STATUS_FAILED)
+
+        out = StringIO()
+        call_command('process_webhook_events', '--min-age', '0', stdout=out)
+
+        self.assertIn('procesados: 1 de 1', out.getvalue())
+        pago.refresh_from_db()
+        self.assertEqual(pago.estado, 'SUCCESS')
+
+    def test_firma_invalida(self, _rate):
+        """Prueba que un evento con firma inválida se rechaza sin guardarse"""
+        response = self.client.post(
+            self.url, data='{}', content_type='application/json', HTTP_STRIPE_SIGNATURE='invalida'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ProcessedWebhookEvent.objects.exists())
+
+    @staticmethod
+    def _fail(payment_intent):
+        raise RuntimeError('Error temporal')
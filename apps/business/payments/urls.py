@@ -2,7 +2,7 @@ from django.urls import path
 from apps.business.payments.views import (
     PagoViewSet, PagoInscripcionViewSet, DonacionViewSet, MetodosPagoView,
     AdminPagoViewSet, AdminPagoInscripcionViewSet, AdminDonacionViewSet,
-    StripeWebhookView
+    StripeLatencyView, StripeWebhookView
 )
 
 # Configuración de las rutas para la API de Payments (Pagos)
@@ -24,6 +24,12 @@ urlpatterns = [
         'delete': 'destroy'
     }), name='pagos-detail'),
 
+    # Procesar pago - Encola el procesamiento con Stripe y consulta su estado
+    path('pagos/<int:pk>/procesar_pago/', PagoViewSet.as_view({
+        'get': 'procesar_pago',
+        'post': 'procesar_pago'
+    }), name='pagos-procesar-pago'),
+
     # Pagos de Inscripción - Gestión de pagos de inscripciones
     path('pagos-inscripcion/', PagoInscripcionViewSet.as_view({
         'get': 'list',
@@ -37,6 +43,12 @@ urlpatterns = [
         'delete': 'destroy'
     }), name='pagos-inscripcion-detail'),
 
+    # Procesar pago - Encola el procesamiento del pago de una inscripción
+    path('pagos-inscripcion/<int:pk>/procesar_pago/', PagoInscripcionViewSet.as_view({
+        'get': 'procesar_pago',
+        'post': 'procesar_pago'
+    }), name='pagos-inscripcion-procesar-pago'),
+
     # Donaciones - Gestión de donaciones al parque
     path('donaciones/', DonacionViewSet.as_view({
         'get': 'list',
@@ -50,12 +62,23 @@ urlpatterns = [
         'delete': 'destroy'
     }), name='donaciones-detail'),
 
+    # Procesar pago - Encola el procesamiento de una donación con Stripe
+    path('donaciones/<int:pk>/procesar_pago/', DonacionViewSet.as_view({
+        'get': 'procesar_pago',
+        'post': 'procesar_pago'
+    }), name='donaciones-procesar-pago'),
+
     # Administración de Pagos - Gestión administrativa de pagos
     path('admin/pagos/', AdminPagoViewSet.as_view({
         'get': 'list',
         'post': 'create'
     }), name='admin-pagos-list-create'),
     
+    # Exportación del listado filtrado completo (?formato=csv|xlsx)
+    path('admin/pagos/exportar/', AdminPagoViewSet.as_view({
+        'get': 'exportar'
+    }), name='admin-pagos-exportar'),
+
     path('admin/pagos/<int:pk>/', AdminPagoViewSet.as_view({
         'get': 'retrieve',
         'put': 'update',
@@ -69,6 +92,11 @@ urlpatterns = [
         'post': 'create'
     }), name='admin-pagos-inscripcion-list-create'),
     
+    # Exportación del listado filtrado completo (?formato=csv|xlsx)
+    path('admin/pagos-inscripcion/exportar/', AdminPagoInscripcionViewSet.as_view({
+        'get': 'exportar'
+    }), name='admin-pagos-inscripcion-exportar'),
+
     path('admin/pagos-inscripcion/<int:pk>/', AdminPagoInscripcionViewSet.as_view({
         'get': 'retrieve',
         'put': 'update',
@@ -82,6 +110,11 @@ urlpatterns = [
         'post': 'create'
     }), name='admin-donaciones-list-create'),
     
+    # Exportación del listado filtrado completo (?formato=csv|xlsx)
+    path('admin/donaciones/exportar/', AdminDonacionViewSet.as_view({
+        'get': 'exportar'
+    }), name='admin-donaciones-exportar'),
+
     path('admin/donaciones/<int:pk>/', AdminDonacionViewSet.as_view({
         'get': 'retrieve',
         'put': 'update',
@@ -92,6 +125,9 @@ urlpatterns = [
     # Webhook de Stripe - Para recibir eventos de pago
     path('stripe/webhook/', StripeWebhookView.as_view(), name='stripe-webhook'),
 
+    # Latencia de Stripe - Histogramas de latencia por operación (solo admin)
+    path('stripe/latency/', StripeLatencyView.as_view(), name='stripe-latency'),
+
     # Métodos de Pago - Vista para obtener métodos de pago disponibles
     path('metodos-pago/', MetodosPagoView.as_view(), name='metodos-pago'),
 ]
\ No newline at end of file
@@ -21,6 +21,13 @@ urlpatterns = [
         name='admin-donaciones-create'
     ),
 
+    # Exportar - Descarga el listado filtrado de las donaciones en CSV o XLSX (administrador)
+    path(
+        'exportar/',
+        AdminDonacionViewSet.as_view({'get': 'exportar'}),
+        name='admin-donaciones-exportar'
+    ),
+
     # Detalle - Obtiene información detallada de una donación (administrador)
     path(
         '<int:pk>/',
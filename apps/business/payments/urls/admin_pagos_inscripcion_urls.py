@@ -21,6 +21,13 @@ urlpatterns = [
         name='admin-pagos-inscripcion-create'
     ),
 
+    # Exportar - Descarga el listado filtrado de los pagos de inscripción en CSV o XLSX (administrador)
+    path(
+        'exportar/',
+        AdminPagoInscripcionViewSet.as_view({'get': 'exportar'}),
+        name='admin-pagos-inscripcion-exportar'
+    ),
+
     # Detalle - Obtiene información detallada de un pago de inscripción (administrador)
     path(
         '<int:pk>/',
@@ -21,6 +21,13 @@ urlpatterns = [
         name='admin-pagos-create'
     ),
 
+    # Exportar - Descarga el listado filtrado de los pagos en CSV o XLSX (administrador)
+    path(
+        'exportar/',
+        AdminPagoViewSet.as_view({'get': 'exportar'}),
+        name='admin-pagos-exportar'
+    ),
+
     # Detalle - Obtiene información detallada de un pago (administrador)
     path(
         '<int:pk>/',
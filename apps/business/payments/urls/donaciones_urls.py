@@ -38,7 +38,7 @@ urlpatterns = [
     # Procesar pago - Procesa una donación con Stripe
     path(
         '<int:pk>/procesar_pago/',
-        DonacionViewSet.as_view({'post': 'procesar_pago'}),
+        DonacionViewSet.as_view({'get': 'procesar_pago', 'post': 'procesar_pago'}),
         name='donaciones-procesar-pago'
     ),
 
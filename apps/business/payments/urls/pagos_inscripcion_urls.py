@@ -31,7 +31,7 @@ urlpatterns = [
     # Procesar pago - Procesa el pago de una inscripción
     path(
         '<int:pk>/procesar_pago/',
-        PagoInscripcionViewSet.as_view({'post': 'procesar_pago'}),
+        PagoInscripcionViewSet.as_view({'get': 'procesar_pago', 'post': 'procesar_pago'}),
         name='pagos-inscripcion-procesar'
     ),
 
@@ -31,7 +31,7 @@ urlpatterns = [
     # Procesar pago - Procesa un pago general con Stripe
     path(
         '<int:pk>/procesar_pago/',
-        PagoViewSet.as_view({'post': 'procesar_pago'}),
+        PagoViewSet.as_view({'get': 'procesar_pago', 'post': 'procesar_pago'}),
         name='pagos-procesar'
     ),
 
@@ -3,6 +3,7 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action  # Para definir acciones personalizadas
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.exceptions import NotFound
 
 # Importaciones para manejo de permisos
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
@@ -13,14 +14,76 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.http import HttpResponse
+from django.conf import settings
+from django.db import transaction
+import json
+import logging
+import stripe
 
 # Importaciones locales de modelos y serializadores
-from .models import Pago, PagoInscripcion, Donacion
+from .models import Pago, PagoInscripcion, Donacion, ProcessedWebhookEvent
+from .exports import ExportMixin
 from .serializers import PagoSerializer, PagoInscripcionSerializer, DonacionSerializer
-from apps.integrations.payments.stripe_client import StripeClient, StripeError
-from .notifications import PaymentNotifier
+from .state import PaymentStateMachine
+from apps.integrations.payments.stripe_client import get_latency_histograms
+from . import tasks, webhooks
 
-class PagoViewSet(viewsets.ModelViewSet):
+logger = logging.getLogger(__name__)
+
+
+class ProcesarPagoMixin:
+    """Acción ``procesar_pago`` compartida por pagos, pagos de inscripción y donaciones
+
+    POST encola el procesamiento con Stripe (``PaymentProcessor``) y responde
+    202; GET devuelve el estado del último procesamiento y, al terminar,
+    ``payment_intent_id``, ``client_secret`` y la notificación para el
+    frontend (o el error y su notificación).
+
+    Attributes:
+        procesado_error (str): Mensaje cuando el registro ya no está pendiente
+        en_proceso_message (str): Mensaje de la respuesta 202
+    """
+    procesado_error = 'Este pago ya ha sido procesado'
+    en_proceso_message = 'Pago en proceso'
+
+    def get_payable(self):
+        """Obtiene el registro a procesar"""
+        return self.get_object()
+
+    @action(detail=True, methods=['get', 'post'])
+    def procesar_pago(self, request, pk=None):
+        """Encola el procesamiento con Stripe o consulta su estado"""
+        payable = self.get_payable()
+
+        if request.method == 'GET':
+            job = tasks.latest_payment_job(payable)
+            if job is None:
+                return Response({
+                    'error': 'No hay un procesamiento registrado'
+                }, status=status.HTTP_404_NOT_FOUND)
+            return Response({
+                'job_id': job.pk,
+                'status': job.status,
+                'attempts': job.attempts,
+                'estado': payable.estado,
+                'result': job.result,
+            }, status=status.HTTP_200_OK)
+
+        # Solo procesar registros que estén en estado pendiente
+        if payable.estado != 'PENDING':
+            return Response({
+                'error': self.procesado_error
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        job = tasks.schedule_payment(payable)
+        return Response({
+            'message': self.en_proceso_message,
+            'job_id': job.pk,
+            'status': job.status,
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class PagoViewSet(ProcesarPagoMixin, viewsets.ModelViewSet):
     """ViewSet para gestionar pagos generales
     
     Este ViewSet proporciona los siguientes endpoints:
@@ -29,7 +92,8 @@ class PagoViewSet(viewsets.ModelViewSet):
     - GET /pagos/{id}/ - Obtiene un pago específico
     - PUT /pagos/{id}/ - Actualiza un pago (solo admin)
     - DELETE /pagos/{id}/ - Elimina un pago (solo admin)
-    - POST /pagos/{id}/procesar_pago/ - Procesa el pago con Stripe
+    - POST /pagos/{id}/procesar_pago/ - Encola el procesamiento del pago con Stripe
+    - GET /pagos/{id}/procesar_pago/ - Estado del procesamiento
     
     Permisos:
     - Listar y ver: Usuario autenticado
@@ -69,104 +133,8 @@ class PagoViewSet(viewsets.ModelViewSet):
         if self.action in ['update', 'partial_update', 'destroy']:
             self.permission_classes = [IsAdminUser]
         return super().get_permissions()
-    
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
-    def procesar_pago(self, request, pk=None):
-        """Procesa un pago general utilizando Stripe
-        
-        Actualiza el estado del pago según el resultado del procesamiento con Stripe.
-        """
-        pago = self.get_object()
-        
-        # Solo procesar pagos que estén en estado pendiente
-        if pago.estado != 'PENDING':
-            return Response({
-                'error': 'Este pago ya ha sido procesado'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Procesar pago con Stripe
-        try:
-            stripe_client = StripeClient()
-            
-            # Crear una intención de pago en Stripe
-            currency = pago.moneda.lower()
-            description = f"Pago general - {pago.referencia_transaccion}"
-            
-            # Convertir monto a la moneda correcta para Stripe
-            amount = pago.monto
-            if currency == 'crc':
-                # Stripe requiere el monto en céntimos (colones * 100)
-                amount_cents = int(amount)
-            else:
-                # Para USD, convertir a centavos
-                amount_cents = int(amount * 100)
-            
-            # Crear la intención de pago
-            payment_intent = stripe_client.create_payment_intent(
-                amount=amount,
-                currency=currency,
-                description=description
-            )
-            
-            # Actualizar el estado del pago
-            pago.estado = 'SUCCESS'
-            pago.referencia_transaccion = payment_intent['id']
-            pago.save()
-            
-            # Generar notificación para el frontend
-            notifier = PaymentNotifier()
-            notification = notifier.send_payment_confirmation({
-                'id': pago.id,
-                'monto': str(pago.monto),
-                'moneda': pago.moneda,
-                'fecha_pago': pago.fecha_pago
-            })
-            
-            return Response({
-                'message': 'Pago procesado exitosamente',
-                'payment_intent_id': payment_intent['id'],
-                'client_secret': payment_intent['client_secret'],
-                'notification': notification
-            }, status=status.HTTP_200_OK)
-            
-        except StripeError as e:
-            # Actualizar el estado del pago a fallido
-            pago.estado = 'FAILED'
-            pago.save()
-            
-            # Generar notificación de error para el frontend
-            notifier = PaymentNotifier()
-            notification = notifier.send_payment_failed({
-                'id': pago.id,
-                'monto': str(pago.monto),
-                'moneda': pago.moneda,
-                'fecha_pago': pago.fecha_pago
-            })
-            
-            return Response({
-                'error': str(e),
-                'notification': notification
-            }, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
-            # Actualizar el estado del pago a fallido
-            pago.estado = 'FAILED'
-            pago.save()
-            
-            # Generar notificación de error para el frontend
-            notifier = PaymentNotifier()
-            notification = notifier.send_payment_failed({
-                'id': pago.id,
-                'monto': str(pago.monto),
-                'moneda': pago.moneda,
-                'fecha_pago': pago.fecha_pago
-            })
-            
-            return Response({
-                'error': f'Error al procesar el pago: {str(e)}',
-                'notification': notification
-            }, status=status.HTTP_400_BAD_REQUEST)
 
-class PagoInscripcionViewSet(viewsets.ModelViewSet):
+class PagoInscripcionViewSet(ProcesarPagoMixin, viewsets.ModelViewSet):
     """ViewSet para gestionar pagos de inscripciones a programas educativos
     
     Endpoints disponibles:
@@ -175,7 +143,8 @@ class PagoInscripcionViewSet(viewsets.ModelViewSet):
     - GET /pagos-inscripcion/{id}/ - Obtiene detalles de un pago
     - PUT /pagos-inscripcion/{id}/ - Actualiza pago (admin)
     - DELETE /pagos-inscripcion/{id}/ - Elimina pago (admin)
-    - POST /pagos-inscripcion/{id}/procesar_pago/ - Procesa el pago
+    - POST /pagos-inscripcion/{id}/procesar_pago/ - Encola el procesamiento del pago
+    - GET /pagos-inscripcion/{id}/procesar_pago/ - Estado del procesamiento
     
     Funcionalidades especiales:
     - Validación automática del monto contra el precio del programa
@@ -200,109 +169,13 @@ class PagoInscripcionViewSet(viewsets.ModelViewSet):
     queryset = PagoInscripcion.objects.all()
     serializer_class = PagoInscripcionSerializer
     permission_classes = [IsAuthenticated]
-    
-    @action(detail=True, methods=['post'])
-    def procesar_pago(self, request, pk=None):
-        """Procesa el pago de una inscripción utilizando Stripe
-        
-        Actualiza el estado del pago y la inscripción según el resultado
-        del procesamiento con Stripe.
-        """
-        pago = self.get_object()
-        
-        # Solo procesar pagos que estén en estado pendiente
-        if pago.estado != 'PENDING':
-            return Response({
-                'error': 'Este pago ya ha sido procesado'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Procesar pago con Stripe
-        try:
-            stripe_client = StripeClient()
-            
-            # Crear una intención de pago en Stripe
-            currency = pago.moneda.lower()
-            description = f"Pago de inscripción para {pago.inscripcion.horario.programa.nombre}"
-            
-            # Convertir monto a la moneda correcta para Stripe
-            amount = pago.monto
-            if currency == 'crc':
-                # Stripe requiere el monto en céntimos (colones * 100)
-                amount_cents = int(amount)
-            else:
-                # Para USD, convertir a centavos
-                amount_cents = int(amount * 100)
-            
-            # Crear la intención de pago
-            payment_intent = stripe_client.create_payment_intent(
-                amount=amount,
-                currency=currency,
-                description=description
-            )
-            
-            # Actualizar el estado del pago
-            pago.estado = 'SUCCESS'
-            pago.referencia_transaccion = payment_intent['id']
-            pago.save()
-            
-            # Generar notificación para el frontend
-            notifier = PaymentNotifier()
-            notification = notifier.send_payment_confirmation({
-                'id': pago.id,
-                'monto': str(pago.monto),
-                'moneda': pago.moneda,
-                'fecha_pago': pago.fecha_pago
-            })
-            
-            return Response({
-                'message': 'Pago procesado exitosamente',
-                'payment_intent_id': payment_intent['id'],
-                'client_secret': payment_intent['client_secret'],
-                'notification': notification
-            }, status=status.HTTP_200_OK)
-            
-        except StripeError as e:
-            # Actualizar el estado del pago a fallido
-            pago.estado = 'FAILED'
-            pago.save()
-            
-            # Generar notificación de error para el frontend
-            notifier = PaymentNotifier()
-            notification = notifier.send_payment_failed({
-                'id': pago.id,
-                'monto': str(pago.monto),
-                'moneda': pago.moneda,
-                'fecha_pago': pago.fecha_pago
-            })
-            
-            return Response({
-                'error': str(e),
-                'notification': notification
-            }, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
-            # Actualizar el estado del pago a fallido
-            pago.estado = 'FAILED'
-            pago.save()
-            
-            # Generar notificación de error para el frontend
-            notifier = PaymentNotifier()
-            notification = notifier.send_payment_failed({
-                'id': pago.id,
-                'monto': str(pago.monto),
-                'moneda': pago.moneda,
-                'fecha_pago': pago.fecha_pago
-            })
-            
-            return Response({
-                'error': f'Error al procesar el pago: {str(e)}',
-                'notification': notification
-            }, status=status.HTTP_400_BAD_REQUEST)
 
 # Vista administrativa para Pagos
-class AdminPagoViewSet(viewsets.ModelViewSet):
+class AdminPagoViewSet(ExportMixin, viewsets.ModelViewSet):
     """Vista administrativa para gestionar pagos a través de la API.
     
-    Proporciona funcionalidades CRUD completas con filtrado, búsqueda y ordenamiento.
+    Proporciona funcionalidades CRUD completas con filtrado, búsqueda y ordenamiento,
+    y la exportación del listado filtrado (GET exportar/?formato=csv|xlsx).
     """
     queryset = Pago.objects.all()
     serializer_class = PagoSerializer
@@ -312,12 +185,26 @@ class AdminPagoViewSet(viewsets.ModelViewSet):
     search_fields = ['referencia_transaccion']
     ordering_fields = ['fecha_pago', 'monto']
     ordering = ['-fecha_pago']
+    export_name = 'pagos'
+    export_fields = [
+        ('id', 'ID'),
+        ('fecha_pago', 'Fecha'),
+        ('referencia_transaccion', 'Referencia'),
+        ('estado', 'Estado'),
+        ('metodo_pago', 'Método de pago'),
+        ('moneda', 'Moneda'),
+        ('monto', 'Monto'),
+        ('monto_crc', 'Monto CRC'),
+        ('monto_usd', 'Monto USD'),
+        ('notas', 'Notas'),
+    ]
 
 # Vista administrativa para Pagos de Inscripción
-class AdminPagoInscripcionViewSet(viewsets.ModelViewSet):
+class AdminPagoInscripcionViewSet(ExportMixin, viewsets.ModelViewSet):
     """Vista administrativa para gestionar pagos de inscripción a través de la API.
     
-    Proporciona funcionalidades CRUD completas con filtrado, búsqueda y ordenamiento.
+    Proporciona funcionalidades CRUD completas con filtrado, búsqueda y ordenamiento,
+    y la exportación del listado filtrado (GET exportar/?formato=csv|xlsx).
     """
     queryset = PagoInscripcion.objects.all()
     serializer_class = PagoInscripcionSerializer
@@ -327,12 +214,29 @@ class AdminPagoInscripcionViewSet(viewsets.ModelViewSet):
     search_fields = ['referencia_transaccion', 'inscripcion__usuario__email']
     ordering_fields = ['fecha_pago', 'monto']
     ordering = ['-fecha_pago']
+    export_name = 'pagos-inscripcion'
+    export_fields = [
+        ('id', 'ID'),
+        ('fecha_pago', 'Fecha'),
+        ('referencia_transaccion', 'Referencia'),
+        ('estado', 'Estado'),
+        ('metodo_pago', 'Método de pago'),
+        ('moneda', 'Moneda'),
+        ('monto', 'Monto'),
+        ('monto_crc', 'Monto CRC'),
+        ('monto_usd', 'Monto USD'),
+        ('inscripcion_id', 'Inscripción'),
+        ('inscripcion__nombre_participante', 'Participante'),
+        ('inscripcion__usuario__email', 'Email'),
+        ('inscripcion__horario__programa__nombre', 'Programa'),
+    ]
 
 # Vista administrativa para Donaciones
-class AdminDonacionViewSet(viewsets.ModelViewSet):
+class AdminDonacionViewSet(ExportMixin, viewsets.ModelViewSet):
     """Vista administrativa para gestionar donaciones a través de la API.
     
-    Proporciona funcionalidades CRUD completas con filtrado, búsqueda y ordenamiento.
+    Proporciona funcionalidades CRUD completas con filtrado, búsqueda y ordenamiento,
+    y la exportación del listado filtrado (GET exportar/?formato=csv|xlsx).
     """
     queryset = Donacion.objects.all()
     serializer_class = DonacionSerializer
@@ -342,12 +246,20 @@ class AdminDonacionViewSet(viewsets.ModelViewSet):
     search_fields = ['nombre_donante', 'email_donante', 'referencia_transaccion']
     ordering_fields = ['fecha_creacion', 'monto']
     ordering = ['-fecha_creacion']
-
-    def get_queryset(self):
-        """Filtra los pagos según el tipo de usuario"""
-        if self.request.user.is_staff:
-            return PagoInscripcion.objects.all()
-        return PagoInscripcion.objects.filter(inscripcion__usuario=self.request.user)
+    export_name = 'donaciones'
+    export_fields = [
+        ('id', 'ID'),
+        ('fecha_creacion', 'Fecha'),
+        ('referencia_transaccion', 'Referencia'),
+        ('estado', 'Estado'),
+        ('metodo_pago', 'Método de pago'),
+        ('moneda', 'Moneda'),
+        ('monto', 'Monto'),
+        ('monto_crc', 'Monto CRC'),
+        ('monto_usd', 'Monto USD'),
+        ('nombre_donante', 'Donante'),
+        ('email_donante', 'Email'),
+    ]
 
     def get_permissions(self):
         """Define permisos según la acción"""
@@ -355,7 +267,7 @@ class AdminDonacionViewSet(viewsets.ModelViewSet):
             self.permission_classes = [IsAdminUser]
         return super().get_permissions()
 
-class DonacionViewSet(viewsets.ModelViewSet):
+class DonacionViewSet(ProcesarPagoMixin, viewsets.ModelViewSet):
     """ViewSet para gestionar donaciones al parque
     
     Endpoints principales:
@@ -365,7 +277,8 @@ class DonacionViewSet(viewsets.ModelViewSet):
     - PUT /donaciones/{id}/ - Actualizar donación (admin)
     - DELETE /donaciones/{id}/ - Eliminar donación (admin)
     - POST /donaciones/{id}/procesar_donacion/ - Procesa la donación
-    - POST /donaciones/{id}/procesar_pago/ - Procesa el pago con Stripe
+    - POST /donaciones/{id}/procesar_pago/ - Encola el procesamiento con Stripe
+    - GET /donaciones/{id}/procesar_pago/ - Estado del procesamiento
     
     Características especiales:
     - Creación de donaciones sin autenticación
@@ -393,6 +306,8 @@ class DonacionViewSet(viewsets.ModelViewSet):
     """
     queryset = Donacion.objects.all()
     serializer_class = DonacionSerializer
+    procesado_error = 'Esta donación ya ha sido procesada'
+    en_proceso_message = 'Donación en proceso'
 
     def get_queryset(self):
         """Filtra las donaciones según el tipo de usuario"""
@@ -422,13 +337,6 @@ class DonacionViewSet(viewsets.ModelViewSet):
             self.permission_classes = [IsAuthenticated]
         return super().get_permissions()
 
-    def get_object(self):
-        """Override to allow access to donation for procesar_pago without authentication filtering"""
-        if self.action == 'procesar_pago':
-            # For procesar_pago, bypass the queryset filtering
-            return Donacion.objects.get(pk=self.kwargs.get('pk'))
-        return super().get_object()
-
     @action(detail=True, methods=['post'])
     def procesar_donacion(self, request, pk=None):
         """Procesa una donación
@@ -440,8 +348,10 @@ class DonacionViewSet(viewsets.ModelViewSet):
         # Aquí iría la lógica de procesamiento de la donación
         # Por ahora, simulamos un proceso exitoso
         try:
-            donacion.estado = 'SUCCESS'
-            donacion.save()
+            if not PaymentStateMachine.transition(donacion, 'SUCCESS', source='procesar_donacion'):
+                return Response({
+                    'error': 'La donación cambió de estado durante el procesamiento'
+                }, status=status.HTTP_409_CONFLICT)
             return Response({
                 'message': 'Donación procesada exitosamente'
             }, status=status.HTTP_200_OK)
@@ -450,107 +360,13 @@ class DonacionViewSet(viewsets.ModelViewSet):
                 'error': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
     
-    @action(detail=True, methods=['post'], permission_classes=[])
-    def procesar_pago(self, request, pk=None):
-        """Procesa una donación utilizando Stripe
-        
-        Actualiza el estado de la donación según el resultado del procesamiento con Stripe.
-        """
-        # For procesar_pago, we need to get the object without filtering
+    def get_payable(self):
+        """Obtiene la donación sin filtrar por usuario (procesar_pago es público)"""
         try:
-            donacion = Donacion.objects.get(pk=pk)
+            return Donacion.objects.get(pk=self.kwargs.get('pk'))
         except Donacion.DoesNotExist:
-            return Response({
-                'error': 'Donación no encontrada'
-            }, status=status.HTTP_404_NOT_FOUND)
-        
-        # Solo procesar donaciones que estén en estado pendiente
-        if donacion.estado != 'PENDING':
-            return Response({
-                'error': 'Esta donación ya ha sido procesada'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Procesar pago con Stripe
-        try:
-            stripe_client = StripeClient()
-            
-            # Crear una intención de pago en Stripe
-            currency = donacion.moneda.lower()
-            description = f"Donación de {donacion.nombre_donante or 'Anónimo'}"
-            
-            # Convertir monto a la moneda correcta para Stripe
-            amount = donacion.monto
-            if currency == 'crc':
-                # Stripe requiere el monto en céntimos (colones * 100)
-                amount_cents = int(amount)
-            else:
-                # Para USD, convertir a centavos
-                amount_cents = int(amount * 100)
-            
-            # Crear la intención de pago
-            payment_intent = stripe_client.create_payment_intent(
-                amount=amount,
-                currency=currency,
-                description=description
-            )
-            
-            # Actualizar el estado de la donación
-            donacion.estado = 'SUCCESS'
-            donacion.referencia_transaccion = payment_intent['id']
-            donacion.save()
-            
-            # Generar notificación para el frontend
-            notifier = PaymentNotifier()
-            notification = notifier.send_payment_confirmation({
-                'id': donacion.id,
-                'monto': str(donacion.monto),
-                'moneda': donacion.moneda,
-                'fecha_pago': donacion.fecha_creacion
-            })
-            
-            return Response({
-                'message': 'Donación procesada exitosamente',
-                'payment_intent_id': payment_intent['id'],
-                'client_secret': payment_intent['client_secret'],
-                'notification': notification
-            }, status=status.HTTP_200_OK)
-            
-        except StripeError as e:
-            # Actualizar el estado de la donación a fallido
-            donacion.estado = 'FAILED'
-            donacion.save()
-            
-            # Generar notificación de error para el frontend
-            notifier = PaymentNotifier()
-            notification = notifier.send_payment_failed({
-                'id': donacion.id,
-                'monto': str(donacion.monto),
-                'moneda': donacion.moneda,
-                'fecha_pago': donacion.fecha_creacion
-            })
-            
-            return Response({
-                'error': str(e),
-                'notification': notification
-            }, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
-            # Actualizar el estado de la donación a fallido
-            donacion.estado = 'FAILED'
-            donacion.save()
-            
-            # Generar notificación de error para el frontend
-            notifier = PaymentNotifier()
-            notification = notifier.send_payment_failed({
-                'id': donacion.id,
-                'monto': str(donacion.monto),
-                'moneda': donacion.moneda,
-                'fecha_pago': donacion.fecha_creacion
-            })
-            
-            return Response({
-                'error': f'Error al procesar la donación: {str(e)}',
-                'notification': notification
-            }, status=status.HTTP_400_BAD_REQUEST)
+            raise NotFound('Donación no encontrada')
+
 
 class MetodosPagoView(APIView):
     """Vista para obtener los métodos de pago disponibles
@@ -592,27 +408,43 @@ class MetodosPagoView(APIView):
         ]
         return Response(metodos)
 
+class StripeLatencyView(APIView):
+    """Vista para consultar la latencia de las llamadas a Stripe
+
+    Endpoint:
+    - GET /stripe/latency/ - Histograma de latencias por operación (solo admin)
+
+    Los datos son del proceso que atiende la solicitud: llamadas, errores,
+    promedio, máximo, percentiles 50/95/99 y conteo por intervalo en ms.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """Retorna el resumen de latencias por operación de Stripe"""
+        return Response(get_latency_histograms())
+
 @method_decorator(csrf_exempt, name='dispatch')
 class StripeWebhookView(APIView):
     """View para manejar webhooks de Stripe
     
-    Esta vista recibe eventos de Stripe y actualiza los estados de los pagos
-    en consecuencia.
+    Esta vista solo verifica la firma, guarda el evento y responde 200 de
+    inmediato; los estados de los pagos se actualizan en segundo plano con
+    ``webhooks.process_event``. Los reintentos de Stripe de un evento ya
+    recibido se reconocen sin repetir el trabajo.
     """
     permission_classes = []  # No requiere autenticación
     
     def post(self, request):
         """Maneja eventos de webhook de Stripe"""
         try:
-            stripe_client = StripeClient()
             payload = request.body
             sig_header = request.META['HTTP_STRIPE_SIGNATURE']
-            event = None
 
             try:
-                event = stripe.Webhook.construct_event(
+                stripe.Webhook.construct_event(
                     payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
                 )
+                event = json.loads(payload)
             except ValueError:
                 # Payload inválido
                 return HttpResponse(status=400)
@@ -620,47 +452,11 @@ class StripeWebhookView(APIView):
                 # Firma inválida
                 return HttpResponse(status=400)
 
-            # Manejar el evento
-            if event['type'] == 'payment_intent.succeeded':
-                payment_intent = event['data']['object']
-                # Actualizar el estado del pago en nuestra base de datos
-                try:
-                    pago = Pago.objects.get(referencia_transaccion=payment_intent['id'])
-                    pago.estado = 'SUCCESS'
-                    pago.save()
-                except Pago.DoesNotExist:
-                    try:
-                        pago_inscripcion = PagoInscripcion.objects.get(referencia_transaccion=payment_intent['id'])
-                        pago_inscripcion.estado = 'SUCCESS'
-                        pago_inscripcion.save()
-                    except PagoInscripcion.DoesNotExist:
-                        try:
-                            donacion = Donacion.objects.get(referencia_transaccion=payment_intent['id'])
-                            donacion.estado = 'SUCCESS'
-                            donacion.save()
-                        except Donacion.DoesNotExist:
-                            pass  # Pago no encontrado en nuestra base de datos
-
-            elif event['type'] == 'payment_intent.payment_failed':
-                payment_intent = event['data']['object']
-                # Actualizar el estado del pago en nuestra base de datos
-                try:
-                    pago = Pago.objects.get(referencia_transaccion=payment_intent['id'])
-                    pago.estado = 'FAILED'
-                    pago.save()
-                except Pago.DoesNotExist:
-                    try:
-                        pago_inscripcion = PagoInscripcion.objects.get(referencia_transaccion=payment_intent['id'])
-                        pago_inscripcion.estado = 'FAILED'
-                        pago_inscripcion.save()
-                    except PagoInscripcion.DoesNotExist:
-                        try:
-                            donacion = Donacion.objects.get(referencia_transaccion=payment_intent['id'])
-                            donacion.estado = 'FAILED'
-                            donacion.save()
-                        except Donacion.DoesNotExist:
-                            pass  # Pago no encontrado en nuestra base de datos
+            record, created = webhooks.record_event(event)
+            if created or record.status == ProcessedWebhookEvent.STATUS_FAILED:
+                transaction.on_commit(lambda: webhooks.schedule_event(record.event_id))
 
             return HttpResponse(status=200)
-        except Exception as e:
+        except Exception:
+            logger.exception('Error al recibir el webhook de Stripe')
             return HttpResponse(status=500)
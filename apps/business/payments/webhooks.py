@@ -0,0 +1,199 @@
+"""
+Procesamiento idempotente de webhooks de Stripe
+
+La vista del webhook solo verifica la firma, guarda el evento en
+``ProcessedWebhookEvent`` y responde 200; el trabajo se realiza en
+segundo plano con ``process_event``. Cada evento se procesa una sola vez:
+los reintentos de Stripe con el mismo ID se reconocen sin repetir el
+trabajo y el procesamiento se reclama con un ``UPDATE`` condicional, por lo
+que dos procesos no pueden ejecutar el mismo evento a la vez.
+
+Los eventos que fallan o quedan sin procesar (p. ej. si el proceso se
+reinició) se reintentan con el comando ``process_webhook_events``.
+
+Configuración (``settings.PAYMENT_WEBHOOKS``):
+    ASYNC (bool): Si es False el evento se procesa antes de responder.
+    WORKERS (int): Hilos del procesador en segundo plano.
+    MAX_ATTEMPTS (int): Intentos antes de dejar un evento como fallido.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.business.tickets.services import ReservationService
+from .exceptions import TransicionInvalidaError
+from .models import PaymentReference, ProcessedWebhookEvent
+from .state import PaymentStateMachine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAYMENT_WEBHOOKS = {
+    'ASYNC': True,
+    'WORKERS': 2,
+    'MAX_ATTEMPTS': 5,
+}
+
+
+def get_config():
+    """Configuración de webhooks combinada con los valores por defecto."""
+    return {**DEFAULT_PAYMENT_WEBHOOKS, **getattr(settings, 'PAYMENT_WEBHOOKS', {})}
+
+
+def _set_payment_state(payment_intent_id, estado):
+    """Actualiza el estado del pago, inscripción o donación de una intención de pago."""
+    target = PaymentReference.resolve(payment_intent_id)
+    if target is None:
+        logger.warning('Pago no encontrado para la intención %s', payment_intent_id)
+        return
+    if target.estado == estado:
+        return
+    try:
+        PaymentStateMachine.transition(
+            target, estado, source='webhook', detail={'payment_intent': payment_intent_id}
+        )
+    except TransicionInvalidaError as e:
+        logger.warning('Intención %s: %s', payment_intent_id, e)
+
+
+def handle_payment_succeeded(payment_intent):
+    """Confirma los cupos retenidos y marca el pago como completado."""
+    ReservationService.confirm_payment_intent(payment_intent['id'])
+    _set_payment_state(payment_intent['id'], 'SUCCESS')
+
+
+def handle_payment_failed(payment_intent):
+    """Libera los cupos retenidos y marca el pago como fallido."""
+    ReservationService.release_payment_intent(payment_intent['id'])
+    _set_payment_state(payment_intent['id'], 'FAILED')
+
+
+HANDLERS = {
+    'payment_intent.succeeded': handle_payment_succeeded,
+    'payment_intent.payment_failed': handle_payment_failed,
+}
+
+
+def record_event(event, provider='stripe'):
+    """Guarda un evento recibido.
+
+    Args:
+        event (dict): Evento verificado del proveedor, como JSON decodificado.
+        provider (str): Proveedor que envió el evento.
+
+    Returns:
+        tuple: (ProcessedWebhookEvent, bool indicando si es nuevo).
+    """
+    try:
+        with transaction.atomic():
+            return ProcessedWebhookEvent.objects.create(
+                event_id=event['id'],
+                provider=provider,
+                event_type=event['type'],
+                payload=event,
+            ), True
+    except IntegrityError:
+        return ProcessedWebhookEvent.objects.get(event_id=event['id']), False
+
+
+def _claim(event_id):
+    return ProcessedWebhookEvent.objects.filter(
+        event_id=event_id,
+        status__in=[ProcessedWebhookEvent.STATUS_RECEIVED, ProcessedWebhookEvent.STATUS_FAILED],
+        attempts__lt=get_config()['MAX_ATTEMPTS'],
+    ).update(status=ProcessedWebhookEvent.STATUS_PROCESSING, attempts=F('attempts') + 1)
+
+
+def process_event(event_id):
+    """Procesa un evento guardado si nadie más lo está procesando.
+
+    Args:
+        event_id (str): ID del evento.
+
+    Returns:
+        bool: True si el evento se procesó en esta llamada.
+    """
+    if not _claim(event_id):
+        return False
+
+    record = ProcessedWebhookEvent.objects.get(event_id=event_id)
+    handler = HANDLERS.get(record.event_type)
+    try:
+        with transaction.atomic():
+            if handler is not None:
+                handler(record.payload['data']['object'])
+    except Exception as e:
+        logger.exception('Error al procesar el evento de webhook %s', event_id)
+        ProcessedWebhookEvent.objects.filter(pk=record.pk).update(
+            status=ProcessedWebhookEvent.STATUS_FAILED, error=str(e)
+        )
+        return False
+
+    ProcessedWebhookEvent.objects.filter(pk=record.pk).update(
+        status=ProcessedWebhookEvent.STATUS_PROCESSED, processed_at=timezone.now(), error=''
+    )
+    return True
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_config()['WORKERS'], thread_name_prefix='payment-webhooks'
+            )
+        return _executor
+
+
+def _process_in_background(event_id):
+    try:
+        process_event(event_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_event(event_id):
+    """Procesa un evento en segundo plano (o de inmediato si ``ASYNC`` es False)."""
+    if get_config()['ASYNC']:
+        _get_executor().submit(_process_in_background, event_id)
+    else:
+        process_event(event_id)
+
+
+def pending_events(older_than=None):
+    """Eventos recibidos o fallidos que aún pueden reintentarse.
+
+    Args:
+        older_than (timedelta): Solo eventos recibidos hace más de este tiempo.
+    """
+    queryset = ProcessedWebhookEvent.objects.filter(
+        status__in=[ProcessedWebhookEvent.STATUS_RECEIVED, ProcessedWebhookEvent.STATUS_FAILED],
+        attempts__lt=get_config()['MAX_ATTEMPTS'],
+    )
+    if older_than is not None:
+        queryset = queryset.filter(received_at__lte=timezone.now() - older_than)
+    return queryset.order_by('received_at')
+
+
+def reset_stale(older_than):
+    """Devuelve a fallidos los eventos que quedaron en proceso (p. ej. tras un reinicio).
+
+    Args:
+        older_than (timedelta): Antigüedad mínima desde la recepción.
+
+    Returns:
+        int: Cantidad de eventos reiniciados.
+    """
+    return ProcessedWebhookEvent.objects.filter(
+        status=ProcessedWebhookEvent.STATUS_PROCESSING,
+        received_at__lte=timezone.now() - older_than,
+    ).update(status=ProcessedWebhookEvent.STATUS_FAILED, error='Procesamiento interrumpido')
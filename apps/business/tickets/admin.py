@@ -1,5 +1,17 @@
 from django.contrib import admin
-from .models import Ticket, Visit
+from .models import (
+    CapacityOverride,
+    CapacityTemplate,
+    ETicket,
+    PricingRule,
+    Reservation,
+    ReservationLine,
+    Ticket,
+    TicketOrder,
+    TicketOrderLine,
+    Visit,
+    WeekdayCapacity,
+)
 
 @admin.register(Ticket)
 class TicketAdmin(admin.ModelAdmin):
@@ -12,11 +24,12 @@ class TicketAdmin(admin.ModelAdmin):
         'price',
         'currency',
         'total_slots',
-        'occupied_slots'
+        'occupied_slots',
+        'held_slots'
     ]
     list_filter = ['currency']
     search_fields = ['name', 'description']
-    readonly_fields = ['occupied_slots']
+    readonly_fields = ['occupied_slots', 'held_slots']
     ordering = ['name']
 
 @admin.register(Visit)
@@ -28,10 +41,11 @@ class VisitAdmin(admin.ModelAdmin):
     list_display = [
         'day',
         'total_slots',
-        'occupied_slots'
+        'occupied_slots',
+        'held_slots'
     ]
     list_filter = ['day']
-    readonly_fields = ['occupied_slots']
+    readonly_fields = ['occupied_slots', 'held_slots']
     ordering = ['-day']
 
     def get_readonly_fields(self, request, obj=None):
@@ -45,5 +59,122 @@ class VisitAdmin(admin.ModelAdmin):
             list: Lista de campos de solo lectura
         """
         if obj:  # Si es edición
-            return ['day', 'occupied_slots']
-        return ['occupied_slots']  # Si es creación
+            return ['day', 'occupied_slots', 'held_slots']
+        return ['occupied_slots', 'held_slots']  # Si es creación
+
+
+class ReservationLineInline(admin.TabularInline):
+    """Líneas de ticket de una reserva (solo lectura)."""
+    model = ReservationLine
+    extra = 0
+    readonly_fields = ['ticket', 'quantity']
+    can_delete = False
+
+
+@admin.register(Reservation)
+class ReservationAdmin(admin.ModelAdmin):
+    """Configuración del panel de administración para Reservas.
+
+    Las reservas solo cambian de estado mediante ``ReservationService``, por
+    lo que se muestran en modo de solo lectura.
+    """
+    list_display = [
+        'id',
+        'visit',
+        'user',
+        'quantity',
+        'status',
+        'expires_at',
+        'created_at'
+    ]
+    list_filter = ['status']
+    search_fields = ['payment_intent_id', 'user__username']
+    list_select_related = ['visit', 'user']
+    inlines = [ReservationLineInline]
+    ordering = ['-created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class TicketOrderLineInline(admin.TabularInline):
+    """Líneas de ticket de una orden (solo lectura)."""
+    model = TicketOrderLine
+    extra = 0
+    readonly_fields = ['ticket', 'quantity', 'unit_price']
+    can_delete = False
+
+
+class ETicketInline(admin.TabularInline):
+    """Tickets electrónicos emitidos para una orden (solo lectura)."""
+    model = ETicket
+    extra = 0
+    fields = ['code', 'line', 'sequence', 'png', 'pdf']
+    readonly_fields = fields
+    can_delete = False
+
+
+@admin.register(TicketOrder)
+class TicketOrderAdmin(admin.ModelAdmin):
+    """Configuración del panel de administración para Órdenes de tickets."""
+    list_display = [
+        'id',
+        'visit',
+        'user',
+        'total',
+        'currency',
+        'status',
+        'issued_at',
+        'created_at'
+    ]
+    list_filter = ['status', 'currency']
+    search_fields = ['user__username', 'reservation__payment_intent_id']
+    list_select_related = ['visit', 'user']
+    inlines = [TicketOrderLineInline, ETicketInline]
+    ordering = ['-created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class WeekdayCapacityInline(admin.TabularInline):
+    """Reglas de cupo por día de la semana de una plantilla."""
+    model = WeekdayCapacity
+    extra = 0
+
+
+@admin.register(CapacityTemplate)
+class CapacityTemplateAdmin(admin.ModelAdmin):
+    """Configuración del panel de administración para Plantillas de Cupos.
+
+    Los cambios se aplican a las visitas con el comando
+    ``extend_visit_horizon`` o el endpoint ``visits/provision/``.
+    """
+    list_display = ['name', 'default_slots', 'is_active']
+    list_filter = ['is_active']
+    inlines = [WeekdayCapacityInline]
+
+
+@admin.register(CapacityOverride)
+class CapacityOverrideAdmin(admin.ModelAdmin):
+    """Configuración del panel de administración para Excepciones de Cupo."""
+    list_display = ['start_date', 'end_date', 'total_slots', 'is_closure', 'reason']
+    list_filter = ['is_closure']
+    search_fields = ['reason']
+    ordering = ['-start_date']
+
+
+@admin.register(PricingRule)
+class PricingRuleAdmin(admin.ModelAdmin):
+    """Configuración del panel de administración para Reglas de Precio."""
+    list_display = ['name', 'kind', 'ticket', 'threshold', 'multiplier', 'is_active']
+    list_filter = ['kind', 'is_active']
+    list_editable = ['is_active']
+    list_select_related = ['ticket']
+    search_fields = ['name']
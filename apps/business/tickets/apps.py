@@ -3,4 +3,8 @@ from django.apps import AppConfig
 
 class TicketsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.business.tickets'
\ No newline at end of file
+    name = 'apps.business.tickets'
+
+    def ready(self):
+        """Importa las señales cuando la aplicación esté lista"""
+        import apps.business.tickets.signals
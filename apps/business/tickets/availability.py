@@ -0,0 +1,117 @@
+"""Calendario de disponibilidad de visitas con caché por mes.
+
+La disponibilidad de cada día (``total_slots - occupied_slots - held_slots``)
+se calcula en la base de datos y se guarda en caché agrupada por mes. Cada
+entrada se invalida cuando cambian los contadores de alguna visita del mes
+(señal ``slots_changed``) o cuando se crea, edita o elimina una visita.
+
+Las cotizaciones de ``pricing`` dependen de la ocupación y se invalidan
+junto con el calendario.
+
+Con varios procesos la caché debe ser compartida (``REDIS_URL``) para que
+la invalidación alcance a todos.
+"""
+
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import Visit
+from .pricing import price_cache_keys
+
+CACHE_KEY = 'tickets:calendar:{}'
+
+
+def month_of(day):
+    """Periodo AAAAMM de una fecha."""
+    return day.year * 100 + day.month
+
+
+def months_between(start, end):
+    """Lista los periodos AAAAMM entre dos fechas, inclusive."""
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append(year * 100 + month)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def _month_bounds(periodo):
+    year, month = divmod(periodo, 100)
+    first = date(year, month, 1)
+    last = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return first, last
+
+
+def _load(months):
+    """Calcula la disponibilidad de varios meses con una sola consulta.
+
+    Returns:
+        dict: {periodo: [[día ISO, cupos restantes], ...]} para cada mes pedido.
+    """
+    data = {periodo: [] for periodo in months}
+    start = _month_bounds(min(months))[0]
+    end = _month_bounds(max(months))[1]
+    rows = (
+        Visit.objects.filter(day__gte=start, day__lt=end)
+        .annotate(remaining=F('total_slots') - F('occupied_slots') - F('held_slots'))
+        .order_by('day')
+        .values_list('day', 'remaining')
+    )
+    for day, remaining in rows:
+        periodo = month_of(day)
+        if periodo in data:
+            data[periodo].append([day.isoformat(), max(remaining, 0)])
+    return data
+
+
+def get_calendar(start, end):
+    """Obtiene la disponibilidad diaria entre dos fechas.
+
+    Los meses que no están en caché se calculan juntos en una sola consulta
+    y se guardan para las siguientes solicitudes.
+
+    Args:
+        start (date): Primer día del rango.
+        end (date): Último día del rango (inclusive).
+
+    Returns:
+        list: Pares [día ISO, cupos restantes] ordenados por día.
+    """
+    months = months_between(start, end)
+    keys = {periodo: CACHE_KEY.format(periodo) for periodo in months}
+    cached = cache.get_many(keys.values())
+    data = {periodo: cached[key] for periodo, key in keys.items() if key in cached}
+
+    missing = [periodo for periodo in months if periodo not in data]
+    if missing:
+        loaded = _load(missing)
+        cache.set_many(
+            {keys[periodo]: days for periodo, days in loaded.items()},
+            getattr(settings, 'TICKET_CALENDAR_CACHE_TIMEOUT', 3600),
+        )
+        data.update(loaded)
+
+    first, last = start.isoformat(), end.isoformat()
+    return [
+        entry
+        for periodo in months
+        for entry in data[periodo]
+        if first <= entry[0] <= last
+    ]
+
+
+def invalidate_days(days):
+    """Elimina de la caché el calendario y las cotizaciones de los meses de las fechas indicadas."""
+    months = {month_of(day) for day in days}
+    if not months:
+        return
+    cache.delete_many([CACHE_KEY.format(periodo) for periodo in months] + price_cache_keys(months))
+
+
+def invalidate_visits(pks):
+    """Elimina de la caché los meses de las visitas indicadas."""
+    invalidate_days(Visit.objects.filter(pk__in=pks).values_list('day', flat=True))
@@ -0,0 +1,478 @@
+"""Backends de contadores de cupos para visitas y tickets.
+
+Todas las operaciones sobre los contadores de cupos (ocupar, liberar,
+retener, confirmar) pasan por un backend configurable con
+``settings.TICKET_SLOT_COUNTER['BACKEND']``:
+
+    database: Contadores en las columnas ``occupied_slots`` y ``held_slots``
+        mediante ``UPDATE`` condicionales (comportamiento por defecto).
+    redis: Contadores en Redis actualizados con scripts Lua de verificación
+        e incremento. La base de datos se actualiza periódicamente con el
+        comando ``reconcile_slot_counters``.
+    memory: Equivalente en memoria del backend de Redis, para pruebas.
+
+En los backends externos las columnas de la base de datos son un reflejo
+del último reconciliado, no la fuente de verdad.
+
+Ejemplo:
+
+```python
+from apps.business.tickets.counters import SlotChange, get_slot_counter
+
+failed = get_slot_counter().apply('reserve', [SlotChange(Visit, visit.pk, 2)])
+if failed is not None:
+    ...  # Sin cupo para failed.model / failed.pk
+```
+"""
+
+import itertools
+import logging
+import threading
+from collections import defaultdict, namedtuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import Signal, receiver
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ('reserve', 'release', 'hold', 'release_hold', 'confirm_hold')
+
+DEFAULT_SLOT_COUNTER = {
+    'BACKEND': 'database',
+    'KEY_PREFIX': 'tickets',
+    'REDIS_ALIAS': 'default',
+}
+
+SlotChange = namedtuple('SlotChange', ['model', 'pk', 'slots'])
+SlotChange.__doc__ = 'Cambio de cupos sobre un registro de Visit o Ticket.'
+
+# Se envía cuando cambian los contadores guardados en la base de datos,
+# con ``sender`` = modelo y ``pks`` = IDs afectados, después del commit.
+slots_changed = Signal()
+
+
+def _notify(changes):
+    """Envía ``slots_changed`` por modelo al confirmar la transacción activa."""
+    by_model = defaultdict(set)
+    for change in changes:
+        by_model[change.model].add(change.pk)
+
+    def send():
+        for model, pks in by_model.items():
+            slots_changed.send(sender=model, pks=pks)
+    transaction.on_commit(send)
+
+
+def _check(op, changes):
+    if op not in OPERATIONS:
+        raise ValueError(f'Operación de cupos inválida: {op}')
+    for change in changes:
+        if change.slots <= 0:
+            raise ValueError('La cantidad de cupos debe ser un número positivo')
+
+
+def _allowed(op, counter, slots):
+    """Evalúa la condición de una operación sobre un contador (total, occupied, held)."""
+    if op in ('reserve', 'hold'):
+        return counter['occupied'] + counter['held'] + slots <= counter['total']
+    if op == 'release':
+        return counter['occupied'] >= slots
+    return counter['held'] >= slots
+
+
+def _mutate(op, counter, slots):
+    if op == 'reserve':
+        counter['occupied'] += slots
+    elif op == 'release':
+        counter['occupied'] -= slots
+    elif op == 'hold':
+        counter['held'] += slots
+    elif op == 'release_hold':
+        counter['held'] -= slots
+    else:
+        counter['held'] -= slots
+        counter['occupied'] += slots
+
+
+class SlotCounterBackend:
+    """Interfaz de los backends de contadores de cupos.
+
+    Attributes:
+        transactional (bool): True si las operaciones participan de la
+            transacción de base de datos activa (y se revierten con ella).
+    """
+
+    transactional = False
+
+    def apply(self, op, changes):
+        """Aplica una operación a varios contadores de forma atómica.
+
+        O se aplican todos los cambios o ninguno.
+
+        Args:
+            op (str): Una de ``OPERATIONS``.
+            changes (list): Lista de ``SlotChange`` sin registros repetidos.
+
+        Returns:
+            SlotChange: El primer cambio que no cumplió su condición, o None
+            si todos se aplicaron.
+        """
+        raise NotImplementedError
+
+    def apply_on_commit(self, op, changes):
+        """Aplica una operación que no puede fallar por cupo al confirmar la transacción.
+
+        Se usa para liberar y confirmar cupos después de cambiar el estado de
+        una reserva, de modo que un backend externo no quede modificado si
+        la transacción se revierte.
+        """
+        def apply():
+            failed = self.apply(op, changes)
+            if failed is not None:
+                logger.error('No se pudo aplicar %s sobre %s', op, failed)
+
+        if self.transactional:
+            apply()
+        else:
+            transaction.on_commit(apply)
+
+    def sync_total(self, instance):
+        """Actualiza el cupo total de un registro tras editarlo."""
+
+    def reconcile(self, batch_size=500):
+        """Escribe en la base de datos los contadores modificados.
+
+        Returns:
+            int: Cantidad de registros actualizados.
+        """
+        return 0
+
+
+class DatabaseSlotCounter(SlotCounterBackend):
+    """Contadores en la base de datos mediante ``SlotQuerySet``."""
+
+    transactional = True
+
+    class _Failed(Exception):
+        def __init__(self, change):
+            self.change = change
+
+    def apply(self, op, changes):
+        _check(op, changes)
+        try:
+            with transaction.atomic():
+                for change in changes:
+                    if not getattr(change.model.objects, op)(change.pk, change.slots):
+                        raise self._Failed(change)
+        except self._Failed as exc:
+            return exc.change
+        _notify(changes)
+        return None
+
+
+class ExternalSlotCounter(SlotCounterBackend):
+    """Base de los backends que guardan los contadores fuera de la base de datos.
+
+    Cada registro se inicializa desde la base de datos la primera vez que se
+    usa. Los registros modificados se marcan como pendientes y
+    ``reconcile`` los escribe de vuelta en lote.
+    """
+
+    def __init__(self, key_prefix='tickets'):
+        self.key_prefix = key_prefix
+
+    def key(self, model, pk):
+        """Llave del contador de un registro."""
+        return f'{self.key_prefix}:{{slots}}:{model._meta.label_lower}:{pk}'
+
+    def parse_key(self, key):
+        """Obtiene (modelo, pk) a partir de una llave de contador."""
+        label, pk = key.rsplit(':', 2)[-2:]
+        return apps.get_model(label), int(pk)
+
+    @staticmethod
+    def load(model, pks):
+        """Lee los contadores actuales de la base de datos.
+
+        Returns:
+            dict: {pk: {'total', 'occupied', 'held'}} de los registros existentes.
+        """
+        return {
+            pk: {'total': total, 'occupied': occupied, 'held': held}
+            for pk, total, occupied, held in model.objects.filter(pk__in=pks).values_list(
+                'pk', 'total_slots', 'occupied_slots', 'held_slots'
+            )
+        }
+
+    def _seed_missing(self, changes, exists):
+        """Inicializa desde la base de datos los contadores que no existen.
+
+        Returns:
+            SlotChange: Un cambio cuyo registro no existe en la base de datos, o None.
+        """
+        missing = defaultdict(list)
+        for change in changes:
+            if not exists(self.key(change.model, change.pk)):
+                missing[change.model].append(change.pk)
+        for model, pks in missing.items():
+            rows = self.load(model, pks)
+            for pk in pks:
+                if pk not in rows:
+                    return next(c for c in changes if c.model is model and c.pk == pk)
+                self.seed(self.key(model, pk), rows[pk])
+        return None
+
+    def seed(self, key, counter):
+        raise NotImplementedError
+
+    def write_back(self, values):
+        """Escribe en la base de datos los contadores reconciliados.
+
+        Args:
+            values (dict): {llave: {'occupied', 'held'}}.
+
+        Returns:
+            int: Cantidad de registros actualizados.
+        """
+        by_model = defaultdict(list)
+        for key, counter in values.items():
+            model, pk = self.parse_key(key)
+            by_model[model].append(
+                model(pk=pk, occupied_slots=counter['occupied'], held_slots=counter['held'])
+            )
+        updated = 0
+        for model, objs in by_model.items():
+            updated += model.objects.bulk_update(objs, ['occupied_slots', 'held_slots'])
+            _notify([SlotChange(model, obj.pk, 1) for obj in objs])
+        return updated
+
+
+class InMemorySlotCounter(ExternalSlotCounter):
+    """Contadores en memoria del proceso, con la misma semántica que Redis.
+
+    Pensado para pruebas: no se comparte entre procesos.
+    """
+
+    def __init__(self, key_prefix='tickets'):
+        super().__init__(key_prefix)
+        self.counters = {}
+        self.dirty = set()
+        self._lock = threading.Lock()
+
+    def seed(self, key, counter):
+        with self._lock:
+            self.counters.setdefault(key, dict(counter))
+
+    def apply(self, op, changes):
+        _check(op, changes)
+        failed = self._seed_missing(changes, lambda key: key in self.counters)
+        if failed is not None:
+            return failed
+        keys = [self.key(change.model, change.pk) for change in changes]
+        with self._lock:
+            for key, change in zip(keys, changes):
+                if not _allowed(op, self.counters[key], change.slots):
+                    return change
+            for key, change in zip(keys, changes):
+                _mutate(op, self.counters[key], change.slots)
+            self.dirty.update(keys)
+        return None
+
+    def sync_total(self, instance):
+        key = self.key(type(instance), instance.pk)
+        with self._lock:
+            if key in self.counters:
+                self.counters[key]['total'] = instance.total_slots
+
+    def reconcile(self, batch_size=500):
+        with self._lock:
+            keys = list(itertools.islice(self.dirty, batch_size))
+            values = {key: dict(self.counters[key]) for key in keys}
+        updated = self.write_back(values)
+        with self._lock:
+            self.dirty.difference_update(
+                key for key in keys
+                if (self.counters[key]['occupied'], self.counters[key]['held'])
+                == (values[key]['occupied'], values[key]['held'])
+            )
+        return updated
+
+
+# Verifica y aplica la operación sobre todas las llaves o sobre ninguna.
+# KEYS: llaves de contadores seguidas de la llave del conjunto de pendientes.
+# ARGV: operación seguida de la cantidad de cupos de cada llave.
+# Retorna {0, 0} si se aplicó, {-2, i} si la llave i no existe y {-1, i} si
+# la llave i no cumple la condición.
+APPLY_SCRIPT = """
+local op = ARGV[1]
+local count = #KEYS - 1
+local counters = {}
+for i = 1, count do
+    local values = redis.call('HMGET', KEYS[i], 'total', 'occupied', 'held')
+    if not values[1] then
+        return {-2, i}
+    end
+    local total, occupied, held = tonumber(values[1]), tonumber(values[2]), tonumber(values[3])
+    local n = tonumber(ARGV[i + 1])
+    local ok
+    if op == 'reserve' or op == 'hold' then
+        ok = occupied + held + n <= total
+    elseif op == 'release' then
+        ok = occupied >= n
+    else
+        ok = held >= n
+    end
+    if not ok then
+        return {-1, i}
+    end
+end
+for i = 1, count do
+    local n = tonumber(ARGV[i + 1])
+    if op == 'reserve' then
+        redis.call('HINCRBY', KEYS[i], 'occupied', n)
+    elseif op == 'release' then
+        redis.call('HINCRBY', KEYS[i], 'occupied', -n)
+    elseif op == 'hold' then
+        redis.call('HINCRBY', KEYS[i], 'held', n)
+    elseif op == 'release_hold' then
+        redis.call('HINCRBY', KEYS[i], 'held', -n)
+    else
+        redis.call('HINCRBY', KEYS[i], 'held', -n)
+        redis.call('HINCRBY', KEYS[i], 'occupied', n)
+    end
+    redis.call('SADD', KEYS[#KEYS], KEYS[i])
+end
+return {0, 0}
+"""
+
+# Quita del conjunto de pendientes las llaves ya escritas en la base de datos
+# que no cambiaron mientras tanto.
+# KEYS: llaves de contadores seguidas de la llave del conjunto de pendientes.
+# ARGV: cupos ocupados y retenidos escritos de cada llave ('' si no existía).
+RECONCILED_SCRIPT = """
+local dirty = KEYS[#KEYS]
+for i = 1, #KEYS - 1 do
+    local values = redis.call('HMGET', KEYS[i], 'occupied', 'held')
+    if (values[1] or '') == ARGV[2 * i - 1] and (values[2] or '') == ARGV[2 * i] then
+        redis.call('SREM', dirty, KEYS[i])
+    end
+end
+return 0
+"""
+
+SYNC_TOTAL_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HSET', KEYS[1], 'total', ARGV[1])
+end
+return 0
+"""
+
+
+class RedisSlotCounter(ExternalSlotCounter):
+    """Contadores en Redis con verificación e incremento en scripts Lua.
+
+    Redis ejecuta cada script de forma atómica y en memoria, por lo que los
+    checkouts concurrentes de un mismo día no esperan por bloqueos de fila
+    en la base de datos. Todas las llaves comparten la etiqueta ``{slots}``
+    para que una orden con varias líneas se aplique en un solo script
+    también en Redis Cluster.
+    """
+
+    def __init__(self, client, key_prefix='tickets'):
+        super().__init__(key_prefix)
+        self.client = client
+        self.dirty_key = f'{key_prefix}:{{slots}}:dirty'
+        self._apply = client.register_script(APPLY_SCRIPT)
+        self._sync_total = client.register_script(SYNC_TOTAL_SCRIPT)
+        self._reconciled = client.register_script(RECONCILED_SCRIPT)
+
+    def seed(self, key, counter):
+        pipe = self.client.pipeline()
+        for field, value in counter.items():
+            pipe.hsetnx(key, field, value)
+        pipe.execute()
+
+    def apply(self, op, changes):
+        _check(op, changes)
+        keys = [self.key(change.model, change.pk) for change in changes]
+        args = [op] + [change.slots for change in changes]
+        for _ in range(2):
+            status, index = self._apply(keys=keys + [self.dirty_key], args=args)
+            if status == 0:
+                return None
+            if status == -1:
+                return changes[index - 1]
+            failed = self._seed_missing(changes, lambda key: self.client.exists(key))
+            if failed is not None:
+                return failed
+        return changes[index - 1]
+
+    def sync_total(self, instance):
+        self._sync_total(keys=[self.key(type(instance), instance.pk)], args=[instance.total_slots])
+
+    def reconcile(self, batch_size=500):
+        # Las llaves siguen pendientes hasta escribirlas: si write_back falla,
+        # el siguiente reconciliado las vuelve a tomar
+        keys = [
+            key.decode() if isinstance(key, bytes) else key
+            for key in self.client.srandmember(self.dirty_key, batch_size) or []
+        ]
+        if not keys:
+            return 0
+        pipe = self.client.pipeline()
+        for key in keys:
+            pipe.hmget(key, 'occupied', 'held')
+        read = list(zip(keys, pipe.execute()))
+        values = {
+            key: {'occupied': int(occupied), 'held': int(held)}
+            for key, (occupied, held) in read
+            if occupied is not None
+        }
+        updated = self.write_back(values)
+        # Solo se quitan las que no cambiaron desde la lectura; las demás se escriben de nuevo
+        args = [
+            '' if value is None else value.decode() if isinstance(value, bytes) else value
+            for _, counter in read
+            for value in counter
+        ]
+        self._reconciled(keys=keys + [self.dirty_key], args=args)
+        return updated
+
+
+def _build_slot_counter():
+    config = {**DEFAULT_SLOT_COUNTER, **getattr(settings, 'TICKET_SLOT_COUNTER', {})}
+    backend = config['BACKEND']
+    if backend == 'database':
+        return DatabaseSlotCounter()
+    if backend == 'memory':
+        return InMemorySlotCounter(config['KEY_PREFIX'])
+    if backend == 'redis':
+        from django_redis import get_redis_connection
+
+        return RedisSlotCounter(get_redis_connection(config['REDIS_ALIAS']), config['KEY_PREFIX'])
+    raise ValueError(f'Backend de contadores de cupos inválido: {backend}')
+
+
+_slot_counter = None
+_slot_counter_lock = threading.Lock()
+
+
+def get_slot_counter():
+    """Obtiene el backend de contadores de cupos configurado."""
+    global _slot_counter
+    if _slot_counter is None:
+        with _slot_counter_lock:
+            if _slot_counter is None:
+                _slot_counter = _build_slot_counter()
+    return _slot_counter
+
+
+@receiver(setting_changed)
+def reset_slot_counter(setting, **kwargs):
+    """Reconstruye el backend cuando cambia la configuración (p. ej. en pruebas)."""
+    global _slot_counter
+    if setting == 'TICKET_SLOT_COUNTER':
+        _slot_counter = None
@@ -0,0 +1,30 @@
+import django_filters
+
+from .models import Ticket, Visit
+
+
+class TicketFilter(django_filters.FilterSet):
+    """Filtros de tickets, incluido el cupo restante anotado en la consulta."""
+    available_slots_min = django_filters.NumberFilter(field_name='remaining_slots', lookup_expr='gte')
+    available_slots_max = django_filters.NumberFilter(field_name='remaining_slots', lookup_expr='lte')
+    has_available_slots = django_filters.BooleanFilter(method='filter_has_available_slots')
+
+    class Meta:
+        model = Ticket
+        fields = ['currency']
+
+    def filter_has_available_slots(self, queryset, name, value):
+        """Filtra por ``remaining_slots__gt=0`` (o su negación)."""
+        if value:
+            return queryset.filter(remaining_slots__gt=0)
+        return queryset.filter(remaining_slots__lte=0)
+
+
+class VisitFilter(TicketFilter):
+    """Filtros de visitas por rango de fechas y cupo restante."""
+    day_from = django_filters.DateFilter(field_name='day', lookup_expr='gte')
+    day_to = django_filters.DateFilter(field_name='day', lookup_expr='lte')
+
+    class Meta:
+        model = Visit
+        fields = ['day']
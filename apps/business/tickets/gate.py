@@ -0,0 +1,352 @@
+"""Validación de tickets en los torniquetes de entrada.
+
+El código QR de cada ticket electrónico es un token firmado con HMAC
+(``sign_ticket``) que un torniquete puede verificar sin conexión con la
+clave compartida ``TICKET_GATE['SIGNING_KEY']``.
+
+Con conexión, el endpoint de escaneo valida la redención contra un índice
+en memoria por día (``RedemptionIndex``) sin consultar la base de datos:
+al primer escaneo de un día se cargan los IDs de tickets válidos y ya
+usados, y las redenciones nuevas se escriben en la base de datos por lotes
+desde un hilo en segundo plano. En cada escritura también se incorporan las
+redenciones hechas por otros procesos desde la sincronización anterior.
+
+El índice es propio de cada proceso: entre dos sincronizaciones, dos
+procesos distintos podrían aceptar el mismo ticket. Las redenciones
+duplicadas se detectan al escribir y quedan en el log.
+
+Configuración (``settings.TICKET_GATE``):
+    SIGNING_KEY (str): Clave HMAC compartida con los torniquetes.
+    ASYNC (bool): Si es False cada redención se escribe de inmediato.
+    BATCH_SIZE (int): Redenciones por escritura.
+    FLUSH_INTERVAL (float): Segundos máximos entre escrituras.
+"""
+
+import atexit
+import base64
+import hashlib
+import hmac
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ETicket, TicketOrder
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION = 'T1'
+SIGNATURE_LENGTH = 16
+
+DEFAULT_TICKET_GATE = {
+    'SIGNING_KEY': None,
+    'ASYNC': True,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 1.0,
+}
+
+ScanResult = namedtuple('ScanResult', ['status', 'ticket_id', 'day'])
+
+SCAN_OK = 'ok'
+SCAN_INVALID = 'invalid'
+SCAN_WRONG_DAY = 'wrong_day'
+SCAN_NOT_VALID = 'not_valid'
+SCAN_ALREADY_USED = 'already_used'
+
+
+def get_config():
+    """Configuración de torniquetes combinada con los valores por defecto."""
+    return {**DEFAULT_TICKET_GATE, **getattr(settings, 'TICKET_GATE', {})}
+
+
+def _signing_key():
+    return (get_config()['SIGNING_KEY'] or settings.SECRET_KEY).encode()
+
+
+def _signature(message):
+    digest = hmac.new(_signing_key(), message.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode()[:SIGNATURE_LENGTH]
+
+
+def sign_ticket(ticket_id, day):
+    """Genera el token firmado de un ticket electrónico.
+
+    Args:
+        ticket_id (int): ID del ``ETicket``.
+        day (date): Día de la visita para el que es válido.
+
+    Returns:
+        str: Token con el formato ``T1.<id>.<AAAAMMDD>.<firma>``.
+    """
+    message = f'{TOKEN_VERSION}.{ticket_id}.{day:%Y%m%d}'
+    return f'{message}.{_signature(message)}'
+
+
+def verify_token(token):
+    """Verifica la firma de un token sin consultar la base de datos.
+
+    Args:
+        token (str): Token leído del código QR.
+
+    Returns:
+        tuple: (ID del ticket, día) o None si el token no es válido.
+    """
+    try:
+        version, ticket_id, day, signature = token.split('.')
+        if version != TOKEN_VERSION:
+            return None
+        message = f'{version}.{ticket_id}.{day}'
+        if not hmac.compare_digest(signature, _signature(message)):
+            return None
+        return int(ticket_id), datetime.strptime(day, '%Y%m%d').date()
+    except (AttributeError, ValueError):
+        return None
+
+
+class RedemptionIndex:
+    """Índice en memoria, por día, de tickets válidos y ya redimidos.
+
+    ``redeem`` solo toca memoria; las redenciones se acumulan en una lista
+    pendiente que ``flush`` escribe en la base de datos.
+
+    Attributes:
+        batch_size (int): Redenciones por escritura.
+        flush_interval (float): Segundos máximos entre escrituras.
+        enabled (bool): Si es False cada redención se escribe de inmediato.
+    """
+
+    def __init__(self, batch_size=500, flush_interval=1.0, enabled=True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self._days = {}
+        self._pending = []
+        self._synced_at = timezone.now()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_settings(cls):
+        """Crea un índice a partir de ``settings.TICKET_GATE``."""
+        config = get_config()
+        return cls(
+            batch_size=config['BATCH_SIZE'],
+            flush_interval=config['FLUSH_INTERVAL'],
+            enabled=config['ASYNC'],
+        )
+
+    def load_day(self, day):
+        """Carga (o recarga) los tickets válidos y redimidos de un día.
+
+        Returns:
+            tuple: (set de IDs válidos, set de IDs redimidos).
+        """
+        rows = ETicket.objects.filter(
+            order__visit__day=day, order__status=TicketOrder.STATUS_PAID
+        ).values_list('pk', 'redeemed_at')
+        valid, redeemed = set(), set()
+        for pk, redeemed_at in rows:
+            valid.add(pk)
+            if redeemed_at is not None:
+                redeemed.add(pk)
+        return self.prime(day, valid, redeemed)
+
+    def prime(self, day, valid, redeemed=()):
+        """Reemplaza en memoria los tickets válidos y redimidos de un día.
+
+        Returns:
+            tuple: (set de IDs válidos, set de IDs redimidos).
+        """
+        valid, redeemed = set(valid), set(redeemed)
+        with self._lock:
+            redeemed.update(pk for pk, pending_day, _, _ in self._pending if pending_day == day)
+            self._days[day] = (valid, redeemed)
+        return valid, redeemed
+
+    def _sets_for(self, day):
+        sets = self._days.get(day)
+        if sets is None:
+            sets = self.load_day(day)
+        return sets
+
+    def _is_valid(self, ticket_id, day, valid):
+        if ticket_id in valid:
+            return True
+        # Ticket emitido después de cargar el día
+        if ETicket.objects.filter(
+            pk=ticket_id, order__visit__day=day, order__status=TicketOrder.STATUS_PAID
+        ).exists():
+            with self._lock:
+                valid.add(ticket_id)
+            return True
+        return False
+
+    def redeem(self, ticket_id, day, gate=''):
+        """Marca un ticket como usado si es válido y no se había usado.
+
+        Args:
+            ticket_id (int): ID del ``ETicket``.
+            day (date): Día de la visita.
+            gate (str): Identificador del torniquete.
+
+        Returns:
+            str: ``SCAN_OK``, ``SCAN_NOT_VALID`` o ``SCAN_ALREADY_USED``.
+        """
+        valid, redeemed = self._sets_for(day)
+        if not self._is_valid(ticket_id, day, valid):
+            return SCAN_NOT_VALID
+
+        with self._lock:
+            if ticket_id in redeemed:
+                return SCAN_ALREADY_USED
+            redeemed.add(ticket_id)
+            self._pending.append((ticket_id, day, timezone.now(), gate))
+            pending = len(self._pending)
+
+        if not self.enabled:
+            self.flush()
+        else:
+            self._ensure_started()
+            if pending >= self.batch_size:
+                self._wakeup.set()
+        return SCAN_OK
+
+    def flush(self):
+        """Escribe las redenciones pendientes y trae las de otros procesos.
+
+        Returns:
+            int: Cantidad de redenciones escritas.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                days = list(self._days)
+            synced_at = timezone.now()
+            try:
+                self._write(batch)
+            except Exception:
+                with self._lock:
+                    self._pending[:0] = batch
+                logger.exception('Error al escribir %s redenciones de tickets', len(batch))
+                return 0
+            self._pull(days, since=self._synced_at)
+            self._synced_at = synced_at
+            return len(batch)
+
+    def _write(self, batch):
+        if not batch:
+            return
+        ids = [ticket_id for ticket_id, _, _, _ in batch]
+        duplicated = set(
+            ETicket.objects.filter(pk__in=ids, redeemed_at__isnull=False).values_list('pk', flat=True)
+        )
+        if duplicated:
+            logger.warning('Tickets redimidos en más de un proceso: %s', sorted(duplicated))
+        ETicket.objects.bulk_update(
+            [
+                ETicket(pk=ticket_id, redeemed_at=redeemed_at, redeemed_gate=gate)
+                for ticket_id, _, redeemed_at, gate in batch
+                if ticket_id not in duplicated
+            ],
+            ['redeemed_at', 'redeemed_gate'],
+            batch_size=self.batch_size,
+        )
+
+    def _pull(self, days, since):
+        if not days:
+            return
+        rows = ETicket.objects.filter(
+            order__visit__day__in=days, redeemed_at__gte=since
+        ).values_list('pk', 'order__visit__day')
+        with self._lock:
+            for pk, day in rows:
+                if day in self._days:
+                    self._days[day][1].add(pk)
+
+    def evict_before(self, day):
+        """Descarta de memoria los días anteriores a ``day``."""
+        with self._lock:
+            for loaded in [loaded for loaded in self._days if loaded < day]:
+                del self._days[loaded]
+
+    def stop(self, timeout=5.0):
+        """Detiene el hilo escritor y escribe lo pendiente."""
+        self._stopping.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        self.flush()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._flush_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='gate-redemption-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                self.evict_before(timezone.localdate())
+            finally:
+                close_old_connections()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_redemption_index():
+    """Índice de redenciones compartido del proceso."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = RedemptionIndex.from_settings()
+            atexit.register(_index.stop)
+        return _index
+
+
+@receiver(setting_changed)
+def _reset_redemption_index(setting, **kwargs):
+    global _index
+    if setting == 'TICKET_GATE':
+        with _index_lock:
+            _index = None
+
+
+def scan(token, gate='', today=None, index=None):
+    """Valida un token escaneado en un torniquete y lo redime.
+
+    Args:
+        token (str): Token leído del código QR.
+        gate (str): Identificador del torniquete.
+        today (date): Día de operación; por defecto la fecha local actual.
+        index (RedemptionIndex): Índice a usar; por defecto el del proceso.
+
+    Returns:
+        ScanResult: Estado del escaneo, ID del ticket y día del token.
+    """
+    verified = verify_token(token)
+    if verified is None:
+        return ScanResult(SCAN_INVALID, None, None)
+    ticket_id, day = verified
+    if day != (today or timezone.localdate()):
+        return ScanResult(SCAN_WRONG_DAY, ticket_id, day)
+    status = (index or get_redemption_index()).redeem(ticket_id, day, gate)
+    return ScanResult(status, ticket_id, day)
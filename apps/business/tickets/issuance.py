@@ -0,0 +1,293 @@
+"""Emisión de tickets electrónicos con código QR.
+
+Cuando una orden queda pagada se crean sus ``ETicket`` (uno por persona) y
+se renderizan en PNG y PDF. El renderizado nunca ocurre en el hilo de la
+solicitud: ``schedule_issuance`` encola las órdenes en un despachador en
+segundo plano, que reparte los tickets de cada orden en un pool de hilos.
+
+La plantilla de cada tipo de ticket y día (encabezado y textos) es igual
+para todos sus tickets, por lo que se dibuja una sola vez y se reutiliza
+desde una caché LRU; por ticket solo se dibujan el código QR y su código.
+
+Las órdenes que no se emitieron (p. ej. si el proceso se reinició) se
+recuperan con el comando ``issue_etickets``.
+
+Configuración (``settings.TICKET_ISSUANCE``):
+    ASYNC (bool): Si es False las órdenes se emiten en el hilo que las encola.
+    WORKERS (int): Hilos del pool de renderizado.
+    RENDER_CACHE_SIZE (int): Plantillas guardadas en la caché de renderizado.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+
+import qrcode
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.dispatch import receiver
+from django.utils import timezone
+from PIL import Image, ImageDraw, ImageFont
+
+from .models import ETicket, TicketOrder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TICKET_ISSUANCE = {
+    'ASYNC': True,
+    'WORKERS': 4,
+    'RENDER_CACHE_SIZE': 64,
+}
+
+
+def get_config():
+    """Configuración de emisión combinada con los valores por defecto."""
+    return {**DEFAULT_TICKET_ISSUANCE, **getattr(settings, 'TICKET_ISSUANCE', {})}
+
+
+@dataclass(frozen=True)
+class RenderJob:
+    """Datos necesarios para renderizar un ticket, sin acceso a la base de datos."""
+    code: str
+    payload: str
+    template_key: tuple
+    title: str
+    subtitle: str
+    footer: str
+
+
+class TicketRenderer:
+    """Renderiza tickets en PNG y PDF reutilizando plantillas en caché.
+
+    Es seguro usarlo desde varios hilos: la caché está protegida por un lock
+    y cada ticket trabaja sobre una copia de la plantilla.
+
+    Attributes:
+        cache_size (int): Cantidad máxima de plantillas en caché.
+        hits (int): Renderizados que reutilizaron una plantilla.
+        misses (int): Plantillas dibujadas desde cero.
+    """
+
+    WIDTH = 600
+    HEIGHT = 860
+    HEADER_HEIGHT = 150
+    QR_SIZE = 440
+    BRAND_COLOR = (0, 92, 151)
+
+    def __init__(self, cache_size=64):
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def template(self, key, title, subtitle):
+        """Obtiene la plantilla de un tipo de ticket y día, dibujándola si no está en caché."""
+        with self._lock:
+            image = self._templates.get(key)
+            if image is not None:
+                self._templates.move_to_end(key)
+                self.hits += 1
+                return image
+
+        image = self._draw_template(title, subtitle)
+        with self._lock:
+            self.misses += 1
+            self._templates[key] = image
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.cache_size:
+                self._templates.popitem(last=False)
+        return image
+
+    def _draw_template(self, title, subtitle):
+        image = Image.new('RGB', (self.WIDTH, self.HEIGHT), 'white')
+        draw = ImageDraw.Draw(image)
+        draw.rectangle([0, 0, self.WIDTH, self.HEADER_HEIGHT], fill=self.BRAND_COLOR)
+        draw.text((30, 30), 'Parque Marino', font=ImageFont.load_default(size=40), fill='white')
+        draw.text((30, 95), title, font=ImageFont.load_default(size=28), fill='white')
+        draw.text((30, self.HEADER_HEIGHT + 20), subtitle, font=ImageFont.load_default(size=26), fill='black')
+        return image
+
+    def render(self, job):
+        """Renderiza un ticket.
+
+        Args:
+            job (RenderJob): Datos del ticket.
+
+        Returns:
+            tuple: (bytes PNG, bytes PDF).
+        """
+        image = self.template(job.template_key, job.title, job.subtitle).copy()
+
+        qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=2)
+        qr.add_data(job.payload)
+        qr.make(fit=True)
+        qr_image = qr.make_image().get_image().convert('RGB').resize(
+            (self.QR_SIZE, self.QR_SIZE), Image.NEAREST
+        )
+        top = self.HEADER_HEIGHT + 70
+        image.paste(qr_image, ((self.WIDTH - self.QR_SIZE) // 2, top))
+
+        draw = ImageDraw.Draw(image)
+        font = ImageFont.load_default(size=24)
+        draw.text((30, top + self.QR_SIZE + 30), job.code, font=font, fill='black')
+        draw.text((30, top + self.QR_SIZE + 70), job.footer, font=font, fill='black')
+
+        png, pdf = BytesIO(), BytesIO()
+        image.save(png, format='PNG', optimize=True)
+        image.save(pdf, format='PDF', resolution=150)
+        return png.getvalue(), pdf.getvalue()
+
+
+_state_lock = threading.Lock()
+_renderer = None
+_render_pool = None
+_dispatcher = None
+
+
+def get_renderer():
+    """Renderizador compartido del proceso."""
+    global _renderer
+    with _state_lock:
+        if _renderer is None:
+            _renderer = TicketRenderer(get_config()['RENDER_CACHE_SIZE'])
+        return _renderer
+
+
+def _get_render_pool():
+    global _render_pool
+    with _state_lock:
+        if _render_pool is None:
+            _render_pool = ThreadPoolExecutor(
+                max_workers=get_config()['WORKERS'], thread_name_prefix='eticket-render'
+            )
+        return _render_pool
+
+
+def _get_dispatcher():
+    global _dispatcher
+    with _state_lock:
+        if _dispatcher is None:
+            _dispatcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='eticket-dispatch')
+        return _dispatcher
+
+
+@receiver(setting_changed)
+def _reset_issuance(setting, **kwargs):
+    global _renderer
+    if setting == 'TICKET_ISSUANCE':
+        with _state_lock:
+            _renderer = None
+
+
+def create_etickets(order):
+    """Crea los ``ETicket`` que le falten a una orden, uno por persona.
+
+    Es idempotente: las filas existentes se conservan gracias a la
+    restricción única (línea, secuencia).
+    """
+    ETicket.objects.bulk_create(
+        [
+            ETicket(order=order, line=line, sequence=sequence, code=ETicket.new_code())
+            for line in order.lines.all()
+            for sequence in range(1, line.quantity + 1)
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _job_for(eticket, order):
+    ticket = eticket.line.ticket
+    return RenderJob(
+        code=eticket.code,
+        payload=eticket.qr_payload(),
+        template_key=(ticket.pk, ticket.name, order.visit.day),
+        title=ticket.name,
+        subtitle=f'Visita: {order.visit.day:%d/%m/%Y}',
+        footer=f'Orden {order.pk} - {eticket.sequence}/{eticket.line.quantity}',
+    )
+
+
+def issue_order(order_id):
+    """Emite los tickets electrónicos de una orden pagada.
+
+    Los tickets se renderizan y se guardan en paralelo en el pool de hilos;
+    los trabajadores no acceden a la base de datos. Los nombres de archivo
+    se guardan al final con un solo ``bulk_update``.
+
+    Args:
+        order_id (int): ID de la orden.
+
+    Returns:
+        int: Cantidad de tickets renderizados.
+    """
+    order = TicketOrder.objects.select_related('visit').get(pk=order_id)
+    if order.status != TicketOrder.STATUS_PAID:
+        return 0
+
+    create_etickets(order)
+    pending = list(order.etickets.select_related('line__ticket').filter(png=''))
+    if pending:
+        renderer = get_renderer()
+        storage = ETicket._meta.get_field('png').storage
+        folder = f'etickets/{order.visit.day:%Y/%m}'
+
+        def render_and_store(job):
+            png, pdf = renderer.render(job)
+            return (
+                storage.save(f'{folder}/{job.code}.png', ContentFile(png)),
+                storage.save(f'{folder}/{job.code}.pdf', ContentFile(pdf)),
+            )
+
+        jobs = [_job_for(eticket, order) for eticket in pending]
+        for eticket, (png_name, pdf_name) in zip(pending, _get_render_pool().map(render_and_store, jobs)):
+            eticket.png.name = png_name
+            eticket.pdf.name = pdf_name
+        ETicket.objects.bulk_update(pending, ['png', 'pdf'])
+
+    TicketOrder.objects.filter(pk=order.pk, issued_at__isnull=True).update(issued_at=timezone.now())
+    logger.info('Orden %s: %s tickets electrónicos emitidos', order.pk, len(pending))
+    return len(pending)
+
+
+def _issue_orders(order_ids):
+    issued = 0
+    for order_id in order_ids:
+        try:
+            issued += issue_order(order_id)
+        except Exception:
+            logger.exception('Error al emitir los tickets de la orden %s', order_id)
+    return issued
+
+
+def _dispatch(order_ids):
+    try:
+        _issue_orders(order_ids)
+    finally:
+        close_old_connections()
+
+
+def schedule_issuance(order_ids):
+    """Encola la emisión de tickets de varias órdenes.
+
+    Con ``ASYNC`` activo retorna de inmediato y la emisión ocurre en el hilo
+    despachador; los errores se registran y la orden queda pendiente para
+    ``issue_etickets``.
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return
+    if get_config()['ASYNC']:
+        _get_dispatcher().submit(_dispatch, order_ids)
+    else:
+        _issue_orders(order_ids)
+
+
+def pending_orders():
+    """Órdenes pagadas cuyos tickets electrónicos aún no se emitieron."""
+    return TicketOrder.objects.filter(status=TicketOrder.STATUS_PAID, issued_at__isnull=True)
@@ -0,0 +1,82 @@
+"""
+Comando de gestión para medir el rendimiento del escaneo en torniquetes
+
+Genera tokens firmados para tickets sintéticos de un día y los escanea en
+memoria con ``gate.scan``, en el mismo camino que el endpoint de escaneo
+(verificación HMAC y redención en el índice), sin escribir en la base de
+datos. Cada token se escanea dos veces: la primera se acepta y la segunda
+se rechaza como ya usado.
+
+Uso:
+    python manage.py benchmark_gate_scan
+    python manage.py benchmark_gate_scan --tickets 50000 --threads 8
+
+Opciones:
+    --tickets: Cantidad de tickets sintéticos
+    --threads: Hilos que escanean en paralelo (simula varios torniquetes)
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.business.tickets import gate
+
+
+class MemoryOnlyIndex(gate.RedemptionIndex):
+    """Índice sin hilo escritor: la medición no escribe en la base de datos."""
+
+    def _ensure_started(self):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Mide los escaneos por segundo de la validación en torniquetes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tickets',
+            type=int,
+            default=20000,
+            help='Cantidad de tickets sintéticos'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=4,
+            help='Hilos que escanean en paralelo'
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        ids = range(1, options['tickets'] + 1)
+        tokens = [gate.sign_ticket(pk, today) for pk in ids]
+
+        index = MemoryOnlyIndex(batch_size=len(tokens) * 2 + 1)
+        index.prime(today, ids)
+
+        for label, expected in (('Primer escaneo', gate.SCAN_OK), ('Reingreso', gate.SCAN_ALREADY_USED)):
+            latencies, statuses, elapsed = self._run(tokens, index, today, options['threads'])
+            rejected = sum(1 for result in statuses if result != expected)
+            latencies.sort()
+            self.stdout.write(
+                f'{label}: {len(tokens) / elapsed:,.0f} escaneos/s, '
+                f'p50 {latencies[len(latencies) // 2] * 1e6:.0f} µs, '
+                f'p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.0f} µs, '
+                f'resultados inesperados: {rejected}'
+            )
+
+    @staticmethod
+    def _run(tokens, index, today, threads):
+        def scan_one(token):
+            started = time.perf_counter()
+            result = gate.scan(token, gate='benchmark', today=today, index=index)
+            return time.perf_counter() - started, result.status
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(scan_one, tokens, chunksize=256))
+        elapsed = time.perf_counter() - started
+        return [latency for latency, _ in results], [result for _, result in results], elapsed
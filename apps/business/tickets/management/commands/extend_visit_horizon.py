@@ -0,0 +1,89 @@
+"""
+Comando de gestión para generar las visitas de los próximos días
+
+Crea las visitas que faltan desde hoy (o --from) hasta el horizonte indicado
+usando la plantilla de cupos activa, y ajusta el cupo total de los días
+existentes cuando la plantilla o sus excepciones cambiaron. Es idempotente:
+ejecutarlo varias veces produce el mismo resultado.
+
+Uso:
+    python manage.py extend_visit_horizon
+    python manage.py extend_visit_horizon --days 365
+    python manage.py extend_visit_horizon --from 2026-01-01 --days 30 --dry-run
+    python manage.py extend_visit_horizon --no-update
+
+Opciones:
+    --days: Cantidad de días a generar (por defecto 365)
+    --from: Primer día (AAAA-MM-DD); por defecto hoy
+    --chunk-size: Filas por sentencia de inserción/actualización
+    --no-update: No modificar el cupo de los días existentes
+    --dry-run: Mostrar el resultado sin escribir en la base de datos
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.business.tickets.provisioning import extend_horizon
+
+
+class Command(BaseCommand):
+    help = 'Genera las visitas de los próximos días según la plantilla de cupos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Cantidad de días a generar'
+        )
+        parser.add_argument(
+            '--from',
+            dest='start',
+            type=str,
+            help='Primer día (AAAA-MM-DD); por defecto hoy'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Filas por sentencia de inserción/actualización'
+        )
+        parser.add_argument(
+            '--no-update',
+            action='store_true',
+            help='No modificar el cupo de los días existentes'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Mostrar el resultado sin escribir en la base de datos'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] <= 0:
+            raise CommandError('--days debe ser un número positivo')
+        start = None
+        if options['start']:
+            try:
+                start = date.fromisoformat(options['start'])
+            except ValueError:
+                raise CommandError('--from debe tener el formato AAAA-MM-DD')
+
+        result = extend_horizon(
+            options['days'],
+            start=start,
+            update_existing=not options['no_update'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+        )
+
+        prefix = '[DRY RUN] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}Visitas creadas: {result.created}, actualizadas: {result.updated}, '
+            f'sin cambios: {result.unchanged}'
+        ))
+        for day in result.conflicts:
+            self.stdout.write(self.style.WARNING(
+                f'{day}: el nuevo cupo es menor que los cupos ya vendidos; no se modificó'
+            ))
@@ -0,0 +1,40 @@
+"""
+Comando de gestión para emitir tickets electrónicos pendientes
+
+Normalmente los tickets se emiten en segundo plano al confirmarse el pago.
+Este comando emite los de las órdenes pagadas que quedaron sin emitir, por
+ejemplo si el proceso se reinició antes de terminar.
+
+Uso:
+    python manage.py issue_etickets
+    python manage.py issue_etickets --order 42
+
+Opciones:
+    --order: Emite solo la orden indicada
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.business.tickets.issuance import issue_order, pending_orders
+
+
+class Command(BaseCommand):
+    help = 'Emite los tickets electrónicos de las órdenes pagadas pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--order',
+            type=int,
+            help='Emite solo la orden indicada'
+        )
+
+    def handle(self, *args, **options):
+        if options['order']:
+            order_ids = [options['order']]
+        else:
+            order_ids = list(pending_orders().values_list('pk', flat=True))
+
+        issued = sum(issue_order(order_id) for order_id in order_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Órdenes procesadas: {len(order_ids)}, tickets emitidos: {issued}'
+        ))
@@ -0,0 +1,55 @@
+"""
+Comando de gestión para reconciliar los contadores de cupos externos
+
+Con TICKET_SLOT_COUNTER['BACKEND'] = 'redis' los cupos ocupados y retenidos
+se llevan en Redis. Este comando escribe en Visit y Ticket los contadores
+modificados desde el último reconciliado. Con el backend de base de datos no
+hace nada.
+
+Uso:
+    python manage.py reconcile_slot_counters
+    python manage.py reconcile_slot_counters --batch-size 1000
+    python manage.py reconcile_slot_counters --interval 5
+
+Opciones:
+    --batch-size: Contadores escritos por lote
+    --interval: Segundos entre reconciliados; si se omite se ejecuta una sola vez
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.business.tickets.counters import get_slot_counter
+
+
+class Command(BaseCommand):
+    help = 'Escribe en la base de datos los contadores de cupos externos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Contadores escritos por lote'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            help='Segundos entre reconciliados; si se omite se ejecuta una sola vez'
+        )
+
+    def handle(self, *args, **options):
+        counter = get_slot_counter()
+        interval = options['interval']
+        while True:
+            updated = 0
+            while True:
+                batch = counter.reconcile(batch_size=options['batch_size'])
+                updated += batch
+                if batch < options['batch_size']:
+                    break
+            self.stdout.write(self.style.SUCCESS(f'Contadores reconciliados: {updated}'))
+            if not interval:
+                return
+            time.sleep(interval)
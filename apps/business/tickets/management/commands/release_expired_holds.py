@@ -0,0 +1,54 @@
+"""
+Comando de gestión para liberar las retenciones de cupos vencidas
+
+Las reservas creadas al iniciar el checkout retienen cupos durante
+TICKET_HOLD_TTL_SECONDS. Este comando libera en lote las que vencieron sin
+que Stripe confirmara el pago. Puede ejecutarse periódicamente (cron) o como
+proceso permanente con --interval.
+
+Uso:
+    python manage.py release_expired_holds
+    python manage.py release_expired_holds --batch-size 1000
+    python manage.py release_expired_holds --interval 30
+
+Opciones:
+    --batch-size: Reservas procesadas por transacción
+    --interval: Segundos entre barridos; si se omite se ejecuta una sola vez
+"""
+
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.business.tickets.services import ReservationService
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Libera las retenciones de cupos vencidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Reservas procesadas por transacción'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            help='Segundos entre barridos; si se omite se ejecuta una sola vez'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            expired = ReservationService.expire_holds(batch_size=options['batch_size'])
+            if expired:
+                logger.info('Retenciones vencidas liberadas: %s', expired)
+            self.stdout.write(self.style.SUCCESS(f'Retenciones liberadas: {expired}'))
+            if not interval:
+                return
+            time.sleep(interval)
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='ticket',
+            constraint=models.CheckConstraint(condition=models.Q(('occupied_slots__lte', models.F('total_slots'))), name='ticket_occupied_lte_total', violation_error_message='Los cupos ocupados no pueden superar los cupos totales.'),
+        ),
+        migrations.AddConstraint(
+            model_name='visit',
+            constraint=models.CheckConstraint(condition=models.Q(('occupied_slots__lte', models.F('total_slots'))), name='visit_occupied_lte_total', violation_error_message='Los cupos ocupados no pueden superar los cupos totales.'),
+        ),
+    ]
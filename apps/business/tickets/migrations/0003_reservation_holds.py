@@ -0,0 +1,95 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:10
+
+import django.db.models.deletion
+import django.db.models.expressions
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0002_slot_capacity_constraints'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Cupos')),
+                ('payment_intent_id', models.CharField(blank=True, db_index=True, max_length=255, verbose_name='Intención de Pago')),
+                ('status', models.CharField(choices=[('HELD', 'Retenida'), ('CONFIRMED', 'Confirmada'), ('RELEASED', 'Liberada'), ('EXPIRED', 'Vencida')], default='HELD', max_length=10, verbose_name='Estado')),
+                ('expires_at', models.DateTimeField(verbose_name='Vence')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('confirmed_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Confirmación')),
+            ],
+            options={
+                'verbose_name': 'Reserva',
+                'verbose_name_plural': 'Reservas',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReservationLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Cantidad')),
+            ],
+            options={
+                'verbose_name': 'Línea de Reserva',
+                'verbose_name_plural': 'Líneas de Reserva',
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name='ticket',
+            name='ticket_occupied_lte_total',
+        ),
+        migrations.RemoveConstraint(
+            model_name='visit',
+            name='visit_occupied_lte_total',
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='held_slots',
+            field=models.PositiveIntegerField(default=0, verbose_name='Cupos Retenidos'),
+        ),
+        migrations.AddField(
+            model_name='visit',
+            name='held_slots',
+            field=models.PositiveIntegerField(default=0, verbose_name='Cupos Retenidos'),
+        ),
+        migrations.AddConstraint(
+            model_name='ticket',
+            constraint=models.CheckConstraint(condition=models.Q(('occupied_slots__lte', django.db.models.expressions.CombinedExpression(models.F('total_slots'), '-', models.F('held_slots')))), name='ticket_slots_within_total', violation_error_message='Los cupos ocupados y retenidos no pueden superar los cupos totales.'),
+        ),
+        migrations.AddConstraint(
+            model_name='visit',
+            constraint=models.CheckConstraint(condition=models.Q(('occupied_slots__lte', django.db.models.expressions.CombinedExpression(models.F('total_slots'), '-', models.F('held_slots')))), name='visit_slots_within_total', violation_error_message='Los cupos ocupados y retenidos no pueden superar los cupos totales.'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ticket_reservations', to=settings.AUTH_USER_MODEL, verbose_name='Usuario'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='visit',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='reservations', to='tickets.visit', verbose_name='Visita'),
+        ),
+        migrations.AddField(
+            model_name='reservationline',
+            name='reservation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='tickets.reservation', verbose_name='Reserva'),
+        ),
+        migrations.AddField(
+            model_name='reservationline',
+            name='ticket',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='reservation_lines', to='tickets.ticket', verbose_name='Ticket'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'expires_at'], name='reservation_status_exp_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0003_reservation_holds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CapacityOverride',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField(verbose_name='Desde')),
+                ('end_date', models.DateField(verbose_name='Hasta')),
+                ('total_slots', models.PositiveIntegerField(default=0, verbose_name='Cupos Totales')),
+                ('is_closure', models.BooleanField(default=False, verbose_name='Cierre')),
+                ('reason', models.CharField(blank=True, max_length=200, verbose_name='Motivo')),
+            ],
+            options={
+                'verbose_name': 'Excepción de Cupo',
+                'verbose_name_plural': 'Excepciones de Cupo',
+                'ordering': ['start_date'],
+                'indexes': [models.Index(fields=['start_date', 'end_date'], name='capacity_override_range_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('end_date__gte', models.F('start_date'))), name='capacity_override_valid_range', violation_error_message='La fecha final no puede ser anterior a la inicial.')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CapacityTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Nombre')),
+                ('default_slots', models.PositiveIntegerField(default=1276, verbose_name='Cupos por Defecto')),
+                ('is_active', models.BooleanField(default=False, verbose_name='Activa')),
+            ],
+            options={
+                'verbose_name': 'Plantilla de Cupos',
+                'verbose_name_plural': 'Plantillas de Cupos',
+                'ordering': ['name'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('is_active',), name='single_active_capacity_template')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WeekdayCapacity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'), (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo')], verbose_name='Día de la Semana')),
+                ('total_slots', models.PositiveIntegerField(verbose_name='Cupos Totales')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekday_rules', to='tickets.capacitytemplate', verbose_name='Plantilla')),
+            ],
+            options={
+                'verbose_name': 'Cupo por Día de la Semana',
+                'verbose_name_plural': 'Cupos por Día de la Semana',
+                'ordering': ['template', 'weekday'],
+                'constraints': [models.UniqueConstraint(fields=('template', 'weekday'), name='unique_template_weekday')],
+            },
+        ),
+    ]
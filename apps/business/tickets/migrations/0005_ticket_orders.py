@@ -0,0 +1,50 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_alter_pago_comprobante'),
+        ('tickets', '0004_capacity_templates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Total')),
+                ('currency', models.CharField(choices=[('CRC', 'Colones'), ('USD', 'Dólares')], default='CRC', max_length=3, verbose_name='Moneda')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente de pago'), ('PAID', 'Pagada'), ('CANCELLED', 'Cancelada'), ('EXPIRED', 'Vencida')], default='PENDING', max_length=10, verbose_name='Estado')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('pago', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ticket_order', to='payments.pago', verbose_name='Pago')),
+                ('reservation', models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, related_name='order', to='tickets.reservation', verbose_name='Reserva')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ticket_orders', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+                ('visit', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='orders', to='tickets.visit', verbose_name='Visita')),
+            ],
+            options={
+                'verbose_name': 'Orden de Tickets',
+                'verbose_name_plural': 'Órdenes de Tickets',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TicketOrderLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Cantidad')),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio Unitario')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='tickets.ticketorder', verbose_name='Orden')),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='order_lines', to='tickets.ticket', verbose_name='Ticket')),
+            ],
+            options={
+                'verbose_name': 'Línea de Orden',
+                'verbose_name_plural': 'Líneas de Orden',
+            },
+        ),
+    ]
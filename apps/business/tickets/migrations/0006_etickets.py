@@ -0,0 +1,39 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:24
+
+import config.storage_backends
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0005_ticket_orders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticketorder',
+            name='issued_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Emisión'),
+        ),
+        migrations.CreateModel(
+            name='ETicket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField(verbose_name='Secuencia')),
+                ('code', models.CharField(max_length=32, unique=True, verbose_name='Código')),
+                ('png', models.FileField(blank=True, storage=config.storage_backends.media_storage, upload_to='etickets/', verbose_name='PNG')),
+                ('pdf', models.FileField(blank=True, storage=config.storage_backends.media_storage, upload_to='etickets/', verbose_name='PDF')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('line', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='etickets', to='tickets.ticketorderline', verbose_name='Línea')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='etickets', to='tickets.ticketorder', verbose_name='Orden')),
+            ],
+            options={
+                'verbose_name': 'Ticket Electrónico',
+                'verbose_name_plural': 'Tickets Electrónicos',
+                'ordering': ['order', 'line', 'sequence'],
+                'constraints': [models.UniqueConstraint(fields=('line', 'sequence'), name='eticket_line_sequence_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0006_etickets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eticket',
+            name='redeemed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Uso'),
+        ),
+        migrations.AddField(
+            model_name='eticket',
+            name='redeemed_gate',
+            field=models.CharField(blank=True, max_length=50, verbose_name='Torniquete'),
+        ),
+        migrations.AddIndex(
+            model_name='eticket',
+            index=models.Index(fields=['redeemed_at'], name='eticket_redeemed_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_eticket_redemption'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nombre')),
+                ('kind', models.CharField(choices=[('OCCUPANCY', 'Ocupación del día (%)'), ('EARLY_BIRD', 'Anticipación (días)'), ('GROUP', 'Tamaño del grupo')], max_length=12, verbose_name='Tipo')),
+                ('threshold', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='Umbral')),
+                ('multiplier', models.DecimalField(decimal_places=3, max_digits=5, verbose_name='Multiplicador')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Activa')),
+                ('ticket', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pricing_rules', to='tickets.ticket', verbose_name='Ticket')),
+            ],
+            options={
+                'verbose_name': 'Regla de Precio',
+                'verbose_name_plural': 'Reglas de Precio',
+                'ordering': ['kind', 'threshold'],
+                'constraints': [models.CheckConstraint(condition=models.Q(('multiplier__gt', 0)), name='pricing_rule_positive_multiplier', violation_error_message='El multiplicador debe ser mayor que cero.')],
+            },
+        ),
+    ]
@@ -1,6 +1,208 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
+from django.db.models import ExpressionWrapper, F
+
+from config.storage_backends import media_storage
+
+from .counters import SlotChange, get_slot_counter
+
+
+def _check_slots(slots):
+    if slots <= 0:
+        raise ValueError('La cantidad de cupos debe ser un número positivo')
+
+
+class SlotQuerySet(models.QuerySet):
+    """QuerySet con operaciones atómicas sobre los contadores de cupos.
+
+    Cada operación es un único ``UPDATE`` condicional evaluado por la base de
+    datos, por lo que dos compras concurrentes nunca pueden leer el mismo
+    valor de los contadores y sobrevender el cupo.
+
+    ``occupied_slots`` cuenta los cupos confirmados y ``held_slots`` los
+    retenidos temporalmente por reservas en proceso de pago.
+    """
+
+    def with_available_slots(self):
+        """Anota ``remaining_slots``, el cupo restante calculado en SQL.
+
+        Permite filtrar y ordenar por cupo restante en la base de datos
+        (p. ej. ``remaining_slots__gt=0``) sin cálculos por fila en Python.
+        La anotación refleja los contadores al momento de la consulta; la
+        propiedad ``available_slots`` de la instancia los usa ya cargados.
+        """
+        return self.annotate(remaining_slots=ExpressionWrapper(
+            F('total_slots') - F('occupied_slots') - F('held_slots'),
+            output_field=models.IntegerField(),
+        ))
+
+    def _has_room(self, pk, slots):
+        return self.filter(
+            pk=pk,
+            total_slots__gte=F('occupied_slots') + F('held_slots') + slots,
+        )
+
+    def reserve(self, pk, slots):
+        """Ocupa cupos solo si quedan suficientes disponibles.
+
+        Equivale a ``UPDATE ... SET occupied_slots = occupied_slots + n
+        WHERE id = pk AND total_slots - occupied_slots - held_slots >= n``.
+
+        Args:
+            pk: ID del registro.
+            slots (int): Número de cupos a ocupar.
+
+        Returns:
+            bool: True si se ocuparon los cupos, False si no había suficientes.
+        """
+        _check_slots(slots)
+        return self._has_room(pk, slots).update(occupied_slots=F('occupied_slots') + slots) == 1
+
+    def release(self, pk, slots):
+        """Libera cupos ocupados sin dejar el contador en negativo.
+
+        Args:
+            pk: ID del registro.
+            slots (int): Número de cupos a liberar.
+
+        Returns:
+            bool: True si se liberaron los cupos.
+        """
+        _check_slots(slots)
+        return self.filter(
+            pk=pk,
+            occupied_slots__gte=slots,
+        ).update(occupied_slots=F('occupied_slots') - slots) == 1
+
+    def hold(self, pk, slots):
+        """Retiene cupos temporalmente si quedan suficientes disponibles.
+
+        Args:
+            pk: ID del registro.
+            slots (int): Número de cupos a retener.
+
+        Returns:
+            bool: True si se retuvieron los cupos.
+        """
+        _check_slots(slots)
+        return self._has_room(pk, slots).update(held_slots=F('held_slots') + slots) == 1
+
+    def release_hold(self, pk, slots):
+        """Devuelve cupos retenidos al cupo disponible.
+
+        Args:
+            pk: ID del registro.
+            slots (int): Número de cupos a liberar.
+
+        Returns:
+            bool: True si se liberaron los cupos.
+        """
+        _check_slots(slots)
+        return self.filter(
+            pk=pk,
+            held_slots__gte=slots,
+        ).update(held_slots=F('held_slots') - slots) == 1
+
+    def confirm_hold(self, pk, slots):
+        """Convierte cupos retenidos en ocupados.
+
+        No vuelve a verificar el cupo: los cupos retenidos ya estaban
+        descontados del disponible.
+
+        Args:
+            pk: ID del registro.
+            slots (int): Número de cupos a confirmar.
+
+        Returns:
+            bool: True si se confirmaron los cupos.
+        """
+        _check_slots(slots)
+        return self.filter(
+            pk=pk,
+            held_slots__gte=slots,
+        ).update(
+            held_slots=F('held_slots') - slots,
+            occupied_slots=F('occupied_slots') + slots,
+        ) == 1
+
+
+class SlotCounterMixin:
+    """Comportamiento común de los modelos con control de cupos.
+
+    Los contadores (``occupied_slots`` y ``held_slots``) solo cambian
+    mediante ``SlotQuerySet`` o el reconciliado de ``counters.py``. Al guardar una instancia existente sin
+    ``update_fields`` se excluyen del ``UPDATE``, para que editar otros
+    campos (p. ej. desde el admin) no sobrescriba reservas hechas por otras
+    solicitudes.
+    """
+
+    COUNTER_FIELDS = ('occupied_slots', 'held_slots')
+
+    def save(self, *args, **kwargs):
+        updating = not self._state.adding and self.pk is not None
+        if updating and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+        if updating:
+            # Los backends externos guardan su propia copia del cupo total
+            get_slot_counter().sync_total(self)
+
+    @property
+    def available_slots(self):
+        """int: Cupos totales menos confirmados y retenidos, según la instancia cargada."""
+        return self.total_slots - self.occupied_slots - self.held_slots
+
+    def has_available_slots(self, requested_slots):
+        """Verifica si hay suficientes cupos disponibles.
+
+        Es solo una consulta informativa; la reserva real debe hacerse con
+        ``occupy_slots``, que verifica el cupo en la misma sentencia.
+
+        Args:
+            requested_slots (int): Número de cupos solicitados
+
+        Returns:
+            bool: True si hay suficientes cupos, False en caso contrario
+        """
+        return self.available_slots >= requested_slots
+
+    def occupy_slots(self, slots):
+        """Ocupa la cantidad especificada de cupos si están disponibles.
+
+        Args:
+            slots (int): Número de cupos a ocupar
+
+        Returns:
+            bool: True si se pudieron ocupar los cupos, False en caso contrario
+        """
+        return self._apply_slots('reserve', slots)
+
+    def release_slots(self, slots):
+        """Libera la cantidad especificada de cupos.
+
+        Args:
+            slots (int): Número de cupos a liberar
+
+        Returns:
+            bool: True si se pudieron liberar los cupos, False en caso contrario
+        """
+        return self._apply_slots('release', slots)
+
+    def _apply_slots(self, op, slots):
+        applied = get_slot_counter().apply(op, [SlotChange(type(self), self.pk, slots)]) is None
+        self.refresh_from_db(fields=list(self.COUNTER_FIELDS))
+        return applied
 
-class Ticket(models.Model):
+
+class Ticket(SlotCounterMixin, models.Model):
     """Modelo para gestionar los tickets de entrada al parque marino.
     
     Este modelo almacena la información de los diferentes tipos de tickets
@@ -13,8 +215,11 @@ class Ticket(models.Model):
         description (str): Descripción detallada del ticket
         total_slots (int): Número total de cupos disponibles
         occupied_slots (int): Número de cupos ocupados
+        held_slots (int): Número de cupos retenidos por reservas pendientes
         currency (str): Moneda del precio (CRC o USD)
     """
+    objects = SlotQuerySet.as_manager()
+
     price = models.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -37,6 +242,10 @@ class Ticket(models.Model):
         default=0,
         verbose_name="Cupos Ocupados"
     )
+    held_slots = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Cupos Retenidos"
+    )
     currency = models.CharField(
         max_length=3,
         choices=[
@@ -51,37 +260,19 @@ class Ticket(models.Model):
         verbose_name = "Ticket"
         verbose_name_plural = "Tickets"
         ordering = ["name"]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(occupied_slots__lte=F('total_slots') - F('held_slots')),
+                name='ticket_slots_within_total',
+                violation_error_message='Los cupos ocupados y retenidos no pueden superar los cupos totales.',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
-    def has_available_slots(self, requested_slots):
-        """Verifica si hay suficientes cupos disponibles.
-        
-        Args:
-            requested_slots (int): Número de cupos solicitados
-            
-        Returns:
-            bool: True si hay suficientes cupos, False en caso contrario
-        """
-        return self.total_slots - self.occupied_slots >= requested_slots
-
-    def occupy_slots(self, slots):
-        """Ocupa la cantidad especificada de cupos si están disponibles.
-        
-        Args:
-            slots (int): Número de cupos a ocupar
-            
-        Returns:
-            bool: True si se pudieron ocupar los cupos, False en caso contrario
-        """
-        if self.has_available_slots(slots):
-            self.occupied_slots += slots
-            self.save()
-            return True
-        return False
 
-class Visit(models.Model):
+class Visit(SlotCounterMixin, models.Model):
     """Modelo para gestionar las visitas diarias al parque marino.
     
     Este modelo controla la disponibilidad de cupos para cada día de visita,
@@ -91,7 +282,10 @@ class Visit(models.Model):
         day (Date): Día de la visita
         total_slots (int): Número total de cupos disponibles por día
         occupied_slots (int): Número de cupos ocupados para ese día
+        held_slots (int): Número de cupos retenidos por reservas pendientes
     """
+    objects = SlotQuerySet.as_manager()
+
     day = models.DateField(
         verbose_name="Día de Visita",
         unique=True
@@ -104,37 +298,592 @@ class Visit(models.Model):
         default=0,
         verbose_name="Cupos Ocupados"
     )
+    held_slots = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Cupos Retenidos"
+    )
 
     class Meta:
         verbose_name = "Visita"
         verbose_name_plural = "Visitas"
         ordering = ["-day"]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(occupied_slots__lte=F('total_slots') - F('held_slots')),
+                name='visit_slots_within_total',
+                violation_error_message='Los cupos ocupados y retenidos no pueden superar los cupos totales.',
+            ),
+        ]
 
     def __str__(self):
         return self.day.strftime('%Y-%m-%d')
 
-    def has_available_slots(self, requested_slots):
-        """Verifica si hay suficientes cupos disponibles para el día.
-        
-        Args:
-            requested_slots (int): Número de cupos solicitados
-            
-        Returns:
-            bool: True si hay suficientes cupos, False en caso contrario
-        """
-        return self.total_slots - self.occupied_slots >= requested_slots
 
-    def occupy_slots(self, slots):
-        """Ocupa la cantidad especificada de cupos si están disponibles.
-        
-        Args:
-            slots (int): Número de cupos a ocupar
-            
-        Returns:
-            bool: True si se pudieron ocupar los cupos, False en caso contrario
-        """
-        if self.has_available_slots(slots):
-            self.occupied_slots += slots
-            self.save()
-            return True
-        return False
+class Reservation(models.Model):
+    """Retención temporal de cupos mientras se completa el pago.
+
+    Al iniciar el checkout se retienen los cupos de la visita y de cada tipo
+    de ticket (``held_slots``). Cuando Stripe confirma el pago la retención
+    pasa a cupos ocupados; si vence antes, el comando
+    ``release_expired_holds`` la libera en lote.
+
+    Attributes:
+        visit (ForeignKey): Día de visita reservado.
+        user (ForeignKey): Usuario que inició la reserva.
+        quantity (int): Total de cupos retenidos en la visita.
+        payment_intent_id (str): ID de la intención de pago de Stripe.
+        status (str): Estado de la reserva.
+        expires_at (DateTime): Vencimiento de la retención.
+        created_at (DateTime): Fecha de creación.
+        confirmed_at (DateTime): Fecha de confirmación del pago.
+    """
+    STATUS_HELD = 'HELD'
+    STATUS_CONFIRMED = 'CONFIRMED'
+    STATUS_RELEASED = 'RELEASED'
+    STATUS_EXPIRED = 'EXPIRED'
+    STATUS_CHOICES = [
+        (STATUS_HELD, 'Retenida'),
+        (STATUS_CONFIRMED, 'Confirmada'),
+        (STATUS_RELEASED, 'Liberada'),
+        (STATUS_EXPIRED, 'Vencida'),
+    ]
+
+    visit = models.ForeignKey(
+        Visit,
+        on_delete=models.PROTECT,
+        related_name='reservations',
+        verbose_name="Visita"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ticket_reservations',
+        verbose_name="Usuario"
+    )
+    quantity = models.PositiveIntegerField(
+        verbose_name="Cupos"
+    )
+    payment_intent_id = models.CharField(
+        max_length=255,
+        blank=True,
+        db_index=True,
+        verbose_name="Intención de Pago"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_HELD,
+        verbose_name="Estado"
+    )
+    expires_at = models.DateTimeField(
+        verbose_name="Vence"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Fecha de Creación"
+    )
+    confirmed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Fecha de Confirmación"
+    )
+
+    class Meta:
+        verbose_name = "Reserva"
+        verbose_name_plural = "Reservas"
+        ordering = ["-created_at"]
+        indexes = [
+            # Usado por el barrido de retenciones vencidas
+            models.Index(fields=['status', 'expires_at'], name='reservation_status_exp_idx'),
+        ]
+
+    def __str__(self):
+        return f'Reserva {self.pk} - {self.visit} ({self.get_status_display()})'
+
+
+class ReservationLine(models.Model):
+    """Cantidad reservada de un tipo de ticket dentro de una reserva.
+
+    Attributes:
+        reservation (ForeignKey): Reserva a la que pertenece la línea.
+        ticket (ForeignKey): Tipo de ticket reservado.
+        quantity (int): Cantidad de cupos del ticket.
+    """
+    reservation = models.ForeignKey(
+        Reservation,
+        on_delete=models.CASCADE,
+        related_name='lines',
+        verbose_name="Reserva"
+    )
+    ticket = models.ForeignKey(
+        Ticket,
+        on_delete=models.PROTECT,
+        related_name='reservation_lines',
+        verbose_name="Ticket"
+    )
+    quantity = models.PositiveIntegerField(
+        verbose_name="Cantidad"
+    )
+
+    class Meta:
+        verbose_name = "Línea de Reserva"
+        verbose_name_plural = "Líneas de Reserva"
+
+    def __str__(self):
+        return f'{self.quantity} x {self.ticket}'
+
+
+class CapacityTemplate(models.Model):
+    """Plantilla de cupos diarios para generar visitas.
+
+    El cupo de un día se resuelve en este orden: cierre, excepción por rango
+    de fechas, regla del día de la semana y cupo por defecto de la plantilla
+    activa.
+
+    Attributes:
+        name (str): Nombre de la plantilla.
+        default_slots (int): Cupo diario cuando no aplica ninguna regla.
+        is_active (bool): Si es la plantilla usada para generar visitas.
+    """
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name="Nombre"
+    )
+    default_slots = models.PositiveIntegerField(
+        default=1276,
+        verbose_name="Cupos por Defecto"
+    )
+    is_active = models.BooleanField(
+        default=False,
+        verbose_name="Activa"
+    )
+
+    class Meta:
+        verbose_name = "Plantilla de Cupos"
+        verbose_name_plural = "Plantillas de Cupos"
+        ordering = ["name"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['is_active'],
+                condition=models.Q(is_active=True),
+                name='single_active_capacity_template',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def get_active(cls):
+        """Obtiene la plantilla activa o None si no hay ninguna."""
+        return cls.objects.filter(is_active=True).prefetch_related('weekday_rules').first()
+
+
+class WeekdayCapacity(models.Model):
+    """Cupo diario de una plantilla para un día de la semana.
+
+    Attributes:
+        template (ForeignKey): Plantilla a la que pertenece la regla.
+        weekday (int): Día de la semana (0 = lunes, 6 = domingo).
+        total_slots (int): Cupo del día.
+    """
+    WEEKDAY_CHOICES = [
+        (0, 'Lunes'),
+        (1, 'Martes'),
+        (2, 'Miércoles'),
+        (3, 'Jueves'),
+        (4, 'Viernes'),
+        (5, 'Sábado'),
+        (6, 'Domingo'),
+    ]
+
+    template = models.ForeignKey(
+        CapacityTemplate,
+        on_delete=models.CASCADE,
+        related_name='weekday_rules',
+        verbose_name="Plantilla"
+    )
+    weekday = models.PositiveSmallIntegerField(
+        choices=WEEKDAY_CHOICES,
+        verbose_name="Día de la Semana"
+    )
+    total_slots = models.PositiveIntegerField(
+        verbose_name="Cupos Totales"
+    )
+
+    class Meta:
+        verbose_name = "Cupo por Día de la Semana"
+        verbose_name_plural = "Cupos por Día de la Semana"
+        ordering = ["template", "weekday"]
+        constraints = [
+            models.UniqueConstraint(fields=['template', 'weekday'], name='unique_template_weekday'),
+        ]
+
+    def __str__(self):
+        return f'{self.template} - {self.get_weekday_display()}: {self.total_slots}'
+
+
+class CapacityOverride(models.Model):
+    """Excepción de cupo o cierre para un rango de fechas.
+
+    Los cierres tienen prioridad sobre las excepciones de cupo; entre
+    excepciones que se solapan prevalece la creada más recientemente.
+
+    Attributes:
+        start_date (Date): Primer día del rango.
+        end_date (Date): Último día del rango (inclusive).
+        total_slots (int): Cupo diario del rango (ignorado en cierres).
+        is_closure (bool): Si el parque está cerrado en el rango.
+        reason (str): Motivo (feriado, mantenimiento, etc.).
+    """
+    start_date = models.DateField(
+        verbose_name="Desde"
+    )
+    end_date = models.DateField(
+        verbose_name="Hasta"
+    )
+    total_slots = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Cupos Totales"
+    )
+    is_closure = models.BooleanField(
+        default=False,
+        verbose_name="Cierre"
+    )
+    reason = models.CharField(
+        max_length=200,
+        blank=True,
+        verbose_name="Motivo"
+    )
+
+    class Meta:
+        verbose_name = "Excepción de Cupo"
+        verbose_name_plural = "Excepciones de Cupo"
+        ordering = ["start_date"]
+        indexes = [
+            models.Index(fields=['start_date', 'end_date'], name='capacity_override_range_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(end_date__gte=F('start_date')),
+                name='capacity_override_valid_range',
+                violation_error_message='La fecha final no puede ser anterior a la inicial.',
+            ),
+        ]
+
+    def __str__(self):
+        kind = 'Cierre' if self.is_closure else f'{self.total_slots} cupos'
+        return f'{self.start_date} - {self.end_date}: {kind}'
+
+
+class PricingRule(models.Model):
+    """Regla de precio dinámico: multiplica el precio base de los tickets.
+
+    Para cada tipo de regla se aplica la de mayor umbral alcanzado y los
+    multiplicadores de los distintos tipos se combinan multiplicándose:
+
+    - ``OCCUPANCY``: ocupación del día (confirmados y retenidos / total) en
+      porcentaje, p. ej. umbral 80 y multiplicador 1.20.
+    - ``EARLY_BIRD``: días de anticipación de la compra, p. ej. umbral 30 y
+      multiplicador 0.85.
+    - ``GROUP``: cantidad de tickets de la orden, p. ej. umbral 10 y
+      multiplicador 0.90.
+
+    Una regla con ``ticket`` aplica solo a ese tipo de ticket y, a igual
+    umbral, prevalece sobre la regla general.
+
+    Attributes:
+        name (str): Nombre descriptivo.
+        kind (str): Tipo de regla.
+        ticket (ForeignKey): Ticket al que aplica; vacío para todos.
+        threshold (Decimal): Umbral mínimo para aplicar la regla.
+        multiplier (Decimal): Factor aplicado al precio base.
+        is_active (bool): Si la regla está vigente.
+    """
+    KIND_OCCUPANCY = 'OCCUPANCY'
+    KIND_EARLY_BIRD = 'EARLY_BIRD'
+    KIND_GROUP = 'GROUP'
+    KIND_CHOICES = [
+        (KIND_OCCUPANCY, 'Ocupación del día (%)'),
+        (KIND_EARLY_BIRD, 'Anticipación (días)'),
+        (KIND_GROUP, 'Tamaño del grupo'),
+    ]
+
+    name = models.CharField(
+        max_length=100,
+        verbose_name="Nombre"
+    )
+    kind = models.CharField(
+        max_length=12,
+        choices=KIND_CHOICES,
+        verbose_name="Tipo"
+    )
+    ticket = models.ForeignKey(
+        Ticket,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='pricing_rules',
+        verbose_name="Ticket"
+    )
+    threshold = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        verbose_name="Umbral"
+    )
+    multiplier = models.DecimalField(
+        max_digits=5,
+        decimal_places=3,
+        verbose_name="Multiplicador"
+    )
+    is_active = models.BooleanField(
+        default=True,
+        verbose_name="Activa"
+    )
+
+    class Meta:
+        verbose_name = "Regla de Precio"
+        verbose_name_plural = "Reglas de Precio"
+        ordering = ["kind", "threshold"]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(multiplier__gt=0),
+                name='pricing_rule_positive_multiplier',
+                violation_error_message='El multiplicador debe ser mayor que cero.',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.get_kind_display()} >= {self.threshold}: x{self.multiplier})'
+
+
+class TicketOrder(models.Model):
+    """Orden de compra de tickets para un día de visita.
+
+    Una orden agrupa varias líneas de tickets, retiene sus cupos mediante
+    una ``Reservation`` y genera un único ``Pago`` por el total.
+
+    Attributes:
+        user (ForeignKey): Usuario que realizó la compra.
+        visit (ForeignKey): Día de visita.
+        reservation (OneToOneField): Retención de cupos de la orden.
+        pago (OneToOneField): Pago asociado a la orden.
+        total (Decimal): Monto total en la moneda de la orden.
+        currency (str): Moneda de la orden (CRC o USD).
+        status (str): Estado de la orden.
+        created_at (DateTime): Fecha de creación.
+        issued_at (DateTime): Fecha en que se emitieron sus tickets electrónicos.
+    """
+    STATUS_PENDING = 'PENDING'
+    STATUS_PAID = 'PAID'
+    STATUS_CANCELLED = 'CANCELLED'
+    STATUS_EXPIRED = 'EXPIRED'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente de pago'),
+        (STATUS_PAID, 'Pagada'),
+        (STATUS_CANCELLED, 'Cancelada'),
+        (STATUS_EXPIRED, 'Vencida'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ticket_orders',
+        verbose_name="Usuario"
+    )
+    visit = models.ForeignKey(
+        Visit,
+        on_delete=models.PROTECT,
+        related_name='orders',
+        verbose_name="Visita"
+    )
+    reservation = models.OneToOneField(
+        Reservation,
+        on_delete=models.PROTECT,
+        related_name='order',
+        verbose_name="Reserva"
+    )
+    pago = models.OneToOneField(
+        'payments.Pago',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ticket_order',
+        verbose_name="Pago"
+    )
+    total = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Total"
+    )
+    currency = models.CharField(
+        max_length=3,
+        choices=[
+            ('CRC', 'Colones'),
+            ('USD', 'Dólares')
+        ],
+        default='CRC',
+        verbose_name="Moneda"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name="Estado"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Fecha de Creación"
+    )
+    issued_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Fecha de Emisión"
+    )
+
+    class Meta:
+        verbose_name = "Orden de Tickets"
+        verbose_name_plural = "Órdenes de Tickets"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f'Orden {self.pk} - {self.visit} ({self.get_status_display()})'
+
+
+class TicketOrderLine(models.Model):
+    """Línea de una orden: cantidad de un tipo de ticket y su precio unitario.
+
+    Attributes:
+        order (ForeignKey): Orden a la que pertenece la línea.
+        ticket (ForeignKey): Tipo de ticket comprado.
+        quantity (int): Cantidad de tickets.
+        unit_price (Decimal): Precio unitario en la moneda de la orden.
+    """
+    order = models.ForeignKey(
+        TicketOrder,
+        on_delete=models.CASCADE,
+        related_name='lines',
+        verbose_name="Orden"
+    )
+    ticket = models.ForeignKey(
+        Ticket,
+        on_delete=models.PROTECT,
+        related_name='order_lines',
+        verbose_name="Ticket"
+    )
+    quantity = models.PositiveIntegerField(
+        verbose_name="Cantidad"
+    )
+    unit_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Precio Unitario"
+    )
+
+    class Meta:
+        verbose_name = "Línea de Orden"
+        verbose_name_plural = "Líneas de Orden"
+
+    def __str__(self):
+        return f'{self.quantity} x {self.ticket}'
+
+    @property
+    def subtotal(self):
+        """Decimal: Precio unitario por cantidad."""
+        return self.unit_price * self.quantity
+
+
+class ETicket(models.Model):
+    """Ticket electrónico de una persona, con su código QR y archivos renderizados.
+
+    Cada línea de una orden pagada genera ``quantity`` tickets electrónicos,
+    identificados por ``sequence`` dentro de la línea. Los archivos PNG y PDF
+    se generan en segundo plano (ver ``issuance``) y se guardan en
+    ``MediaStorage``.
+
+    Attributes:
+        order (ForeignKey): Orden a la que pertenece.
+        line (ForeignKey): Línea de la orden.
+        sequence (int): Posición del ticket dentro de la línea.
+        code (str): Código único del ticket.
+        png (FileField): Ticket en formato PNG.
+        pdf (FileField): Ticket en formato PDF.
+        created_at (DateTime): Fecha de creación.
+        redeemed_at (DateTime): Fecha en que se usó en un torniquete.
+        redeemed_gate (str): Torniquete donde se usó.
+    """
+    order = models.ForeignKey(
+        TicketOrder,
+        on_delete=models.CASCADE,
+        related_name='etickets',
+        verbose_name="Orden"
+    )
+    line = models.ForeignKey(
+        TicketOrderLine,
+        on_delete=models.CASCADE,
+        related_name='etickets',
+        verbose_name="Línea"
+    )
+    sequence = models.PositiveIntegerField(
+        verbose_name="Secuencia"
+    )
+    code = models.CharField(
+        max_length=32,
+        unique=True,
+        verbose_name="Código"
+    )
+    png = models.FileField(
+        upload_to='etickets/',
+        storage=media_storage,
+        blank=True,
+        verbose_name="PNG"
+    )
+    pdf = models.FileField(
+        upload_to='etickets/',
+        storage=media_storage,
+        blank=True,
+        verbose_name="PDF"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Fecha de Creación"
+    )
+    redeemed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Fecha de Uso"
+    )
+    redeemed_gate = models.CharField(
+        max_length=50,
+        blank=True,
+        verbose_name="Torniquete"
+    )
+
+    class Meta:
+        verbose_name = "Ticket Electrónico"
+        verbose_name_plural = "Tickets Electrónicos"
+        ordering = ['order', 'line', 'sequence']
+        constraints = [
+            models.UniqueConstraint(fields=['line', 'sequence'], name='eticket_line_sequence_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['redeemed_at'], name='eticket_redeemed_idx'),
+        ]
+
+    def __str__(self):
+        return self.code
+
+    @staticmethod
+    def new_code():
+        """Genera un código aleatorio para un ticket nuevo."""
+        return uuid.uuid4().hex
+
+    def qr_payload(self):
+        """Contenido del código QR: token firmado verificable sin conexión."""
+        from .gate import sign_ticket
+        return sign_ticket(self.pk, self.order.visit.day)
@@ -0,0 +1,224 @@
+"""Motor de precios dinámicos de tickets.
+
+El precio de un ticket para un día es su precio base multiplicado por los
+factores de las reglas ``PricingRule`` que alcanzan su umbral: ocupación
+del día, anticipación de la compra y tamaño del grupo.
+
+El motor carga las reglas una sola vez y cotiza por columnas: el factor de
+ocupación y anticipación se resuelve una vez por día (búsqueda binaria
+sobre los umbrales ordenados) y se aplica a todos los tipos de ticket, de
+modo que un calendario de un mes se cotiza con tres consultas (tickets,
+visitas y reglas) sin importar cuántos días y tickets incluya.
+
+Los factores del día se guardan en caché por mes con una entrada por
+(ticket, día), sin redondear: el precio se redondea una sola vez al aplicar
+el factor de grupo (``PricingEngine.price``), igual que en el checkout. La
+llave incluye el día actual, porque la anticipación cambia cada día, y una
+versión que se renueva al modificar tickets o reglas. Los cambios de ocupación invalidan el mes junto con el calendario
+de disponibilidad (``availability.invalidate_days``).
+"""
+
+import time
+from bisect import bisect_right
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import PricingRule, Ticket, Visit
+
+PRICE_CACHE_KEY = 'tickets:price-factors:{version}:{today:%Y%m%d}:{periodo}'
+VERSION_KEY = 'tickets:prices:version'
+CENT = Decimal('0.01')
+ONE = Decimal('1')
+
+
+def occupancy_percent(visit):
+    """Ocupación de una visita (confirmados y retenidos) en porcentaje."""
+    if not visit.total_slots:
+        return Decimal('100')
+    return Decimal((visit.occupied_slots + visit.held_slots) * 100) / visit.total_slots
+
+
+class RuleTable:
+    """Umbrales y multiplicadores ordenados por tipo de regla.
+
+    Args:
+        rules (list): Reglas aplicables; a igual umbral, las específicas de
+            un ticket se ordenan después y prevalecen sobre las generales.
+    """
+
+    def __init__(self, rules):
+        self._kinds = {}
+        ordered = sorted(rules, key=lambda rule: (rule.threshold, rule.ticket_id is not None))
+        for rule in ordered:
+            thresholds, multipliers = self._kinds.setdefault(rule.kind, ([], []))
+            thresholds.append(rule.threshold)
+            multipliers.append(rule.multiplier)
+
+    def multiplier(self, kind, value):
+        """Multiplicador de la regla de mayor umbral alcanzado por ``value``."""
+        thresholds, multipliers = self._kinds.get(kind, ((), ()))
+        position = bisect_right(thresholds, value) - 1
+        return multipliers[position] if position >= 0 else ONE
+
+
+class PricingEngine:
+    """Cotiza precios de tickets a partir de las reglas activas.
+
+    Args:
+        today (date): Fecha de la compra; por defecto la fecha local actual.
+        rules (list): Reglas a usar; por defecto las activas en la base de datos.
+    """
+
+    def __init__(self, today=None, rules=None):
+        self.today = today or timezone.localdate()
+        if rules is None:
+            rules = list(PricingRule.objects.filter(is_active=True))
+        general = [rule for rule in rules if rule.ticket_id is None]
+        self._tables = {None: RuleTable(general)}
+        for ticket_id in {rule.ticket_id for rule in rules if rule.ticket_id is not None}:
+            self._tables[ticket_id] = RuleTable(
+                general + [rule for rule in rules if rule.ticket_id == ticket_id]
+            )
+
+    def _table(self, ticket_id):
+        return self._tables.get(ticket_id, self._tables[None])
+
+    def _day_factor(self, table, visit):
+        advance = Decimal((visit.day - self.today).days)
+        return (
+            table.multiplier(PricingRule.KIND_OCCUPANCY, occupancy_percent(visit))
+            * table.multiplier(PricingRule.KIND_EARLY_BIRD, advance)
+        )
+
+    def group_factor(self, ticket_id, quantity):
+        """Multiplicador por tamaño de grupo de un ticket."""
+        return self._table(ticket_id).multiplier(PricingRule.KIND_GROUP, Decimal(quantity))
+
+    @staticmethod
+    def price(base_price, factor):
+        """Aplica un factor combinado a un precio base y redondea a céntimos."""
+        return (base_price * factor).quantize(CENT, ROUND_HALF_UP)
+
+    def day_factors(self, tickets, visits):
+        """Factores de ocupación y anticipación de todos los tickets para todas las visitas.
+
+        Args:
+            tickets (list): Tickets a cotizar.
+            visits (list): Visitas con sus contadores cargados.
+
+        Returns:
+            dict: {día: {ID de ticket: factor}} sin redondear ni descuento de grupo.
+        """
+        scopes = {}
+        for ticket in tickets:
+            scope = ticket.pk if ticket.pk in self._tables else None
+            scopes.setdefault(scope, []).append(ticket)
+
+        factors = {visit.day: {} for visit in visits}
+        for scope, scoped_tickets in scopes.items():
+            table = self._tables[scope]
+            for visit in visits:
+                factor = self._day_factor(table, visit)
+                day_factors = factors[visit.day]
+                for ticket in scoped_tickets:
+                    day_factors[ticket.pk] = factor
+        return factors
+
+    def quote(self, ticket, visit, quantity=1):
+        """Precio unitario de un ticket para una visita.
+
+        Args:
+            ticket (Ticket): Ticket a cotizar.
+            visit (Visit): Visita con sus contadores cargados.
+            quantity (int): Tickets de la orden, para el descuento de grupo.
+
+        Returns:
+            Decimal: Precio unitario en la moneda del ticket.
+        """
+        factor = self._day_factor(self._table(ticket.pk), visit) * self.group_factor(ticket.pk, quantity)
+        return self.price(ticket.price, factor)
+
+
+def _version():
+    return cache.get(VERSION_KEY) or 0
+
+
+def bump_price_version():
+    """Invalida todas las cotizaciones en caché (tickets o reglas modificados)."""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def price_cache_keys(months, today=None):
+    """Llaves de caché vigentes de las cotizaciones de los meses indicados."""
+    version, today = _version(), today or timezone.localdate()
+    return [PRICE_CACHE_KEY.format(version=version, today=today, periodo=periodo) for periodo in months]
+
+
+def get_price_calendar(start, end, quantity=1, today=None):
+    """Cotiza todos los tickets para cada día con visita entre dos fechas.
+
+    Los meses que no están en caché se cotizan juntos con una consulta de
+    visitas y otra de reglas. Los precios se calculan con ``PricingEngine.price``
+    sobre el factor del día por el de grupo, como ``PricingEngine.quote``.
+
+    Args:
+        start (date): Primer día del rango.
+        end (date): Último día del rango (inclusive).
+        quantity (int): Tamaño del grupo para aplicar su descuento.
+        today (date): Fecha de la compra; por defecto la fecha local actual.
+
+    Returns:
+        tuple: (lista de tickets, lista de pares [día ISO, {ID de ticket: precio}]).
+    """
+    from .availability import _month_bounds, month_of, months_between
+
+    today = today or timezone.localdate()
+    tickets = list(Ticket.objects.order_by('pk'))
+    months = months_between(start, end)
+    keys = dict(zip(months, price_cache_keys(months, today)))
+    cached = cache.get_many(keys.values())
+    data = {periodo: cached[key] for periodo, key in keys.items() if key in cached}
+
+    engine = None
+    missing = [periodo for periodo in months if periodo not in data]
+    if missing:
+        engine = PricingEngine(today=today)
+        visits = list(
+            Visit.objects.filter(day__gte=_month_bounds(min(missing))[0], day__lt=_month_bounds(max(missing))[1])
+            .only('pk', 'day', 'total_slots', 'occupied_slots', 'held_slots')
+            .order_by('day')
+        )
+        loaded = {periodo: [] for periodo in missing}
+        for day, factors in engine.day_factors(tickets, visits).items():
+            if month_of(day) in loaded:
+                loaded[month_of(day)].append(
+                    [day.isoformat(), {str(pk): str(factor) for pk, factor in factors.items()}]
+                )
+        cache.set_many(
+            {keys[periodo]: days for periodo, days in loaded.items()},
+            getattr(settings, 'TICKET_CALENDAR_CACHE_TIMEOUT', 3600),
+        )
+        data.update(loaded)
+
+    group = {}
+    if quantity > 1:
+        engine = engine or PricingEngine(today=today)
+        group = {ticket.pk: engine.group_factor(ticket.pk, quantity) for ticket in tickets}
+
+    base_prices = {ticket.pk: ticket.price for ticket in tickets}
+    first, last = start.isoformat(), end.isoformat()
+    days = []
+    for periodo in months:
+        for day, factors in data[periodo]:
+            if not first <= day <= last:
+                continue
+            days.append([day, {
+                pk: str(PricingEngine.price(base_prices[int(pk)], Decimal(factor) * group.get(int(pk), ONE)))
+                for pk, factor in factors.items()
+                if int(pk) in base_prices
+            }])
+    return tickets, days
+
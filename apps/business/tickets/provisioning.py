@@ -0,0 +1,166 @@
+"""Generación masiva de visitas a partir de la plantilla de cupos.
+
+Las visitas de un rango de fechas se materializan con ``bulk_create`` y
+``bulk_update`` por bloques, en lugar de una solicitud por día. La
+generación es idempotente: los días existentes solo se actualizan si su
+cupo total cambió según la plantilla.
+
+Nunca se reduce el cupo total de un día por debajo de los cupos ya ocupados
+y retenidos; esos días se reportan como conflictos para revisión manual. Los
+días cuyo cupo se reduce se actualizan con un ``UPDATE`` condicional, porque
+una reserva puede llegar entre la lectura y la escritura.
+"""
+
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .availability import invalidate_days
+from .counters import get_slot_counter
+from .models import CapacityOverride, CapacityTemplate, Visit
+
+DEFAULT_DAILY_SLOTS = Visit._meta.get_field('total_slots').default
+
+
+@dataclass
+class ProvisionResult:
+    """Resumen de una generación de visitas."""
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    conflicts: list = field(default_factory=list)
+
+
+class CapacityPlan:
+    """Cupos diarios resueltos a partir de la plantilla y las excepciones.
+
+    Carga las reglas y las excepciones del rango una sola vez; ``capacity_for``
+    no consulta la base de datos.
+    """
+
+    def __init__(self, start, end, template=None):
+        self.template = template if template is not None else CapacityTemplate.get_active()
+        self.weekdays = {}
+        self.default_slots = DEFAULT_DAILY_SLOTS
+        if self.template is not None:
+            self.default_slots = self.template.default_slots
+            self.weekdays = {
+                rule.weekday: rule.total_slots for rule in self.template.weekday_rules.all()
+            }
+        # Los cierres primero y luego las excepciones más recientes
+        self.overrides = list(
+            CapacityOverride.objects.filter(start_date__lte=end, end_date__gte=start)
+            .order_by('-is_closure', '-pk')
+        )
+
+    def capacity_for(self, day):
+        """Cupo total de un día.
+
+        Args:
+            day (date): Día a resolver.
+
+        Returns:
+            int: Cupo total (0 si el parque está cerrado).
+        """
+        for override in self.overrides:
+            if override.start_date <= day <= override.end_date:
+                return 0 if override.is_closure else override.total_slots
+        return self.weekdays.get(day.weekday(), self.default_slots)
+
+
+def capacity_for_day(day):
+    """Cupo total de un día según la plantilla activa."""
+    return CapacityPlan(day, day).capacity_for(day)
+
+
+def _days(start, end):
+    for offset in range((end - start).days + 1):
+        yield start + timedelta(days=offset)
+
+
+def provision_visits(start, end, template=None, update_existing=True, chunk_size=500, dry_run=False):
+    """Crea o ajusta las visitas de un rango de fechas.
+
+    Args:
+        start (date): Primer día del rango.
+        end (date): Último día del rango (inclusive).
+        template (CapacityTemplate): Plantilla a usar; por defecto la activa.
+        update_existing (bool): Si se ajusta el cupo de los días existentes.
+        chunk_size (int): Filas por sentencia de ``bulk_create``/``bulk_update``.
+        dry_run (bool): Calcula el resultado sin escribir en la base de datos.
+
+    Returns:
+        ProvisionResult: Cantidades creadas, actualizadas, sin cambios y
+        los días en conflicto.
+    """
+    if end < start:
+        raise ValueError('La fecha final no puede ser anterior a la inicial')
+
+    plan = CapacityPlan(start, end, template)
+    existing = {
+        visit.day: visit
+        for visit in Visit.objects.filter(day__gte=start, day__lte=end).only(
+            'pk', 'day', 'total_slots', 'occupied_slots', 'held_slots'
+        )
+    }
+
+    result = ProvisionResult()
+    to_create, to_update = [], []
+    previous_totals = {}
+    for day in _days(start, end):
+        total = plan.capacity_for(day)
+        visit = existing.get(day)
+        if visit is None:
+            to_create.append(Visit(day=day, total_slots=total))
+        elif not update_existing or visit.total_slots == total:
+            result.unchanged += 1
+        elif total < visit.occupied_slots + visit.held_slots:
+            result.conflicts.append(day)
+        else:
+            previous_totals[visit.pk] = visit.total_slots
+            visit.total_slots = total
+            to_update.append(visit)
+
+    result.created = len(to_create)
+    result.updated = len(to_update)
+    if dry_run:
+        return result
+
+    with transaction.atomic():
+        # ignore_conflicts mantiene la idempotencia si otro proceso creó el día
+        Visit.objects.bulk_create(to_create, batch_size=chunk_size, ignore_conflicts=True)
+
+        # Ampliar el cupo siempre es válido; reducirlo, solo si lo vendido sigue cabiendo
+        applied = [visit for visit in to_update if visit.total_slots > previous_totals[visit.pk]]
+        Visit.objects.bulk_update(applied, ['total_slots'], batch_size=chunk_size)
+        for visit in to_update:
+            if visit.total_slots > previous_totals[visit.pk]:
+                continue
+            if Visit.objects.alias(used=F('occupied_slots') + F('held_slots')).filter(
+                pk=visit.pk, used__lte=visit.total_slots,
+            ).update(total_slots=visit.total_slots):
+                applied.append(visit)
+            else:
+                result.conflicts.append(visit.day)
+        result.updated = len(applied)
+        result.conflicts.sort()
+
+        counter = get_slot_counter()
+        changed = [visit.day for visit in to_create + applied]
+        transaction.on_commit(lambda: invalidate_days(changed))
+        for visit in applied:
+            transaction.on_commit(lambda visit=visit: counter.sync_total(visit))
+    return result
+
+
+def extend_horizon(days, start=None, **kwargs):
+    """Genera las visitas desde ``start`` (hoy, en hora local, por defecto) hasta ``days`` días después.
+
+    Returns:
+        ProvisionResult: Resultado de ``provision_visits``.
+    """
+    start = start or timezone.localdate()
+    return provision_visits(start, start + timedelta(days=days - 1), **kwargs)
@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Ticket, Visit
+from .models import ETicket, Reservation, ReservationLine, Ticket, TicketOrder, TicketOrderLine, Visit
+from .provisioning import capacity_for_day
+from .services import ReservationService
 
 class TicketSerializer(serializers.ModelSerializer):
     """Serializador para el modelo Ticket.
@@ -8,9 +12,10 @@ class TicketSerializer(serializers.ModelSerializer):
     a JSON y viceversa, incluyendo validaciones y formateo de datos.
     
     Attributes:
-        available_slots (int): Campo calculado que muestra los cupos disponibles
+        available_slots (int): Cupos disponibles según los contadores cargados;
+            los viewsets filtran y ordenan por ``remaining_slots``
     """
-    available_slots = serializers.SerializerMethodField()
+    available_slots = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Ticket
@@ -22,20 +27,10 @@ class TicketSerializer(serializers.ModelSerializer):
             'currency',
             'total_slots',
             'occupied_slots',
+            'held_slots',
             'available_slots'
         ]
-        read_only_fields = ['occupied_slots', 'available_slots']
-
-    def get_available_slots(self, obj):
-        """Calcula los cupos disponibles para el ticket.
-        
-        Args:
-            obj: Instancia del modelo Ticket
-            
-        Returns:
-            int: Número de cupos disponibles
-        """
-        return obj.total_slots - obj.occupied_slots
+        read_only_fields = ['occupied_slots', 'held_slots', 'available_slots']
 
     def validate_price(self, value):
         """Valida que el precio sea mayor que cero.
@@ -62,9 +57,10 @@ class VisitSerializer(serializers.ModelSerializer):
     a JSON y viceversa, incluyendo validaciones y formateo de datos.
     
     Attributes:
-        available_slots (int): Campo calculado que muestra los cupos disponibles
+        available_slots (int): Cupos disponibles según los contadores cargados;
+            los viewsets filtran y ordenan por ``remaining_slots``
     """
-    available_slots = serializers.SerializerMethodField()
+    available_slots = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Visit
@@ -73,20 +69,16 @@ class VisitSerializer(serializers.ModelSerializer):
             'day',
             'total_slots',
             'occupied_slots',
+            'held_slots',
             'available_slots'
         ]
-        read_only_fields = ['occupied_slots', 'available_slots']
+        read_only_fields = ['occupied_slots', 'held_slots', 'available_slots']
 
-    def get_available_slots(self, obj):
-        """Calcula los cupos disponibles para el día de visita.
-        
-        Args:
-            obj: Instancia del modelo Visit
-            
-        Returns:
-            int: Número de cupos disponibles
-        """
-        return obj.total_slots - obj.occupied_slots
+    def create(self, validated_data):
+        """Crea la visita tomando el cupo de la plantilla si no se indicó."""
+        if 'total_slots' not in validated_data:
+            validated_data['total_slots'] = capacity_for_day(validated_data['day'])
+        return super().create(validated_data)
 
     def validate_day(self, value):
         """Valida que la fecha de visita no sea en el pasado.
@@ -106,3 +98,165 @@ class VisitSerializer(serializers.ModelSerializer):
                 "La fecha de visita no puede ser en el pasado"
             )
         return value
+
+
+class ReservationLineSerializer(serializers.ModelSerializer):
+    """Serializador para las líneas de una reserva."""
+
+    class Meta:
+        model = ReservationLine
+        fields = ['ticket', 'quantity']
+        extra_kwargs = {'quantity': {'min_value': 1}}
+
+
+class ReservationSerializer(serializers.ModelSerializer):
+    """Serializador para el modelo Reservation.
+
+    Al crear una reserva se retienen los cupos de la visita y de cada línea
+    mediante ``ReservationService``; los contadores nunca se modifican desde
+    el serializador.
+    """
+    lines = ReservationLineSerializer(many=True)
+
+    class Meta:
+        model = Reservation
+        fields = [
+            'id',
+            'visit',
+            'lines',
+            'quantity',
+            'payment_intent_id',
+            'status',
+            'expires_at',
+            'created_at',
+            'confirmed_at'
+        ]
+        # La intención de pago solo la asigna el checkout de TicketOrderService
+        read_only_fields = ['quantity', 'payment_intent_id', 'status', 'expires_at', 'created_at', 'confirmed_at']
+
+    def validate_lines(self, value):
+        """Valida que la reserva tenga al menos una línea."""
+        if not value:
+            raise serializers.ValidationError("La reserva debe tener al menos un ticket")
+        return value
+
+    def validate(self, attrs):
+        """Limita las retenciones activas por usuario (``TICKET_MAX_ACTIVE_HOLDS``)."""
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated and not user.is_staff:
+            limit = getattr(settings, 'TICKET_MAX_ACTIVE_HOLDS', 3)
+            active = Reservation.objects.filter(
+                user=user, status=Reservation.STATUS_HELD, expires_at__gt=timezone.now()
+            ).count()
+            if active >= limit:
+                raise serializers.ValidationError(
+                    f"Ya tiene {active} reservas pendientes de pago; libere alguna o complete el pago"
+                )
+        return attrs
+
+    def create(self, validated_data):
+        lines = [(line['ticket'], line['quantity']) for line in validated_data['lines']]
+        return ReservationService.hold(
+            validated_data['visit'],
+            lines,
+            user=validated_data.get('user'),
+        )
+
+
+class VisitProvisionSerializer(serializers.Serializer):
+    """Parámetros de la generación masiva de visitas."""
+    start = serializers.DateField()
+    end = serializers.DateField()
+    update_existing = serializers.BooleanField(default=True)
+    dry_run = serializers.BooleanField(default=False)
+
+    MAX_DAYS = 731
+
+    def validate(self, attrs):
+        """Valida que el rango sea válido y no supere dos años."""
+        if attrs['end'] < attrs['start']:
+            raise serializers.ValidationError("La fecha final no puede ser anterior a la inicial")
+        if (attrs['end'] - attrs['start']).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(f"El rango no puede superar {self.MAX_DAYS} días")
+        return attrs
+
+
+class TicketOrderLineSerializer(serializers.ModelSerializer):
+    """Serializador para las líneas de una orden de tickets."""
+    ticket_name = serializers.CharField(source='ticket.name', read_only=True)
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = TicketOrderLine
+        fields = ['ticket', 'ticket_name', 'quantity', 'unit_price', 'subtotal']
+
+
+class ETicketSerializer(serializers.ModelSerializer):
+    """Serializador para los tickets electrónicos de una orden."""
+    ticket = serializers.IntegerField(source='line.ticket_id', read_only=True)
+
+    class Meta:
+        model = ETicket
+        fields = ['code', 'ticket', 'sequence', 'png', 'pdf']
+        read_only_fields = fields
+
+
+class TicketOrderSerializer(serializers.ModelSerializer):
+    """Serializador de solo lectura para el modelo TicketOrder.
+
+    ``etickets`` queda vacío hasta que termina la emisión en segundo plano
+    (``issued_at``).
+    """
+    lines = TicketOrderLineSerializer(many=True, read_only=True)
+    etickets = ETicketSerializer(many=True, read_only=True)
+    expires_at = serializers.DateTimeField(source='reservation.expires_at', read_only=True)
+
+    class Meta:
+        model = TicketOrder
+        fields = [
+            'id',
+            'visit',
+            'lines',
+            'total',
+            'currency',
+            'status',
+            'pago',
+            'reservation',
+            'expires_at',
+            'etickets',
+            'issued_at',
+            'created_at'
+        ]
+        read_only_fields = fields
+
+
+class CheckoutLineSerializer(serializers.Serializer):
+    """Línea solicitada en el checkout."""
+    ticket = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class CheckoutSerializer(serializers.Serializer):
+    """Datos de entrada del checkout de una orden de tickets."""
+    visit = serializers.PrimaryKeyRelatedField(queryset=Visit.objects.all())
+    lines = CheckoutLineSerializer(many=True)
+
+    def validate_visit(self, value):
+        """Valida que la visita no sea en el pasado."""
+        from django.utils import timezone
+        if value.day < timezone.now().date():
+            raise serializers.ValidationError("La fecha de visita no puede ser en el pasado")
+        return value
+
+    def validate_lines(self, value):
+        """Valida que la orden tenga al menos una línea."""
+        if not value:
+            raise serializers.ValidationError("La orden debe tener al menos un ticket")
+        return value
+
+
+class TicketScanSerializer(serializers.Serializer):
+    """Token escaneado en un torniquete."""
+    token = serializers.CharField(max_length=100)
+    gate = serializers.CharField(max_length=50, required=False, default='')
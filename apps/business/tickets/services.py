@@ -0,0 +1,513 @@
+"""Servicios de reserva de cupos para visitas y tickets.
+
+Los contadores se modifican mediante el backend configurado (ver
+``counters.py``): por defecto ``UPDATE`` condicionales sobre la base de datos
+(``SlotQuerySet``), u opcionalmente scripts atómicos en Redis. Una orden con
+varias líneas reserva el día de visita y cada tipo de ticket en una sola
+operación atómica; si una línea no tiene cupo, ningún cupo queda ocupado.
+
+Los registros siempre se actualizan en el mismo orden (primero la visita,
+luego los tickets por ID ascendente), de modo que dos órdenes concurrentes
+nunca esperan una por la otra en sentido cruzado.
+
+Ejemplo:
+
+```python
+from apps.business.tickets.services import SlotReservationService
+
+SlotReservationService.reserve_order(visit, [(adulto, 2), (nino, 1)])
+```
+
+Las retenciones de checkout (``ReservationService``) usan el mismo esquema
+sobre ``held_slots``: se retienen al iniciar el pago, se confirman con el
+webhook de Stripe y las vencidas se liberan en lote.
+"""
+
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.exceptions import APIException, ValidationError
+
+from apps.business.payments.models import Pago
+from apps.business.payments.services import CurrencyConverter
+from apps.business.payments.state import PaymentStateMachine
+from apps.integrations.payments.stripe_client import StripeError, get_stripe_client
+
+from .counters import SlotChange, get_slot_counter
+from .issuance import schedule_issuance
+from .models import Reservation, ReservationLine, Ticket, TicketOrder, TicketOrderLine, Visit
+from .pricing import PricingEngine
+
+logger = logging.getLogger(__name__)
+
+
+class SlotReservationError(APIException):
+    """Excepción lanzada cuando no hay cupos suficientes para una reserva."""
+    status_code = 409
+    default_detail = 'No hay cupos suficientes para completar la reserva'
+    default_code = 'slots_unavailable'
+
+
+def _pk(obj):
+    return getattr(obj, 'pk', obj)
+
+
+def _unavailable(change):
+    if change.model is Visit:
+        return SlotReservationError('No hay cupos suficientes para el día de visita')
+    return SlotReservationError(f'No hay cupos suficientes para el ticket {change.pk}')
+
+
+class SlotReservationService:
+    """Reserva y libera cupos de visitas y tickets de forma atómica."""
+
+    @staticmethod
+    def normalize_lines(lines):
+        """Agrupa las líneas de una orden por tipo de ticket.
+
+        Args:
+            lines: Iterable de tuplas (ticket o ID de ticket, cantidad).
+
+        Returns:
+            OrderedDict: Cantidades por ID de ticket, en orden ascendente de ID.
+
+        Raises:
+            ValueError: Si alguna cantidad no es un entero positivo.
+        """
+        quantities = {}
+        for ticket, quantity in lines:
+            if not isinstance(quantity, int) or quantity <= 0:
+                raise ValueError('La cantidad de cupos debe ser un número positivo')
+            pk = _pk(ticket)
+            quantities[pk] = quantities.get(pk, 0) + quantity
+        return OrderedDict(sorted(quantities.items()))
+
+    @classmethod
+    def changes_for(cls, visit, quantities):
+        """Construye los cambios de cupos de una orden.
+
+        Args:
+            visit: Visita (o su ID) del día reservado.
+            quantities (dict): Cantidades por ID de ticket, ordenadas por ID.
+
+        Returns:
+            list: ``SlotChange`` de la visita (por el total) y de cada ticket.
+        """
+        changes = [SlotChange(Visit, _pk(visit), sum(quantities.values()))]
+        changes.extend(
+            SlotChange(Ticket, ticket_id, quantity) for ticket_id, quantity in quantities.items()
+        )
+        return changes
+
+    @classmethod
+    def reserve_order(cls, visit, lines):
+        """Reserva los cupos de una orden completa.
+
+        El día de visita se reserva por la suma de todas las líneas y cada
+        tipo de ticket por su propia cantidad.
+
+        Args:
+            visit: Visita (o su ID) del día reservado.
+            lines: Iterable de tuplas (ticket o ID de ticket, cantidad).
+
+        Returns:
+            int: Total de cupos reservados.
+
+        Raises:
+            SlotReservationError: Si la visita o algún ticket no tiene cupo.
+            ValueError: Si la orden no tiene líneas o alguna cantidad es inválida.
+        """
+        quantities = cls.normalize_lines(lines)
+        if not quantities:
+            raise ValueError('La orden no tiene líneas')
+
+        failed = get_slot_counter().apply('reserve', cls.changes_for(visit, quantities))
+        if failed is not None:
+            raise _unavailable(failed)
+        return sum(quantities.values())
+
+    @classmethod
+    def release_order(cls, visit, lines):
+        """Libera los cupos reservados por una orden.
+
+        Args:
+            visit: Visita (o su ID) del día reservado.
+            lines: Iterable de tuplas (ticket o ID de ticket, cantidad).
+
+        Returns:
+            int: Total de cupos liberados.
+        """
+        quantities = cls.normalize_lines(lines)
+        if not quantities:
+            return 0
+
+        failed = get_slot_counter().apply('release', cls.changes_for(visit, quantities))
+        if failed is not None:
+            logger.warning('No se pudieron liberar los cupos de %s', failed)
+            return 0
+        return sum(quantities.values())
+
+
+class ReservationService:
+    """Ciclo de vida de las retenciones de cupos durante el checkout.
+
+    Los cambios de estado de una reserva se hacen con ``UPDATE`` condicionados
+    al estado actual, de modo que la confirmación del webhook y el barrido de
+    vencidas nunca procesan dos veces la misma reserva.
+    """
+
+    @staticmethod
+    def hold_ttl():
+        """Duración de una retención según ``settings.TICKET_HOLD_TTL_SECONDS``."""
+        return timedelta(seconds=getattr(settings, 'TICKET_HOLD_TTL_SECONDS', 900))
+
+    @classmethod
+    def hold(cls, visit, lines, user=None, payment_intent_id='', ttl=None, after_hold=None):
+        """Retiene cupos para una orden y crea la reserva.
+
+        Args:
+            visit: Visita (o su ID) del día reservado.
+            lines: Iterable de tuplas (ticket o ID de ticket, cantidad).
+            user: Usuario que inicia el checkout.
+            payment_intent_id (str): ID de la intención de pago de Stripe.
+            ttl (timedelta): Duración de la retención; por defecto la configurada.
+            after_hold (callable): Función llamada con la reserva dentro de la
+                misma transacción; si falla, la retención se revierte.
+
+        Returns:
+            Reservation: Reserva creada en estado HELD.
+
+        Raises:
+            SlotReservationError: Si la visita o algún ticket no tiene cupo.
+            ValueError: Si la orden no tiene líneas o alguna cantidad es inválida.
+        """
+        quantities = SlotReservationService.normalize_lines(lines)
+        if not quantities:
+            raise ValueError('La orden no tiene líneas')
+        changes = SlotReservationService.changes_for(visit, quantities)
+        counter = get_slot_counter()
+
+        with transaction.atomic():
+            failed = counter.apply('hold', changes)
+            if failed is not None:
+                raise _unavailable(failed)
+            try:
+                reservation = Reservation.objects.create(
+                    visit_id=_pk(visit),
+                    user=user,
+                    quantity=sum(quantities.values()),
+                    payment_intent_id=payment_intent_id,
+                    expires_at=timezone.now() + (ttl or cls.hold_ttl()),
+                )
+                ReservationLine.objects.bulk_create([
+                    ReservationLine(reservation=reservation, ticket_id=ticket_id, quantity=quantity)
+                    for ticket_id, quantity in quantities.items()
+                ])
+                if after_hold is not None:
+                    after_hold(reservation)
+            except Exception:
+                # Un backend externo no se revierte con la transacción
+                if not counter.transactional:
+                    counter.apply('release_hold', changes)
+                raise
+        return reservation
+
+    @staticmethod
+    def _changes(reservation):
+        lines = reservation.lines.order_by('ticket_id').values_list('ticket_id', 'quantity')
+        return SlotReservationService.changes_for(reservation.visit_id, OrderedDict(lines))
+
+    @staticmethod
+    def _line_quantities(reservation_ids):
+        """Suma las cantidades de las líneas de varias reservas por ticket."""
+        return OrderedDict(
+            ReservationLine.objects.filter(reservation_id__in=reservation_ids)
+            .values_list('ticket_id')
+            .annotate(total=Sum('quantity'))
+            .order_by('ticket_id')
+        )
+
+    ORDER_STATUS = {
+        Reservation.STATUS_RELEASED: TicketOrder.STATUS_CANCELLED,
+        Reservation.STATUS_EXPIRED: TicketOrder.STATUS_EXPIRED,
+    }
+
+    @staticmethod
+    def _set_order_status(reservation_ids, status):
+        """Actualiza el estado de las órdenes de varias reservas en un solo UPDATE.
+
+        Las órdenes pagadas se encolan para emitir sus tickets electrónicos
+        una vez confirmada la transacción.
+        """
+        orders = TicketOrder.objects.filter(reservation_id__in=reservation_ids)
+        if orders.update(status=status) and status == TicketOrder.STATUS_PAID:
+            order_ids = list(orders.values_list('pk', flat=True))
+            transaction.on_commit(lambda: schedule_issuance(order_ids))
+
+    @staticmethod
+    def _claim(reservation, to_status, from_statuses=(Reservation.STATUS_HELD,), **fields):
+        """Cambia el estado de una reserva solo si sigue en ``from_statuses``."""
+        return Reservation.objects.filter(
+            pk=reservation.pk, status__in=from_statuses,
+        ).update(status=to_status, **fields) == 1
+
+    @classmethod
+    def confirm(cls, reservation):
+        """Confirma el pago de una reserva y ocupa sus cupos.
+
+        Si la retención ya había sido liberada o había vencido, se intenta
+        ocupar el cupo de nuevo; si ya no hay cupo el error queda registrado
+        para gestionar el reembolso.
+
+        Args:
+            reservation (Reservation): Reserva a confirmar.
+
+        Returns:
+            bool: True si la reserva quedó confirmada por esta llamada.
+        """
+        changes = cls._changes(reservation)
+        counter = get_slot_counter()
+        now = timezone.now()
+
+        with transaction.atomic():
+            if cls._claim(reservation, Reservation.STATUS_CONFIRMED, confirmed_at=now):
+                counter.apply_on_commit('confirm_hold', changes)
+                cls._set_order_status([reservation.pk], TicketOrder.STATUS_PAID)
+                return True
+
+            released = (Reservation.STATUS_RELEASED, Reservation.STATUS_EXPIRED)
+            if not cls._claim(reservation, Reservation.STATUS_CONFIRMED, released, confirmed_at=now):
+                return False
+            failed = counter.apply('reserve', changes)
+            if failed is not None:
+                logger.error(
+                    'Pago confirmado para la reserva %s sin cupo disponible', reservation.pk
+                )
+                raise _unavailable(failed)
+            cls._set_order_status([reservation.pk], TicketOrder.STATUS_PAID)
+        return True
+
+    @classmethod
+    def release(cls, reservation, status=Reservation.STATUS_RELEASED):
+        """Libera los cupos retenidos por una reserva.
+
+        Args:
+            reservation (Reservation): Reserva a liberar.
+            status (str): Estado final (RELEASED o EXPIRED).
+
+        Returns:
+            bool: True si la reserva fue liberada por esta llamada.
+        """
+        changes = cls._changes(reservation)
+        with transaction.atomic():
+            if not cls._claim(reservation, status):
+                return False
+            get_slot_counter().apply_on_commit('release_hold', changes)
+            cls._set_order_status([reservation.pk], cls.ORDER_STATUS[status])
+        return True
+
+    @classmethod
+    def confirm_payment_intent(cls, payment_intent_id):
+        """Confirma las reservas asociadas a una intención de pago exitosa.
+
+        Returns:
+            int: Cantidad de reservas confirmadas.
+        """
+        reservations = Reservation.objects.filter(
+            payment_intent_id=payment_intent_id,
+        ).exclude(status=Reservation.STATUS_CONFIRMED)
+        confirmed = 0
+        for reservation in reservations:
+            try:
+                confirmed += cls.confirm(reservation)
+            except SlotReservationError:
+                continue
+        return confirmed
+
+    @classmethod
+    def release_payment_intent(cls, payment_intent_id):
+        """Libera las reservas retenidas de una intención de pago fallida.
+
+        Returns:
+            int: Cantidad de reservas liberadas.
+        """
+        reservations = Reservation.objects.filter(
+            payment_intent_id=payment_intent_id, status=Reservation.STATUS_HELD,
+        )
+        return sum(cls.release(reservation) for reservation in reservations)
+
+    @classmethod
+    def expire_holds(cls, now=None, batch_size=500):
+        """Libera en lote las retenciones vencidas.
+
+        Cada lote se selecciona con el índice (status, expires_at), se marca
+        como vencido con un solo ``UPDATE`` y descuenta los cupos con una
+        sola operación por visita y por ticket afectados, no por reserva.
+
+        Args:
+            now (datetime): Fecha de referencia; por defecto la actual.
+            batch_size (int): Reservas procesadas por transacción.
+
+        Returns:
+            int: Cantidad de reservas vencidas.
+        """
+        now = now or timezone.now()
+        expired = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    Reservation.objects.select_for_update(skip_locked=True)
+                    .filter(status=Reservation.STATUS_HELD, expires_at__lte=now)
+                    .order_by('expires_at')
+                    .values_list('pk', 'visit_id', 'quantity')[:batch_size]
+                )
+                if not batch:
+                    return expired
+
+                ids = [pk for pk, _, _ in batch]
+                claimed = Reservation.objects.filter(
+                    pk__in=ids, status=Reservation.STATUS_HELD,
+                ).update(status=Reservation.STATUS_EXPIRED)
+                if claimed != len(ids):
+                    # Otra transacción cambió alguna reserva; reintentar el lote
+                    transaction.set_rollback(True)
+                    continue
+
+                visits = OrderedDict()
+                for _, visit_id, quantity in sorted(batch, key=lambda row: row[1]):
+                    visits[visit_id] = visits.get(visit_id, 0) + quantity
+                changes = [SlotChange(Visit, pk, quantity) for pk, quantity in visits.items()]
+                changes.extend(
+                    SlotChange(Ticket, pk, quantity)
+                    for pk, quantity in cls._line_quantities(ids).items()
+                )
+                get_slot_counter().apply_on_commit('release_hold', changes)
+                cls._set_order_status(ids, TicketOrder.STATUS_EXPIRED)
+
+                expired += len(ids)
+            if len(batch) < batch_size:
+                return expired
+
+
+class TicketOrderService:
+    """Checkout de órdenes de tickets con varias líneas.
+
+    En una sola transacción se retienen los cupos de la visita y de todas
+    las líneas, se crea la orden con sus líneas y un único ``Pago`` por el
+    total. La intención de pago de Stripe se crea después de confirmar la
+    transacción, para no mantener bloqueos durante la llamada de red.
+
+    Los precios unitarios se cotizan con ``PricingEngine`` según la ocupación
+    del día, la anticipación y el total de tickets de la orden.
+    """
+
+    @staticmethod
+    def unit_price(ticket, visit, currency, engine, quantity):
+        """Precio unitario dinámico de un ticket en la moneda de la orden.
+
+        Args:
+            ticket (Ticket): Ticket cotizado.
+            visit (Visit): Día de visita.
+            currency (str): Moneda de la orden.
+            engine (PricingEngine): Motor con las reglas de precio cargadas.
+            quantity (int): Total de tickets de la orden (descuento de grupo).
+        """
+        price = engine.quote(ticket, visit, quantity)
+        if ticket.currency == currency:
+            return price
+        return CurrencyConverter.convert_currency(price, ticket.currency, currency)
+
+    @classmethod
+    def checkout(cls, visit, lines, user=None):
+        """Crea una orden, retiene sus cupos y crea la intención de pago.
+
+        Args:
+            visit (Visit): Día de visita.
+            lines: Iterable de tuplas (ID de ticket, cantidad).
+            user: Usuario que realiza la compra.
+
+        Returns:
+            tuple: (TicketOrder, dict con la intención de pago de Stripe).
+
+        Raises:
+            ValidationError: Si algún ticket no existe.
+            SlotReservationError: Si no hay cupos suficientes.
+            StripeError: Si no se pudo crear la intención de pago; la orden
+                queda cancelada y los cupos liberados.
+        """
+        quantities = SlotReservationService.normalize_lines(lines)
+        tickets = Ticket.objects.in_bulk(list(quantities))
+        missing = [pk for pk in quantities if pk not in tickets]
+        if missing:
+            raise ValidationError({'lines': f'Tickets inexistentes: {missing}'})
+
+        currencies = {ticket.currency for ticket in tickets.values()}
+        currency = currencies.pop() if len(currencies) == 1 else 'CRC'
+        engine = PricingEngine()
+        group_size = sum(quantities.values())
+        prices = {
+            pk: cls.unit_price(ticket, visit, currency, engine, group_size)
+            for pk, ticket in tickets.items()
+        }
+        total = sum((prices[pk] * quantity for pk, quantity in quantities.items()), Decimal('0'))
+        # Convertir antes de la transacción: así Pago.save() no consulta la tasa
+        monto_crc, monto_usd = CurrencyConverter.get_both_currencies(total, currency)
+
+        created = {}
+
+        def create_order(reservation):
+            pago = Pago.objects.create(
+                monto=total,
+                monto_crc=monto_crc,
+                monto_usd=monto_usd,
+                moneda=currency,
+                metodo_pago='CARD',
+                referencia_transaccion=f'TKT-{uuid.uuid4().hex[:16].upper()}',
+                notas=f'Orden de tickets para {visit}',
+            )
+            order = TicketOrder.objects.create(
+                user=user,
+                visit=visit,
+                reservation=reservation,
+                pago=pago,
+                total=total,
+                currency=currency,
+            )
+            TicketOrderLine.objects.bulk_create([
+                TicketOrderLine(order=order, ticket_id=pk, quantity=quantity, unit_price=prices[pk])
+                for pk, quantity in quantities.items()
+            ])
+            created['order'] = order
+            created['pago'] = pago
+
+        reservation = ReservationService.hold(
+            visit, quantities.items(), user=user, after_hold=create_order
+        )
+        order = created['order']
+
+        try:
+            payment_intent = get_stripe_client().create_payment_intent(
+                amount=total,
+                currency=currency,
+                description=f'Orden de tickets {order.pk} - {visit}',
+                idempotency_key=f'ticket-order:{order.pk}:payment_intent',
+            )
+        except StripeError:
+            ReservationService.release(reservation)
+            PaymentStateMachine.transition(created['pago'], 'FAILED', source='tickets.checkout')
+            raise
+
+        # El webhook de Stripe localiza el pago y la reserva por este ID
+        pago = created['pago']
+        pago.referencia_transaccion = payment_intent['id']
+        pago.save(update_fields=['referencia_transaccion'])
+        Reservation.objects.filter(pk=reservation.pk).update(payment_intent_id=payment_intent['id'])
+        order.refresh_from_db()
+        return order, payment_intent
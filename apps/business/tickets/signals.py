@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .availability import invalidate_days, invalidate_visits
+from .counters import slots_changed
+from .models import PricingRule, Ticket, Visit
+from .pricing import bump_price_version
+
+
+@receiver(slots_changed, sender=Visit)
+def invalidate_calendar_on_slots(sender, pks, **kwargs):
+    """Invalida el calendario de los meses cuyas visitas cambiaron de cupo."""
+    invalidate_visits(pks)
+
+
+@receiver(pre_save, sender=Visit)
+def remember_previous_day(sender, instance, **kwargs):
+    """Guarda el día anterior de una visita editada para invalidar su mes."""
+    if instance.pk is not None:
+        instance._previous_day = (
+            Visit.objects.filter(pk=instance.pk).values_list('day', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Visit)
+def invalidate_calendar_on_save(sender, instance, **kwargs):
+    """Invalida el calendario al crear o editar una visita."""
+    days = {instance.day}
+    previous = getattr(instance, '_previous_day', None)
+    if previous is not None:
+        days.add(previous)
+    invalidate_days(days)
+
+
+@receiver(post_delete, sender=Visit)
+def invalidate_calendar_on_delete(sender, instance, **kwargs):
+    """Invalida el calendario al eliminar una visita."""
+    invalidate_days([instance.day])
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+@receiver(post_save, sender=PricingRule)
+@receiver(post_delete, sender=PricingRule)
+def invalidate_prices(sender, **kwargs):
+    """Invalida las cotizaciones al cambiar un ticket o una regla de precio."""
+    bump_price_version()
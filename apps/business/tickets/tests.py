@@ -1,3 +1,775 @@
-from django.test import TestCase
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import MagicMock, patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.business.tickets.availability import get_calendar
+from apps.business.tickets import gate
+from apps.business.tickets.counters import RedisSlotCounter, get_slot_counter
+from apps.business.tickets.issuance import RenderJob, TicketRenderer, create_etickets
+from apps.business.tickets.models import (
+    CapacityOverride,
+    CapacityTemplate,
+    ETicket,
+    PricingRule,
+    Reservation,
+    Ticket,
+    TicketOrder,
+    Visit,
+    WeekdayCapacity,
+)
+from apps.business.tickets.pricing import PricingEngine, get_price_calendar
+from apps.business.tickets.provisioning import extend_horizon, provision_visits
+from apps.business.tickets.services import (
+    ReservationService,
+    SlotReservationError,
+    SlotReservationService,
+    TicketOrderService,
+)
+from apps.integrations.payments.stripe_client import StripeError
+
+
+class SlotReservationTest(TestCase):
+    """Pruebas de la reserva atómica de cupos."""
+
+    def setUp(self):
+        self.visit = Visit.objects.create(day=date(2030, 1, 1), total_slots=5)
+        self.adult = Ticket.objects.create(name='Adulto', description='Adulto', price=10, total_slots=3)
+        self.child = Ticket.objects.create(name='Niño', description='Niño', price=5, total_slots=10)
+
+    def test_reserve_stops_at_capacity(self):
+        self.assertTrue(Visit.objects.reserve(self.visit.pk, 3))
+        self.assertTrue(Visit.objects.reserve(self.visit.pk, 2))
+        self.assertFalse(Visit.objects.reserve(self.visit.pk, 1))
+
+        self.visit.refresh_from_db()
+        self.assertEqual(self.visit.occupied_slots, 5)
+
+    def test_occupy_and_release_slots(self):
+        self.assertTrue(self.adult.occupy_slots(2))
+        self.assertEqual(self.adult.occupied_slots, 2)
+        self.assertFalse(self.adult.occupy_slots(2))
+
+        self.assertTrue(self.adult.release_slots(2))
+        self.assertEqual(self.adult.occupied_slots, 0)
+        self.assertFalse(self.adult.release_slots(1))
+
+    def test_save_does_not_overwrite_counter(self):
+        stale = Visit.objects.get(pk=self.visit.pk)
+        Visit.objects.reserve(self.visit.pk, 4)
+
+        stale.total_slots = 6
+        stale.save()
+
+        self.visit.refresh_from_db()
+        self.assertEqual((self.visit.total_slots, self.visit.occupied_slots), (6, 4))
+
+    def test_reserve_order(self):
+        total = SlotReservationService.reserve_order(
+            self.visit, [(self.adult, 2), (self.child.pk, 1), (self.child, 1)]
+        )
+
+        self.assertEqual(total, 4)
+        self.visit.refresh_from_db()
+        self.child.refresh_from_db()
+        self.assertEqual(self.visit.occupied_slots, 4)
+        self.assertEqual(self.child.occupied_slots, 2)
+
+    def test_failed_line_rolls_back_order(self):
+        with self.assertRaises(SlotReservationError):
+            SlotReservationService.reserve_order(self.visit, [(self.child, 1), (self.adult, 4)])
+
+        self.assertEqual(
+            [obj.occupied_slots for obj in (Visit.objects.get(), *Ticket.objects.order_by('pk'))],
+            [0, 0, 0]
+        )
+
+    def test_release_order(self):
+        lines = [(self.adult, 1), (self.child, 2)]
+        SlotReservationService.reserve_order(self.visit, lines)
+        SlotReservationService.release_order(self.visit, lines)
+
+        self.visit.refresh_from_db()
+        self.assertEqual(self.visit.occupied_slots, 0)
+
+    def test_invalid_quantity(self):
+        with self.assertRaises(ValueError):
+            SlotReservationService.reserve_order(self.visit, [(self.adult, 0)])
+
+
+class ReservationHoldTest(TestCase):
+    """Pruebas de las retenciones de cupos durante el checkout."""
+
+    def setUp(self):
+        self.visit = Visit.objects.create(day=date(2030, 1, 1), total_slots=5)
+        self.adult = Ticket.objects.create(name='Adulto', description='Adulto', price=10, total_slots=5)
+
+    def _counters(self, obj):
+        obj.refresh_from_db()
+        return obj.occupied_slots, obj.held_slots, obj.available_slots
+
+    def test_hold_counts_against_capacity(self):
+        ReservationService.hold(self.visit, [(self.adult, 3)], payment_intent_id='pi_1')
+
+        self.assertEqual(self._counters(self.visit), (0, 3, 2))
+        with self.assertRaises(SlotReservationError):
+            ReservationService.hold(self.visit, [(self.adult, 3)])
+        self.assertFalse(Visit.objects.reserve(self.visit.pk, 3))
+
+    def test_confirm_payment_intent(self):
+        ReservationService.hold(self.visit, [(self.adult, 2)], payment_intent_id='pi_1')
+
+        self.assertEqual(ReservationService.confirm_payment_intent('pi_1'), 1)
+        self.assertEqual(ReservationService.confirm_payment_intent('pi_1'), 0)
+        self.assertEqual(self._counters(self.visit), (2, 0, 3))
+        self.assertEqual(self._counters(self.adult), (2, 0, 3))
+        self.assertEqual(Reservation.objects.get().status, Reservation.STATUS_CONFIRMED)
+
+    def test_release_payment_intent(self):
+        ReservationService.hold(self.visit, [(self.adult, 2)], payment_intent_id='pi_1')
+
+        self.assertEqual(ReservationService.release_payment_intent('pi_1'), 1)
+        self.assertEqual(self._counters(self.visit), (0, 0, 5))
+        self.assertEqual(Reservation.objects.get().status, Reservation.STATUS_RELEASED)
+
+    def test_expire_holds_in_batches(self):
+        for _ in range(3):
+            ReservationService.hold(self.visit, [(self.adult, 1)], ttl=timedelta(seconds=-1))
+        active = ReservationService.hold(self.visit, [(self.adult, 1)])
+
+        self.assertEqual(ReservationService.expire_holds(batch_size=2), 3)
+        self.assertEqual(self._counters(self.visit), (0, 1, 4))
+        self.assertEqual(self._counters(self.adult), (0, 1, 4))
+        self.assertEqual(
+            Reservation.objects.filter(status=Reservation.STATUS_EXPIRED).count(), 3
+        )
+        active.refresh_from_db()
+        self.assertEqual(active.status, Reservation.STATUS_HELD)
+
+    def test_confirm_after_expiry_reoccupies_slots(self):
+        reservation = ReservationService.hold(
+            self.visit, [(self.adult, 2)], payment_intent_id='pi_1', ttl=timedelta(seconds=-1)
+        )
+        ReservationService.expire_holds()
+
+        self.assertTrue(ReservationService.confirm(reservation))
+        self.assertEqual(self._counters(self.visit), (2, 0, 3))
+
+    def test_release_holds_command(self):
+        ReservationService.hold(self.visit, [(self.adult, 1)], ttl=timedelta(seconds=-1))
+        out = StringIO()
+
+        call_command('release_expired_holds', stdout=out)
+
+        self.assertIn('Retenciones liberadas: 1', out.getvalue())
+
+    def test_reservation_endpoint(self):
+        user = User.objects.create_user('visitante', password='x')
+        self.client.force_login(user)
+
+        response = self.client.post(
+            '/api/v1/tickets/reservations/',
+            {'visit': self.visit.pk, 'lines': [{'ticket': self.adult.pk, 'quantity': 2}]},
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['status'], Reservation.STATUS_HELD)
+        self.assertEqual(self._counters(self.visit), (0, 2, 3))
+
+        response = self.client.post(f"/api/v1/tickets/reservations/{response.json()['id']}/release/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._counters(self.visit), (0, 0, 5))
+
+    @override_settings(TICKET_MAX_ACTIVE_HOLDS=2)
+    def test_reservation_endpoint_ignores_payment_intent_and_caps_holds(self):
+        user = User.objects.create_user('visitante', password='x')
+        self.client.force_login(user)
+        payload = {
+            'visit': self.visit.pk,
+            'lines': [{'ticket': self.adult.pk, 'quantity': 1}],
+            'payment_intent_id': 'pi_ajeno',
+        }
+
+        for _ in range(2):
+            response = self.client.post('/api/v1/tickets/reservations/', payload, content_type='application/json')
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.json()['payment_intent_id'], '')
+        self.assertEqual(ReservationService.confirm_payment_intent('pi_ajeno'), 0)
+
+        response = self.client.post('/api/v1/tickets/reservations/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self._counters(self.visit), (0, 2, 3))
+
+
+@override_settings(TICKET_SLOT_COUNTER={'BACKEND': 'memory'})
+class InMemorySlotCounterTest(TestCase):
+    """Pruebas del backend externo de contadores usando el equivalente en memoria."""
+
+    def setUp(self):
+        self.visit = Visit.objects.create(day=date(2030, 1, 1), total_slots=4)
+        self.adult = Ticket.objects.create(name='Adulto', description='Adulto', price=10, total_slots=10)
+        self.counter = get_slot_counter()
+        # El backend en memoria vive durante toda la clase de pruebas
+        self.counter.counters.clear()
+        self.counter.dirty.clear()
+
+    def test_reserve_does_not_touch_database_until_reconcile(self):
+        SlotReservationService.reserve_order(self.visit, [(self.adult, 3)])
+
+        self.assertEqual(Visit.objects.get().occupied_slots, 0)
+        with self.assertRaises(SlotReservationError):
+            SlotReservationService.reserve_order(self.visit, [(self.adult, 2)])
+        # El fallo de la visita no debe haber ocupado cupos del ticket
+        self.assertEqual(
+            self.counter.counters[self.counter.key(Ticket, self.adult.pk)]['occupied'], 3
+        )
+
+        self.assertEqual(self.counter.reconcile(), 2)
+        self.assertEqual(Visit.objects.get().occupied_slots, 3)
+        self.assertEqual(Ticket.objects.get().occupied_slots, 3)
+        self.assertEqual(self.counter.reconcile(), 0)
+
+    def test_holds_confirm_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation = ReservationService.hold(self.visit, [(self.adult, 2)], payment_intent_id='pi_1')
+            ReservationService.confirm(reservation)
+        self.counter.reconcile()
+
+        self.visit.refresh_from_db()
+        self.assertEqual((self.visit.occupied_slots, self.visit.held_slots), (2, 0))
+
+    def test_total_change_is_synced(self):
+        SlotReservationService.reserve_order(self.visit, [(self.adult, 4)])
+        self.visit.total_slots = 6
+        self.visit.save()
+
+        SlotReservationService.reserve_order(self.visit, [(self.adult, 2)])
+        self.assertEqual(
+            self.counter.counters[self.counter.key(Visit, self.visit.pk)]['occupied'], 6
+        )
+
+    def test_reconcile_command(self):
+        SlotReservationService.reserve_order(self.visit, [(self.adult, 1)])
+        out = StringIO()
+
+        call_command('reconcile_slot_counters', stdout=out)
+
+        self.assertIn('Contadores reconciliados: 2', out.getvalue())
+
+    def test_failed_write_back_keeps_counters_dirty(self):
+        SlotReservationService.reserve_order(self.visit, [(self.adult, 1)])
+
+        with patch.object(self.counter, 'write_back', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.counter.reconcile()
+        self.assertEqual(len(self.counter.dirty), 2)
+
+        self.assertEqual(self.counter.reconcile(), 2)
+        self.assertEqual(Visit.objects.get().occupied_slots, 1)
+        self.assertEqual(self.counter.dirty, set())
+
+
+class RedisSlotCounterReconcileTest(TestCase):
+    """Pruebas del reconciliado de Redis con un cliente simulado."""
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.counter = RedisSlotCounter(self.client)
+        self.key = self.counter.key(Visit, 1)
+        self.client.srandmember.return_value = [self.key.encode()]
+        self.client.pipeline.return_value.execute.return_value = [[b'3', b'1']]
+
+    def test_keys_stay_dirty_until_written(self):
+        reconciled = self.counter._reconciled
+        with patch.object(self.counter, 'write_back', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.counter.reconcile()
+        self.client.spop.assert_not_called()
+        reconciled.assert_not_called()
+
+        with patch.object(self.counter, 'write_back', return_value=1) as write_back:
+            self.assertEqual(self.counter.reconcile(), 1)
+        write_back.assert_called_once_with({self.key: {'occupied': 3, 'held': 1}})
+        # Solo se quitan si Redis conserva los valores escritos
+        reconciled.assert_called_once_with(keys=[self.key, self.counter.dirty_key], args=['3', '1'])
+
+
+class VisitCalendarTest(TestCase):
+    """Pruebas del calendario de disponibilidad con caché por mes."""
+
+    def setUp(self):
+        cache.clear()
+        self.jan = Visit.objects.create(day=date(2030, 1, 31), total_slots=10)
+        self.feb = Visit.objects.create(day=date(2030, 2, 1), total_slots=10)
+        self.adult = Ticket.objects.create(name='Adulto', description='Adulto', price=10, total_slots=50)
+
+    def _calendar(self, **params):
+        return self.client.get('/api/v1/tickets/visits/calendar/', params)
+
+    def test_calendar_range(self):
+        response = self._calendar(**{'from': '2030-01-15', 'to': '2030-02-28'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['days'], [['2030-01-31', 10], ['2030-02-01', 10]])
+
+    def test_calendar_is_cached_and_invalidated_by_month(self):
+        get_calendar(date(2030, 1, 1), date(2030, 2, 28))
+        with self.assertNumQueries(0):
+            get_calendar(date(2030, 1, 1), date(2030, 2, 28))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SlotReservationService.reserve_order(self.feb, [(self.adult, 3)])
+
+        self.assertIsNotNone(cache.get('tickets:calendar:203001'))
+        self.assertIsNone(cache.get('tickets:calendar:203002'))
+        self.assertEqual(
+            get_calendar(date(2030, 2, 1), date(2030, 2, 1)), [['2030-02-01', 7]]
+        )
+
+    def test_holds_are_subtracted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ReservationService.hold(self.jan, [(self.adult, 4)])
+
+        self.assertEqual(get_calendar(date(2030, 1, 31), date(2030, 1, 31)), [['2030-01-31', 6]])
+
+    def test_invalid_ranges(self):
+        self.assertEqual(self._calendar(**{'from': 'enero'}).status_code, 400)
+        self.assertEqual(self._calendar(**{'from': '2030-02-01', 'to': '2030-01-01'}).status_code, 400)
+        self.assertEqual(self._calendar(**{'from': '2030-01-01', 'to': '2031-06-01'}).status_code, 400)
+
+
+class VisitProvisioningTest(TestCase):
+    """Pruebas de la generación masiva de visitas con plantillas de cupos."""
+
+    def setUp(self):
+        self.template = CapacityTemplate.objects.create(name='Temporada', default_slots=100, is_active=True)
+        WeekdayCapacity.objects.create(template=self.template, weekday=5, total_slots=200)
+        # 2030-01-05 es sábado
+        self.start, self.end = date(2030, 1, 1), date(2030, 1, 10)
+
+    def test_provision_applies_rules(self):
+        CapacityOverride.objects.create(start_date=date(2030, 1, 2), end_date=date(2030, 1, 3), total_slots=50)
+        CapacityOverride.objects.create(start_date=date(2030, 1, 3), end_date=date(2030, 1, 3), is_closure=True)
+
+        result = provision_visits(self.start, self.end)
+
+        self.assertEqual((result.created, result.updated), (10, 0))
+        totals = dict(Visit.objects.values_list('day', 'total_slots'))
+        self.assertEqual(totals[date(2030, 1, 1)], 100)
+        self.assertEqual(totals[date(2030, 1, 2)], 50)
+        self.assertEqual(totals[date(2030, 1, 3)], 0)
+        self.assertEqual(totals[date(2030, 1, 5)], 200)
+
+    def test_provision_is_idempotent_and_protects_sold_slots(self):
+        provision_visits(self.start, self.end)
+        Visit.objects.reserve(Visit.objects.get(day=date(2030, 1, 1)).pk, 80)
+        CapacityOverride.objects.create(start_date=self.start, end_date=self.end, total_slots=60)
+
+        result = provision_visits(self.start, self.end)
+
+        self.assertEqual((result.created, result.updated), (0, 9))
+        self.assertEqual(result.conflicts, [date(2030, 1, 1)])
+        self.assertEqual(provision_visits(self.start, self.end).unchanged, 9)
+
+    def test_reservation_during_provision_is_reported_as_conflict(self):
+        provision_visits(self.start, self.end)
+        CapacityOverride.objects.create(start_date=self.start, end_date=self.start, total_slots=60)
+        bulk_create = Visit.objects.bulk_create
+
+        def reserve_then_create(*args, **kwargs):
+            # Una reserva llega después de leer los contadores
+            Visit.objects.reserve(Visit.objects.get(day=self.start).pk, 80)
+            return bulk_create(*args, **kwargs)
+
+        with patch.object(Visit.objects, 'bulk_create', side_effect=reserve_then_create):
+            result = provision_visits(self.start, self.end)
+
+        self.assertEqual((result.updated, result.conflicts), (0, [self.start]))
+        self.assertEqual(Visit.objects.get(day=self.start).total_slots, 100)
+
+    def test_extend_horizon_command(self):
+        out = StringIO()
+
+        call_command('extend_visit_horizon', '--from', '2030-01-01', '--days', '3', stdout=out)
+
+        self.assertIn('Visitas creadas: 3', out.getvalue())
+        self.assertEqual(Visit.objects.count(), 3)
+
+    def test_extend_horizon_starts_on_local_today(self):
+        # 2030-01-02 03:00 UTC todavía es 2030-01-01 en Costa Rica
+        now = datetime(2030, 1, 2, 3, tzinfo=dt_timezone.utc)
+        with patch('django.utils.timezone.now', return_value=now):
+            extend_horizon(2)
+
+        self.assertEqual(sorted(Visit.objects.values_list('day', flat=True)), [date(2030, 1, 1), date(2030, 1, 2)])
+
+    def test_create_visit_uses_template(self):
+        admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.client.force_login(admin)
+
+        response = self.client.post('/api/v1/tickets/visits/', {'day': '2030-01-05'})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['total_slots'], 200)
+
+    def test_provision_endpoint(self):
+        admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.client.force_login(admin)
+
+        response = self.client.post(
+            '/api/v1/tickets/visits/provision/',
+            {'start': '2030-01-01', 'end': '2030-12-31'},
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 365)
+
+
+@patch('apps.business.payments.services.CurrencyConverter.get_exchange_rate', return_value=Decimal('500'))
+@patch('apps.integrations.payments.stripe_client.StripeClient.create_payment_intent')
+class TicketOrderCheckoutTest(TestCase):
+    """Pruebas del checkout de órdenes con varias líneas."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('cliente', password='x')
+        self.visit = Visit.objects.create(day=date(2030, 1, 1), total_slots=10)
+        self.adult = Ticket.objects.create(name='Adulto', description='Adulto', price=10, total_slots=5)
+        self.child = Ticket.objects.create(name='Niño', description='Niño', price=5, total_slots=5)
+
+    def _intent(self, create_intent):
+        create_intent.return_value = {'id': 'pi_order', 'client_secret': 'secret'}
+
+    def test_checkout_creates_order_pago_and_hold(self, create_intent, _rate):
+        self._intent(create_intent)
+
+        order, intent = TicketOrderService.checkout(
+            self.visit, [(self.adult.pk, 2), (self.child.pk, 3)], user=self.user
+        )
+
+        self.assertEqual(order.total, Decimal('35.00'))
+        self.assertEqual(order.lines.count(), 2)
+        self.assertEqual(order.pago.referencia_transaccion, 'pi_order')
+        self.assertEqual(order.reservation.payment_intent_id, 'pi_order')
+        self.visit.refresh_from_db()
+        self.assertEqual(self.visit.held_slots, 5)
+
+        ReservationService.confirm_payment_intent('pi_order')
+        order.refresh_from_db()
+        self.assertEqual(order.status, TicketOrder.STATUS_PAID)
+
+    def test_checkout_is_all_or_nothing(self, create_intent, _rate):
+        self._intent(create_intent)
+
+        with self.assertRaises(SlotReservationError):
+            TicketOrderService.checkout(self.visit, [(self.adult.pk, 2), (self.child.pk, 6)], user=self.user)
+
+        self.assertFalse(TicketOrder.objects.exists())
+        self.assertFalse(Reservation.objects.exists())
+        self.visit.refresh_from_db()
+        self.assertEqual(self.visit.held_slots, 0)
+        create_intent.assert_not_called()
+
+    def test_stripe_failure_cancels_order(self, create_intent, _rate):
+        create_intent.side_effect = StripeError('tarjeta rechazada')
+
+        with self.assertRaises(StripeError):
+            TicketOrderService.checkout(self.visit, [(self.adult.pk, 1)], user=self.user)
+
+        order = TicketOrder.objects.get()
+        self.assertEqual(order.status, TicketOrder.STATUS_CANCELLED)
+        self.assertEqual(order.pago.estado, 'FAILED')
+        self.visit.refresh_from_db()
+        self.assertEqual(self.visit.held_slots, 0)
+
+    def test_checkout_endpoint(self, create_intent, _rate):
+        self._intent(create_intent)
+        self.client.force_login(self.user)
+
+        response = self.client.post(
+            '/api/v1/tickets/orders/checkout/',
+            {'visit': self.visit.pk, 'lines': [
+                {'ticket': self.adult.pk, 'quantity': 1},
+                {'ticket': self.child.pk, 'quantity': 2},
+            ]},
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['client_secret'], 'secret')
+        self.assertEqual(len(response.json()['lines']), 2)
+        self.assertEqual(self.client.get('/api/v1/tickets/orders/').json()['results'][0]['id'], response.json()['id'])
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, TICKET_ISSUANCE={'ASYNC': False, 'WORKERS': 2})
+@patch('apps.business.payments.services.CurrencyConverter.get_exchange_rate', return_value=Decimal('500'))
+@patch('apps.integrations.payments.stripe_client.StripeClient.create_payment_intent')
+class ETicketIssuanceTest(TestCase):
+    """Pruebas de la emisión de tickets electrónicos tras el pago."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.visit = Visit.objects.create(day=date(2030, 1, 1), total_slots=10)
+        self.adult = Ticket.objects.create(name='Adulto', description='Adulto', price=10, total_slots=5)
+        self.child = Ticket.objects.create(name='Niño', description='Niño', price=5, total_slots=5)
+
+    def _checkout(self, create_intent):
+        create_intent.return_value = {'id': 'pi_issue', 'client_secret': 'secret'}
+        order, _intent = TicketOrderService.checkout(self.visit, [(self.adult.pk, 2), (self.child.pk, 1)])
+        return order
+
+    def test_payment_issues_etickets_after_commit(self, create_intent, _rate):
+        order = self._checkout(create_intent)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ReservationService.confirm_payment_intent('pi_issue')
+
+        order.refresh_from_db()
+        self.assertIsNotNone(order.issued_at)
+        etickets = list(order.etickets.all())
+        self.assertEqual(len(etickets), 3)
+        self.assertEqual(len({eticket.code for eticket in etickets}), 3)
+        with etickets[0].png.open('rb') as png, etickets[0].pdf.open('rb') as pdf:
+            self.assertEqual(png.read(4), b'\x89PNG')
+            self.assertEqual(pdf.read(4), b'%PDF')
+
+    def test_unpaid_orders_are_not_issued(self, create_intent, _rate):
+        self._checkout(create_intent)
+
+        call_command('issue_etickets', stdout=StringIO())
+
+        self.assertFalse(ETicket.objects.exists())
+
+    def test_command_issues_pending_orders(self, create_intent, _rate):
+        order = self._checkout(create_intent)
+        TicketOrder.objects.filter(pk=order.pk).update(status=TicketOrder.STATUS_PAID)
+        out = StringIO()
+
+        call_command('issue_etickets', stdout=out)
+        call_command('issue_etickets', stdout=out)
+
+        self.assertIn('tickets emitidos: 3', out.getvalue())
+        self.assertEqual(order.etickets.count(), 3)
+
+    def test_renderer_reuses_templates(self, create_intent, _rate):
+        renderer = TicketRenderer(cache_size=1)
+        job = RenderJob('A1', 'A1', ('adulto', date(2030, 1, 1)), 'Adulto', 'Visita', 'Orden 1')
+
+        renderer.render(job)
+        renderer.render(RenderJob('A2', 'A2', job.template_key, 'Adulto', 'Visita', 'Orden 1'))
+        renderer.render(RenderJob('B1', 'B1', ('nino', date(2030, 1, 1)), 'Niño', 'Visita', 'Orden 1'))
+
+        self.assertEqual((renderer.hits, renderer.misses), (1, 2))
+        self.assertEqual(list(renderer._templates), [('nino', date(2030, 1, 1))])
+
+
+@override_settings(TICKET_GATE={'SIGNING_KEY': 'gate-key', 'ASYNC': False})
+@patch('apps.business.payments.services.CurrencyConverter.get_exchange_rate', return_value=Decimal('500'))
+@patch('apps.integrations.payments.stripe_client.StripeClient.create_payment_intent')
+class GateScanTest(TestCase):
+    """Pruebas de la validación de tickets en torniquetes."""
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.visit = Visit.objects.create(day=self.today, total_slots=10)
+        self.ticket = Ticket.objects.create(name='Adulto', description='Adulto', price=10, total_slots=5)
+        self.staff = User.objects.create_user('portero', password='x', is_staff=True)
+
+    def _paid_etickets(self, create_intent, quantity=2):
+        create_intent.return_value = {'id': f'pi_gate_{quantity}', 'client_secret': 'secret'}
+        order, _intent = TicketOrderService.checkout(self.visit, [(self.ticket.pk, quantity)])
+        TicketOrder.objects.filter(pk=order.pk).update(status=TicketOrder.STATUS_PAID)
+        create_etickets(order)
+        return list(order.etickets.select_related('order__visit'))
+
+    def _scan(self, token):
+        self.client.force_login(self.staff)
+        return self.client.post('/api/v1/tickets/tickets/scan/', {'token': token, 'gate': 'norte'})
+
+    def test_tokens_are_signed(self, create_intent, _rate):
+        token = gate.sign_ticket(42, self.today)
+
+        self.assertEqual(gate.verify_token(token), (42, self.today))
+        self.assertIsNone(gate.verify_token(token.replace('.42.', '.43.')))
+        self.assertIsNone(gate.verify_token('no-es-un-token'))
+        with override_settings(TICKET_GATE={'SIGNING_KEY': 'otra-clave'}):
+            self.assertIsNone(gate.verify_token(token))
+
+    def test_scan_redeems_once(self, create_intent, _rate):
+        eticket = self._paid_etickets(create_intent)[0]
+
+        first = self._scan(eticket.qr_payload())
+        second = self._scan(eticket.qr_payload())
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()['ticket'], eticket.pk)
+        self.assertEqual(second.status_code, 409)
+        eticket.refresh_from_db()
+        self.assertIsNotNone(eticket.redeemed_at)
+        self.assertEqual(eticket.redeemed_gate, 'norte')
+
+    def test_scan_rejects_invalid_tickets(self, create_intent, _rate):
+        eticket = self._paid_etickets(create_intent)[0]
+        tomorrow = self.today + timedelta(days=1)
+
+        self.assertEqual(self._scan('T1.1.20300101.xxxxxxxxxxxxxxxx').status_code, 400)
+        self.assertEqual(self._scan(gate.sign_ticket(eticket.pk, tomorrow)).json()['status'], gate.SCAN_WRONG_DAY)
+        self.assertEqual(self._scan(gate.sign_ticket(999999, self.today)).json()['status'], gate.SCAN_NOT_VALID)
+
+    def test_index_syncs_redemptions_from_other_processes(self, create_intent, _rate):
+        etickets = self._paid_etickets(create_intent)
+        index = gate.RedemptionIndex(enabled=False)
+        other = gate.RedemptionIndex(enabled=False)
+
+        self.assertEqual(index.redeem(etickets[0].pk, self.today), gate.SCAN_OK)
+        self.assertEqual(other.redeem(etickets[1].pk, self.today), gate.SCAN_OK)
+        index.flush()
+
+        self.assertEqual(index.redeem(etickets[1].pk, self.today), gate.SCAN_ALREADY_USED)
+
+    def test_benchmark_command(self, create_intent, _rate):
+        out = StringIO()
+
+        call_command('benchmark_gate_scan', '--tickets', '200', '--threads', '2', stdout=out)
+
+        self.assertIn('escaneos/s', out.getvalue())
+        self.assertEqual(out.getvalue().count('resultados inesperados: 0'), 2)
+
+
+class AvailableSlotsAnnotationTest(TestCase):
+    """Pruebas del cupo restante calculado en la consulta."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('cliente', password='x')
+        self.client.force_login(self.user)
+        today = timezone.now().date()
+        self.full = Visit.objects.create(day=today + timedelta(days=1), total_slots=2, occupied_slots=1, held_slots=1)
+        self.open = Visit.objects.create(day=today + timedelta(days=2), total_slots=5, occupied_slots=1)
+        self.past = Visit.objects.create(day=today - timedelta(days=1), total_slots=5)
+
+    def test_available_dates_filters_in_sql(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/tickets/visits/available_dates/')
+
+        visit_queries = [query for query in queries if 'FROM "tickets_visit"' in query['sql']]
+        self.assertEqual(len(visit_queries), 1)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([visit['id'] for visit in response.json()], [self.open.pk])
+        self.assertEqual(response.json()[0]['available_slots'], 4)
+
+    def test_filter_and_order_by_available_slots(self):
+        response = self.client.get('/api/v1/tickets/visits/', {'has_available_slots': 'true', 'ordering': '-remaining_slots'})
+        self.assertEqual([visit['id'] for visit in response.json()['results']], [self.past.pk, self.open.pk])
+
+        response = self.client.get('/api/v1/tickets/visits/', {'available_slots_max': 0})
+        self.assertEqual([visit['id'] for visit in response.json()['results']], [self.full.pk])
+
+    def test_annotation_does_not_go_stale(self):
+        visit = Visit.objects.with_available_slots().get(pk=self.open.pk)
+        self.assertEqual((visit.remaining_slots, visit.available_slots), (4, 4))
+
+        Visit.objects.reserve(visit.pk, 2)
+        visit.refresh_from_db()
+
+        self.assertEqual(visit.available_slots, 2)
+        self.assertEqual(Visit.objects.with_available_slots().get(pk=visit.pk).remaining_slots, 2)
+
+
+class DynamicPricingTest(TestCase):
+    """Pruebas del motor de precios dinámicos."""
+
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.adult = Ticket.objects.create(name='Adulto', description='Adulto', price=100, total_slots=500)
+        self.child = Ticket.objects.create(name='Niño', description='Niño', price=50, total_slots=500)
+        self.busy = Visit.objects.create(day=self.today + timedelta(days=1), total_slots=10, occupied_slots=8, held_slots=1)
+        self.early = Visit.objects.create(day=self.today + timedelta(days=60), total_slots=10)
+        PricingRule.objects.create(name='Alta demanda', kind=PricingRule.KIND_OCCUPANCY, threshold=80, multiplier='1.20')
+        PricingRule.objects.create(name='Anticipada', kind=PricingRule.KIND_EARLY_BIRD, threshold=30, multiplier='0.90')
+        PricingRule.objects.create(name='Grupo', kind=PricingRule.KIND_GROUP, threshold=10, multiplier='0.80')
+        PricingRule.objects.create(
+            name='Niños anticipada', kind=PricingRule.KIND_EARLY_BIRD, ticket=self.child,
+            threshold=30, multiplier='0.50'
+        )
+
+    def test_rules_combine(self):
+        engine = PricingEngine(today=self.today)
+
+        self.assertEqual(engine.quote(self.adult, self.busy), Decimal('120.00'))
+        self.assertEqual(engine.quote(self.adult, self.early), Decimal('90.00'))
+        self.assertEqual(engine.quote(self.adult, self.early, quantity=10), Decimal('72.00'))
+        self.assertEqual(engine.quote(self.child, self.early), Decimal('25.00'))
+
+    def test_price_calendar_is_cached_and_invalidated(self):
+        start, end = self.busy.day, self.early.day
+        with self.assertNumQueries(3):
+            _tickets, days = get_price_calendar(start, end)
+        self.assertEqual(
+            days[0], [start.isoformat(), {str(self.adult.pk): '120.00', str(self.child.pk): '60.00'}]
+        )
+
+        with self.assertNumQueries(1):
+            get_price_calendar(start, end)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.busy.release_slots(8)
+        _tickets, days = get_price_calendar(start, start)
+        self.assertEqual(days[0][1][str(self.adult.pk)], '100.00')
+
+    def test_rule_changes_invalidate_prices(self):
+        get_price_calendar(self.early.day, self.early.day)
+
+        PricingRule.objects.filter(kind=PricingRule.KIND_EARLY_BIRD, ticket=None).get().delete()
+
+        _tickets, days = get_price_calendar(self.early.day, self.early.day)
+        self.assertEqual(days[0][1][str(self.adult.pk)], '100.00')
+
+    def test_calendar_group_price_matches_checkout(self):
+        PricingRule.objects.all().delete()
+        PricingRule.objects.create(name='Demanda', kind=PricingRule.KIND_OCCUPANCY, threshold=80, multiplier='1.15')
+        PricingRule.objects.create(name='Pareja', kind=PricingRule.KIND_GROUP, threshold=2, multiplier='0.90')
+        Ticket.objects.all().delete()
+        tickets = [
+            Ticket.objects.create(name=f'Ticket {cents}', description='Prueba', price=Decimal(cents) / 100, total_slots=500)
+            for cents in range(100, 200)
+        ]
+
+        _tickets, days = get_price_calendar(self.busy.day, self.busy.day, quantity=2)
+
+        engine = PricingEngine(today=self.today)
+        prices = days[0][1]
+        self.assertEqual(prices[str(tickets[1].pk)], '1.05')
+        for ticket in tickets:
+            self.assertEqual(
+                prices[str(ticket.pk)],
+                str(TicketOrderService.unit_price(ticket, self.busy, ticket.currency, engine, 2)),
+            )
+
+    def test_prices_endpoint_applies_group_discount(self):
+        day = self.early.day.isoformat()
+        response = self.client.get('/api/v1/tickets/visits/prices/', {'from': day, 'to': day, 'quantity': 10})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['tickets']), 2)
+        self.assertEqual(response.json()['days'], [[day, {str(self.adult.pk): '72.00', str(self.child.pk): '20.00'}]])
+        self.assertEqual(self.client.get('/api/v1/tickets/visits/prices/', {'quantity': 0}).status_code, 400)
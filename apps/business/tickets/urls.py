@@ -1,5 +1,11 @@
 from django.urls import path
-from apps.business.tickets.views import TicketViewSet, VisitViewSet
+from apps.business.tickets.views import (
+    ReservationViewSet,
+    TicketOrderViewSet,
+    TicketScanView,
+    TicketViewSet,
+    VisitViewSet,
+)
 
 # Configuración de las rutas para la API de Tickets (Boletos)
 # Cada ruta proporciona endpoints para operaciones CRUD en diferentes modelos
@@ -13,6 +19,9 @@ urlpatterns = [
         'post': 'create'
     }), name='tickets-list-create'),
     
+    # Escaneo en torniquetes - Validación y redención de tickets electrónicos
+    path('tickets/scan/', TicketScanView.as_view(), name='tickets-scan'),
+
     path('tickets/<int:pk>/', TicketViewSet.as_view({
         'get': 'retrieve',
         'put': 'update',
@@ -26,10 +35,53 @@ urlpatterns = [
         'post': 'create'
     }), name='visits-list-create'),
     
+    path('visits/available_dates/', VisitViewSet.as_view({
+        'get': 'available_dates'
+    }), name='visits-available-dates'),
+
+    path('visits/calendar/', VisitViewSet.as_view({
+        'get': 'calendar'
+    }), name='visits-calendar'),
+
+    path('visits/prices/', VisitViewSet.as_view({
+        'get': 'prices'
+    }), name='visits-prices'),
+
+    path('visits/provision/', VisitViewSet.as_view({
+        'post': 'provision'
+    }), name='visits-provision'),
+
     path('visits/<int:pk>/', VisitViewSet.as_view({
         'get': 'retrieve',
         'put': 'update',
         'patch': 'partial_update',
         'delete': 'destroy'
     }), name='visits-detail'),
-]
\ No newline at end of file
+
+    # Reservas - Retención de cupos durante el checkout
+    path('reservations/', ReservationViewSet.as_view({
+        'get': 'list',
+        'post': 'create'
+    }), name='reservations-list-create'),
+
+    path('reservations/<int:pk>/', ReservationViewSet.as_view({
+        'get': 'retrieve'
+    }), name='reservations-detail'),
+
+    path('reservations/<int:pk>/release/', ReservationViewSet.as_view({
+        'post': 'release'
+    }), name='reservations-release'),
+
+    # Órdenes - Checkout de varios tickets en una sola transacción
+    path('orders/', TicketOrderViewSet.as_view({
+        'get': 'list'
+    }), name='orders-list'),
+
+    path('orders/checkout/', TicketOrderViewSet.as_view({
+        'post': 'checkout'
+    }), name='orders-checkout'),
+
+    path('orders/<int:pk>/', TicketOrderViewSet.as_view({
+        'get': 'retrieve'
+    }), name='orders-detail'),
+]
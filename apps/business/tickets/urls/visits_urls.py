@@ -21,6 +21,13 @@ urlpatterns = [
         name='visits-available-dates'
     ),
 
+    # Calendario - Cupos restantes por día en un rango de fechas
+    path(
+        'calendar/',
+        VisitViewSet.as_view({'get': 'calendar'}),
+        name='visits-calendar'
+    ),
+
     # Crear - Añade una nueva visita
     path(
         'create/',
@@ -28,6 +35,13 @@ urlpatterns = [
         name='visits-create'
     ),
 
+    # Generación masiva - Crea o ajusta las visitas de un rango de fechas
+    path(
+        'provision/',
+        VisitViewSet.as_view({'post': 'provision'}),
+        name='visits-provision'
+    ),
+
     # Detalle - Obtiene información detallada de una visita
     path(
         '<int:pk>/',
@@ -2,10 +2,26 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from django.utils import timezone
-from .models import Ticket, Visit
-from .serializers import TicketSerializer, VisitSerializer
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+from . import gate
+from .availability import get_calendar
+from .filters import TicketFilter, VisitFilter
+from .pricing import get_price_calendar
+from .models import Reservation, Ticket, TicketOrder, Visit
+from .provisioning import provision_visits
+from .serializers import (
+    CheckoutSerializer,
+    ReservationSerializer,
+    TicketOrderSerializer,
+    TicketScanSerializer,
+    TicketSerializer,
+    VisitProvisionSerializer,
+    VisitSerializer,
+)
+from .services import ReservationService, TicketOrderService
 
 class TicketViewSet(viewsets.ModelViewSet):
     """ViewSet para gestionar tickets.
@@ -18,8 +34,10 @@ class TicketViewSet(viewsets.ModelViewSet):
         serializer_class: Clase serializadora para tickets
         permission_classes: Permisos requeridos para acceder a las vistas
     """
-    queryset = Ticket.objects.all()
+    queryset = Ticket.objects.with_available_slots()
     serializer_class = TicketSerializer
+    filterset_class = TicketFilter
+    ordering_fields = ['name', 'price', 'remaining_slots']
 
     def get_permissions(self):
         """Define permisos según la acción.
@@ -57,7 +75,7 @@ class TicketViewSet(viewsets.ModelViewSet):
         return Response({
             "available": available,
             "requested_slots": slots,
-            "available_slots": ticket.total_slots - ticket.occupied_slots
+            "available_slots": ticket.available_slots
         })
 
 class VisitViewSet(viewsets.ModelViewSet):
@@ -71,17 +89,22 @@ class VisitViewSet(viewsets.ModelViewSet):
         serializer_class: Clase serializadora para visitas
         permission_classes: Permisos requeridos para acceder a las vistas
     """
-    queryset = Visit.objects.all()
+    queryset = Visit.objects.with_available_slots()
     serializer_class = VisitSerializer
+    filterset_class = VisitFilter
+    ordering_fields = ['day', 'remaining_slots']
 
     def get_permissions(self):
         """Define permisos según la acción.
         
         Los administradores pueden realizar todas las operaciones.
         Los usuarios autenticados solo pueden ver visitas.
+        El calendario de disponibilidad y los precios son públicos.
         """
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'provision']:
             permission_classes = [IsAdminUser]
+        elif self.action in ['calendar', 'prices']:
+            permission_classes = [AllowAny]
         else:
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
@@ -94,15 +117,115 @@ class VisitViewSet(viewsets.ModelViewSet):
             Response: Lista de fechas con cupos disponibles
         """
         today = timezone.now().date()
-        visits = Visit.objects.filter(day__gte=today)
-        
-        available_visits = []
-        for visit in visits:
-            if visit.total_slots > visit.occupied_slots:
-                serializer = self.get_serializer(visit)
-                available_visits.append(serializer.data)
-        
-        return Response(available_visits)
+        visits = self.get_queryset().filter(day__gte=today, remaining_slots__gt=0).order_by('day')
+        return Response(self.get_serializer(visits, many=True).data)
+
+    def _query_date(self, name):
+        """Interpreta un parámetro de fecha; None si no se envió."""
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise ValueError(value)
+        return parsed
+
+    CALENDAR_DEFAULT_DAYS = 90
+    CALENDAR_MAX_DAYS = 366
+
+    def _calendar_range(self):
+        """Interpreta los parámetros ``from`` y ``to`` de los calendarios.
+
+        Returns:
+            tuple: (inicio, fin, None) o (None, None, Response de error)
+        """
+        try:
+            start = self._query_date('from') or timezone.now().date()
+            end = self._query_date('to') or start + timedelta(days=self.CALENDAR_DEFAULT_DAYS - 1)
+        except ValueError:
+            error = "Las fechas deben tener el formato AAAA-MM-DD"
+        else:
+            if end < start:
+                error = "La fecha final no puede ser anterior a la inicial"
+            elif (end - start).days >= self.CALENDAR_MAX_DAYS:
+                error = f"El rango no puede superar {self.CALENDAR_MAX_DAYS} días"
+            else:
+                return start, end, None
+        return None, None, Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """Calendario de disponibilidad entre dos fechas.
+
+        Parámetros ``from`` y ``to`` (AAAA-MM-DD); por defecto desde hoy y
+        por 90 días. El rango máximo es de 366 días.
+
+        Returns:
+            Response: Rango consultado y pares [día, cupos restantes]
+        """
+        start, end, error = self._calendar_range()
+        if error:
+            return error
+
+        return Response({
+            "from": start,
+            "to": end,
+            "days": get_calendar(start, end)
+        })
+
+    @action(detail=False, methods=['get'])
+    def prices(self, request):
+        """Precios dinámicos de todos los tickets para cada día entre dos fechas.
+
+        Acepta los mismos parámetros que ``calendar`` y ``quantity`` para
+        aplicar el descuento de grupo.
+
+        Returns:
+            Response: Rango consultado, tickets y pares [día, {ticket: precio}]
+        """
+        start, end, error = self._calendar_range()
+        if error:
+            return error
+        try:
+            quantity = int(request.query_params.get('quantity', 1))
+        except ValueError:
+            quantity = 0
+        if quantity < 1:
+            return Response(
+                {"error": "La cantidad debe ser un número positivo"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        tickets, days = get_price_calendar(start, end, quantity)
+        return Response({
+            "from": start,
+            "to": end,
+            "tickets": [
+                {"id": ticket.pk, "name": ticket.name, "currency": ticket.currency, "base_price": ticket.price}
+                for ticket in tickets
+            ],
+            "days": days
+        })
+
+    @action(detail=False, methods=['post'])
+    def provision(self, request):
+        """Crea o ajusta en lote las visitas de un rango según la plantilla de cupos.
+
+        Args:
+            request: Solicitud HTTP con start, end, update_existing y dry_run
+
+        Returns:
+            Response: Cantidades creadas, actualizadas, sin cambios y días en conflicto
+        """
+        serializer = VisitProvisionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = provision_visits(**serializer.validated_data)
+        return Response({
+            "created": result.created,
+            "updated": result.updated,
+            "unchanged": result.unchanged,
+            "conflicts": result.conflicts
+        })
 
     @action(detail=True, methods=['post'])
     def check_availability(self, request, pk=None):
@@ -128,5 +251,135 @@ class VisitViewSet(viewsets.ModelViewSet):
         return Response({
             "available": available,
             "requested_slots": slots,
-            "available_slots": visit.total_slots - visit.occupied_slots
+            "available_slots": visit.available_slots
         })
+
+
+class ReservationViewSet(viewsets.ModelViewSet):
+    """ViewSet para gestionar reservas de cupos durante el checkout.
+
+    Crear una reserva retiene los cupos por ``TICKET_HOLD_TTL_SECONDS``; la
+    confirmación llega por el webhook de Stripe y la acción ``release``
+    devuelve los cupos si el usuario abandona el pago.
+
+    Attributes:
+        serializer_class: Clase serializadora para reservas
+        permission_classes: Permisos requeridos para acceder a las vistas
+    """
+    serializer_class = ReservationSerializer
+    permission_classes = [IsAuthenticated]
+    http_method_names = ['get', 'post', 'head', 'options']
+
+    def get_queryset(self):
+        """Los administradores ven todas las reservas; el resto solo las propias."""
+        queryset = Reservation.objects.select_related('visit').prefetch_related('lines')
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @action(detail=True, methods=['post'])
+    def release(self, request, pk=None):
+        """Libera los cupos retenidos por una reserva pendiente.
+
+        Args:
+            request: Solicitud HTTP
+            pk: ID de la reserva
+
+        Returns:
+            Response: Reserva actualizada o error si ya no estaba retenida
+        """
+        reservation = self.get_object()
+        if not ReservationService.release(reservation):
+            return Response(
+                {"error": "La reserva ya no está retenida"},
+                status=status.HTTP_409_CONFLICT
+            )
+        reservation.refresh_from_db()
+        return Response(self.get_serializer(reservation).data)
+
+
+class TicketOrderViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet para consultar órdenes de tickets y realizar el checkout.
+
+    El checkout valida todas las líneas, retiene los cupos, crea la orden y
+    su pago en una sola transacción y devuelve el ``client_secret`` de la
+    intención de pago de Stripe.
+
+    Attributes:
+        serializer_class: Clase serializadora para órdenes
+        permission_classes: Permisos requeridos para acceder a las vistas
+    """
+    serializer_class = TicketOrderSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Los administradores ven todas las órdenes; el resto solo las propias."""
+        queryset = TicketOrder.objects.select_related('reservation').prefetch_related(
+            'lines__ticket', 'etickets__line'
+        )
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(user=self.request.user)
+
+    @action(detail=False, methods=['post'])
+    def checkout(self, request):
+        """Crea una orden con varias líneas de tickets.
+
+        Args:
+            request: Solicitud HTTP con la visita y las líneas
+
+        Returns:
+            Response: Orden creada y ``client_secret`` de la intención de pago
+        """
+        serializer = CheckoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lines = [(line['ticket'], line['quantity']) for line in serializer.validated_data['lines']]
+        order, payment_intent = TicketOrderService.checkout(
+            serializer.validated_data['visit'], lines, user=request.user
+        )
+        data = self.get_serializer(order).data
+        data['client_secret'] = payment_intent['client_secret']
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class TicketScanView(APIView):
+    """Valida y redime tickets electrónicos en los torniquetes.
+
+    La firma del token se verifica en memoria y la redención se comprueba
+    contra el índice por día de ``gate.RedemptionIndex``; la solicitud no
+    escribe en la base de datos.
+    """
+    permission_classes = [IsAdminUser]
+
+    STATUS_CODES = {
+        gate.SCAN_OK: status.HTTP_200_OK,
+        gate.SCAN_INVALID: status.HTTP_400_BAD_REQUEST,
+        gate.SCAN_WRONG_DAY: status.HTTP_403_FORBIDDEN,
+        gate.SCAN_NOT_VALID: status.HTTP_403_FORBIDDEN,
+        gate.SCAN_ALREADY_USED: status.HTTP_409_CONFLICT,
+    }
+
+    def post(self, request):
+        """Escanea un token.
+
+        Args:
+            request: Solicitud HTTP con ``token`` y opcionalmente ``gate``
+
+        Returns:
+            Response: Estado del escaneo, ID del ticket y día del token
+        """
+        serializer = TicketScanSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = gate.scan(serializer.validated_data['token'], serializer.validated_data['gate'])
+        return Response(
+            {
+                'status': result.status,
+                'valid': result.status == gate.SCAN_OK,
+                'ticket': result.ticket_id,
+                'day': result.day,
+            },
+            status=self.STATUS_CODES[result.status]
+        )
@@ -116,12 +116,15 @@ class PayPalClient:
             logger.exception('Error inesperado al ejecutar pago PayPal')
             raise PayPalError(str(e))
     
-    def refund_payment(self, sale_id: str, amount: Optional[Decimal] = None) -> Dict:
+    def refund_payment(self, sale_id: str, amount: Optional[Decimal] = None,
+                       idempotency_key: Optional[str] = None) -> Dict:
         """Reembolsa un pago completado
         
         Args:
             sale_id: ID de la venta en PayPal
             amount: Monto opcional a reembolsar. Si no se especifica, se reembolsa todo
+            idempotency_key: Llave de idempotencia (encabezado ``PayPal-Request-Id``);
+                usar una derivada del reembolso para que reintentarlo no reembolse dos veces
             
         Returns:
             Dict con la información del reembolso
@@ -138,7 +141,12 @@ class PayPalClient:
                     'total': str(amount),
                     'currency': sale.amount.currency
                 }
-                
+
+            if idempotency_key:
+                # El SDK envía request_id como encabezado PayPal-Request-Id
+                refund_data = paypalrestsdk.Resource(refund_data)
+                refund_data.request_id = idempotency_key
+
             refund = sale.refund(refund_data)
             
             if refund.success():
@@ -156,6 +164,30 @@ class PayPalClient:
             logger.exception('Error inesperado al procesar reembolso PayPal')
             raise PayPalError(str(e))
 
+    def get_refund(self, refund_id: str) -> Dict:
+        """Consulta el estado de un reembolso
+        
+        Args:
+            refund_id: ID del reembolso en PayPal
+            
+        Returns:
+            Dict con la información del reembolso
+            
+        Raises:
+            PayPalError: Si hay un error al consultar el reembolso
+        """
+        try:
+            refund = paypalrestsdk.Refund.find(refund_id)
+            return {
+                'id': refund.id,
+                'state': refund.state,
+                'amount': refund.amount
+            }
+                
+        except Exception as e:
+            logger.exception('Error inesperado al consultar reembolso PayPal')
+            raise PayPalError(str(e))
+
 class PayPalError(APIException):
     """Excepción personalizada para errores de PayPal
     
@@ -1,57 +1,284 @@
-"""Integración con Stripe para procesamiento de pagos con tarjeta"""
+"""Integración con Stripe para procesamiento de pagos con tarjeta
+
+El cliente se comparte en todo el proceso (``get_stripe_client``): usa un
+solo pool de conexiones HTTP keep-alive hacia la API de Stripe, con tiempos
+máximos de conexión y lectura, en lugar de abrir una conexión TLS nueva por
+solicitud. No modifica la configuración global del SDK (``stripe.api_key``).
+
+Las operaciones que crean objetos en Stripe envían una llave de idempotencia,
+por lo que se reintentan de forma segura ante errores de red, con espera
+exponencial aleatoria y un número acotado de intentos; si Stripe sigue sin
+responder se lanza ``StripeConnectionError`` (subclase de ``StripeError``)
+para que el llamador reintente más tarde en lugar de dar la operación por
+fallida. Solo los errores de transporte (``TRANSPORT_ERRORS``) se tratan así;
+cualquier otro error se lanza como ``StripeError``. La latencia de cada
+operación se registra en un histograma por operación
+(``get_latency_histograms``).
+
+Configuración (``settings.STRIPE_CLIENT``):
+    CONNECT_TIMEOUT (float): Segundos máximos para establecer la conexión.
+    READ_TIMEOUT (float): Segundos máximos de espera de la respuesta.
+    MAX_RETRIES (int): Reintentos ante errores de red.
+    BACKOFF_BASE (float): Espera máxima antes del primer reintento.
+    BACKOFF_MAX (float): Espera máxima entre reintentos.
+    POOL_SIZE (int): Conexiones keep-alive conservadas en el pool.
+"""
 
 import logging
+import random
+import threading
+import time
+import uuid
+from bisect import bisect_left
 from decimal import Decimal
 from typing import Dict, Optional
 
+import requests
 import stripe
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
 from rest_framework.exceptions import APIException
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_STRIPE_CLIENT = {
+    'CONNECT_TIMEOUT': 3.0,
+    'READ_TIMEOUT': 20.0,
+    'MAX_RETRIES': 2,
+    'BACKOFF_BASE': 0.25,
+    'BACKOFF_MAX': 2.0,
+    'POOL_SIZE': 10,
+}
+
+# Errores de transporte: se desconoce si Stripe recibió la solicitud
+TRANSPORT_ERRORS = (stripe.error.APIConnectionError, requests.RequestException)
+
+# Límites superiores (ms) de los intervalos de los histogramas de latencia
+LATENCY_BUCKETS_MS = (25, 50, 100, 200, 300, 500, 750, 1000, 1500, 2500, 5000, 10000)
+
+
+def get_config():
+    """Configuración del cliente combinada con los valores por defecto."""
+    return {**DEFAULT_STRIPE_CLIENT, **getattr(settings, 'STRIPE_CLIENT', {})}
+
+
+class LatencyHistogram:
+    """Histograma de latencias con intervalos fijos, seguro entre hilos.
+
+    Attributes:
+        buckets (tuple): Límites superiores de los intervalos en milisegundos.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._errors = 0
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, error=False):
+        """Registra la duración de una llamada."""
+        ms = seconds * 1000
+        with self._lock:
+            self._counts[bisect_left(self.buckets, ms)] += 1
+            self._count += 1
+            self._total_ms += ms
+            self._max_ms = max(self._max_ms, ms)
+            if error:
+                self._errors += 1
+
+    def _percentile(self, fraction):
+        # Límite superior del intervalo que contiene el percentil
+        rank = fraction * self._count
+        seen = 0
+        for bound, count in zip(self.buckets, self._counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return round(self._max_ms, 1)
+
+    def snapshot(self):
+        """Resumen del histograma.
+
+        Returns:
+            dict: Llamadas, errores, promedio, máximo, percentiles 50/95/99
+            (estimados por intervalo) y conteo por intervalo, en milisegundos.
+        """
+        with self._lock:
+            if not self._count:
+                return {'count': 0, 'errors': 0}
+            labels = [f'le_{bound}' for bound in self.buckets] + ['inf']
+            return {
+                'count': self._count,
+                'errors': self._errors,
+                'mean_ms': round(self._total_ms / self._count, 1),
+                'max_ms': round(self._max_ms, 1),
+                'p50_ms': self._percentile(0.50),
+                'p95_ms': self._percentile(0.95),
+                'p99_ms': self._percentile(0.99),
+                'buckets': dict(zip(labels, self._counts)),
+            }
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def _histogram(operation):
+    with _histograms_lock:
+        histogram = _histograms.get(operation)
+        if histogram is None:
+            histogram = _histograms[operation] = LatencyHistogram()
+        return histogram
+
+
+def observe_latency(operation, seconds, error=False):
+    """Registra la duración de una operación en su histograma."""
+    _histogram(operation).observe(seconds, error=error)
+
+
+def get_latency_histograms():
+    """Resumen de latencias por operación en este proceso."""
+    with _histograms_lock:
+        histograms = dict(_histograms)
+    return {operation: histogram.snapshot() for operation, histogram in sorted(histograms.items())}
+
+
+def reset_latency_histograms():
+    """Descarta las latencias registradas."""
+    with _histograms_lock:
+        _histograms.clear()
+
+
+def new_idempotency_key():
+    """Llave de idempotencia aleatoria para una operación sin identidad propia."""
+    return uuid.uuid4().hex
+
+
 class StripeClient:
     """Cliente para interactuar con la API de Stripe
-    
+
     Esta clase maneja la configuración y las operaciones principales con Stripe,
-    incluyendo pagos con tarjeta, tokens y reembolsos.
-    
+    incluyendo pagos con tarjeta, tokens y reembolsos. Es segura entre hilos;
+    usar ``get_stripe_client`` para compartir la instancia del proceso.
+
     Attributes:
         api_key (str): Clave secreta de API de Stripe
         public_key (str): Clave pública de API de Stripe
+        config (dict): Tiempos máximos, reintentos y tamaño del pool
     """
-    
-    def __init__(self):
-        """Inicializa el cliente de Stripe con la configuración desde settings"""
+
+    def __init__(self, config=None, http_client=None):
+        """Inicializa el cliente de Stripe con la configuración desde settings
+
+        Args:
+            config (dict): Configuración; por defecto ``settings.STRIPE_CLIENT``.
+            http_client: Cliente HTTP del SDK; por defecto uno con pool propio.
+        """
         self.api_key = settings.STRIPE_SECRET_KEY
         self.public_key = settings.STRIPE_PUBLIC_KEY
-        stripe.api_key = self.api_key
-    
-    def create_payment_intent(self, amount: Decimal, currency: str, description: str) -> Dict:
+        self.config = config or get_config()
+        self._http_client = http_client
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def _build_http_client(self):
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=self.config['POOL_SIZE']))
+        return stripe.RequestsClient(
+            timeout=(self.config['CONNECT_TIMEOUT'], self.config['READ_TIMEOUT']),
+            session=session,
+        )
+
+    @property
+    def client(self):
+        """Cliente del SDK de Stripe, creado en el primer uso."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = stripe.StripeClient(
+                        self.api_key,
+                        http_client=self._http_client or self._build_http_client(),
+                        # Los reintentos se controlan en _call
+                        max_network_retries=0,
+                    )
+        return self._client
+
+    def _backoff(self, attempt):
+        delay = min(self.config['BACKOFF_MAX'], self.config['BACKOFF_BASE'] * 2 ** (attempt - 1))
+        return random.uniform(0, delay)
+
+    def _call(self, operation, func, *args, retry=False, **kwargs):
+        """Ejecuta una llamada al SDK registrando su latencia.
+
+        Args:
+            operation (str): Nombre de la operación para el histograma.
+            func (callable): Método del SDK.
+            retry (bool): Reintentar ante errores de red (solo operaciones
+                idempotentes o con llave de idempotencia).
+        """
+        attempts = self.config['MAX_RETRIES'] + 1 if retry else 1
+        histogram = _histogram(operation)
+        for attempt in range(1, attempts + 1):
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except TRANSPORT_ERRORS as e:
+                histogram.observe(time.perf_counter() - started, error=True)
+                if attempt == attempts:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(
+                    'Error de red en Stripe (%s), intento %s de %s; reintento en %.2f s: %s',
+                    operation, attempt, attempts, delay, e,
+                )
+                time.sleep(delay)
+                continue
+            except Exception:
+                histogram.observe(time.perf_counter() - started, error=True)
+                raise
+            histogram.observe(time.perf_counter() - started)
+            return result
+
+    def create_payment_intent(self, amount: Decimal, currency: str, description: str,
+                              idempotency_key: Optional[str] = None) -> Dict:
         """Crea una intención de pago en Stripe
-        
+
         Args:
             amount: Monto del pago (en centavos/céntimos)
             currency: Código de moneda (usd, crc)
             description: Descripción del pago
-            
+            idempotency_key: Llave de idempotencia; usar una derivada del pago
+                para que reintentar la operación no cree otra intención
+
         Returns:
             Dict con la información de la intención de pago
-            
+
         Raises:
-            StripeError: Si hay un error al crear la intención de pago
+            StripeConnectionError: Si Stripe no respondió; reintentar con la misma llave
+            StripeError: Si Stripe rechazó la intención de pago
         """
         try:
             # Stripe requiere montos en centavos/céntimos
             amount_cents = int(amount * 100)
-            
-            intent = stripe.PaymentIntent.create(
-                amount=amount_cents,
-                currency=currency.lower(),
-                description=description,
-                payment_method_types=['card']
+
+            intent = self._call(
+                'payment_intents.create',
+                self.client.payment_intents.create,
+                params={
+                    'amount': amount_cents,
+                    'currency': currency.lower(),
+                    'description': description,
+                    'payment_method_types': ['card'],
+                },
+                options={'idempotency_key': idempotency_key or new_idempotency_key()},
+                retry=True,
             )
-            
+
             logger.info(f'Intención de pago Stripe creada: {intent.id}')
             return {
                 'id': intent.id,
@@ -60,29 +287,37 @@ class StripeClient:
                 'currency': currency,
                 'status': intent.status
             }
-            
+
+        except TRANSPORT_ERRORS as e:
+            logger.error(f'Stripe no respondió al crear intención de pago: {str(e)}')
+            raise StripeConnectionError(str(e))
         except stripe.error.StripeError as e:
             logger.error(f'Error Stripe al crear intención de pago: {str(e)}')
             raise StripeError(str(e))
         except Exception as e:
             logger.exception('Error inesperado al crear intención de pago Stripe')
             raise StripeError(str(e))
-    
+
     def confirm_payment(self, payment_intent_id: str) -> Dict:
         """Confirma una intención de pago
-        
+
         Args:
             payment_intent_id: ID de la intención de pago
-            
+
         Returns:
             Dict con la información del pago confirmado
-            
+
         Raises:
             StripeError: Si hay un error al confirmar el pago
         """
         try:
-            intent = stripe.PaymentIntent.retrieve(payment_intent_id)
-            
+            intent = self._call(
+                'payment_intents.retrieve',
+                self.client.payment_intents.retrieve,
+                payment_intent_id,
+                retry=True,
+            )
+
             if intent.status == 'succeeded':
                 logger.info(f'Pago Stripe confirmado: {intent.id}')
                 return {
@@ -95,43 +330,58 @@ class StripeClient:
             else:
                 logger.error(f'Estado inválido de pago Stripe: {intent.status}')
                 raise StripeError(f'Estado de pago inválido: {intent.status}')
-                
+
+        except TRANSPORT_ERRORS as e:
+            logger.error(f'Stripe no respondió al confirmar pago: {str(e)}')
+            raise StripeConnectionError(str(e))
         except stripe.error.StripeError as e:
             logger.error(f'Error Stripe al confirmar pago: {str(e)}')
             raise StripeError(str(e))
         except Exception as e:
             logger.exception('Error inesperado al confirmar pago Stripe')
             raise StripeError(str(e))
-    
-    def refund_payment(self, payment_intent_id: str, amount: Optional[Decimal] = None) -> Dict:
+
+    def refund_payment(self, payment_intent_id: str, amount: Optional[Decimal] = None,
+                       idempotency_key: Optional[str] = None,
+                       metadata: Optional[Dict[str, str]] = None) -> Dict:
         """Reembolsa un pago completado
-        
+
         Args:
             payment_intent_id: ID de la intención de pago
             amount: Monto opcional a reembolsar. Si no se especifica, se reembolsa todo
-            
+            idempotency_key: Llave de idempotencia; usar una derivada del
+                reembolso para que reintentarlo no reembolse dos veces
+            metadata: Datos propios guardados en el reembolso de Stripe
+
         Returns:
             Dict con la información del reembolso
-            
+
         Raises:
-            StripeError: Si hay un error al procesar el reembolso
+            StripeConnectionError: Si Stripe no respondió; reintentar con la misma llave
+            StripeError: Si Stripe rechazó el reembolso
         """
         try:
             refund_data = {'payment_intent': payment_intent_id}
-            
+
             if amount:
                 refund_data['amount'] = int(amount * 100)  # Convertir a centavos
-                
-            refund = stripe.Refund.create(**refund_data)
-            
+            if metadata:
+                refund_data['metadata'] = metadata
+
+            refund = self._call(
+                'refunds.create',
+                self.client.refunds.create,
+                params=refund_data,
+                options={'idempotency_key': idempotency_key or new_idempotency_key()},
+                retry=True,
+            )
+
             logger.info(f'Reembolso Stripe procesado: {refund.id}')
-            return {
-                'id': refund.id,
-                'status': refund.status,
-                'amount': Decimal(refund.amount) / 100,  # Convertir de centavos
-                'currency': refund.currency
-            }
-            
+            return self._refund_data(refund)
+
+        except TRANSPORT_ERRORS as e:
+            logger.error(f'Stripe no respondió al procesar reembolso: {str(e)}')
+            raise StripeConnectionError(str(e))
         except stripe.error.StripeError as e:
             logger.error(f'Error Stripe al procesar reembolso: {str(e)}')
             raise StripeError(str(e))
@@ -139,12 +389,94 @@ class StripeClient:
             logger.exception('Error inesperado al procesar reembolso Stripe')
             raise StripeError(str(e))
 
+    def list_refunds(self, created_gte: Optional[int] = None, limit: int = 100,
+                     starting_after: Optional[str] = None) -> Dict:
+        """Obtiene una página de reembolsos, del más reciente al más antiguo
+
+        Args:
+            created_gte: Solo reembolsos creados desde este instante (timestamp Unix)
+            limit: Reembolsos por página (máximo 100)
+            starting_after: ID del último reembolso de la página anterior
+
+        Returns:
+            Dict con los reembolsos (``data``) e indicador de más páginas (``has_more``)
+
+        Raises:
+            StripeError: Si hay un error al consultar los reembolsos
+        """
+        try:
+            params = {'limit': limit}
+            if created_gte is not None:
+                params['created'] = {'gte': created_gte}
+            if starting_after:
+                params['starting_after'] = starting_after
+
+            page = self._call('refunds.list', self.client.refunds.list, params=params, retry=True)
+            return {
+                'data': [self._refund_data(refund) for refund in page.data],
+                'has_more': page.has_more,
+            }
+
+        except TRANSPORT_ERRORS as e:
+            logger.error(f'Stripe no respondió al consultar reembolsos: {str(e)}')
+            raise StripeConnectionError(str(e))
+        except stripe.error.StripeError as e:
+            logger.error(f'Error Stripe al consultar reembolsos: {str(e)}')
+            raise StripeError(str(e))
+        except Exception as e:
+            logger.exception('Error inesperado al consultar reembolsos Stripe')
+            raise StripeError(str(e))
+
+    @staticmethod
+    def _refund_data(refund):
+        return {
+            'id': refund.id,
+            'status': refund.status,
+            'amount': Decimal(refund.amount) / 100,  # Convertir de centavos
+            'currency': refund.currency,
+            'metadata': dict(refund.metadata or {}),
+        }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_stripe_client():
+    """Cliente de Stripe compartido del proceso, con su pool de conexiones."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = StripeClient()
+        return _client
+
+
+@receiver(setting_changed)
+def _reset_stripe_client(setting, **kwargs):
+    global _client
+    if setting in ('STRIPE_CLIENT', 'STRIPE_SECRET_KEY', 'STRIPE_PUBLIC_KEY'):
+        with _client_lock:
+            _client = None
+
+
 class StripeError(APIException):
     """Excepción personalizada para errores de Stripe
-    
+
     Esta excepción se utiliza para manejar errores específicos de la integración
     con Stripe y proporcionar mensajes de error claros al cliente.
     """
     status_code = 400
     default_detail = 'Error al procesar la operación con Stripe'
     default_code = 'stripe_error'
+
+
+class StripeConnectionError(StripeError):
+    """Stripe no respondió tras los reintentos
+
+    A diferencia de un rechazo de Stripe, se desconoce si la operación se
+    aplicó: debe reintentarse más tarde con la misma llave de idempotencia,
+    no darse por fallida.
+    """
+    status_code = 503
+    default_detail = 'Stripe no está disponible, intente de nuevo más tarde'
+    default_code = 'stripe_unavailable'
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AuditLog
+from .models import AuditLog, AuditLogArchive
 
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
@@ -11,7 +11,8 @@ class AuditLogAdmin(admin.ModelAdmin):
     Attributes:
         list_display: Campos a mostrar en la lista de registros.
         list_filter: Campos por los que se puede filtrar.
-        search_fields: Campos en los que se puede buscar.
+        search_fields: Campos en los que se puede buscar (exactos o por
+            prefijo, para usar los índices en lugar de recorrer la tabla).
         readonly_fields: Campos que no se pueden modificar.
         ordering: Orden por defecto de los registros.
     """
@@ -22,20 +23,20 @@ class AuditLogAdmin(admin.ModelAdmin):
         'action',
         'model',
         'record_id',
+        'status_code',
+        'latency_ms',
     ]
     
     list_filter = [
         'timestamp',
-        'user',
-        'action',
-        'model',
+        'method',
+        'status_code',
     ]
     
     search_fields = [
-        'user__username',
-        'action',
-        'model',
-        'details',
+        '=user__username',
+        '=model',
+        '^path',
     ]
     
     readonly_fields = [
@@ -44,10 +45,17 @@ class AuditLogAdmin(admin.ModelAdmin):
         'action',
         'model',
         'record_id',
+        'method',
+        'path',
+        'status_code',
+        'latency_ms',
         'details',
     ]
     
     ordering = ['-timestamp']
+    list_select_related = ['user']
+    # Evita un COUNT(*) sobre toda la tabla en cada página del listado
+    show_full_result_count = False
     
     def has_add_permission(self, request):
         """Deshabilita la creación manual de registros."""
@@ -60,3 +68,20 @@ class AuditLogAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         """Deshabilita la eliminación de registros."""
         return False
+
+
+@admin.register(AuditLogArchive)
+class AuditLogArchiveAdmin(admin.ModelAdmin):
+    """Configuración del panel de administración para particiones archivadas."""
+
+    list_display = ['periodo', 'row_count', 'format', 'file_path', 'archived_at']
+    list_filter = ['format']
+    ordering = ['-periodo', '-archived_at']
+
+    def has_add_permission(self, request):
+        """Los archivos solo se crean con el comando archive_audit_logs."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Deshabilita la modificación de registros."""
+        return False
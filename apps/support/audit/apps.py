@@ -3,4 +3,8 @@ from django.apps import AppConfig
 
 class AuditConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.support.audit'
\ No newline at end of file
+    name = 'apps.support.audit'
+
+    def ready(self):
+        """Importa las señales cuando la aplicación esté lista"""
+        import apps.support.audit.signals
@@ -0,0 +1,227 @@
+"""Buffer asíncrono para la escritura de registros de auditoría.
+
+Los registros se encolan en memoria desde el hilo de la solicitud y un hilo
+escritor en segundo plano los persiste en lotes mediante ``bulk_create``.
+De esta forma ninguna solicitud HTTP espera por un INSERT de auditoría.
+
+Configuración (``settings.AUDIT_BUFFER``):
+    ENABLED (bool): Si es False los registros se escriben de forma síncrona.
+    MAX_QUEUE_SIZE (int): Capacidad máxima de la cola en memoria.
+    BATCH_SIZE (int): Cantidad máxima de registros por ``bulk_create``.
+    FLUSH_INTERVAL (float): Segundos máximos que un registro espera en cola.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AUDIT_BUFFER = {
+    'ENABLED': True,
+    'MAX_QUEUE_SIZE': 10000,
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 2.0,
+}
+
+
+class AuditBuffer:
+    """Cola acotada con un hilo escritor que persiste registros en lotes.
+
+    Cada registro es un diccionario con los argumentos de ``AuditLog``. Si el
+    valor de ``details`` es un callable, se evalúa en el hilo escritor, lo que
+    permite diferir la serialización de cuerpos fuera del hilo de la solicitud.
+
+    Cuando la cola está llena el registro se descarta (nunca se bloquea al
+    llamador) y se incrementa el contador ``dropped``. Al superar la marca de
+    agua alta se despierta al escritor sin esperar el intervalo de vaciado.
+
+    Attributes:
+        max_queue_size (int): Capacidad máxima de la cola.
+        batch_size (int): Registros por lote de escritura.
+        flush_interval (float): Intervalo máximo entre vaciados en segundos.
+        enabled (bool): Si es False, ``enqueue`` escribe de forma síncrona.
+    """
+
+    HIGH_WATER_RATIO = 0.8
+
+    def __init__(self, max_queue_size=10000, batch_size=200, flush_interval=2.0, enabled=True):
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._high_water = max(1, int(max_queue_size * self.HIGH_WATER_RATIO))
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._thread = None
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'failed': 0,
+            'flushes': 0,
+            'high_water_hits': 0,
+        }
+
+    @classmethod
+    def from_settings(cls):
+        """Crea un buffer a partir de ``settings.AUDIT_BUFFER``."""
+        config = {**DEFAULT_AUDIT_BUFFER, **getattr(settings, 'AUDIT_BUFFER', {})}
+        return cls(
+            max_queue_size=config['MAX_QUEUE_SIZE'],
+            batch_size=config['BATCH_SIZE'],
+            flush_interval=config['FLUSH_INTERVAL'],
+            enabled=config['ENABLED'],
+        )
+
+    @property
+    def stats(self):
+        """Copia de los contadores del buffer más la profundidad actual de la cola."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize()
+        return stats
+
+    def _incr(self, counter, amount=1):
+        with self._stats_lock:
+            self._stats[counter] += amount
+
+    def enqueue(self, record):
+        """Encola un registro de auditoría sin bloquear al llamador.
+
+        Args:
+            record (dict): Argumentos para construir un ``AuditLog``.
+
+        Returns:
+            bool: True si el registro fue aceptado, False si se descartó.
+        """
+        if not self.enabled:
+            self._write([record])
+            return True
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._incr('dropped')
+            self._wakeup.set()
+            return False
+
+        self._incr('enqueued')
+        depth = self._queue.qsize()
+        if depth >= self._high_water:
+            self._incr('high_water_hits')
+            self._wakeup.set()
+        elif depth >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def flush(self):
+        """Vacía la cola completa en el hilo actual.
+
+        Returns:
+            int: Cantidad de registros escritos.
+        """
+        written = 0
+        with self._write_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                written += self._write(batch)
+        return written
+
+    def shutdown(self, timeout=5.0):
+        """Detiene el hilo escritor y persiste los registros pendientes.
+
+        Args:
+            timeout (float): Segundos máximos de espera por el hilo escritor.
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        self.flush()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                name='audit-buffer-writer',
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _run(self):
+        """Bucle del hilo escritor: vacía por lote lleno o por intervalo."""
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def _take_batch(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        from .models import AuditLog
+
+        try:
+            instances = [AuditLog(**self._resolve(record)) for record in batch]
+            AuditLog.objects.bulk_create(instances, batch_size=self.batch_size)
+        except Exception:
+            self._incr('failed', len(batch))
+            logger.exception('Error al escribir %s registros de auditoría', len(batch))
+            return 0
+
+        self._incr('written', len(batch))
+        self._incr('flushes')
+        return len(batch)
+
+    @staticmethod
+    def _resolve(record):
+        details = record.get('details')
+        if callable(details):
+            record = {**record, 'details': details()}
+        return record
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_audit_buffer():
+    """Retorna el buffer de auditoría del proceso, creándolo si es necesario.
+
+    El vaciado final queda registrado con ``atexit`` para no perder registros
+    al apagar el proceso.
+    """
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = AuditBuffer.from_settings()
+                atexit.register(_buffer.shutdown)
+    return _buffer
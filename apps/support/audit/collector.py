@@ -0,0 +1,191 @@
+"""Recolector de cambios de auditoría con alcance de transacción.
+
+Dentro de un bloque ``transaction.atomic`` los cambios emitidos por las
+señales se acumulan y se escriben al confirmar la transacción más externa
+con una sola revisión de django-reversion y un único ``bulk_create``,
+aunque incluya bloques ``atomic`` anidados. Si la transacción se revierte,
+los cambios se descartan junto con ella; si se revierte un savepoint, solo
+los cambios registrados dentro de él. Fuera de una
+transacción los cambios se escriben de inmediato.
+"""
+
+import logging
+import threading
+
+import reversion
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class _Savepoint:
+    """Cambios registrados en un nivel de savepoint de la transacción."""
+
+    def __init__(self, committed=False):
+        self.committed = committed
+
+    def confirm(self):
+        self.committed = True
+
+
+class _TransactionBatch:
+    """Cambios pendientes de una transacción, incluidos sus savepoints.
+
+    Cada nivel de savepoint registra un callback ``on_commit`` que Django
+    descarta si ese savepoint se revierte; al confirmar la transacción solo
+    se escriben los cambios de los niveles cuyo callback se ejecutó. La
+    escritura se registra sin savepoints después de esos callbacks, por lo
+    que solo un rollback total la descarta.
+    """
+
+    def __init__(self, collector, using):
+        self.collector = collector
+        self.using = using
+        self.entries = []
+        self.savepoints = {}
+        self.callback = None
+        self.index = None
+
+    def add(self, connection, entry):
+        key = tuple(connection.savepoint_ids)
+        savepoint = self.savepoints.get(key)
+        if savepoint is None:
+            # El nivel más externo solo se revierte junto con la escritura
+            savepoint = self.savepoints[key] = _Savepoint(committed=not key)
+            if key:
+                transaction.on_commit(savepoint.confirm, using=self.using)
+            self._schedule(connection)
+        self.entries.append((savepoint, entry))
+
+    def _schedule(self, connection):
+        """Registra la escritura después de los callbacks de los savepoints.
+
+        Solo la última escritura registrada escribe; las anteriores quedan
+        sin efecto.
+        """
+        def flush():
+            if self.callback is flush:
+                self.flush()
+
+        connection.run_on_commit.append((set(), flush, False))
+        self.callback = flush
+        self.index = len(connection.run_on_commit) - 1
+
+    def is_pending(self, connection):
+        """Indica si la escritura del lote sigue registrada.
+
+        Un rollback total descarta el callback; en ese caso el lote no debe
+        recibir más cambios. Se revisa la posición guardada al registrarlo y
+        solo si un rollback de savepoint movió la lista se busca de nuevo.
+        """
+        callbacks = connection.run_on_commit
+        if self.index is not None and self.index < len(callbacks) and callbacks[self.index][1] is self.callback:
+            return True
+        self.index = next((i for i, item in enumerate(callbacks) if item[1] is self.callback), None)
+        return self.index is not None
+
+    def flush(self):
+        self.collector.discard(self)
+        self.collector.write(
+            [entry for savepoint, entry in self.entries if savepoint.committed], using=self.using
+        )
+
+
+class AuditCollector:
+    """Acumula cambios de modelos y los persiste al confirmar la transacción.
+
+    Cada cambio es un diccionario con las llaves ``instance``, ``action``,
+    ``model``, ``record_id`` y ``user``.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def add(self, entry, using=DEFAULT_DB_ALIAS):
+        """Registra un cambio en el lote de la transacción activa.
+
+        Args:
+            entry (dict): Datos del cambio a auditar.
+            using (str): Alias de la base de datos donde ocurrió el cambio.
+        """
+        connection = connections[using]
+        if not connection.in_atomic_block:
+            self.write([entry], using=using)
+            return
+        self._current_batch(connection, using).add(connection, entry)
+
+    def _current_batch(self, connection, using):
+        batches = getattr(self._local, 'batches', None)
+        if batches is None:
+            batches = self._local.batches = {}
+
+        batch = batches.get(using)
+        if batch is None or not batch.is_pending(connection):
+            # La transacción anterior se revirtió por completo
+            batch = batches[using] = _TransactionBatch(self, using)
+        return batch
+
+    def discard(self, batch):
+        """Olvida el lote de una transacción ya confirmada."""
+        batches = getattr(self._local, 'batches', {})
+        if batches.get(batch.using) is batch:
+            del batches[batch.using]
+
+    def write(self, entries, using=DEFAULT_DB_ALIAS):
+        """Escribe los cambios con una revisión y un ``bulk_create``.
+
+        Los errores se registran en el log y no se propagan, para que una
+        falla de auditoría no afecte la operación que la originó.
+
+        Args:
+            entries (list): Cambios a persistir.
+            using (str): Alias de la base de datos.
+        """
+        if not entries:
+            return
+        from .models import AuditLog
+
+        try:
+            user = next((e['user'] for e in entries if e['user'] is not None), None)
+            with reversion.create_revision(using=using):
+                reversion.set_user(user)
+                reversion.set_comment(self._summary(entries))
+                for entry in entries:
+                    instance = entry['instance']
+                    if entry['action'] != 'deleted' and reversion.is_registered(type(instance)):
+                        reversion.add_to_revision(instance)
+
+                AuditLog.objects.using(using).bulk_create([
+                    AuditLog(
+                        user=entry['user'],
+                        action=entry['action'],
+                        model=entry['model'],
+                        record_id=entry['record_id'],
+                    )
+                    for entry in entries
+                ])
+        except Exception:
+            logger.exception('Error al escribir %s cambios de auditoría', len(entries))
+
+    @staticmethod
+    def _summary(entries, limit=20):
+        parts = [f"{e['action']} {e['model']}#{e['record_id']}" for e in entries[:limit]]
+        if len(entries) > limit:
+            parts.append(f'... (+{len(entries) - limit})')
+        return f'{len(entries)} cambios: ' + ', '.join(parts)
+
+
+def resolve_audit_user(instance):
+    """Obtiene el usuario responsable de un cambio a partir de la instancia.
+
+    Returns:
+        User o None si la instancia no referencia a un usuario persistido.
+    """
+    user = getattr(instance, 'id_user', getattr(instance, 'user', None))
+    if isinstance(user, User) and user.pk is not None:
+        return user
+    return None
+
+
+audit_collector = AuditCollector()
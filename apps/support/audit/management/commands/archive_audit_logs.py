@@ -0,0 +1,88 @@
+"""
+Comando de gestión para archivar particiones vencidas de auditoría
+
+Exporta cada partición mensual de AuditLog más antigua que la retención
+configurada a un archivo comprimido y luego la elimina de la tabla.
+
+Uso:
+    python manage.py archive_audit_logs
+    python manage.py archive_audit_logs --retention-months 6 --format columnar
+    python manage.py archive_audit_logs --output-dir /backups/audit --dry-run
+
+Opciones:
+    --retention-months: Meses a conservar además del mes actual
+    --format: Formato del archivo (jsonl o columnar)
+    --output-dir: Directorio de destino de los archivos
+    --chunk-size: Filas por bloque de lectura
+    --dry-run: Mostrar las particiones vencidas sin archivarlas
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.support.audit.partitions import ARCHIVE_FORMATS, archive_partition, expired_periodos
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Archiva en archivos comprimidos las particiones vencidas de auditoría y las elimina'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-months',
+            type=int,
+            default=settings.AUDIT_RETENTION_MONTHS,
+            help='Meses a conservar además del mes actual'
+        )
+        parser.add_argument(
+            '--format',
+            choices=ARCHIVE_FORMATS,
+            default='jsonl',
+            help='Formato del archivo (jsonl o columnar)'
+        )
+        parser.add_argument(
+            '--output-dir',
+            type=str,
+            default=str(settings.AUDIT_ARCHIVE_DIR),
+            help='Directorio de destino de los archivos'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Filas por bloque de lectura'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Mostrar las particiones vencidas sin archivarlas'
+        )
+
+    def handle(self, *args, **options):
+        if options['retention_months'] < 0:
+            raise CommandError('La retención debe ser un número de meses positivo')
+
+        periodos = expired_periodos(options['retention_months'])
+        if not periodos:
+            self.stdout.write(self.style.SUCCESS('No hay particiones vencidas'))
+            return
+
+        for periodo in periodos:
+            if options['dry_run']:
+                self.stdout.write(f'[dry-run] Partición {periodo} sería archivada')
+                continue
+
+            try:
+                archive = archive_partition(
+                    periodo,
+                    options['output_dir'],
+                    fmt=options['format'],
+                    chunk_size=options['chunk_size'],
+                )
+            except Exception as e:
+                logger.exception(f'Error al archivar la partición {periodo}')
+                raise CommandError(f'Error al archivar la partición {periodo}: {e}')
+
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Partición {periodo}: {archive.row_count} registros en {archive.file_path}'
+            ))
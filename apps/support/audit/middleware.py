@@ -1,61 +1,105 @@
 import json
-from django.contrib.auth import get_user_model
+import time
 from django.utils.deprecation import MiddlewareMixin
 from django.utils import timezone
-from .models import AuditLog
+from .buffer import get_audit_buffer
+from .policies import get_capture_policy_engine
+
+
+def _decode_body(captured):
+    """Decodifica un cuerpo capturado y lo interpreta como JSON si es posible.
+
+    Args:
+        captured (CapturedBody): Cuerpo capturado por la política o None.
+
+    Returns:
+        El JSON interpretado, el texto decodificado o None si no es texto.
+    """
+    if captured is None:
+        return None
+    try:
+        # Un cuerpo truncado puede cortar un carácter multibyte al final
+        text = captured.content.decode('utf-8', errors='ignore' if captured.truncated else 'strict')
+    except UnicodeDecodeError:
+        return None
+    if captured.truncated:
+        return f'{text}... [truncado]'
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+def _build_details(request_body, response_body):
+    """Construye los detalles JSON de una solicitud HTTP.
+
+    Se ejecuta en el hilo escritor del buffer de auditoría, no en el hilo
+    de la solicitud. El método, la ruta y el código de estado se guardan en
+    columnas propias, por lo que aquí solo quedan los cuerpos capturados.
+
+    Returns:
+        dict: Cuerpos de la solicitud y la respuesta, o None si no se capturaron.
+    """
+    if request_body is None and response_body is None:
+        return None
+    return {
+        'request_body': _decode_body(request_body),
+        'response_body': _decode_body(response_body),
+    }
 
-User = get_user_model()
 
 class AuditLogMiddleware(MiddlewareMixin):
     """Middleware para registrar automáticamente las solicitudes HTTP.
-    
-    Este middleware captura todas las solicitudes HTTP y sus respuestas,
-    registrándolas en el sistema de auditoría para su posterior análisis.
+
+    Este middleware captura las solicitudes HTTP y sus respuestas según la
+    política de captura de cada ruta (ver ``policies.py``), registrándolas en
+    el sistema de auditoría para su posterior análisis. Los registros se
+    envían al buffer de auditoría, por lo que la solicitud nunca espera por
+    la escritura en base de datos.
     """
-    
+
+    def process_request(self, request):
+        """Marca el inicio de la solicitud para calcular su latencia."""
+        request._audit_started = time.monotonic()
+
     def process_response(self, request, response):
         """Procesa la respuesta y registra la actividad.
-        
+
         Args:
             request: La solicitud HTTP.
             response: La respuesta HTTP.
-            
+
         Returns:
             response: La respuesta HTTP sin modificar.
         """
-        
+        policy = get_capture_policy_engine().resolve(request.path)
+        if not policy.should_log():
+            return response
+
         # Obtener el usuario autenticado o None
-        user = request.user if request.user.is_authenticated else None
-        
-        # Intentar decodificar el cuerpo de la solicitud
-        try:
-            request_body = request.body.decode('utf-8')
-            try:
-                request_body = json.loads(request_body)
-            except json.JSONDecodeError:
-                pass
-        except:
-            request_body = None
-        
-        # Intentar decodificar el cuerpo de la respuesta
-        try:
-            response_body = response.content.decode('utf-8')
-            try:
-                response_body = json.loads(response_body)
-            except json.JSONDecodeError:
-                pass
-        except:
-            response_body = None
-        
-        # Crear el registro de auditoría
-        AuditLog.objects.create(
-            timestamp=timezone.now(),
-            user=user,
-            action=f'{request.method} {request.path}',
-            model='API Request',
-            details=f'Request Body: {request_body}, '
-                   f'Response Code: {response.status_code}, '
-                   f'Response Body: {response_body}'
-        )
-        
-        return response
\ No newline at end of file
+        user = getattr(request, 'user', None)
+        user_id = user.pk if user is not None and user.is_authenticated else None
+
+        # Capturar los cuerpos permitidos; la decodificación se difiere al escritor
+        request_body = response_body = None
+        if policy.should_capture_bodies(request):
+            request_body = policy.capture_request_body(request)
+            response_body = policy.capture_response_body(response)
+
+        started = getattr(request, '_audit_started', None)
+        latency_ms = int((time.monotonic() - started) * 1000) if started is not None else None
+
+        # Encolar el registro de auditoría
+        get_audit_buffer().enqueue({
+            'timestamp': timezone.now(),
+            'user_id': user_id,
+            'action': f'{request.method} {request.path}',
+            'model': 'API Request',
+            'method': request.method,
+            'path': request.path[:255],
+            'status_code': response.status_code,
+            'latency_ms': latency_ms,
+            'details': lambda: _build_details(request_body, response_body),
+        })
+
+        return response
@@ -0,0 +1,62 @@
+from datetime import timezone as dt_timezone
+
+import apps.support.audit.models
+from django.db import migrations, models
+
+
+def backfill_periodo(apps, schema_editor):
+    """Calcula la partición mensual (AAAAMM, en UTC) de los registros existentes.
+
+    La fórmula se copia aquí en lugar de importar ``periodo_for`` para que la
+    migración no cambie si el modelo cambia.
+    """
+    AuditLog = apps.get_model('audit', 'AuditLog')
+    batch = []
+    for log in AuditLog.objects.only('id', 'timestamp').iterator(chunk_size=2000):
+        timestamp = log.timestamp
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(dt_timezone.utc)
+        log.periodo = timestamp.year * 100 + timestamp.month
+        batch.append(log)
+        if len(batch) >= 2000:
+            AuditLog.objects.bulk_update(batch, ['periodo'])
+            batch = []
+    if batch:
+        AuditLog.objects.bulk_update(batch, ['periodo'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0002_auditlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='periodo',
+            field=apps.support.audit.models.PeriodoField(default=0, editable=False, verbose_name='Periodo'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_periodo, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['periodo', '-timestamp'], name='audit_periodo_ts_idx'),
+        ),
+        migrations.CreateModel(
+            name='AuditLogArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.PositiveIntegerField(db_index=True, verbose_name='Periodo')),
+                ('file_path', models.CharField(max_length=500, verbose_name='Archivo')),
+                ('format', models.CharField(choices=[('jsonl', 'JSON Lines comprimido'), ('columnar', 'Columnar comprimido')], max_length=10, verbose_name='Formato')),
+                ('row_count', models.PositiveIntegerField(verbose_name='Registros archivados')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de archivado')),
+            ],
+            options={
+                'verbose_name': 'Archivo de Auditoría',
+                'verbose_name_plural': 'Archivos de Auditoría',
+                'ordering': ['-periodo', '-archived_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,120 @@
+import re
+
+from django.db import migrations, models
+
+RESPONSE_CODE = re.compile(r'Response Code: (\d{3})')
+
+FULL_TEXT_INDEX = 'audit_details_fts_idx'
+
+
+def migrate_legacy_details(apps, schema_editor):
+    """Copia los detalles de texto a JSON y extrae los campos estructurados.
+
+    El texto original se conserva como ``{'legacy': texto}``. En los registros
+    de solicitudes HTTP el método, la ruta y el código de estado se obtienen
+    de ``action`` y del texto de detalles.
+    """
+    AuditLog = apps.get_model('audit', 'AuditLog')
+    fields = ['details_json', 'method', 'path', 'status_code']
+    batch = []
+    queryset = AuditLog.objects.only('id', 'action', 'model', 'details')
+    for log in queryset.iterator(chunk_size=2000):
+        if log.details:
+            log.details_json = {'legacy': log.details}
+        if log.model == 'API Request':
+            method, _, path = log.action.partition(' ')
+            log.method = method[:10]
+            log.path = path[:255]
+            match = RESPONSE_CODE.search(log.details or '')
+            if match:
+                log.status_code = int(match.group(1))
+        batch.append(log)
+        if len(batch) >= 2000:
+            AuditLog.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        AuditLog.objects.bulk_update(batch, fields)
+
+
+def create_full_text_index(apps, schema_editor):
+    """Crea un índice GIN de texto completo sobre ``details`` en PostgreSQL.
+
+    La expresión coincide con la que genera ``SearchVector('details',
+    config='simple')``, usada por el filtro ``details_search`` de la API.
+    En otros motores no se crea ningún índice.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = schema_editor.quote_name(apps.get_model('audit', 'AuditLog')._meta.db_table)
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {FULL_TEXT_INDEX} ON {table} '
+        "USING gin (to_tsvector('simple'::regconfig, COALESCE((details)::text, '')))"
+    )
+
+
+def drop_full_text_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {FULL_TEXT_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0003_auditlog_periodo_partitions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='method',
+            field=models.CharField(blank=True, max_length=10, verbose_name='Método HTTP'),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='path',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Ruta'),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Código de estado'),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='latency_ms',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Latencia (ms)'),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='details_json',
+            field=models.JSONField(blank=True, null=True, verbose_name='Detalles'),
+        ),
+        migrations.RunPython(migrate_legacy_details, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='auditlog',
+            name='details',
+        ),
+        migrations.RenameField(
+            model_name='auditlog',
+            old_name='details_json',
+            new_name='details',
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['user', '-timestamp'], name='audit_user_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['model', 'record_id'], name='audit_model_record_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['path', '-timestamp'], name='audit_path_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['status_code', '-timestamp'], name='audit_status_ts_idx'),
+        ),
+        migrations.RunPython(create_full_text_index, drop_full_text_index),
+    ]
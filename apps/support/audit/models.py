@@ -1,25 +1,85 @@
+from datetime import timezone as dt_timezone
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+def periodo_for(value):
+    """Calcula la llave de partición mensual (AAAAMM, en UTC) de una fecha.
+
+    Args:
+        value (datetime): Fecha y hora a particionar.
+
+    Returns:
+        int: Periodo en formato AAAAMM, p. ej. 202508.
+    """
+    if timezone.is_aware(value):
+        value = value.astimezone(dt_timezone.utc)
+    return value.year * 100 + value.month
+
+
+class PeriodoField(models.PositiveIntegerField):
+    """Llave de partición mensual derivada de un campo de fecha del modelo.
+
+    El valor se calcula en ``pre_save``, que Django invoca tanto en ``save()``
+    como en ``bulk_create``, por lo que ningún camino de escritura lo omite.
+    """
+
+    def __init__(self, *args, source='timestamp', **kwargs):
+        self.source = source
+        kwargs.setdefault('editable', False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.source != 'timestamp':
+            kwargs['source'] = self.source
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = periodo_for(getattr(model_instance, self.source))
+        setattr(model_instance, self.attname, value)
+        return value
+
 
 class AuditLog(models.Model):
     """Modelo para registrar las acciones y cambios en el sistema.
-    
+
     Este modelo almacena información detallada sobre las operaciones realizadas
     en el sistema, incluyendo quién las realizó, cuándo, y qué cambios se hicieron.
-    
+
+    Los registros se agrupan en particiones mensuales mediante ``periodo``.
+    Las consultas por rango de fechas se restringen a las particiones que
+    se solapan con el rango y las particiones vencidas se archivan con el
+    comando ``archive_audit_logs``.
+
+    Los datos de las solicitudes HTTP se guardan en columnas estructuradas e
+    indexadas (método, ruta, código de estado, latencia) para que las
+    búsquedas no tengan que recorrer el texto de ``details``.
+
     Attributes:
         timestamp (DateTimeField): Fecha y hora de la acción.
+        periodo (PeriodoField): Partición mensual (AAAAMM) derivada de timestamp.
         user (ForeignKey): Usuario que realizó la acción.
         action (CharField): Tipo de acción realizada (crear, actualizar, eliminar).
         model (CharField): Modelo/entidad afectada por la acción.
         record_id (PositiveIntegerField): ID del registro afectado.
-        details (TextField): Detalles adicionales de la acción.
+        method (CharField): Método HTTP de la solicitud auditada.
+        path (CharField): Ruta HTTP de la solicitud auditada.
+        status_code (PositiveSmallIntegerField): Código de estado de la respuesta.
+        latency_ms (PositiveIntegerField): Duración de la solicitud en milisegundos.
+        details (JSONField): Detalles adicionales de la acción.
     """
-    
+
     timestamp = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         verbose_name='Fecha y hora'
     )
+    periodo = PeriodoField(
+        verbose_name='Periodo'
+    )
     user = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
@@ -40,7 +100,27 @@ class AuditLog(models.Model):
         blank=True,
         verbose_name='ID del registro'
     )
-    details = models.TextField(
+    method = models.CharField(
+        max_length=10,
+        blank=True,
+        verbose_name='Método HTTP'
+    )
+    path = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Ruta'
+    )
+    status_code = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Código de estado'
+    )
+    latency_ms = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Latencia (ms)'
+    )
+    details = models.JSONField(
         blank=True,
         null=True,
         verbose_name='Detalles'
@@ -50,9 +130,60 @@ class AuditLog(models.Model):
         verbose_name = "Registro de Auditoría"
         verbose_name_plural = "Registros de Auditoría"
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['periodo', '-timestamp'], name='audit_periodo_ts_idx'),
+            models.Index(fields=['user', '-timestamp'], name='audit_user_ts_idx'),
+            models.Index(fields=['model', 'record_id'], name='audit_model_record_idx'),
+            models.Index(fields=['path', '-timestamp'], name='audit_path_ts_idx'),
+            models.Index(fields=['status_code', '-timestamp'], name='audit_status_ts_idx'),
+        ]
 
     def __str__(self):
         """Representación en cadena del registro de auditoría."""
         return f'{self.timestamp} - {self.user} - {self.action} - {self.model} - {self.record_id}'
 
-# Create your models here.
+
+class AuditLogArchive(models.Model):
+    """Partición mensual de auditoría exportada a archivo y eliminada de la tabla.
+
+    Attributes:
+        periodo (PositiveIntegerField): Partición archivada (AAAAMM).
+        file_path (CharField): Ruta del archivo comprimido generado.
+        format (CharField): Formato del archivo (jsonl o columnar).
+        row_count (PositiveIntegerField): Cantidad de registros archivados.
+        archived_at (DateTimeField): Fecha y hora del archivado.
+    """
+
+    FORMAT_CHOICES = [
+        ('jsonl', 'JSON Lines comprimido'),
+        ('columnar', 'Columnar comprimido'),
+    ]
+
+    periodo = models.PositiveIntegerField(
+        db_index=True,
+        verbose_name='Periodo'
+    )
+    file_path = models.CharField(
+        max_length=500,
+        verbose_name='Archivo'
+    )
+    format = models.CharField(
+        max_length=10,
+        choices=FORMAT_CHOICES,
+        verbose_name='Formato'
+    )
+    row_count = models.PositiveIntegerField(
+        verbose_name='Registros archivados'
+    )
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de archivado'
+    )
+
+    class Meta:
+        verbose_name = "Archivo de Auditoría"
+        verbose_name_plural = "Archivos de Auditoría"
+        ordering = ['-periodo', '-archived_at']
+
+    def __str__(self):
+        return f'{self.periodo} - {self.row_count} registros ({self.format})'
@@ -0,0 +1,177 @@
+"""Utilidades de particionamiento mensual y archivado de registros de auditoría.
+
+Cada ``AuditLog`` pertenece a una partición mensual (``periodo`` = AAAAMM).
+Este módulo calcula las particiones que se solapan con un rango de fechas y
+exporta particiones completas a archivos comprimidos antes de eliminarlas.
+
+Formatos de archivo:
+    jsonl: Un objeto JSON por registro, comprimido con gzip.
+    columnar: Grupos de filas en orientación columnar (un objeto JSON por
+        grupo con una lista de valores por columna), comprimido con gzip.
+        Es el mismo esquema de grupos de filas de Parquet sin requerir
+        dependencias adicionales.
+"""
+
+import gzip
+import json
+import os
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import AuditLog, AuditLogArchive, periodo_for
+
+ARCHIVE_FORMATS = ('jsonl', 'columnar')
+
+ARCHIVE_FIELDS = [
+    'id', 'timestamp', 'periodo', 'user_id', 'action', 'model', 'record_id',
+    'method', 'path', 'status_code', 'latency_ms', 'details',
+]
+
+
+def periodo_range(start=None, end=None):
+    """Calcula las particiones que se solapan con un rango de fechas.
+
+    Args:
+        start (datetime): Inicio del rango o None si no está acotado.
+        end (datetime): Fin del rango o None si no está acotado.
+
+    Returns:
+        tuple: (periodo_inicial, periodo_final); cualquiera puede ser None.
+    """
+    return (
+        periodo_for(start) if start is not None else None,
+        periodo_for(end) if end is not None else None,
+    )
+
+
+def shift_periodo(periodo, months):
+    """Desplaza un periodo AAAAMM una cantidad de meses (positiva o negativa)."""
+    index = (periodo // 100) * 12 + (periodo % 100 - 1) + months
+    return (index // 12) * 100 + index % 12 + 1
+
+
+def expired_periodos(retention_months, now=None):
+    """Lista las particiones con registros más antiguos que la retención.
+
+    Args:
+        retention_months (int): Meses completos a conservar además del actual.
+        now (datetime): Fecha de referencia; por defecto la actual.
+
+    Returns:
+        list: Periodos vencidos presentes en la tabla, en orden ascendente.
+    """
+    cutoff = shift_periodo(periodo_for(now or timezone.now()), -retention_months)
+    return list(
+        AuditLog.objects.filter(periodo__lt=cutoff)
+        .order_by('periodo')
+        .values_list('periodo', flat=True)
+        .distinct()
+    )
+
+
+def _write_jsonl(handle, rows):
+    for row in rows:
+        handle.write(json.dumps(dict(zip(ARCHIVE_FIELDS, row)), cls=DjangoJSONEncoder))
+        handle.write('\n')
+
+
+def _write_columnar(handle, rows, group_size):
+    group = []
+
+    def flush():
+        columns = {field: [row[i] for row in group] for i, field in enumerate(ARCHIVE_FIELDS)}
+        handle.write(json.dumps({'rows': len(group), 'columns': columns}, cls=DjangoJSONEncoder))
+        handle.write('\n')
+        group.clear()
+
+    for row in rows:
+        group.append(row)
+        if len(group) >= group_size:
+            flush()
+    if group:
+        flush()
+
+
+def archive_partition(periodo, output_dir, fmt='jsonl', chunk_size=5000):
+    """Exporta una partición a un archivo comprimido y la elimina de la tabla.
+
+    Los registros se leen con un iterador por bloques, por lo que la memoria
+    usada no depende del tamaño de la partición. La eliminación ocurre en la
+    misma transacción que el registro del archivo y solo si la cantidad de
+    filas exportadas coincide con la cantidad de filas eliminadas.
+
+    Args:
+        periodo (int): Partición a archivar (AAAAMM).
+        output_dir (str): Directorio de destino.
+        fmt (str): Formato del archivo (jsonl o columnar).
+        chunk_size (int): Filas por bloque de lectura y por grupo columnar.
+
+    Returns:
+        AuditLogArchive: Registro del archivo generado.
+
+    Raises:
+        ValueError: Si el formato no es válido.
+        RuntimeError: Si la cantidad de filas cambió durante el archivado.
+    """
+    if fmt not in ARCHIVE_FORMATS:
+        raise ValueError(f'Formato de archivo inválido: {fmt}')
+
+    os.makedirs(output_dir, exist_ok=True)
+    extension = 'jsonl.gz' if fmt == 'jsonl' else 'columnar.json.gz'
+    stamp = timezone.now().strftime('%Y%m%d%H%M%S')
+    file_path = os.path.join(output_dir, f'audit_{periodo}_{stamp}.{extension}')
+
+    queryset = AuditLog.objects.filter(periodo=periodo).order_by('id')
+
+    try:
+        with transaction.atomic():
+            rows = queryset.values_list(*ARCHIVE_FIELDS).iterator(chunk_size=chunk_size)
+            counter = _CountingIterator(rows)
+            with gzip.open(file_path, 'wt', encoding='utf-8') as handle:
+                if fmt == 'jsonl':
+                    _write_jsonl(handle, counter)
+                else:
+                    _write_columnar(handle, counter, chunk_size)
+
+            # DELETE directo: evita que el ORM cargue cada fila para emitir señales
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {connection.ops.quote_name(AuditLog._meta.db_table)} WHERE periodo = %s',
+                    [periodo],
+                )
+                deleted = cursor.rowcount
+
+            if deleted != counter.count:
+                raise RuntimeError(
+                    f'La partición {periodo} cambió durante el archivado '
+                    f'({counter.count} exportados, {deleted} eliminados)'
+                )
+
+            return AuditLogArchive.objects.create(
+                periodo=periodo,
+                file_path=file_path,
+                format=fmt,
+                row_count=counter.count,
+            )
+    except Exception:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+
+
+class _CountingIterator:
+    """Iterador que cuenta los elementos consumidos."""
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self._iterator)
+        self.count += 1
+        return item
@@ -0,0 +1,215 @@
+"""Políticas de captura de cuerpos para el middleware de auditoría.
+
+Las políticas se configuran por ruta en ``settings.AUDIT_CAPTURE_POLICIES`` y
+se evalúan antes de acceder a ``response.content``, de modo que las respuestas
+en streaming, binarias o demasiado grandes nunca se materializan solo para
+registrarlas.
+
+Ejemplo de configuración:
+
+```python
+AUDIT_CAPTURE_POLICIES = {
+    'DEFAULT': {
+        'MODE': 'full',
+        'MAX_BODY_BYTES': 4096,
+        'ALLOWED_CONTENT_TYPES': ['application/json', 'text/'],
+        'DENIED_CONTENT_TYPES': ['multipart/form-data'],
+        'GET_SAMPLE_RATE': 1.0,
+    },
+    'ROUTES': [
+        {'PATTERN': r'^/media/', 'MODE': 'skip'},
+        {'PATTERN': r'^/api/(v1/)?documents/', 'MODE': 'metadata'},
+    ],
+}
+```
+
+Modos disponibles:
+    full: Registra la solicitud y captura los cuerpos permitidos.
+    metadata: Registra la solicitud sin cuerpos.
+    skip: No registra la solicitud.
+"""
+
+import random
+import re
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+MODE_FULL = 'full'
+MODE_METADATA = 'metadata'
+MODE_SKIP = 'skip'
+
+DEFAULT_POLICY = {
+    'MODE': MODE_FULL,
+    'MAX_BODY_BYTES': 4096,
+    'ALLOWED_CONTENT_TYPES': ['application/json', 'text/'],
+    'DENIED_CONTENT_TYPES': ['multipart/form-data', 'application/octet-stream'],
+    'GET_SAMPLE_RATE': 1.0,
+}
+
+
+class CapturedBody:
+    """Cuerpo HTTP capturado, posiblemente truncado.
+
+    Attributes:
+        content (bytes): Bytes capturados.
+        truncated (bool): True si el cuerpo original superaba el límite.
+    """
+
+    __slots__ = ('content', 'truncated')
+
+    def __init__(self, content, truncated=False):
+        self.content = content
+        self.truncated = truncated
+
+
+class CapturePolicy:
+    """Política de captura aplicada a un grupo de rutas.
+
+    Attributes:
+        mode (str): Modo de captura (full, metadata o skip).
+        max_body_bytes (int): Bytes máximos capturados por cuerpo.
+        allowed_content_types (list): Prefijos de content-type permitidos.
+        denied_content_types (list): Prefijos de content-type excluidos.
+        get_sample_rate (float): Fracción de solicitudes GET con cuerpos capturados.
+    """
+
+    def __init__(self, mode=MODE_FULL, max_body_bytes=4096, allowed_content_types=None,
+                 denied_content_types=None, get_sample_rate=1.0):
+        if mode not in (MODE_FULL, MODE_METADATA, MODE_SKIP):
+            raise ValueError(f'Modo de captura inválido: {mode}')
+        self.mode = mode
+        self.max_body_bytes = max_body_bytes
+        self.allowed_content_types = tuple(allowed_content_types or ())
+        self.denied_content_types = tuple(denied_content_types or ())
+        self.get_sample_rate = get_sample_rate
+
+    @classmethod
+    def from_config(cls, config):
+        """Crea una política a partir de un diccionario de configuración."""
+        return cls(
+            mode=config['MODE'],
+            max_body_bytes=config['MAX_BODY_BYTES'],
+            allowed_content_types=config['ALLOWED_CONTENT_TYPES'],
+            denied_content_types=config['DENIED_CONTENT_TYPES'],
+            get_sample_rate=config['GET_SAMPLE_RATE'],
+        )
+
+    def should_log(self):
+        """Indica si la solicitud debe registrarse."""
+        return self.mode != MODE_SKIP
+
+    def should_capture_bodies(self, request):
+        """Indica si se deben capturar los cuerpos de esta solicitud.
+
+        Las solicitudes GET se muestrean según ``get_sample_rate``; las no
+        muestreadas se registran solo con metadatos.
+        """
+        if self.mode != MODE_FULL:
+            return False
+        if request.method == 'GET' and self.get_sample_rate < 1.0:
+            return random.random() < self.get_sample_rate
+        return True
+
+    def is_content_type_allowed(self, content_type):
+        """Verifica un content-type contra las listas de permitidos y excluidos."""
+        content_type = (content_type or '').split(';')[0].strip().lower()
+        if not content_type:
+            return False
+        if content_type.startswith(self.denied_content_types):
+            return False
+        if not self.allowed_content_types:
+            return True
+        return content_type.startswith(self.allowed_content_types)
+
+    def capture_request_body(self, request):
+        """Captura el cuerpo de la solicitud si la política lo permite.
+
+        Returns:
+            CapturedBody o None si el cuerpo no se captura.
+        """
+        if not self.is_content_type_allowed(request.META.get('CONTENT_TYPE')):
+            return None
+        try:
+            body = request.body
+        except Exception:
+            return None
+        return self._truncate(body)
+
+    def capture_response_body(self, response):
+        """Captura el cuerpo de la respuesta sin materializar streams.
+
+        Returns:
+            CapturedBody o None si el cuerpo no se captura.
+        """
+        if getattr(response, 'streaming', False):
+            return None
+        if not self.is_content_type_allowed(response.get('Content-Type')):
+            return None
+        try:
+            return self._truncate(response.content)
+        except Exception:
+            return None
+
+    def _truncate(self, body):
+        if not body:
+            return None
+        if len(body) > self.max_body_bytes:
+            return CapturedBody(body[:self.max_body_bytes], truncated=True)
+        return CapturedBody(body)
+
+
+class CapturePolicyEngine:
+    """Resuelve la política de captura aplicable a cada ruta.
+
+    Las reglas de ``ROUTES`` se evalúan en orden y la primera cuyo patrón
+    coincida con la ruta se combina sobre la política ``DEFAULT``.
+    """
+
+    def __init__(self, default=None, routes=None):
+        default_config = {**DEFAULT_POLICY, **(default or {})}
+        self.default_policy = CapturePolicy.from_config(default_config)
+        self.routes = [
+            (re.compile(route['PATTERN']), CapturePolicy.from_config({**default_config, **route}))
+            for route in routes or []
+        ]
+
+    @classmethod
+    def from_settings(cls):
+        """Crea el motor a partir de ``settings.AUDIT_CAPTURE_POLICIES``."""
+        config = getattr(settings, 'AUDIT_CAPTURE_POLICIES', {})
+        return cls(default=config.get('DEFAULT'), routes=config.get('ROUTES'))
+
+    def resolve(self, path):
+        """Retorna la política aplicable a una ruta.
+
+        Args:
+            path (str): Ruta de la solicitud.
+
+        Returns:
+            CapturePolicy: Política de la primera regla coincidente o la política por defecto.
+        """
+        for pattern, policy in self.routes:
+            if pattern.search(path):
+                return policy
+        return self.default_policy
+
+
+_engine = None
+
+
+def get_capture_policy_engine():
+    """Retorna el motor de políticas del proceso, creándolo si es necesario."""
+    global _engine
+    if _engine is None:
+        _engine = CapturePolicyEngine.from_settings()
+    return _engine
+
+
+@receiver(setting_changed)
+def reset_capture_policy_engine(setting, **kwargs):
+    """Reconstruye el motor cuando cambia la configuración (p. ej. en pruebas)."""
+    global _engine
+    if setting == 'AUDIT_CAPTURE_POLICIES':
+        _engine = None
@@ -0,0 +1,111 @@
+"""Registro de modelos auditados por las señales de auditoría.
+
+Por defecto se auditan todos los modelos excepto los listados en
+``settings.AUDIT_EXCLUDED_MODELS``. Si se define ``settings.AUDIT_MODELS``,
+solo se auditan los modelos de esa lista. Ambos usan etiquetas
+``app_label.model_name`` en minúsculas.
+
+Ejemplo:
+
+```python
+from apps.support.audit.registry import audit_registry
+
+audit_registry.exclude(Visit)   # Modelo de alta frecuencia, no auditar
+audit_registry.register(Pago)   # Forzar auditoría aunque esté excluido
+```
+"""
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+DEFAULT_EXCLUDED_MODELS = (
+    'audit.auditlog',
+    'admin.logentry',
+    'sessions.session',
+    'contenttypes.contenttype',
+    'auth.permission',
+    'migrations.migration',
+    'reversion.revision',
+    'reversion.version',
+    'token_blacklist.outstandingtoken',
+    'token_blacklist.blacklistedtoken',
+)
+
+
+class AuditRegistry:
+    """Decide qué modelos generan registros de auditoría.
+
+    Las decisiones se memorizan por clase de modelo, de modo que el costo por
+    señal es una búsqueda en diccionario.
+
+    Attributes:
+        included (set): Etiquetas permitidas o None para auditar todos los modelos.
+        excluded (set): Etiquetas excluidas.
+        suspended (bool): Si es True no se audita ningún modelo (p. ej. durante migraciones).
+    """
+
+    def __init__(self, included=None, excluded=DEFAULT_EXCLUDED_MODELS):
+        self.included = {label.lower() for label in included} if included is not None else None
+        self.excluded = {label.lower() for label in excluded}
+        self.suspended = False
+        self._cache = {}
+
+    @classmethod
+    def from_settings(cls):
+        """Crea el registro a partir de la configuración del proyecto."""
+        excluded = set(DEFAULT_EXCLUDED_MODELS)
+        excluded.update(getattr(settings, 'AUDIT_EXCLUDED_MODELS', ()))
+        return cls(included=getattr(settings, 'AUDIT_MODELS', None), excluded=excluded)
+
+    @staticmethod
+    def _label(model):
+        return model._meta.label_lower
+
+    def register(self, model):
+        """Marca un modelo como auditado."""
+        label = self._label(model)
+        self.excluded.discard(label)
+        if self.included is not None:
+            self.included.add(label)
+        self._cache.clear()
+        return model
+
+    def exclude(self, model):
+        """Excluye un modelo de la auditoría."""
+        self.excluded.add(self._label(model))
+        self._cache.clear()
+        return model
+
+    def is_audited(self, model):
+        """Indica si los cambios del modelo deben auditarse.
+
+        Args:
+            model: Clase del modelo que emitió la señal.
+
+        Returns:
+            bool: True si el modelo está auditado.
+        """
+        if self.suspended:
+            return False
+        try:
+            return self._cache[model]
+        except KeyError:
+            pass
+        label = self._label(model)
+        audited = label not in self.excluded and (self.included is None or label in self.included)
+        self._cache[model] = audited
+        return audited
+
+
+audit_registry = AuditRegistry.from_settings()
+
+
+@receiver(setting_changed)
+def reset_audit_registry(setting, **kwargs):
+    """Recarga la configuración del registro cuando cambia (p. ej. en pruebas)."""
+    if setting in ('AUDIT_MODELS', 'AUDIT_EXCLUDED_MODELS'):
+        fresh = AuditRegistry.from_settings()
+        audit_registry.included = fresh.included
+        audit_registry.excluded = fresh.excluded
+        audit_registry._cache.clear()
@@ -20,5 +20,8 @@ class AuditLogSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = AuditLog
-        fields = ['id', 'timestamp', 'user', 'action', 'model', 'record_id', 'details']
+        fields = [
+            'id', 'timestamp', 'user', 'action', 'model', 'record_id',
+            'method', 'path', 'status_code', 'latency_ms', 'details',
+        ]
         read_only_fields = ['timestamp']
\ No newline at end of file
@@ -1,80 +1,64 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_migrate, post_migrate
 from django.dispatch import receiver
-from django.utils import timezone
-import reversion
-from .models import AuditLog
+from .collector import audit_collector, resolve_audit_user
+from .registry import audit_registry
+
+
+def _collect(sender, instance, action, using):
+    """Envía un cambio al recolector de la transacción activa."""
+    audit_collector.add({
+        'instance': instance,
+        'action': action,
+        'model': sender._meta.model_name,
+        'record_id': instance.pk,
+        'user': resolve_audit_user(instance),
+    }, using=using)
+
 
 @receiver(post_save)
-def audit_log_create(sender, instance, created, **kwargs):
+def audit_log_create(sender, instance, created, using, **kwargs):
     """Signal para registrar creaciones y actualizaciones de modelos.
-    
-    Este signal se activa después de que un modelo es creado o actualizado,
-    registrando la acción en el sistema de auditoría.
-    
+
+    Este signal se activa después de que un modelo es creado o actualizado.
+    Dentro de una transacción el cambio se acumula y se escribe al confirmarla
+    junto con el resto de cambios, en una sola revisión y un solo INSERT.
+
     Args:
         sender: El modelo que generó el signal.
         instance: La instancia del modelo que fue creada/actualizada.
         created: Boolean indicando si es una creación nueva.
+        using: Alias de la base de datos utilizada.
         **kwargs: Argumentos adicionales del signal.
     """
-    
-    # Evitar recursión infinita al no registrar cambios en el propio modelo AuditLog
-    if sender._meta.model_name != 'auditlog':
-        action = 'created' if created else 'updated'
-        
-        with reversion.create_revision():
-            # Establecer el usuario que realizó la acción
-            reversion.set_user(
-                getattr(instance, 'id_user', getattr(instance, 'user', None))
-            )
-            
-            # Establecer un comentario descriptivo
-            reversion.set_comment(
-                f'Action {action} on {sender._meta.model_name} with id {instance.pk}'
-            )
-            
-            # Crear el registro de auditoría
-            AuditLog.objects.create(
-                timestamp=timezone.now(),
-                user=getattr(instance, 'id_user', getattr(instance, 'user', None)),
-                action=action,
-                model=sender._meta.model_name,
-                record_id=instance.pk,
-                details=f'Action {action} on {sender._meta.model_name} with id {instance.pk}'
-            )
+
+    # El registro excluye AuditLog para evitar recursión y los modelos de alta frecuencia
+    if audit_registry.is_audited(sender):
+        _collect(sender, instance, 'created' if created else 'updated', using)
 
 @receiver(post_delete)
-def audit_log_delete(sender, instance, **kwargs):
+def audit_log_delete(sender, instance, using, **kwargs):
     """Signal para registrar eliminaciones de modelos.
-    
+
     Este signal se activa después de que un modelo es eliminado,
-    registrando la acción en el sistema de auditoría.
-    
+    acumulando el cambio en el recolector de la transacción activa.
+
     Args:
         sender: El modelo que generó el signal.
         instance: La instancia del modelo que fue eliminada.
+        using: Alias de la base de datos utilizada.
         **kwargs: Argumentos adicionales del signal.
     """
-    
-    # Evitar recursión infinita al no registrar cambios en el propio modelo AuditLog
-    if sender._meta.model_name != 'auditlog':
-        with reversion.create_revision():
-            # Establecer el usuario que realizó la acción
-            reversion.set_user(
-                getattr(instance, 'id_user', getattr(instance, 'user', None))
-            )
-            
-            # Establecer un comentario descriptivo
-            reversion.set_comment(
-                f'Action deleted on {sender._meta.model_name} with id {instance.pk}'
-            )
-            
-            # Crear el registro de auditoría
-            AuditLog.objects.create(
-                timestamp=timezone.now(),
-                user=getattr(instance, 'id_user', getattr(instance, 'user', None)),
-                action='deleted',
-                model=sender._meta.model_name,
-                record_id=instance.pk,
-                details=f'Action deleted on {sender._meta.model_name} with id {instance.pk}'
-            )
\ No newline at end of file
+
+    if audit_registry.is_audited(sender):
+        _collect(sender, instance, 'deleted', using)
+
+
+@receiver(pre_migrate)
+def suspend_audit_during_migrations(sender, **kwargs):
+    """Suspende la auditoría mientras se ejecutan las migraciones."""
+    audit_registry.suspended = True
+
+@receiver(post_migrate)
+def resume_audit_after_migrations(sender, **kwargs):
+    """Reanuda la auditoría al finalizar las migraciones."""
+    audit_registry.suspended = False
@@ -1,3 +1,391 @@
-from django.test import TestCase
+import gzip
+import json
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from apps.business.tickets.models import Ticket, Visit
+from apps.support.audit.buffer import AuditBuffer
+from apps.support.audit.collector import audit_collector
+from apps.support.audit.models import AuditLogArchive
+from apps.support.audit.partitions import archive_partition, expired_periodos, shift_periodo
+from apps.support.audit.policies import CapturePolicy, CapturePolicyEngine
+from apps.support.audit.registry import AuditRegistry, audit_registry
+from apps.support.audit.models import AuditLog
+
+
+class AuditBufferTest(TestCase):
+    """Pruebas del buffer asíncrono de auditoría."""
+
+    def setUp(self):
+        self.buffer = AuditBuffer(max_queue_size=3, batch_size=2, flush_interval=60)
+        # Evitar el hilo escritor: las pruebas vacían la cola manualmente
+        patcher = patch.object(self.buffer, '_ensure_started')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _record(self, action='GET /api/'):
+        return {
+            'timestamp': timezone.now(),
+            'action': action,
+            'model': 'API Request',
+            'details': lambda: {'request_body': action},
+        }
+
+    def test_enqueue_does_not_write(self):
+        self.assertTrue(self.buffer.enqueue(self._record()))
+        self.assertEqual(AuditLog.objects.count(), 0)
+        self.assertEqual(self.buffer.stats['queued'], 1)
+
+    def test_flush_writes_in_batches(self):
+        for i in range(3):
+            self.buffer.enqueue(self._record(f'GET /api/{i}/'))
+
+        self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual(AuditLog.objects.count(), 3)
+        self.assertEqual(self.buffer.stats['flushes'], 2)
+        self.assertEqual(
+            AuditLog.objects.get(action='GET /api/0/').details,
+            {'request_body': 'GET /api/0/'}
+        )
+
+    def test_full_queue_drops_records(self):
+        for i in range(3):
+            self.assertTrue(self.buffer.enqueue(self._record()))
+
+        self.assertFalse(self.buffer.enqueue(self._record()))
+        stats = self.buffer.stats
+        self.assertEqual(stats['dropped'], 1)
+        self.assertEqual(stats['enqueued'], 3)
+        self.assertGreaterEqual(stats['high_water_hits'], 1)
+
+    def test_timestamp_is_preserved(self):
+        timestamp = timezone.now() - timezone.timedelta(minutes=5)
+        record = self._record()
+        record['timestamp'] = timestamp
+        self.buffer.enqueue(record)
+        self.buffer.flush()
+
+        self.assertEqual(AuditLog.objects.get().timestamp, timestamp)
+
+    def test_shutdown_flushes_pending_records(self):
+        self.buffer.enqueue(self._record())
+        self.buffer.shutdown()
+
+        self.assertEqual(AuditLog.objects.count(), 1)
+
+    def test_disabled_buffer_writes_synchronously(self):
+        buffer = AuditBuffer(enabled=False)
+        buffer.enqueue(self._record())
+
+        self.assertEqual(AuditLog.objects.count(), 1)
+        self.assertEqual(buffer.stats['written'], 1)
+
+
+class AuditLogMiddlewareTest(TestCase):
+    """Pruebas del middleware de auditoría de solicitudes HTTP."""
+
+    def test_request_is_logged(self):
+        self.client.get('/api/v1/tickets/tickets/')
+
+        log = AuditLog.objects.get()
+        self.assertEqual(log.action, 'GET /api/v1/tickets/tickets/')
+        self.assertEqual(log.model, 'API Request')
+        self.assertEqual(log.method, 'GET')
+        self.assertEqual(log.path, '/api/v1/tickets/tickets/')
+        self.assertEqual(log.status_code, 401)
+        self.assertIsNotNone(log.latency_ms)
+
+
+class CapturePolicyTest(TestCase):
+    """Pruebas de las políticas de captura de cuerpos."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.policy = CapturePolicy(
+            max_body_bytes=10,
+            allowed_content_types=['application/json', 'text/'],
+            denied_content_types=['text/csv'],
+        )
+
+    def test_body_is_truncated(self):
+        response = HttpResponse(b'{"a": "0123456789"}', content_type='application/json')
+        captured = self.policy.capture_response_body(response)
+
+        self.assertTrue(captured.truncated)
+        self.assertEqual(captured.content, b'{"a": "012')
+
+    def test_disallowed_content_type_is_not_captured(self):
+        response = HttpResponse(b'%PDF-1.4', content_type='application/pdf')
+        self.assertIsNone(self.policy.capture_response_body(response))
+
+    def test_denied_content_type_wins(self):
+        response = HttpResponse(b'a,b', content_type='text/csv')
+        self.assertIsNone(self.policy.capture_response_body(response))
+
+    def test_streaming_response_is_not_materialized(self):
+        def stream():
+            raise AssertionError('El stream no debe consumirse')
+            yield b''
+
+        response = StreamingHttpResponse(stream(), content_type='application/json')
+        self.assertIsNone(self.policy.capture_response_body(response))
+
+    def test_get_sampling(self):
+        request = self.factory.get('/api/v1/tickets/tickets/')
+        self.assertFalse(CapturePolicy(get_sample_rate=0.0).should_capture_bodies(request))
+        self.assertTrue(CapturePolicy(get_sample_rate=1.0).should_capture_bodies(request))
+
+    def test_engine_resolves_first_matching_route(self):
+        engine = CapturePolicyEngine(
+            default={'MAX_BODY_BYTES': 100},
+            routes=[
+                {'PATTERN': r'^/media/', 'MODE': 'skip'},
+                {'PATTERN': r'^/api/documents/', 'MODE': 'metadata'},
+            ],
+        )
+
+        self.assertFalse(engine.resolve('/media/a.png').should_log())
+        self.assertEqual(engine.resolve('/api/documents/1/').mode, 'metadata')
+        self.assertEqual(engine.resolve('/api/documents/1/').max_body_bytes, 100)
+        self.assertIs(engine.resolve('/api/tickets/'), engine.default_policy)
+
+    @override_settings(AUDIT_CAPTURE_POLICIES={'ROUTES': [{'PATTERN': r'^/api/', 'MODE': 'skip'}]})
+    def test_middleware_honors_skip_policy(self):
+        self.client.get('/api/v1/tickets/tickets/')
+        self.assertEqual(AuditLog.objects.count(), 0)
+
+
+class AuditCollectorTest(TestCase):
+    """Pruebas del recolector de auditoría con alcance de transacción."""
+
+    def _create_models(self):
+        ticket = Ticket.objects.create(name='Adulto', description='Entrada general', price=5000)
+        ticket.occupied_slots = 1
+        ticket.save()
+        Visit.objects.create(day=timezone.now().date())
+
+    def test_changes_are_written_once_on_commit(self):
+        with patch.object(audit_collector, 'write', wraps=audit_collector.write) as write:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    self._create_models()
+                    self.assertEqual(AuditLog.objects.count(), 0)
+
+        write.assert_called_once()
+        self.assertEqual(
+            sorted(AuditLog.objects.values_list('model', 'action')),
+            [('ticket', 'created'), ('ticket', 'updated'), ('visit', 'created')]
+        )
+
+    def test_rolled_back_changes_are_discarded(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self._create_models()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+
+        self.assertEqual(AuditLog.objects.count(), 0)
+
+    def test_rolled_back_savepoint_is_discarded(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Visit.objects.create(day=timezone.now().date())
+                try:
+                    with transaction.atomic():
+                        Ticket.objects.create(name='Niño', description='Menores', price=2500)
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+
+        self.assertEqual(list(AuditLog.objects.values_list('model', flat=True)), ['visit'])
+
+    def test_nested_atomic_blocks_share_one_revision(self):
+        with patch.object(audit_collector, 'write', wraps=audit_collector.write) as write:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    Visit.objects.create(day=timezone.now().date())
+                    with transaction.atomic():
+                        Ticket.objects.create(name='Adulto', description='Entrada general', price=5000)
+                        try:
+                            with transaction.atomic():
+                                Ticket.objects.create(name='Niño', description='Menores', price=2500)
+                                raise RuntimeError
+                        except RuntimeError:
+                            pass
+                    Visit.objects.create(day=timezone.now().date() + timedelta(days=1))
+
+        write.assert_called_once()
+        self.assertEqual(len(write.call_args.args[0]), 3)
+        self.assertEqual(
+            list(AuditLog.objects.order_by('pk').values_list('model', flat=True)), ['visit', 'ticket', 'visit']
+        )
+
+    def test_batch_lookup_does_not_scan_callbacks(self):
+        class NoScan(list):
+            def __iter__(self):
+                raise AssertionError('run_on_commit recorrido en cada cambio')
+
+        with patch.object(audit_collector, 'write', wraps=audit_collector.write) as write:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    Visit.objects.create(day=timezone.now().date())
+                    connection.run_on_commit = NoScan(connection.run_on_commit)
+                    try:
+                        for price in range(20):
+                            Ticket.objects.create(name=f'Ticket {price}', description='Lote', price=price)
+                    finally:
+                        connection.run_on_commit = connection.run_on_commit[:]
+
+        write.assert_called_once()
+        self.assertEqual(AuditLog.objects.count(), 21)
+
+    def test_excluded_model_is_not_audited(self):
+        audit_registry.exclude(Visit)
+        self.addCleanup(audit_registry.register, Visit)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self._create_models()
+
+        self.assertFalse(AuditLog.objects.filter(model='visit').exists())
+
+    def test_registry_allowlist(self):
+        registry = AuditRegistry(included=['tickets.ticket'])
+
+        self.assertTrue(registry.is_audited(Ticket))
+        self.assertFalse(registry.is_audited(Visit))
+        self.assertFalse(AuditRegistry().is_audited(AuditLog))
+
+    def test_write_outside_transaction(self):
+        ticket = Ticket(pk=1, name='Adulto')
+        audit_collector.write([{
+            'instance': ticket,
+            'action': 'deleted',
+            'model': 'ticket',
+            'record_id': 1,
+            'user': None,
+        }])
+
+        log = AuditLog.objects.get()
+        self.assertEqual((log.action, log.model, log.record_id), ('deleted', 'ticket', 1))
+        self.assertIsNone(log.details)
+
+
+class AuditPartitionTest(TestCase):
+    """Pruebas del particionamiento mensual y el archivado de auditoría."""
+
+    def _log(self, year, month, day=15, **kwargs):
+        return AuditLog(
+            timestamp=datetime(year, month, day, 12, tzinfo=dt_timezone.utc),
+            action='GET /api/',
+            model='API Request',
+            **kwargs
+        )
+
+    def setUp(self):
+        AuditLog.objects.bulk_create([
+            self._log(2024, 1), self._log(2024, 1, day=20), self._log(2024, 2), self._log(2025, 8),
+        ])
+        self.output_dir = tempfile.mkdtemp()
+
+    def test_periodo_is_set_on_bulk_create(self):
+        self.assertEqual(
+            sorted(AuditLog.objects.values_list('periodo', flat=True)),
+            [202401, 202401, 202402, 202508]
+        )
+
+    def test_shift_periodo(self):
+        self.assertEqual(shift_periodo(202401, -1), 202312)
+        self.assertEqual(shift_periodo(202412, 1), 202501)
+        self.assertEqual(shift_periodo(202508, -12), 202408)
+
+    def test_expired_periodos(self):
+        now = datetime(2025, 8, 1, tzinfo=dt_timezone.utc)
+        self.assertEqual(expired_periodos(12, now=now), [202401, 202402])
+        self.assertEqual(expired_periodos(18, now=now), [202401])
+        self.assertEqual(expired_periodos(20, now=now), [])
+
+    def test_archive_jsonl(self):
+        archive = archive_partition(202401, self.output_dir, fmt='jsonl')
+
+        with gzip.open(archive.file_path, 'rt') as handle:
+            rows = [json.loads(line) for line in handle]
+        self.assertEqual(archive.row_count, 2)
+        self.assertEqual([row['periodo'] for row in rows], [202401, 202401])
+        self.assertFalse(AuditLog.objects.filter(periodo=202401).exists())
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+    def test_archive_columnar(self):
+        archive = archive_partition(202401, self.output_dir, fmt='columnar', chunk_size=1)
+
+        with gzip.open(archive.file_path, 'rt') as handle:
+            groups = [json.loads(line) for line in handle]
+        self.assertEqual([group['rows'] for group in groups], [1, 1])
+        self.assertEqual(groups[0]['columns']['action'], ['GET /api/'])
+
+    def test_command_archives_expired_partitions(self):
+        out = StringIO()
+        with patch('apps.support.audit.partitions.timezone.now',
+                   return_value=datetime(2025, 8, 1, tzinfo=dt_timezone.utc)):
+            call_command('archive_audit_logs', retention_months=12,
+                         output_dir=self.output_dir, stdout=out)
+
+        self.assertEqual(
+            list(AuditLogArchive.objects.order_by('periodo').values_list('periodo', 'row_count')),
+            [(202401, 2), (202402, 1)]
+        )
+        self.assertEqual(list(AuditLog.objects.values_list('periodo', flat=True)), [202508])
+
+    def test_viewset_filters_partitions(self):
+        user = User.objects.create_user('auditor', password='x', is_staff=True)
+        user.groups.add(Group.objects.get_or_create(name='admin')[0])
+        self.client.force_login(user)
+
+        response = self.client.get(
+            '/api/v1/audit/logs/',
+            {'timestamp__gte': '2024-02-01T00:00:00Z', 'timestamp__lte': '2024-12-31T00:00:00Z'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+
+
+class AuditStructuredFieldsTest(TestCase):
+    """Pruebas de los campos estructurados y la búsqueda en detalles."""
+
+    def setUp(self):
+        AuditLog.objects.bulk_create([
+            AuditLog(action='GET /api/v1/tickets/', model='API Request', method='GET',
+                     path='/api/v1/tickets/', status_code=200, latency_ms=12,
+                     details={'response_body': {'name': 'Adulto'}}),
+            AuditLog(action='POST /api/v1/payments/', model='API Request', method='POST',
+                     path='/api/v1/payments/', status_code=500, latency_ms=340,
+                     details={'request_body': {'monto': '10.00'}}),
+        ])
+        user = User.objects.create_user('auditor', password='x', is_staff=True)
+        user.groups.add(Group.objects.get_or_create(name='admin')[0])
+        self.client.force_login(user)
+
+    def _paths(self, params):
+        response = self.client.get('/api/v1/audit/logs/', params)
+        self.assertEqual(response.status_code, 200)
+        return [row['path'] for row in response.json()['results']]
+
+    def test_filter_by_structured_fields(self):
+        self.assertEqual(self._paths({'status_code__gte': 500}), ['/api/v1/payments/'])
+        self.assertEqual(self._paths({'path__startswith': '/api/v1/tick'}), ['/api/v1/tickets/'])
+        self.assertEqual(self._paths({'latency_ms__gte': 300}), ['/api/v1/payments/'])
+
+    def test_details_search(self):
+        self.assertEqual(self._paths({'details_search': 'Adulto'}), ['/api/v1/tickets/'])
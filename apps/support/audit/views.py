@@ -1,7 +1,14 @@
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import TextField
+from django.db.models.functions import Cast
+from django.utils import timezone
 from rest_framework import viewsets, filters
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import AuditLog
+from .partitions import periodo_range
 from .serializers import AuditLogSerializer
 from apps.support.security.permissions import IsAuthenticatedAndRole
 
@@ -32,27 +39,101 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
         filters.OrderingFilter
     ]
     
+    # Solo búsquedas exactas o por prefijo sobre columnas indexadas
     filterset_fields = {
         'timestamp': ['gte', 'lte', 'exact', 'gt', 'lt'],
         'user': ['exact'],
-        'action': ['exact', 'icontains'],
-        'model': ['exact', 'icontains'],
-        'record_id': ['exact']
+        'action': ['exact'],
+        'model': ['exact'],
+        'record_id': ['exact'],
+        'method': ['exact'],
+        'path': ['exact', 'startswith'],
+        'status_code': ['exact', 'gte', 'lt'],
+        'latency_ms': ['gte', 'lte'],
     }
     
-    search_fields = ['action', 'model', 'details']
-    ordering_fields = ['timestamp', 'user', 'action', 'model']
+    search_fields = ['=action', '=model', '^path']
+    ordering_fields = ['timestamp', 'user', 'action', 'model', 'status_code', 'latency_ms']
     
     def get_queryset(self):
         """Personaliza el queryset según el usuario.
         
         Si el usuario es staff, puede ver todos los registros.
         Si no, solo puede ver los registros relacionados con él.
+        Además restringe la consulta a las particiones mensuales que se
+        solapan con los filtros de ``timestamp`` y aplica el filtro de texto
+        completo ``details_search``.
         
         Returns:
             QuerySet: Registros de auditoría filtrados según el usuario.
         """
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related('user')
         if not self.request.user.is_staff:
             queryset = queryset.filter(user=self.request.user)
+        queryset = self.filter_details(queryset)
+        return self.filter_partitions(queryset)
+
+    def filter_details(self, queryset):
+        """Busca texto dentro de ``details`` con el parámetro ``details_search``.
+
+        En PostgreSQL usa el índice GIN de texto completo creado por la
+        migración 0004; en otros motores recurre a una búsqueda por
+        subcadena, adecuada solo para volúmenes de desarrollo.
+
+        Args:
+            queryset: Queryset de registros de auditoría.
+
+        Returns:
+            QuerySet: Queryset filtrado por el contenido de ``details``.
+        """
+        term = self.request.query_params.get('details_search')
+        if not term:
+            return queryset
+        if connection.vendor == 'postgresql':
+            from django.contrib.postgres.search import SearchQuery, SearchVector
+
+            return queryset.annotate(
+                details_vector=SearchVector('details', config='simple')
+            ).filter(details_vector=SearchQuery(term, config='simple'))
+        return queryset.annotate(
+            details_text=Cast('details', TextField())
+        ).filter(details_text__icontains=term)
+
+    def _param_datetime(self, *names):
+        """Interpreta el primer parámetro de fecha válido entre ``names``."""
+        field = forms.DateTimeField()
+        for name in names:
+            value = self.request.query_params.get(name)
+            if not value:
+                continue
+            try:
+                parsed = field.clean(value)
+            except ValidationError:
+                continue
+            if timezone.is_naive(parsed):
+                parsed = timezone.make_aware(parsed)
+            return parsed
+        return None
+
+    def filter_partitions(self, queryset):
+        """Restringe el queryset a las particiones del rango solicitado.
+
+        El filtro sobre ``periodo`` es redundante con el de ``timestamp`` que
+        aplica ``DjangoFilterBackend``, pero permite usar el índice
+        (periodo, timestamp) y descartar particiones completas.
+
+        Args:
+            queryset: Queryset de registros de auditoría.
+
+        Returns:
+            QuerySet: Queryset acotado a las particiones solapadas.
+        """
+        start, end = periodo_range(
+            self._param_datetime('timestamp__gte', 'timestamp__gt', 'timestamp'),
+            self._param_datetime('timestamp__lte', 'timestamp__lt', 'timestamp'),
+        )
+        if start is not None:
+            queryset = queryset.filter(periodo__gte=start)
+        if end is not None:
+            queryset = queryset.filter(periodo__lte=end)
         return queryset
@@ -0,0 +1,35 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Configuración del panel de administración para trabajos en segundo plano.
+
+    Permite revisar los trabajos descartados y reencolarlos una vez
+    corregida la causa del error.
+    """
+
+    list_display = ['id', 'task', 'queue', 'status', 'attempts', 'max_attempts', 'run_at', 'reference']
+    list_filter = ['status', 'queue', 'task']
+    search_fields = ['=reference', '=task']
+    readonly_fields = [
+        'task', 'kwargs', 'reference', 'attempts', 'locked_by', 'locked_at',
+        'result', 'last_error', 'created_at', 'finished_at',
+    ]
+    ordering = ['-created_at']
+    actions = ['retry_jobs']
+
+    @admin.action(description='Reencolar los trabajos seleccionados')
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status=Job.STATUS_RUNNING).update(
+            status=Job.STATUS_PENDING,
+            attempts=0,
+            run_at=timezone.now(),
+            locked_by='',
+            locked_at=None,
+            finished_at=None,
+        )
+        self.message_user(request, f'{updated} trabajos reencolados')
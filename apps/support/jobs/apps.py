@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.support.jobs'
+    verbose_name = 'Background Jobs'
+
+    def ready(self):
+        """Registra las tareas definidas en los módulos ``tasks`` de las aplicaciones"""
+        autodiscover_modules('tasks')
@@ -0,0 +1,115 @@
+"""
+Comando de gestión para ejecutar los trabajadores de la cola de trabajos
+
+Inicia uno o más procesos que reclaman y ejecutan trabajos de ``Job``. Cada
+proceso termina su trabajo en curso al recibir SIGTERM o SIGINT; el proceso
+principal reenvía la señal a sus hijos y reinicia los que terminan de forma
+inesperada.
+
+Uso:
+    python manage.py run_workers
+    python manage.py run_workers --processes 4 --queue payments --queue default
+    python manage.py run_workers --burst
+
+Opciones:
+    --processes: Procesos trabajadores (por defecto JOB_QUEUE['WORKERS'])
+    --queue: Cola a atender; puede repetirse (por defecto JOB_QUEUE['QUEUES'])
+    --poll-interval: Segundos de espera cuando no hay trabajos
+    --burst: Ejecutar los trabajos disponibles y salir
+"""
+
+import multiprocessing
+import signal
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.support.jobs.queue import Worker, get_config
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(queues, poll_interval, burst):
+    django.setup()
+    Worker(queues=queues, poll_interval=poll_interval).run(burst=burst)
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta procesos trabajadores para la cola de trabajos en segundo plano'
+
+    def add_arguments(self, parser):
+        config = get_config()
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=config['WORKERS'],
+            help='Procesos trabajadores'
+        )
+        parser.add_argument(
+            '--queue',
+            action='append',
+            dest='queues',
+            help='Cola a atender; puede repetirse'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=config['POLL_INTERVAL'],
+            help='Segundos de espera cuando no hay trabajos'
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Ejecutar los trabajos disponibles y salir'
+        )
+
+    def handle(self, *args, **options):
+        queues = options['queues'] or get_config()['QUEUES']
+        processes = max(1, options['processes'])
+
+        if processes == 1:
+            processed = Worker(queues=queues, poll_interval=options['poll_interval']).run(burst=options['burst'])
+            self.stdout.write(self.style.SUCCESS(f'{processed} trabajos ejecutados'))
+            return
+
+        self._supervise(processes, (queues, options['poll_interval'], options['burst']))
+
+    def _supervise(self, processes, worker_args):
+        # Las conexiones abiertas no deben compartirse con los procesos hijos
+        connections.close_all()
+        context = multiprocessing.get_context()
+        stopping = False
+
+        def start():
+            process = context.Process(target=_worker_main, args=worker_args, daemon=False)
+            process.start()
+            return process
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+            for process in children:
+                if process.is_alive():
+                    process.terminate()
+
+        children = [start() for _ in range(processes)]
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        self.stdout.write(f'{processes} trabajadores iniciados en las colas {", ".join(worker_args[0])}')
+
+        burst = worker_args[2]
+        while children:
+            for process in list(children):
+                process.join(timeout=0.5)
+                if process.is_alive():
+                    continue
+                children.remove(process)
+                if not stopping and not burst and process.exitcode != 0:
+                    logger.warning('Trabajador %s terminó con código %s, se reinicia', process.pid, process.exitcode)
+                    time.sleep(1)
+                    children.append(start())
+
+        self.stdout.write(self.style.SUCCESS('Trabajadores detenidos'))
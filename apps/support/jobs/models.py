@@ -0,0 +1,69 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Trabajo en segundo plano guardado en la base de datos.
+
+    Los trabajos se crean dentro de la misma transacción que los cambios que
+    los originan, por lo que solo existen si esos cambios se confirman. Los
+    procesos del comando ``run_workers`` los reclaman en orden de ``run_at``
+    (ver ``apps.support.jobs.queue``).
+
+    Ciclo de vida:
+    - PENDING: En espera de un trabajador (nuevo o reintento programado)
+    - RUNNING: Reclamado por un trabajador
+    - SUCCEEDED: Terminado; ``result`` guarda el valor retornado
+    - DEAD: Agotó sus intentos o falló de forma permanente
+
+    Attributes:
+        queue (CharField): Cola a la que pertenece
+        task (CharField): Nombre registrado de la tarea
+        kwargs (JSONField): Argumentos de la tarea
+        reference (CharField): Objeto relacionado (``app_label.modelo:pk``)
+        status (CharField): Estado del trabajo
+        attempts (PositiveIntegerField): Intentos realizados
+        max_attempts (PositiveIntegerField): Intentos antes de descartarlo
+        run_at (DateTimeField): Momento a partir del cual puede ejecutarse
+        locked_by (CharField): Trabajador que lo reclamó
+        locked_at (DateTimeField): Momento en que fue reclamado
+        result (JSONField): Valor retornado por la tarea
+        last_error (TextField): Último error registrado
+    """
+    STATUS_PENDING = 'PENDING'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_SUCCEEDED = 'SUCCEEDED'
+    STATUS_DEAD = 'DEAD'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_RUNNING, 'En ejecución'),
+        (STATUS_SUCCEEDED, 'Completado'),
+        (STATUS_DEAD, 'Descartado'),
+    ]
+
+    queue = models.CharField(max_length=50, default='default')
+    task = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    reference = models.CharField(max_length=100, blank=True, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Trabajo en segundo plano'
+        verbose_name_plural = 'Trabajos en segundo plano'
+        ordering = ['run_at', 'pk']
+        indexes = [
+            models.Index(fields=['status', 'queue', 'run_at'], name='jobs_job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.pk} - {self.get_status_display()}'
@@ -0,0 +1,394 @@
+"""
+Cola de trabajos en segundo plano respaldada por la base de datos
+
+Las tareas se registran con el decorador ``task`` en el módulo ``tasks`` de
+cada aplicación y se encolan con ``enqueue``. El trabajo se guarda como una
+fila de ``Job`` en la transacción actual: si la transacción se revierte, el
+trabajo desaparece con ella, y si se confirma, sobrevive a reinicios hasta
+que un trabajador lo ejecuta.
+
+Los trabajadores (comando ``run_workers``) reclaman trabajos con
+``SELECT ... FOR UPDATE SKIP LOCKED`` cuando la base de datos lo soporta
+(PostgreSQL), de modo que varios procesos toman filas distintas sin
+bloquearse entre sí. En SQLite, que serializa las escrituras, el reclamo se
+hace con un ``UPDATE`` condicional sobre el estado.
+
+Un trabajo que falla se reprograma con espera exponencial
+(``BACKOFF_BASE * 2 ** (intento - 1)`` segundos, acotada por ``BACKOFF_MAX``)
+y, al agotar sus intentos o lanzar ``PermanentError``, queda descartado
+(``DEAD``) para revisarse desde el admin. Los trabajos reclamados por un
+trabajador que murió se devuelven a la cola pasado ``LOCK_TIMEOUT``.
+
+Configuración (``settings.JOB_QUEUE``):
+    ASYNC (bool): Si es False los trabajos se ejecutan al confirmar la
+        transacción que los encola, sin trabajadores (pruebas).
+    QUEUES (list): Colas atendidas por defecto por ``run_workers``.
+    WORKERS (int): Procesos trabajadores por defecto.
+    POLL_INTERVAL (float): Segundos de espera cuando no hay trabajos.
+    MAX_ATTEMPTS (int): Intentos por defecto de cada trabajo.
+    BACKOFF_BASE (float): Segundos de espera antes del primer reintento.
+    BACKOFF_MAX (float): Espera máxima entre reintentos.
+    LOCK_TIMEOUT (float): Segundos tras los cuales un trabajo reclamado se
+        considera abandonado.
+"""
+
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import partial
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_QUEUE = {
+    'ASYNC': True,
+    'QUEUES': ['default'],
+    'WORKERS': 2,
+    'POLL_INTERVAL': 1.0,
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE': 5.0,
+    'BACKOFF_MAX': 3600.0,
+    'LOCK_TIMEOUT': 600.0,
+}
+
+
+def get_config():
+    """Configuración de la cola combinada con los valores por defecto."""
+    return {**DEFAULT_JOB_QUEUE, **getattr(settings, 'JOB_QUEUE', {})}
+
+
+class PermanentError(Exception):
+    """Error que no se corrige reintentando; el trabajo se descarta de inmediato."""
+
+
+@dataclass(frozen=True)
+class Task:
+    """Tarea registrada en la cola.
+
+    Attributes:
+        name (str): Nombre con el que se encola.
+        func (callable): Función que ejecuta el trabajo con sus argumentos.
+        queue (str): Cola por defecto.
+        max_attempts (int): Intentos antes de descartar; None usa la configuración.
+        on_dead (callable): Se llama con (job, error) cuando el trabajo se descarta.
+    """
+    name: str
+    func: Callable
+    queue: str = 'default'
+    max_attempts: Optional[int] = None
+    on_dead: Optional[Callable] = None
+
+
+_registry = {}
+
+
+def task(name, queue='default', max_attempts=None, on_dead=None):
+    """Registra una función como tarea de la cola.
+
+    Args:
+        name (str): Nombre único de la tarea, p. ej. ``'payments.process_payment'``.
+        queue (str): Cola por defecto de sus trabajos.
+        max_attempts (int): Intentos antes de descartar el trabajo.
+        on_dead (callable): Compensación al descartar el trabajo.
+
+    Returns:
+        callable: Decorador que devuelve la función sin cambios.
+    """
+    def decorator(func):
+        _registry[name] = Task(name, func, queue, max_attempts, on_dead)
+        return func
+    return decorator
+
+
+def get_task(name):
+    """Tarea registrada con ese nombre o None."""
+    return _registry.get(name)
+
+
+def backoff_delay(attempts, base=None, maximum=None):
+    """Segundos de espera antes del siguiente intento.
+
+    La espera se duplica con cada intento y lleva hasta un 10 % de variación
+    aleatoria para que los trabajos que fallaron juntos no se reintenten a la vez.
+
+    Args:
+        attempts (int): Intentos ya realizados (1 o más).
+        base (float): Espera del primer reintento; por defecto ``BACKOFF_BASE``.
+        maximum (float): Espera máxima; por defecto ``BACKOFF_MAX``.
+    """
+    config = get_config()
+    base = config['BACKOFF_BASE'] if base is None else base
+    maximum = config['BACKOFF_MAX'] if maximum is None else maximum
+    delay = min(maximum, base * 2 ** max(attempts - 1, 0))
+    return delay + random.uniform(0, delay * 0.1)
+
+
+def enqueue(name, kwargs=None, reference='', queue=None, delay=None, unique=False):
+    """Encola un trabajo en la transacción actual.
+
+    Args:
+        name (str): Nombre de la tarea registrada.
+        kwargs (dict): Argumentos serializables en JSON.
+        reference (str): Objeto relacionado, p. ej. ``'payments.pago:12'``.
+        queue (str): Cola; por defecto la de la tarea.
+        delay (timedelta): Tiempo mínimo antes de ejecutarlo.
+        unique (bool): Si ya hay un trabajo pendiente o en ejecución de la
+            misma tarea y referencia, se devuelve ese en lugar de crear otro.
+
+    Returns:
+        Job: Trabajo encolado.
+
+    Raises:
+        LookupError: Si la tarea no está registrada.
+    """
+    registered = get_task(name)
+    if registered is None:
+        raise LookupError(f'Tarea no registrada: {name}')
+
+    if unique:
+        existing = Job.objects.filter(
+            task=name, reference=reference, status__in=[Job.STATUS_PENDING, Job.STATUS_RUNNING]
+        ).first()
+        if existing is not None:
+            return existing
+
+    config = get_config()
+    job = Job.objects.create(
+        queue=queue or registered.queue,
+        task=name,
+        kwargs=kwargs or {},
+        reference=reference,
+        max_attempts=registered.max_attempts or config['MAX_ATTEMPTS'],
+        run_at=timezone.now() + (delay or timedelta()),
+    )
+    if not config['ASYNC'] and delay is None:
+        transaction.on_commit(partial(run_job, job.pk))
+    return job
+
+
+def _claim_update(queryset, worker_id, now):
+    return queryset.filter(status=Job.STATUS_PENDING).update(
+        status=Job.STATUS_RUNNING,
+        attempts=F('attempts') + 1,
+        locked_by=worker_id,
+        locked_at=now,
+    )
+
+
+def claim_job(worker_id, queues=None):
+    """Reclama el siguiente trabajo disponible.
+
+    Args:
+        worker_id (str): Identificador del trabajador.
+        queues (list): Colas a atender; por defecto ``QUEUES``.
+
+    Returns:
+        Job: Trabajo reclamado (ya en ``RUNNING``) o None si no hay.
+    """
+    now = timezone.now()
+    available = Job.objects.filter(
+        status=Job.STATUS_PENDING,
+        queue__in=queues or get_config()['QUEUES'],
+        run_at__lte=now,
+    ).order_by('run_at', 'pk')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            pk = available.select_for_update(skip_locked=True).values_list('pk', flat=True).first()
+            if pk is None:
+                return None
+            _claim_update(Job.objects.filter(pk=pk), worker_id, now)
+        return Job.objects.get(pk=pk)
+
+    # Sin SKIP LOCKED (SQLite): el UPDATE condicional solo gana en un proceso
+    for pk in available.values_list('pk', flat=True)[:10]:
+        if _claim_update(Job.objects.filter(pk=pk), worker_id, now):
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def _release(job, worker_id, **fields):
+    updated = Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING, locked_by=worker_id).update(
+        locked_by='', locked_at=None, **fields
+    )
+    if not updated:
+        logger.warning('El trabajo %s ya no pertenecía a %s al terminar', job.pk, worker_id)
+
+
+def _bury(job, registered, worker_id, error):
+    _release(job, worker_id, status=Job.STATUS_DEAD, last_error=error, finished_at=timezone.now())
+    logger.error('Trabajo %s (%s) descartado: %s', job.pk, job.task, error)
+    if registered is not None and registered.on_dead is not None:
+        try:
+            registered.on_dead(job, error)
+        except Exception:
+            logger.exception('Error en la compensación del trabajo %s', job.pk)
+
+
+def execute(job, worker_id):
+    """Ejecuta un trabajo reclamado y registra su resultado.
+
+    Args:
+        job (Job): Trabajo en ``RUNNING`` reclamado por ``worker_id``.
+        worker_id (str): Identificador del trabajador.
+
+    Returns:
+        bool: True si la tarea terminó sin errores.
+    """
+    registered = get_task(job.task)
+    if registered is None:
+        _bury(job, None, worker_id, f'Tarea no registrada: {job.task}')
+        return False
+
+    try:
+        result = registered.func(**job.kwargs)
+    except PermanentError as e:
+        _bury(job, registered, worker_id, str(e))
+        return False
+    except Exception as e:
+        error = f'{e.__class__.__name__}: {e}'
+        if job.attempts >= job.max_attempts:
+            logger.exception('Trabajo %s (%s) falló en su último intento', job.pk, job.task)
+            _bury(job, registered, worker_id, error)
+        else:
+            delay = backoff_delay(job.attempts)
+            logger.warning(
+                'Trabajo %s (%s) falló en el intento %s, se reintenta en %.0f s: %s',
+                job.pk, job.task, job.attempts, delay, error,
+            )
+            _release(
+                job, worker_id,
+                status=Job.STATUS_PENDING,
+                run_at=timezone.now() + timedelta(seconds=delay),
+                last_error=error,
+            )
+        return False
+
+    _release(
+        job, worker_id,
+        status=Job.STATUS_SUCCEEDED, result=result, last_error='', finished_at=timezone.now(),
+    )
+    return True
+
+
+def run_job(job_id, worker_id=None):
+    """Reclama y ejecuta un trabajo específico si sigue pendiente.
+
+    Returns:
+        bool: True si la tarea se ejecutó sin errores.
+    """
+    worker_id = worker_id or default_worker_id()
+    if not _claim_update(Job.objects.filter(pk=job_id), worker_id, timezone.now()):
+        return False
+    return execute(Job.objects.get(pk=job_id), worker_id)
+
+
+def requeue_stale(timeout=None):
+    """Devuelve a la cola los trabajos de trabajadores que dejaron de responder.
+
+    Los que ya agotaron sus intentos se descartan.
+
+    Args:
+        timeout (float): Segundos desde el reclamo; por defecto ``LOCK_TIMEOUT``.
+
+    Returns:
+        int: Cantidad de trabajos devueltos a la cola.
+    """
+    timeout = get_config()['LOCK_TIMEOUT'] if timeout is None else timeout
+    stale = Job.objects.filter(
+        status=Job.STATUS_RUNNING, locked_at__lte=timezone.now() - timedelta(seconds=timeout)
+    )
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.STATUS_DEAD, locked_by='', locked_at=None,
+        last_error='Trabajador sin respuesta', finished_at=timezone.now(),
+    )
+    requeued = stale.update(status=Job.STATUS_PENDING, locked_by='', locked_at=None)
+    if requeued:
+        logger.warning('%s trabajos abandonados devueltos a la cola', requeued)
+    return requeued
+
+
+def default_worker_id():
+    """Identificador del proceso actual (``host:pid``)."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class Worker:
+    """Trabajador que atiende una o más colas hasta que se le detiene.
+
+    Al recibir SIGTERM o SIGINT termina el trabajo en curso y sale.
+
+    Attributes:
+        queues (list): Colas atendidas.
+        poll_interval (float): Segundos de espera cuando no hay trabajos.
+        worker_id (str): Identificador registrado en ``Job.locked_by``.
+    """
+
+    def __init__(self, queues=None, poll_interval=None, worker_id=None):
+        config = get_config()
+        self.queues = list(queues or config['QUEUES'])
+        self.poll_interval = config['POLL_INTERVAL'] if poll_interval is None else poll_interval
+        self.worker_id = worker_id or default_worker_id()
+        self._stopping = threading.Event()
+
+    def stop(self, *args):
+        """Pide al trabajador que salga tras el trabajo en curso."""
+        self._stopping.set()
+
+    def run_pending(self):
+        """Ejecuta trabajos disponibles hasta vaciar las colas o recibir ``stop``.
+
+        Returns:
+            int: Cantidad de trabajos ejecutados.
+        """
+        processed = 0
+        while not self._stopping.is_set():
+            close_old_connections()
+            job = claim_job(self.worker_id, self.queues)
+            if job is None:
+                break
+            execute(job, self.worker_id)
+            processed += 1
+        return processed
+
+    def run(self, burst=False):
+        """Atiende las colas hasta ``stop``; con ``burst`` sale al vaciarlas.
+
+        Returns:
+            int: Cantidad de trabajos ejecutados.
+        """
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        logger.info('Trabajador %s atendiendo las colas %s', self.worker_id, ', '.join(self.queues))
+        processed = 0
+        reaped_at = 0.0
+        try:
+            while not self._stopping.is_set():
+                if time.monotonic() - reaped_at > get_config()['LOCK_TIMEOUT'] / 2:
+                    requeue_stale()
+                    reaped_at = time.monotonic()
+                count = self.run_pending()
+                processed += count
+                if burst and not count:
+                    break
+                if not count:
+                    self._stopping.wait(self.poll_interval)
+        finally:
+            close_old_connections()
+        logger.info('Trabajador %s detenido tras %s trabajos', self.worker_id, processed)
+        return processed
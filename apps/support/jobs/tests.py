@@ -0,0 +1,148 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import MagicMock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.support.jobs.models import Job
+from apps.support.jobs.queue import (
+    PermanentError, backoff_delay, claim_job, enqueue, execute, requeue_stale, task,
+)
+
+calls = []
+on_dead = MagicMock()
+
+
+@task('tests.add')
+def add(a, b):
+    calls.append((a, b))
+    return a + b
+
+
+@task('tests.flaky', max_attempts=2, on_dead=lambda job, error: on_dead(job.pk, error))
+def flaky():
+    raise ConnectionError('sin conexión')
+
+
+@task('tests.permanent')
+def permanent():
+    raise PermanentError('datos inválidos')
+
+
+@override_settings(JOB_QUEUE={'ASYNC': True, 'QUEUES': ['default'], 'BACKOFF_BASE': 10.0})
+class JobQueueTest(TestCase):
+    """Pruebas de la cola de trabajos respaldada por la base de datos."""
+
+    def setUp(self):
+        calls.clear()
+        on_dead.reset_mock()
+
+    def test_trabajo_exitoso_guarda_resultado(self):
+        job = enqueue('tests.add', {'a': 2, 'b': 3}, reference='tests.obj:1')
+
+        claimed = claim_job('w1')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, Job.STATUS_RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertTrue(execute(claimed, 'w1'))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(job.result, 5)
+        self.assertEqual(job.locked_by, '')
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(claim_job('w1'))
+
+    def test_un_trabajo_no_se_reclama_dos_veces(self):
+        enqueue('tests.add', {'a': 1, 'b': 1})
+
+        self.assertIsNotNone(claim_job('w1'))
+        self.assertIsNone(claim_job('w2'))
+
+    def test_respeta_run_at_y_colas(self):
+        enqueue('tests.add', {'a': 1, 'b': 1}, delay=timedelta(minutes=5))
+        enqueue('tests.add', {'a': 1, 'b': 2}, queue='reports')
+
+        self.assertIsNone(claim_job('w1'))
+        self.assertEqual(claim_job('w1', queues=['reports']).kwargs, {'a': 1, 'b': 2})
+
+    def test_fallo_se_reintenta_con_espera_y_luego_se_descarta(self):
+        job = enqueue('tests.flaky')
+
+        self.assertFalse(execute(claim_job('w1'), 'w1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('sin conexión', job.last_error)
+        self.assertGreaterEqual(job.run_at, timezone.now() + timedelta(seconds=9))
+        self.assertIsNone(claim_job('w1'))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertFalse(execute(claim_job('w1'), 'w1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_DEAD)
+        self.assertEqual(job.attempts, 2)
+        on_dead.assert_called_once_with(job.pk, job.last_error)
+
+    def test_error_permanente_se_descarta_sin_reintentos(self):
+        job = enqueue('tests.permanent')
+
+        execute(claim_job('w1'), 'w1')
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_DEAD)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.last_error, 'datos inválidos')
+
+    def test_espera_exponencial_acotada(self):
+        self.assertGreaterEqual(backoff_delay(1), 10)
+        self.assertLess(backoff_delay(1), 11.01)
+        self.assertGreaterEqual(backoff_delay(3), 40)
+        self.assertLessEqual(backoff_delay(30, maximum=60), 66)
+
+    def test_encolado_unico_por_referencia(self):
+        first = enqueue('tests.add', {'a': 1, 'b': 1}, reference='tests.obj:1', unique=True)
+        second = enqueue('tests.add', {'a': 1, 'b': 1}, reference='tests.obj:1', unique=True)
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_tarea_no_registrada(self):
+        with self.assertRaises(LookupError):
+            enqueue('tests.inexistente')
+
+    def test_trabajos_abandonados_vuelven_a_la_cola(self):
+        job = enqueue('tests.add', {'a': 1, 'b': 1})
+        claim_job('w1')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(requeue_stale(timeout=600), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_PENDING)
+        self.assertEqual(job.locked_by, '')
+
+        # El trabajador original ya no puede registrar el resultado
+        claimed = claim_job('w2')
+        self.assertTrue(execute(claimed, 'w2'))
+        self.assertEqual(claimed.attempts, 2)
+
+    @override_settings(JOB_QUEUE={'ASYNC': False})
+    def test_sin_trabajadores_se_ejecuta_al_confirmar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = enqueue('tests.add', {'a': 4, 'b': 4})
+            self.assertEqual(calls, [])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(job.result, 8)
+
+    def test_comando_run_workers_en_modo_burst(self):
+        for value in range(3):
+            enqueue('tests.add', {'a': value, 'b': 1})
+        out = StringIO()
+
+        call_command('run_workers', '--burst', '--processes', '1', stdout=out)
+
+        self.assertIn('3 trabajos ejecutados', out.getvalue())
+        self.assertEqual(Job.objects.filter(status=Job.STATUS_SUCCEEDED).count(), 3)
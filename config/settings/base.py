@@ -80,6 +80,7 @@ INSTALLED_APPS = [
     'apps.business.tickets',  # Sistema de tickets y visitas
     'apps.business.documents',
     'apps.support.messaging',
+    'apps.support.jobs',  # Cola de trabajos en segundo plano
 ]
 
 
@@ -137,6 +138,23 @@ DATABASES = {
 }
 
 
+# ==============================
+# CACHÉ
+# ==============================
+# Con REDIS_URL se usa django-redis; sin ella, la caché local en memoria
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            },
+        }
+    }
+
+
 # ==============================
 # CONFIGURACIÓN DE DRF Y JWT
 # ==============================
@@ -240,6 +258,108 @@ STRIPE_PUBLIC_KEY = os.environ.get('STRIPE_PUBLIC_KEY')
 STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY')
 STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET')
 
+# Cliente HTTP compartido con pool keep-alive, tiempos máximos y reintentos
+# acotados ante errores de red (ver apps.integrations.payments.stripe_client)
+STRIPE_CLIENT = {
+    'CONNECT_TIMEOUT': float(os.environ.get('STRIPE_CONNECT_TIMEOUT', 3.0)),
+    'READ_TIMEOUT': float(os.environ.get('STRIPE_READ_TIMEOUT', 20.0)),
+    'MAX_RETRIES': int(os.environ.get('STRIPE_MAX_RETRIES', 2)),
+    'BACKOFF_BASE': 0.25,
+    'BACKOFF_MAX': 2.0,
+    'POOL_SIZE': int(os.environ.get('STRIPE_POOL_SIZE', 10)),
+}
+
+# Los webhooks se guardan y se responden de inmediato; el procesamiento
+# ocurre en segundo plano (ver apps.business.payments.webhooks)
+PAYMENT_WEBHOOKS = {
+    'ASYNC': os.environ.get('PAYMENT_WEBHOOKS_ASYNC', 'True') == 'True',
+    'WORKERS': int(os.environ.get('PAYMENT_WEBHOOKS_WORKERS', 2)),
+    'MAX_ATTEMPTS': 5,
+}
+
+# Tipo de cambio USD/CRC: se sirve desde caché y se renueva en segundo plano
+# al vencer FRESH_FOR (ver apps.business.payments.services.ExchangeRateService)
+EXCHANGE_RATES = {
+    'URL': os.environ.get('EXCHANGE_RATE_URL', 'https://api.exchangerate-api.com/v4/latest/USD'),
+    'TIMEOUT': float(os.environ.get('EXCHANGE_RATE_TIMEOUT', 5.0)),
+    'FRESH_FOR': int(os.environ.get('EXCHANGE_RATE_FRESH_FOR', 14400)),
+    'STALE_FOR': int(os.environ.get('EXCHANGE_RATE_STALE_FOR', 7 * 24 * 3600)),
+    'LOCK_TIMEOUT': 60,
+    'DEFAULT_RATE': os.environ.get('EXCHANGE_RATE_DEFAULT', '540.00'),
+    'ASYNC': os.environ.get('EXCHANGE_RATE_ASYNC', 'True') == 'True',
+}
+
+# Los reportes de ventas leen resúmenes diarios; el día de un pago se
+# recalcula ROLLUP_DELAY segundos después de su último cambio
+SALES_REPORTS = {
+    'ROLLUP_DELAY': int(os.environ.get('SALES_ROLLUP_DELAY', 60)),
+}
+
+# Reembolsos: los masivos (cancelación de horarios) se procesan con a lo sumo
+# MAX_CONCURRENCY llamadas simultáneas; la conciliación consulta a Stripe por
+# páginas (ver apps.business.payments.services.ReembolsoService)
+REFUNDS = {
+    'MAX_CONCURRENCY': int(os.environ.get('REFUNDS_MAX_CONCURRENCY', 4)),
+    'BATCH_SIZE': 500,
+    'PAGE_SIZE': 100,
+    'RETRY_AFTER': int(os.environ.get('REFUNDS_RETRY_AFTER', 900)),
+}
+
+# ==============================
+# CONFIGURACIÓN DE TICKETS
+# ==============================
+# Duración de la retención de cupos mientras se completa el pago
+TICKET_HOLD_TTL_SECONDS = int(os.environ.get('TICKET_HOLD_TTL_SECONDS', 900))
+
+# Reservas retenidas (sin pagar ni vencer) que un usuario puede tener a la vez
+TICKET_MAX_ACTIVE_HOLDS = int(os.environ.get('TICKET_MAX_ACTIVE_HOLDS', 3))
+
+# Vigencia del calendario de disponibilidad en caché; se invalida por mes al
+# cambiar los cupos, este valor solo acota el tiempo de una entrada obsoleta
+TICKET_CALENDAR_CACHE_TIMEOUT = int(os.environ.get('TICKET_CALENDAR_CACHE_TIMEOUT', 300))
+
+# Backend de contadores de cupos: database, redis o memory (solo pruebas).
+# Con redis, ejecutar periódicamente el comando reconcile_slot_counters.
+TICKET_SLOT_COUNTER = {
+    'BACKEND': os.environ.get('TICKET_SLOT_COUNTER_BACKEND', 'database'),
+    'KEY_PREFIX': 'tickets',
+    'REDIS_ALIAS': 'default',
+}
+
+# Emisión de tickets electrónicos (QR, PNG y PDF) tras el pago.
+# ASYNC=False renderiza en el mismo hilo que confirma el pago (pruebas).
+TICKET_ISSUANCE = {
+    'ASYNC': os.environ.get('TICKET_ISSUANCE_ASYNC', 'True') == 'True',
+    'WORKERS': int(os.environ.get('TICKET_ISSUANCE_WORKERS', 4)),
+    'RENDER_CACHE_SIZE': 64,
+}
+
+# Validación en torniquetes: clave HMAC de los códigos QR (compartida con los
+# torniquetes para validar sin conexión) y escritura por lotes de redenciones
+TICKET_GATE = {
+    'SIGNING_KEY': os.environ.get('TICKET_GATE_SIGNING_KEY'),
+    'ASYNC': True,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': float(os.environ.get('TICKET_GATE_FLUSH_INTERVAL', 1.0)),
+}
+
+# ==============================
+# COLA DE TRABAJOS EN SEGUNDO PLANO
+# ==============================
+# Trabajos guardados en la base de datos y ejecutados por el comando
+# run_workers (ver apps.support.jobs.queue). ASYNC=False los ejecuta al
+# confirmar la transacción que los encola, sin trabajadores (pruebas).
+JOB_QUEUE = {
+    'ASYNC': os.environ.get('JOB_QUEUE_ASYNC', 'True') == 'True',
+    'QUEUES': os.environ.get('JOB_QUEUE_QUEUES', 'default,payments').split(','),
+    'WORKERS': int(os.environ.get('JOB_QUEUE_WORKERS', 2)),
+    'POLL_INTERVAL': float(os.environ.get('JOB_QUEUE_POLL_INTERVAL', 1.0)),
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE': 5.0,
+    'BACKOFF_MAX': 3600.0,
+    'LOCK_TIMEOUT': 600.0,
+}
+
 # ==============================
 # CONFIGURACIÓN DE EMAIL
 # ==============================
@@ -254,4 +374,44 @@ EMAIL_REPLY_TO = [os.environ.get('EMAIL_REPLY_TO', 'support@parquemarino.com')]
 
 SITE_NAME = 'Parque Marino'
 CONTACT_EMAIL = 'info@parquemarino.com'
-SUPPORT_PHONE = '+506 XXXX XXXX'
\ No newline at end of file
+SUPPORT_PHONE = '+506 XXXX XXXX'
+
+# ==============================
+# CONFIGURACIÓN DE AUDITORÍA
+# ==============================
+# Buffer en memoria para escribir los registros de auditoría en lotes
+AUDIT_BUFFER = {
+    'ENABLED': os.environ.get('AUDIT_BUFFER_ENABLED', 'True') == 'True',
+    'MAX_QUEUE_SIZE': int(os.environ.get('AUDIT_BUFFER_MAX_QUEUE_SIZE', 10000)),
+    'BATCH_SIZE': int(os.environ.get('AUDIT_BUFFER_BATCH_SIZE', 200)),
+    'FLUSH_INTERVAL': float(os.environ.get('AUDIT_BUFFER_FLUSH_INTERVAL', 2.0)),
+}
+
+# Modelos excluidos de la auditoría por señales (app_label.model_name).
+# Definir AUDIT_MODELS para auditar únicamente una lista explícita de modelos.
+AUDIT_EXCLUDED_MODELS = [
+    'messaging.otprecord',
+]
+
+# Políticas de captura de cuerpos por ruta (ver apps/support/audit/policies.py)
+AUDIT_CAPTURE_POLICIES = {
+    'DEFAULT': {
+        'MODE': 'full',
+        'MAX_BODY_BYTES': int(os.environ.get('AUDIT_MAX_BODY_BYTES', 4096)),
+        'ALLOWED_CONTENT_TYPES': ['application/json', 'text/'],
+        'DENIED_CONTENT_TYPES': ['multipart/form-data', 'application/octet-stream'],
+        'GET_SAMPLE_RATE': float(os.environ.get('AUDIT_GET_SAMPLE_RATE', 0.1)),
+    },
+    'ROUTES': [
+        # Archivos estáticos y media no se auditan
+        {'PATTERN': r'^/(static|media)/', 'MODE': 'skip'},
+        # Documentos: solo metadatos, las descargas pueden ser binarias y grandes
+        {'PATTERN': r'^/api/(v1/)?documents/', 'MODE': 'metadata'},
+        # Detalle completo de exhibiciones: respuestas grandes, solo un extracto
+        {'PATTERN': r'/full_details/$', 'MAX_BODY_BYTES': 1024},
+    ],
+}
+
+# Retención de particiones mensuales de auditoría y destino de los archivos
+AUDIT_RETENTION_MONTHS = int(os.environ.get('AUDIT_RETENTION_MONTHS', 12))
+AUDIT_ARCHIVE_DIR = os.environ.get('AUDIT_ARCHIVE_DIR', BASE_DIR / 'archive' / 'audit')
@@ -29,6 +29,12 @@ DATABASES = {
     }
 }
 
+# Auditoría síncrona en desarrollo para facilitar la depuración y las pruebas
+AUDIT_BUFFER = {
+    **AUDIT_BUFFER,
+    'ENABLED': os.environ.get('AUDIT_BUFFER_ENABLED', 'False') == 'True',
+}
+
 # Configuración de correo para desarrollo (consola)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
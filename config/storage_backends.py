@@ -52,7 +52,21 @@ class MediaStorage(S3Boto3Storage):
         if ext not in ALLOWED_EXTENSIONS:
             raise ValidationError(f'Tipo de archivo no permitido. Use: {", ".join(ALLOWED_EXTENSIONS)}')
           
-        if ext not in ALLOWED_MAX_SIZE:
+        if content.size > ALLOWED_MAX_SIZE:
             raise ValidationError(f'Tamaño de archivo no permitido. Máximo: {ALLOWED_MAX_SIZE} bytes')
         
         return super()._save(name, content)
+
+
+def media_storage():
+    """Almacenamiento de archivos media generados por la aplicación.
+
+    Usa ``MediaStorage`` cuando S3 está habilitado (``USE_S3``) y el
+    almacenamiento local por defecto en caso contrario.
+    """
+    from django.conf import settings
+    from django.core.files.storage import default_storage
+
+    if getattr(settings, 'USE_S3', False):
+        return MediaStorage()
+    return default_storage